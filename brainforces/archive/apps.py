@@ -7,3 +7,7 @@ class ArchiveConfig(django.apps.AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'archive'
     verbose_name = 'архив'
+
+    def ready(self) -> None:
+        """подключаем обработчики сигналов"""
+        import archive.signals  # noqa: F401
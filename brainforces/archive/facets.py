@@ -0,0 +1,94 @@
+import typing
+
+import django.db
+import django.db.models
+
+import archive.models
+import core.cache
+import quiz.models
+
+
+def count_questions(
+    field: str, keys: typing.Optional[typing.Set[int]]
+) -> typing.Dict[int, int]:
+    """
+    количество архивных вопросов по значениям поля (тегу, сложности)
+    keys None - по всем значениям
+    """
+    questions = quiz.models.Question.objects.filter_archived()
+    if keys is not None:
+        questions = questions.filter(**{f'{field}__in': keys})
+    return {
+        key: total
+        for key, total in questions.values(field)
+        .annotate(total=django.db.models.Count('pk'))
+        .values_list(field, 'total')
+        .order_by()
+        if key is not None
+    }
+
+
+def save_facets(
+    model: typing.Type[django.db.models.Model],
+    keys: typing.Optional[typing.Set[int]],
+    counts: typing.Dict[int, int],
+) -> None:
+    """
+    записываем количества значений keys, пустые значения удаляем
+    пишем только изменившиеся строки
+    """
+    facets = model.objects.all()
+    if keys is not None:
+        facets = facets.filter(pk__in=keys)
+    with django.db.transaction.atomic():
+        facets.exclude(pk__in=counts.keys()).delete()
+        existing = model.objects.in_bulk(counts.keys())
+        changed = list()
+        for facet in existing.values():
+            if facet.count != counts[facet.pk]:
+                facet.count = counts[facet.pk]
+                changed.append(facet)
+        model.objects.bulk_update(changed, ('count',))
+        model.objects.bulk_create(
+            [
+                model(pk=key, count=total)
+                for key, total in counts.items()
+                if key not in existing
+            ]
+        )
+    core.cache.touch(model)
+
+
+def refresh_facets(
+    tag_pks: typing.Optional[typing.Iterable[int]] = (),
+    difficulties: typing.Optional[typing.Iterable[int]] = (),
+) -> None:
+    """
+    пересчитываем количества только для затронутых тегов и сложностей,
+    None - пересчитываем все
+    """
+    for field, model, keys in (
+        ('tags', archive.models.TagFacet, tag_pks),
+        ('difficulty', archive.models.DifficultyFacet, difficulties),
+    ):
+        if keys is not None:
+            keys = set(keys)
+            if not keys:
+                continue
+        save_facets(model, keys, count_questions(field, keys))
+
+
+def refresh_quiz_facets(quiz_pk: int) -> None:
+    """викторина попала в архив или ушла из него"""
+    questions = quiz.models.Question.objects.filter(quiz__pk=quiz_pk)
+    refresh_facets(
+        tag_pks=quiz.models.Tag.objects.filter(
+            questions__quiz__pk=quiz_pk
+        ).values_list('pk', flat=True),
+        difficulties=questions.values_list('difficulty', flat=True),
+    )
+
+
+def rebuild_facets() -> None:
+    """пересчитываем все количества заново"""
+    refresh_facets(tag_pks=None, difficulties=None)
@@ -0,0 +1,13 @@
+import django.core.management.base
+
+import archive.facets
+
+
+class Command(django.core.management.base.BaseCommand):
+    """перестроение фильтров архива"""
+
+    help = 'Заново считает количества вопросов архива по тегам и сложностям'
+
+    def handle(self, *args, **options) -> None:
+        archive.facets.rebuild_facets()
+        self.stdout.write('Фильтры архива пересчитаны')
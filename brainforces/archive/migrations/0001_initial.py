@@ -0,0 +1,60 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_facets(apps, schema_editor):
+    """считаем количества по существующим вопросам архива"""
+    question_model = apps.get_model('quiz', 'Question')
+    questions = question_model.objects.filter(
+        quiz__is_ended=True, quiz__is_private=False, quiz__is_published=True
+    )
+    for field, model_name in (
+        ('tags', 'TagFacet'),
+        ('difficulty', 'DifficultyFacet'),
+    ):
+        model = apps.get_model('archive', model_name)
+        model.objects.bulk_create(
+            model(pk=key, count=total)
+            for key, total in questions.values(field)
+            .annotate(total=models.Count('pk'))
+            .values_list(field, 'total')
+            .order_by()
+            if key is not None
+        )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('quiz', '0028_rendered_rich_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DifficultyFacet',
+            fields=[
+                ('difficulty', models.PositiveSmallIntegerField(help_text='Сложность архивных вопросов', primary_key=True, serialize=False, verbose_name='сложность')),
+                ('count', models.PositiveIntegerField(default=0, help_text='Количество архивных вопросов со сложностью', verbose_name='вопросов')),
+            ],
+            options={
+                'verbose_name': 'сложность архива',
+                'verbose_name_plural': 'сложности архива',
+            },
+        ),
+        migrations.CreateModel(
+            name='TagFacet',
+            fields=[
+                ('tag', models.OneToOneField(help_text='Тег архивных вопросов', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive_facet', serialize=False, to='quiz.tag', verbose_name='тег')),
+                ('count', models.PositiveIntegerField(default=0, help_text='Количество архивных вопросов с тегом', verbose_name='вопросов')),
+            ],
+            options={
+                'verbose_name': 'тег архива',
+                'verbose_name_plural': 'теги архива',
+            },
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
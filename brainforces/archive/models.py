@@ -0,0 +1,58 @@
+import django.db.models
+
+import quiz.models
+
+
+class TagFacet(django.db.models.Model):
+    """
+    количество архивных вопросов с тегом
+    обновляется при изменении вопросов, их тегов и викторин,
+    чтобы фильтр архива не считал вопросы на каждый запрос
+    """
+
+    tag = django.db.models.OneToOneField(
+        quiz.models.Tag,
+        verbose_name='тег',
+        help_text='Тег архивных вопросов',
+        on_delete=django.db.models.CASCADE,
+        primary_key=True,
+        related_name='archive_facet',
+    )
+
+    count = django.db.models.PositiveIntegerField(
+        verbose_name='вопросов',
+        help_text='Количество архивных вопросов с тегом',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'тег архива'
+        verbose_name_plural = 'теги архива'
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'Тег {self.tag_id}: {self.count}'
+
+
+class DifficultyFacet(django.db.models.Model):
+    """количество архивных вопросов со сложностью"""
+
+    difficulty = django.db.models.PositiveSmallIntegerField(
+        verbose_name='сложность',
+        help_text='Сложность архивных вопросов',
+        primary_key=True,
+    )
+
+    count = django.db.models.PositiveIntegerField(
+        verbose_name='вопросов',
+        help_text='Количество архивных вопросов со сложностью',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'сложность архива'
+        verbose_name_plural = 'сложности архива'
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'Сложность {self.difficulty}: {self.count}'
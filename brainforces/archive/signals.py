@@ -0,0 +1,118 @@
+import django.db.models.signals
+import django.dispatch
+
+import archive.facets
+import quiz.models
+
+
+# поля викторины, от которых зависит, попадают ли ее вопросы в архив
+ARCHIVE_QUIZ_FIELDS = frozenset(('is_ended', 'is_private', 'is_published'))
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.pre_save, sender=quiz.models.Question
+)
+def remember_question_difficulty(
+    sender: type, instance: quiz.models.Question, **kwargs
+) -> None:
+    """запоминаем старую сложность, ее количество тоже изменится"""
+    instance._archive_difficulty = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._archive_difficulty = (
+            quiz.models.Question.objects.filter(pk=instance.pk)
+            .values_list('difficulty', flat=True)
+            .first()
+        )
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=quiz.models.Question
+)
+def update_question_facets(
+    sender: type, instance: quiz.models.Question, created: bool, **kwargs
+) -> None:
+    """вопрос сохранен, пересчитываем его теги и сложности"""
+    if kwargs.get('raw'):
+        return
+    difficulties = {instance.difficulty}
+    old_difficulty = getattr(instance, '_archive_difficulty', None)
+    if old_difficulty is not None:
+        difficulties.add(old_difficulty)
+    archive.facets.refresh_facets(
+        tag_pks=() if created else instance.tags.values_list('pk', flat=True),
+        difficulties=difficulties,
+    )
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.pre_delete, sender=quiz.models.Question
+)
+def remember_question_tags(
+    sender: type, instance: quiz.models.Question, **kwargs
+) -> None:
+    """запоминаем теги удаляемого вопроса, связи удалятся раньше него"""
+    instance._archive_tag_pks = list(
+        instance.tags.values_list('pk', flat=True)
+    )
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete, sender=quiz.models.Question
+)
+def remove_question_facets(
+    sender: type, instance: quiz.models.Question, **kwargs
+) -> None:
+    """вопрос удален, пересчитываем его теги и сложность"""
+    archive.facets.refresh_facets(
+        tag_pks=getattr(instance, '_archive_tag_pks', ()),
+        difficulties=(instance.difficulty,),
+    )
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.m2m_changed,
+    sender=quiz.models.Question.tags.through,
+)
+def update_tag_facets(
+    sender: type,
+    instance: django.db.models.Model,
+    action: str,
+    reverse: bool,
+    pk_set: set,
+    **kwargs,
+) -> None:
+    """теги вопроса изменились, пересчитываем затронутые теги"""
+    if reverse:
+        if action.startswith('post_'):
+            archive.facets.refresh_facets(tag_pks=(instance.pk,))
+        return
+    if action == 'pre_clear':
+        instance._archive_tag_pks = list(
+            instance.tags.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        archive.facets.refresh_facets(
+            tag_pks=getattr(instance, '_archive_tag_pks', ())
+        )
+    elif action in ('post_add', 'post_remove'):
+        archive.facets.refresh_facets(tag_pks=pk_set or ())
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=quiz.models.Quiz
+)
+def update_quiz_facets(
+    sender: type,
+    instance: quiz.models.Quiz,
+    created: bool,
+    update_fields: frozenset = None,
+    **kwargs,
+) -> None:
+    """викторина могла попасть в архив или уйти из него"""
+    if kwargs.get('raw') or created:
+        return
+    if update_fields is not None and not (
+        ARCHIVE_QUIZ_FIELDS & set(update_fields)
+    ):
+        return
+    archive.facets.refresh_quiz_facets(instance.pk)
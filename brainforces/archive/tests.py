@@ -1,5 +1,9 @@
+import django.core.cache
 import django.test
+import django.urls
+import django.utils.timezone
 
+import archive.models
 import quiz.models
 
 
@@ -33,3 +37,118 @@ class ArchiveTests(django.test.TestCase):
                 )
             )
         )
+
+
+class ArchiveFacetTests(django.test.TestCase):
+    """тестируем фильтры архива по тегам и сложностям"""
+
+    def setUp(self) -> None:
+        """закончившаяся и идущая викторины с вопросами"""
+        django.core.cache.cache.clear()
+        start_time = django.utils.timezone.now()
+        self.ended = quiz.models.Quiz.objects.create(
+            name='ended',
+            description='description',
+            start_time=start_time,
+            duration=60,
+            is_published=True,
+            is_ended=True,
+        )
+        self.running = quiz.models.Quiz.objects.create(
+            name='running',
+            description='description',
+            start_time=start_time,
+            duration=60,
+            is_published=True,
+        )
+        self.first_tag = quiz.models.Tag.objects.create(name='first')
+        self.second_tag = quiz.models.Tag.objects.create(name='second')
+        self.first = quiz.models.Question.objects.create(
+            name='first', text='text', quiz=self.ended, difficulty=1
+        )
+        self.first.tags.add(self.first_tag, self.second_tag)
+        self.second = quiz.models.Question.objects.create(
+            name='second', text='text', quiz=self.ended, difficulty=2
+        )
+        self.second.tags.add(self.first_tag)
+        self.other = quiz.models.Question.objects.create(
+            name='other', text='text', quiz=self.running, difficulty=1
+        )
+        self.other.tags.add(self.first_tag)
+
+    def get_counts(self) -> tuple:
+        """количества по тегам и сложностям"""
+        return (
+            dict(
+                archive.models.TagFacet.objects.values_list(
+                    'tag__name', 'count'
+                )
+            ),
+            dict(
+                archive.models.DifficultyFacet.objects.values_list(
+                    'difficulty', 'count'
+                )
+            ),
+        )
+
+    def test_counts(self) -> None:
+        """считаются только вопросы закончившихся викторин"""
+        self.assertEqual(
+            self.get_counts(), ({'first': 2, 'second': 1}, {1: 1, 2: 1})
+        )
+
+    def test_incremental_updates(self) -> None:
+        """количества меняются вместе с вопросами и тегами"""
+        self.first.tags.remove(self.second_tag)
+        self.second.difficulty = 1
+        self.second.save()
+        self.assertEqual(self.get_counts(), ({'first': 2}, {1: 2}))
+        self.first.delete()
+        self.assertEqual(self.get_counts(), ({'first': 1}, {1: 1}))
+        self.second.tags.clear()
+        self.assertEqual(self.get_counts(), (dict(), {1: 1}))
+
+    def test_quiz_enters_archive(self) -> None:
+        """вопросы закончившейся викторины попадают в фильтры"""
+        self.running.is_ended = True
+        self.running.save(update_fields=('is_ended',))
+        self.assertEqual(
+            self.get_counts(), ({'first': 3, 'second': 1}, {1: 2, 2: 1})
+        )
+
+    def test_filters(self) -> None:
+        """фильтр по тегу и сложности"""
+        url = django.urls.reverse('archive:archive')
+        for params, names in (
+            ({'tag': self.first_tag.pk}, ['first', 'second']),
+            ({'tag': self.second_tag.pk}, ['first']),
+            ({'difficulty': 2}, ['second']),
+            ({'tag': self.first_tag.pk, 'difficulty': 1}, ['first']),
+        ):
+            with self.subTest(params=params):
+                response = django.test.Client().get(url, params)
+                self.assertEqual(
+                    [
+                        question.name
+                        for question in response.context['questions']
+                    ],
+                    names,
+                )
+
+    def test_constant_queries(self) -> None:
+        """количество запросов не зависит от числа вопросов на странице"""
+        for question_ind in range(10):
+            question = quiz.models.Question.objects.create(
+                name=f'question{question_ind}',
+                text='text',
+                quiz=self.ended,
+                difficulty=3,
+            )
+            question.tags.add(self.first_tag, self.second_tag)
+        django.core.cache.cache.clear()
+        # количество, страница, теги страницы, теги и сложности фильтров
+        with self.assertNumQueries(5):
+            response = django.test.Client().get(
+                django.urls.reverse('archive:archive')
+            )
+        self.assertContains(response, 'first: 12')
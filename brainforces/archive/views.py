@@ -1,45 +1,105 @@
+import typing
+
 import django.db.models
 import django.shortcuts
 import django.urls
 import django.views.generic
 
+import archive.models
+import core.mixins
+import core.pagination
 import quiz.models
+import search.mixins
+import search.models
 
 
-class ArchiveQuestionsView(django.views.generic.ListView):
+class ArchiveQuestionsView(
+    core.mixins.AnonymousPageCacheMixin,
+    search.mixins.SearchMixin,
+    django.views.generic.ListView,
+):
     """список архивных вопросов"""
 
+    cache_models = (
+        'quiz.Question',
+        'quiz.Quiz',
+        'quiz.Tag',
+        'archive.TagFacet',
+        'archive.DifficultyFacet',
+        'quiz.QuestionStats',
+    )
+    search_kind = search.models.SearchDocument.Kinds.QUESTION
+    search_columns = {
+        'all': None,
+        'name': 'title',
+        'text': 'body',
+        'tags': 'extra',
+    }
+
     template_name = 'archive/archive.html'
     context_object_name = 'questions'
     paginate_by = 70
 
+    def get_facet(self, name: str) -> typing.Optional[int]:
+        """выбранное значение фильтра из запроса"""
+        value = self.request.GET.get(name, '')
+        return int(value) if value.isdigit() else None
+
+    def get_facet_query(self, name: str, value: typing.Any) -> str:
+        """параметры запроса со значением фильтра, повторный выбор снимает"""
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        if self.get_facet(name) == value:
+            query.pop(name, None)
+        else:
+            query[name] = str(value)
+        return query.urlencode()
+
     def get_queryset(self) -> django.db.models.QuerySet:
         """
-        обрабатываем поисковый запрос от пользователя:
+        обрабатываем поисковый запрос от пользователя
+        полнотекстовым поиском:
         пользователь может искать по всем критериям,
         по имени вопроса, по тексту или названиям тегов
+        фильтры по тегу и сложности, теги страницы одним запросом
         """
         queryset = quiz.models.Question.objects.get_only_useful_list_fields()
-        searched = self.request.GET.get('searched')
-        search_criteria = self.request.GET.get('search_critery', 'all')
-        if searched:
-            if search_criteria == 'all':
-                queryset = (
-                    queryset.filter(
-                        django.db.models.Q(name__icontains=searched)
-                        | django.db.models.Q(text__icontains=searched)
-                        | django.db.models.Q(tags__name__icontains=searched)
-                    )
-                ).distinct()
-            elif search_criteria == 'name':
-                queryset = queryset.filter(name__icontains=searched)
-            elif search_criteria == 'text':
-                queryset = queryset.filter(text__icontains=searched)
-            elif search_criteria == 'tags':
-                queryset = queryset.filter(tags__name__icontains=searched)
-        return queryset
+        tag_pk = self.get_facet('tag')
+        if tag_pk is not None:
+            queryset = queryset.filter(tags__pk=tag_pk)
+        difficulty = self.get_facet('difficulty')
+        if difficulty is not None:
+            queryset = queryset.filter(difficulty=difficulty)
+        return self.search_queryset(queryset).prefetch_related(
+            django.db.models.Prefetch(
+                'tags', queryset=quiz.models.Tag.objects.only('name')
+            )
+        )
 
     def get_context_data(self, *args, **kwargs) -> dict:
+        """
+        фильтры с готовыми количествами вопросов, по запросу на вид фильтра
+        """
         context = super().get_context_data(*args, **kwargs)
         context['searched'] = self.request.GET.get('searched', '')
+        tag_facets = list(
+            archive.models.TagFacet.objects.filter(tag__is_published=True)
+            .select_related('tag')
+            .only('count', 'tag__name')
+            .order_by('-count', 'tag__name')
+        )
+        difficulty_facets = list(
+            archive.models.DifficultyFacet.objects.order_by('difficulty')
+        )
+        for name, facets in (
+            ('tag', tag_facets),
+            ('difficulty', difficulty_facets),
+        ):
+            selected = self.get_facet(name)
+            for facet in facets:
+                facet.is_selected = facet.pk == selected
+                facet.query = self.get_facet_query(name, facet.pk)
+        context['tag_facets'] = tag_facets
+        context['difficulty_facets'] = difficulty_facets
+        context['page_query'] = core.pagination.get_page_query(self.request)
         return context
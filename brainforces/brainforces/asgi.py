@@ -5,4 +5,10 @@ import django.core.asgi
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'brainforces.settings')
 
-application = django.core.asgi.get_asgi_application()
+django_application = django.core.asgi.get_asgi_application()
+
+# приложения импортируем после настройки django
+import quiz.asgi  # noqa: E402
+
+
+application = quiz.asgi.EventStreamApplication(django_application)
@@ -29,15 +29,16 @@ INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
     'core.apps.CoreConfig',
+    'search.apps.SearchConfig',
     'users.apps.UsersConfig',
     'organization.apps.OrganizationConfig',
     'about.apps.AboutConfig',
     'django.contrib.contenttypes',
+    'django.contrib.postgres',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django_dump_load_utf8',
-    'sorl.thumbnail',
     'django_cleanup.apps.CleanupConfig',
     'ckeditor',
     'ckeditor_uploader',
@@ -90,6 +91,8 @@ if (
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': 'db.sqlite3',
     }
+    SEARCH_BACKEND = 'search.backends.SQLiteBackend'
+    FUZZY_SEARCH_BACKEND = 'search.fuzzy.NgramBackend'
 else:
     DATABASES['default'] = {
         'ENGINE': 'django.db.backends.postgresql',
@@ -100,6 +103,28 @@ else:
     }
     if os.getenv('DB_PORT', default=''):
         DATABASES['default']['PORT'] = os.getenv('DB_PORT')
+    SEARCH_BACKEND = 'search.backends.PostgresBackend'
+    FUZZY_SEARCH_BACKEND = 'search.fuzzy.TrigramBackend'
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+CACHES = dict()
+
+if 'test' in sys.argv or not os.getenv('CACHE_BACKEND'):
+    CACHES['default'] = {
+        'BACKEND': CACHE_BACKENDS['locmem'],
+    }
+else:
+    CACHES['default'] = {
+        'BACKEND': CACHE_BACKENDS.get(
+            os.getenv('CACHE_BACKEND'), os.getenv('CACHE_BACKEND')
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -129,8 +154,99 @@ USER_IS_ACTIVE = (
     os.getenv('USER_IS_ACTIVE', default='False').lower() in YES_OPTIONS
 )
 
+STANDINGS_REFRESH_SECONDS = int(
+    os.getenv('STANDINGS_REFRESH_SECONDS', default=10)
+)
+# сколько таблиц положения хранится в памяти процесса
+STANDINGS_MAX_QUIZZES = int(os.getenv('STANDINGS_MAX_QUIZZES', default=100))
+
+JOBS_POLL_SECONDS = 1
+# задачу, которая выполняется дольше, считаем брошенной упавшим воркером
+# и отдаем другому
+JOBS_LEASE_SECONDS = 60 * 15
+# пока задача выполняется, воркер продлевает аренду
+JOBS_LEASE_RENEW_SECONDS = JOBS_LEASE_SECONDS // 3
+
+QUIZ_WARMUP_SECONDS = 60
+QUIZ_SCHEDULER_RELOAD_SECONDS = 30
+
+QUIZ_RATING_SYSTEM = os.getenv(
+    'QUIZ_RATING_SYSTEM', default='quiz.rating.DifficultyRating'
+)
+QUIZ_RESULTS_BATCH_SIZE = 500
+# наибольшее количество вопросов в создаваемой викторине
+QUIZ_MAX_QUESTIONS = int(os.getenv('QUIZ_MAX_QUESTIONS', default=500))
+QUIZ_QUESTIONS_BATCH_SIZE = 500
+# импорт и экспорт наборов вопросов
+QUIZ_IMPORT_BATCH_SIZE = 1000
+QUIZ_IMPORT_MAX_QUESTIONS = int(
+    os.getenv('QUIZ_IMPORT_MAX_QUESTIONS', default=100000)
+)
+# сколько id тегов по названиям помнить во время загрузки
+QUIZ_IMPORT_MAX_CACHED_TAGS = 10000
+
+LEADERBOARD_BATCH_SIZE = 500
+LEADERBOARD_HISTOGRAM_STEP = 100
+# ключ advisory lock postgresql, под которым пересчитываются места
+LEADERBOARD_LOCK_KEY = 7340011
+
+# брокер в памяти не доставляет события из других процессов,
+# поэтому вне разработки события идут через бд
+QUIZ_EVENTS_BROKER = os.getenv(
+    'QUIZ_EVENTS_BROKER',
+    default='quiz.events.LocalBroker'
+    if DEBUG
+    else 'quiz.events.DatabaseBroker',
+)
+QUIZ_EVENTS_QUEUE_SIZE = 100
+QUIZ_EVENTS_KEEPALIVE_SECONDS = 15
+QUIZ_EVENTS_POLL_SECONDS = 0.5
+# событие может закоммититься позже события с большим id,
+# столько секунд слушатель перечитывает уже разосланные события
+QUIZ_EVENTS_LAG_SECONDS = 5
+QUIZ_EVENTS_KEEP_SECONDS = 60
+
+MEMBERSHIP_CACHE_ALIAS = os.getenv('MEMBERSHIP_CACHE_ALIAS', default='default')
+MEMBERSHIP_CACHE_SECONDS = 60 * 60
+# кеш в памяти процесса не сбрасывается в других воркерах,
+# поэтому права из него живут несколько секунд
+MEMBERSHIP_LOCAL_CACHE_SECONDS = 5
+
+PAGE_CACHE_ALIAS = os.getenv('PAGE_CACHE_ALIAS', default='default')
+# в тестах страницы не кешируем, кеш включают там, где его проверяют
+PAGE_CACHE_SECONDS = (
+    0 if 'test' in sys.argv else int(os.getenv('PAGE_CACHE_SECONDS', 60))
+)
+
+SEARCH_RESULTS_LIMIT = 1000
+SEARCH_BATCH_SIZE = 500
+FUZZY_SEARCH_LIMIT = 10
+FUZZY_SEARCH_THRESHOLD = 0.3
+# индекс нечеткого поиска в памяти не видит QuerySet.update и bulk_create,
+# поэтому живет не дольше этого времени
+FUZZY_INDEX_MAX_AGE_SECONDS = 60
+
 AUTHENTICATION_BACKENDS = ['users.backends.EmailBackend']
 LOGIN_ATTEMPTS = int(os.environ.get('LOGIN_ATTEMPTS', default=3))
+AUTH_CACHE_ALIAS = os.getenv('AUTH_CACHE_ALIAS', default='default')
+# сколько помним логин, по которому пользователь не найден
+AUTH_MISSING_CACHE_SECONDS = 30
+
+RATELIMIT_STORE = os.getenv(
+    'RATELIMIT_STORE', default='core.ratelimit.CacheCounterStore'
+)
+RATELIMIT_CACHE_ALIAS = os.getenv('RATELIMIT_CACHE_ALIAS', default='default')
+# заголовок с адресом клиента, за прокси - например HTTP_X_REAL_IP
+RATELIMIT_IP_HEADER = os.getenv('RATELIMIT_IP_HEADER', default='REMOTE_ADDR')
+# неудачные входы: в аккаунт (LOGIN_ATTEMPTS), с одного ip и всего на сайте
+LOGIN_ATTEMPTS_SECONDS = 60 * 15
+LOGIN_IP_LIMIT = 20
+LOGIN_IP_SECONDS = 60 * 5
+# неудачных входов на сайте больше LOGIN_GLOBAL_LIMIT - идет перебор,
+# тогда аккаунту и ip до отказа хватает LOGIN_FLOOD_ATTEMPTS ошибок
+LOGIN_GLOBAL_LIMIT = 1000
+LOGIN_GLOBAL_SECONDS = 60
+LOGIN_FLOOD_ATTEMPTS = 1
 
 
 LANGUAGE_CODE = 'ru'
@@ -156,8 +272,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# уменьшенные копии картинок (аватарок), делаются фоновой задачей
+IMAGE_RENDITION_SIZES = (50, 100, 200)
+IMAGE_RENDITION_FORMATS = ('webp', 'jpeg')
+IMAGE_RENDITION_QUALITY = 80
+
 CKEDITOR_UPLOAD_PATH = 'uploads/'
 
+# загрузки редактора хранятся по хешу содержимого, без дублей
+CKEDITOR_STORAGE_BACKEND = 'core.storage.ContentAddressedStorage'
+# загруженные картинки уменьшаются до этого размера по большей стороне
+UPLOAD_IMAGE_MAX_SIZE = 1920
+UPLOAD_IMAGE_QUALITY = 85
+# файлы без ссылок моложе этого не удаляются: текст могут еще сохранять
+UPLOAD_ORPHAN_SECONDS = 60 * 60 * 24
+
 AUTH_USER_MODEL = 'users.User'
 
 CKEDITOR_CONFIGS = {
@@ -257,6 +386,13 @@ else:
 
 PASSWORD_RESET_TIMEOUT = 43200
 
+EMAIL_BATCH_SIZE = 50
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_SECONDS = 60
+EMAIL_DEDUP_SECONDS = 60 * 10
+# письмо, которое отправляется дольше, снова ставится в очередь
+EMAIL_SENDING_TIMEOUT_SECONDS = 60 * 5
+
 MESSAGE_TAGS = {
     django.contrib.messages.constants.DEBUG: 'alert-secondary',
     django.contrib.messages.constants.INFO: 'alert-info',
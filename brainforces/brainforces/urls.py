@@ -19,6 +19,7 @@ urlpatterns = [
         'organizations/', django.urls.include('organization.urls')
     ),
     django.urls.path('about/', django.urls.include('about.urls')),
+    django.urls.path('search/', django.urls.include('search.urls')),
 ]
 
 
@@ -0,0 +1,33 @@
+import django.contrib.admin
+
+import core.models
+
+
+@django.contrib.admin.register(core.models.Job)
+class JobAdmin(django.contrib.admin.ModelAdmin):
+    """отображение модели Job в админке"""
+
+    list_display = ('id', 'task', 'key', 'status', 'created_at', 'duration')
+    list_display_links = ('id',)
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'duration', 'error')
+
+
+@django.contrib.admin.register(core.models.Email)
+class EmailAdmin(django.contrib.admin.ModelAdmin):
+    """отображение модели Email в админке"""
+
+    list_display = ('id', 'to', 'subject', 'status', 'attempts', 'created_at')
+    list_display_links = ('id',)
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'error')
+
+
+@django.contrib.admin.register(core.models.UploadedFile)
+class UploadedFileAdmin(django.contrib.admin.ModelAdmin):
+    """отображение модели UploadedFile в админке"""
+
+    list_display = ('id', 'name', 'size', 'references', 'is_optimized')
+    list_display_links = ('id',)
+    list_filter = ('is_optimized',)
+    readonly_fields = ('name', 'digest', 'size', 'references', 'created_at')
@@ -7,3 +7,43 @@ class CoreConfig(django.apps.AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'кор'
+
+    def ready(self) -> None:
+        """
+        сбрасываем кеш страниц при изменении моделей
+        и считаем ссылки текстов на загруженные файлы
+        """
+        import django.apps
+        import django.db.models.signals
+
+        import core.cache
+        import core.uploads
+
+        for signal in (
+            django.db.models.signals.post_save,
+            django.db.models.signals.post_delete,
+        ):
+            signal.connect(
+                core.cache.on_model_changed, dispatch_uid='core_page_cache'
+            )
+        django.db.models.signals.m2m_changed.connect(
+            core.cache.on_m2m_changed, dispatch_uid='core_page_cache'
+        )
+        for model in django.apps.apps.get_models():
+            if not core.uploads.get_rich_text_fields(model):
+                continue
+            django.db.models.signals.pre_save.connect(
+                core.uploads.remember_upload_names,
+                sender=model,
+                dispatch_uid='core_upload_references',
+            )
+            django.db.models.signals.post_save.connect(
+                core.uploads.count_saved_references,
+                sender=model,
+                dispatch_uid='core_upload_references',
+            )
+            django.db.models.signals.post_delete.connect(
+                core.uploads.count_deleted_references,
+                sender=model,
+                dispatch_uid='core_upload_references',
+            )
@@ -0,0 +1,111 @@
+import hashlib
+import typing
+
+import django.conf
+import django.contrib.messages
+import django.core.cache
+import django.core.cache.backends.locmem
+import django.db.models
+import django.http
+
+
+# модели, от которых зависят закешированные страницы
+CACHED_MODELS: typing.Set[str] = set()
+
+
+def get_cache() -> typing.Any:
+    """кеш страниц"""
+    return django.core.cache.caches[django.conf.settings.PAGE_CACHE_ALIAS]
+
+
+def is_process_local(cache: typing.Any) -> bool:
+    """
+    кеш живет в памяти процесса: другие воркеры его не видят,
+    и сброс ключа в одном процессе не доходит до остальных
+    """
+    return isinstance(cache, django.core.cache.backends.locmem.LocMemCache)
+
+
+def get_model_label(model: typing.Any) -> str:
+    """метка модели вида app.model"""
+    if isinstance(model, str):
+        return model.lower()
+    return model._meta.label_lower
+
+
+def get_version_key(label: str) -> str:
+    """ключ версии данных модели"""
+    return f'version:{label}'
+
+
+def get_versions(labels: typing.Iterable[str]) -> str:
+    """
+    текущие версии данных моделей одной строкой
+    версии берутся одним запросом в кеш
+    """
+    labels = list(labels)
+    cache = get_cache()
+    keys = [get_version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    missing = {key: 1 for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def touch(model: typing.Any) -> None:
+    """
+    данные модели изменились, повышаем их версию
+    старые страницы больше не находятся по ключу и вытесняются сами
+    вызывается сигналами, а после массовых update и bulk_update,
+    которые сигналов не отправляют, - явно
+    """
+    label = get_model_label(model)
+    if label not in CACHED_MODELS:
+        return
+    cache = get_cache()
+    try:
+        cache.incr(get_version_key(label))
+    except ValueError:
+        cache.set(get_version_key(label), 2, None)
+
+
+def get_page_key(
+    request: django.http.HttpRequest, labels: typing.Iterable[str]
+) -> str:
+    """ключ страницы: путь, параметры запроса и версии данных"""
+    query = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name != 'csrfmiddlewaretoken'
+        for value in values
+    )
+    query_hash = hashlib.md5(repr(query).encode()).hexdigest()
+    return f'page:{request.path}:{query_hash}:{get_versions(labels)}'
+
+
+def can_cache_request(request: django.http.HttpRequest) -> bool:
+    """
+    кешируем только GET запросы анонимов без всплывающих сообщений,
+    чтобы не отдать сообщение другому пользователю
+    """
+    return (
+        django.conf.settings.PAGE_CACHE_SECONDS > 0
+        and request.method == 'GET'
+        and not request.user.is_authenticated
+        and not len(django.contrib.messages.get_messages(request))
+    )
+
+
+def on_model_changed(sender: type, **kwargs) -> None:
+    """обработчик сигналов изменения моделей"""
+    touch(sender)
+
+
+def on_m2m_changed(
+    sender: type, instance: django.db.models.Model, action: str, **kwargs
+) -> None:
+    """обработчик изменения связей многие ко многим"""
+    if action.startswith('post_'):
+        touch(type(instance))
@@ -0,0 +1,97 @@
+import io
+import typing
+
+import PIL.Image
+import PIL.ImageOps
+
+import django.apps
+import django.conf
+import django.core.files.base
+import django.db.models
+import django.db.models.fields.files
+
+import core.models
+
+
+# формат Pillow и расширение файла для каждого формата копий
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def delete_renditions(storage: typing.Any, directory: str) -> None:
+    """удаляем все копии из папки"""
+    if not storage.exists(directory):
+        return
+    _, files = storage.listdir(directory)
+    for filename in files:
+        storage.delete(f'{directory}/{filename}')
+
+
+def make_renditions(
+    image: django.db.models.fields.files.FieldFile, directory: str
+) -> typing.Dict[str, str]:
+    """
+    квадратные копии картинки размеров IMAGE_RENDITION_SIZES
+    в форматах IMAGE_RENDITION_FORMATS, старые копии из папки удаляются
+    возвращаем адреса копий по ключам вида 'webp_50'
+    """
+    settings = django.conf.settings
+    with image.open('rb'):
+        source = PIL.Image.open(image)
+        source.load()
+    source = PIL.ImageOps.exif_transpose(source).convert('RGB')
+    delete_renditions(image.storage, directory)
+    renditions = dict()
+    for size in settings.IMAGE_RENDITION_SIZES:
+        resized = PIL.ImageOps.fit(
+            source, (size, size), PIL.Image.Resampling.LANCZOS
+        )
+        for kind in settings.IMAGE_RENDITION_FORMATS:
+            image_format, extension = RENDITION_FORMATS[kind]
+            buffer = io.BytesIO()
+            resized.save(
+                buffer,
+                image_format,
+                quality=settings.IMAGE_RENDITION_QUALITY,
+            )
+            name = image.storage.save(
+                f'{directory}/{size}.{extension}',
+                django.core.files.base.ContentFile(buffer.getvalue()),
+            )
+            renditions[f'{kind}_{size}'] = image.storage.url(name)
+    return renditions
+
+
+def make_renditions_by_pk(model: str, pk: int, image: str) -> None:
+    """
+    фоновая задача: копии картинки объекта
+    если картинку успели сменить, задача ничего не делает,
+    копии для новой картинки сделает ее собственная задача
+    """
+    model_class = django.apps.apps.get_model(model)
+    obj = model_class.objects.filter(pk=pk, image=image).first()
+    if obj is None:
+        return
+    directory = obj.get_renditions_directory()
+    if image:
+        renditions = make_renditions(obj.image, directory)
+    else:
+        delete_renditions(obj.image.storage, directory)
+        renditions = dict()
+    model_class.objects.filter(pk=pk, image=image).update(
+        renditions=renditions
+    )
+
+
+def enqueue_renditions(obj: core.models.AbstractImageModel) -> typing.Any:
+    """ставим в очередь копии только что сохраненной картинки объекта"""
+    model = obj._meta.label
+    return core.models.Job.objects.enqueue(
+        'core.images.make_renditions_by_pk',
+        key=f'make_renditions:{model}:{obj.pk}:{obj.image.name or ""}',
+        model=model,
+        pk=obj.pk,
+        image=obj.image.name or '',
+    )
@@ -0,0 +1,13 @@
+import django.core.management.base
+
+import core.uploads
+
+
+class Command(django.core.management.base.BaseCommand):
+    """удаление загрузок редактора, на которые нет ссылок"""
+
+    help = 'Удаляет загруженные файлы, которые не используются в текстах'
+
+    def handle(self, *args, **options) -> None:
+        deleted_count = core.uploads.delete_unused_uploads()
+        self.stdout.write(f'Удалено файлов: {deleted_count}')
@@ -0,0 +1,36 @@
+import time
+
+import django.conf
+import django.core.management.base
+
+import core.services
+
+
+class Command(django.core.management.base.BaseCommand):
+    """воркер фоновых задач и почты"""
+
+    help = 'Выполняет фоновые задачи и отправляет письма из очереди'
+
+    def add_arguments(
+        self, parser: django.core.management.base.CommandParser
+    ) -> None:
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить задачи, отправить письма и завершиться',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """
+        берем задачи и письма из очереди, пока она не пуста, потом ждем
+        """
+        while True:
+            jobs_count = core.services.run_pending_jobs()
+            if jobs_count:
+                self.stdout.write(f'Выполнено задач: {jobs_count}')
+            emails_count = core.services.send_pending_emails()
+            if emails_count:
+                self.stdout.write(f'Отправлено писем: {emails_count}')
+            if options['once']:
+                return
+            time.sleep(django.conf.settings.JOBS_POLL_SECONDS)
@@ -0,0 +1,232 @@
+import typing
+
+import django.conf
+import django.db
+import django.db.models
+import django.utils.timezone
+
+
+class JobManager(django.db.models.Manager):
+    """менеджер модели Job"""
+
+    def get_claimable(self) -> django.db.models.Q:
+        """
+        задачи, которые можно взять: в очереди или выполняющиеся,
+        чей воркер не продлил аренду и, видимо, упал
+        """
+        statuses = self.model.Statuses
+        return django.db.models.Q(
+            status=statuses.PENDING
+        ) | django.db.models.Q(
+            status=statuses.RUNNING,
+            lease_until__lt=django.utils.timezone.now(),
+        )
+
+    def enqueue(self, task: str, key: str = '', **kwargs) -> typing.Any:
+        """
+        ставим задачу в очередь
+        если задача с таким ключом уже в очереди или выполняется,
+        новую не создаем и возвращаем существующую
+        задачу упавшего воркера возвращаем в очередь
+        одну активную задачу на ключ гарантирует ограничение в бд
+        """
+        if not key:
+            return self.create(task=task, key=key, kwargs=kwargs)
+        job = self.get_active(key)
+        if job is None:
+            try:
+                with django.db.transaction.atomic(using=self.db):
+                    return self.create(task=task, key=key, kwargs=kwargs)
+            except django.db.IntegrityError:
+                job = self.get_active(key)
+                if job is None:
+                    raise
+        if job.status == self.model.Statuses.RUNNING and not job.is_leased:
+            self.get_queryset().filter(self.get_claimable(), pk=job.pk).update(
+                status=self.model.Statuses.PENDING
+            )
+            job.refresh_from_db()
+        return job
+
+    def get_active(self, key: str) -> typing.Any:
+        """задача с ключом, которая в очереди или выполняется"""
+        statuses = self.model.Statuses
+        return (
+            self.get_queryset()
+            .filter(key=key, status__in=(statuses.PENDING, statuses.RUNNING))
+            .order_by('-created_at')
+            .first()
+        )
+
+    def get_last(self, key: str) -> typing.Any:
+        """последняя задача с ключом"""
+        return (
+            self.get_queryset().filter(key=key).order_by('-created_at').first()
+        )
+
+    def get_lease_until(self) -> typing.Any:
+        """конец аренды, взятой или продленной сейчас"""
+        return django.utils.timezone.now() + django.utils.timezone.timedelta(
+            seconds=django.conf.settings.JOBS_LEASE_SECONDS
+        )
+
+    def claim(self) -> typing.Any:
+        """
+        берем самую старую задачу из очереди или задачу с истекшей арендой
+        и арендуем ее на JOBS_LEASE_SECONDS
+        на postgres строку блокируем через SELECT ... FOR UPDATE SKIP LOCKED,
+        чтобы воркеры не ждали друг друга,
+        на sqlite такой блокировки нет, поэтому задачу забирает тот,
+        чей UPDATE с условием выборки изменил строку,
+        а проигравший берет следующую задачу
+        """
+        connection = django.db.connections[self.db]
+        lost_pks = list()
+        while True:
+            with django.db.transaction.atomic(using=self.db):
+                queryset = (
+                    self.get_queryset()
+                    .filter(self.get_claimable())
+                    .exclude(pk__in=lost_pks)
+                    .order_by('created_at')
+                )
+                if connection.features.has_select_for_update_skip_locked:
+                    queryset = queryset.select_for_update(skip_locked=True)
+                job = queryset.first()
+                if job is None:
+                    return None
+                job.status = self.model.Statuses.RUNNING
+                job.started_at = django.utils.timezone.now()
+                job.lease_until = self.get_lease_until()
+                if (
+                    self.get_queryset()
+                    .filter(self.get_claimable(), pk=job.pk)
+                    .update(
+                        status=job.status,
+                        started_at=job.started_at,
+                        lease_until=job.lease_until,
+                    )
+                ):
+                    return job
+            lost_pks.append(job.pk)
+
+    def get_own(self, job: typing.Any) -> django.db.models.QuerySet:
+        """
+        задача, пока ее аренда наша: если аренда истекла
+        и задачу взял другой воркер, срок аренды в бд уже другой
+        """
+        return self.get_queryset().filter(
+            pk=job.pk,
+            status=self.model.Statuses.RUNNING,
+            lease_until=job.lease_until,
+        )
+
+    def renew(self, job: typing.Any) -> bool:
+        """продлеваем аренду, False - задачу уже взял другой воркер"""
+        lease_until = self.get_lease_until()
+        if not self.get_own(job).update(lease_until=lease_until):
+            return False
+        job.lease_until = lease_until
+        return True
+
+
+class EmailManager(django.db.models.Manager):
+    """менеджер модели Email"""
+
+    def get_stale(self) -> django.db.models.Q:
+        """
+        письма, которые взял упавший отправитель: они отправляются
+        дольше EMAIL_SENDING_TIMEOUT_SECONDS
+        """
+        return django.db.models.Q(
+            status=self.model.Statuses.SENDING,
+            claimed_at__lt=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(
+                seconds=django.conf.settings.EMAIL_SENDING_TIMEOUT_SECONDS
+            ),
+        )
+
+    def enqueue(
+        self,
+        to: str,
+        subject: str,
+        body: str,
+        from_email: str = '',
+        key: str = '',
+    ) -> typing.Any:
+        """
+        ставим письмо в очередь
+        письмо с тем же ключом, которое еще в очереди или было отправлено
+        недавно (EMAIL_DEDUP_SECONDS), второй раз не ставим
+        зависшие письма с этим ключом не учитываем и помечаем ошибкой,
+        вместо них отправится новое
+        """
+        statuses = self.model.Statuses
+        if key:
+            self.get_queryset().filter(self.get_stale(), key=key).update(
+                status=statuses.FAILED, error='Отправка зависла'
+            )
+            email = (
+                self.get_queryset()
+                .filter(
+                    django.db.models.Q(
+                        status__in=(statuses.PENDING, statuses.SENDING)
+                    )
+                    | django.db.models.Q(
+                        status=statuses.SENT,
+                        sent_at__gte=django.utils.timezone.now()
+                        - django.utils.timezone.timedelta(
+                            seconds=django.conf.settings.EMAIL_DEDUP_SECONDS
+                        ),
+                    ),
+                    key=key,
+                )
+                .order_by('-created_at')
+                .first()
+            )
+            if email is not None:
+                return email
+        return self.create(
+            to=to, subject=subject, body=body, from_email=from_email, key=key
+        )
+
+    def claim_batch(self, size: int) -> typing.List[typing.Any]:
+        """
+        берем до size писем, время отправки которых пришло,
+        и зависшие письма упавших отправителей
+        как и задачи, на postgres строки блокируем SKIP LOCKED,
+        на sqlite письмо достается тому, чей UPDATE его изменил
+        """
+        statuses = self.model.Statuses
+        connection = django.db.connections[self.db]
+        now = django.utils.timezone.now()
+        claimable = (
+            django.db.models.Q(status=statuses.PENDING, send_after__lte=now)
+            | self.get_stale()
+        )
+        with django.db.transaction.atomic(using=self.db):
+            queryset = (
+                self.get_queryset()
+                .filter(claimable)
+                .order_by('send_after', 'pk')
+            )
+            skip_locked = connection.features.has_select_for_update_skip_locked
+            if skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            emails = list(queryset[:size])
+            if skip_locked:
+                self.get_queryset().filter(
+                    pk__in=[email.pk for email in emails]
+                ).update(status=statuses.SENDING, claimed_at=now)
+            else:
+                emails = [
+                    email
+                    for email in emails
+                    if self.get_queryset()
+                    .filter(claimable, pk=email.pk)
+                    .update(status=statuses.SENDING, claimed_at=now)
+                ]
+        for email in emails:
+            email.status = statuses.SENDING
+            email.claimed_at = now
+        return emails
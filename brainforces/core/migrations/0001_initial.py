@@ -0,0 +1,36 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(help_text='Путь к функции, которую нужно выполнить', max_length=200, verbose_name='задача')),
+                ('kwargs', models.JSONField(blank=True, default=dict, help_text='Именованные аргументы функции', verbose_name='аргументы')),
+                ('key', models.CharField(blank=True, db_index=True, help_text='Ключ для поиска задачи и защиты от дублей', max_length=200, verbose_name='ключ')),
+                ('status', models.IntegerField(choices=[(0, 'В очереди'), (1, 'Выполняется'), (2, 'Выполнена'), (3, 'Ошибка')], default=0, help_text='Статус задачи', verbose_name='статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Время постановки задачи в очередь', verbose_name='создана')),
+                ('started_at', models.DateTimeField(blank=True, help_text='Время начала выполнения задачи', null=True, verbose_name='начата')),
+                ('duration', models.DurationField(blank=True, help_text='Время выполнения задачи', null=True, verbose_name='длительность')),
+                ('error', models.TextField(blank=True, help_text='Текст ошибки, если задача упала', verbose_name='ошибка')),
+            ],
+            options={
+                'verbose_name': 'задача',
+                'verbose_name_plural': 'задачи',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'created_at'], name='job_status_created'),
+        ),
+    ]
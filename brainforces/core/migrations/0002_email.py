@@ -0,0 +1,39 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Email',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to', models.EmailField(help_text='Почта получателя', max_length=254, verbose_name='получатель')),
+                ('from_email', models.CharField(blank=True, help_text='Почта отправителя, по умолчанию DEFAULT_FROM_EMAIL', max_length=254, verbose_name='отправитель')),
+                ('subject', models.CharField(help_text='Тема письма', max_length=200, verbose_name='тема')),
+                ('body', models.TextField(help_text='Текст письма', verbose_name='текст')),
+                ('key', models.CharField(blank=True, db_index=True, help_text='Ключ для защиты от повторных писем', max_length=200, verbose_name='ключ')),
+                ('status', models.IntegerField(choices=[(0, 'В очереди'), (1, 'Отправляется'), (2, 'Отправлено'), (3, 'Не отправлено')], default=0, help_text='Статус письма', verbose_name='статус')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Количество неудачных попыток отправки', verbose_name='попытки')),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Время, раньше которого письмо не отправляется', verbose_name='отправить после')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Время постановки письма в очередь', verbose_name='создано')),
+                ('sent_at', models.DateTimeField(blank=True, help_text='Время отправки письма', null=True, verbose_name='отправлено')),
+                ('error', models.TextField(blank=True, help_text='Текст последней ошибки отправки', verbose_name='ошибка')),
+            ],
+            options={
+                'verbose_name': 'письмо',
+                'verbose_name_plural': 'письма',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(fields=['status', 'send_after'], name='email_status_send_after'),
+        ),
+    ]
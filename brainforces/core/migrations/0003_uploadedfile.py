@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Путь к файлу в хранилище', max_length=255, unique=True, verbose_name='путь')),
+                ('digest', models.CharField(help_text='SHA-256 загруженного содержимого', max_length=64, unique=True, verbose_name='хеш')),
+                ('size', models.PositiveIntegerField(default=0, help_text='Размер файла в байтах', verbose_name='размер')),
+                ('references', models.IntegerField(default=0, help_text='Количество текстов, в которых есть файл', verbose_name='ссылки')),
+                ('is_optimized', models.BooleanField(default=False, help_text='Метаданные удалены, картинка уменьшена и пережата', verbose_name='обработан')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Время первой загрузки файла', verbose_name='загружен')),
+            ],
+            options={
+                'verbose_name': 'загруженный файл',
+                'verbose_name_plural': 'загруженные файлы',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['references', 'created_at'], name='uploadedfile_references'),
+        ),
+    ]
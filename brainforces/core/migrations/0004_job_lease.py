@@ -0,0 +1,42 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:13
+
+from django.db import migrations, models
+
+
+def fail_duplicate_jobs(apps, schema_editor):
+    """из активных задач с одним ключом оставляем самую новую"""
+    job_model = apps.get_model('core', 'Job')
+    seen = set()
+    duplicates = list()
+    for job in (
+        job_model.objects.filter(status__in=(0, 1))
+        .exclude(key='')
+        .order_by('-created_at', '-pk')
+        .only('key')
+    ):
+        if job.key in seen:
+            duplicates.append(job.pk)
+        seen.add(job.key)
+    job_model.objects.filter(pk__in=duplicates).update(
+        status=3, error='Дубль задачи с тем же ключом'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_uploadedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, help_text='До этого времени задачу выполняет взявший ее воркер, потом ее может взять другой', null=True, verbose_name='аренда до'),
+        ),
+        migrations.RunPython(fail_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', (0, 1)), models.Q(('key', ''), _negated=True)), fields=('key',), name='job_active_key'),
+        ),
+    ]
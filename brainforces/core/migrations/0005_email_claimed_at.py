@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:14
+
+from django.db import migrations, models
+
+
+def fill_claimed_at(apps, schema_editor):
+    """письма, которые уже отправляются, считаем взятыми при создании"""
+    email_model = apps.get_model('core', 'Email')
+    email_model.objects.filter(status=1, claimed_at=None).update(
+        claimed_at=models.F('created_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_job_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='Время, когда отправитель взял письмо из очереди', null=True, verbose_name='взято в отправку'),
+        ),
+        migrations.RunPython(fill_claimed_at, migrations.RunPython.noop),
+    ]
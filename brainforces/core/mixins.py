@@ -0,0 +1,110 @@
+import typing
+
+import django.conf
+import django.http
+import django.views.generic
+import django.views.generic.list
+
+import core.cache
+import core.pagination
+
+
+class AnonymousPageCacheMixin(django.views.generic.View):
+    """
+    кешируем страницу для анонимных пользователей
+    ключ зависит от адреса, параметров запроса (страница, поиск)
+    и версий данных моделей из cache_models,
+    изменение любой из них делает старую страницу недоступной
+    """
+
+    cache_models: typing.Tuple[str, ...] = tuple()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        core.cache.CACHED_MODELS.update(
+            core.cache.get_model_label(model) for model in cls.cache_models
+        )
+
+    def dispatch(
+        self, request: django.http.HttpRequest, *args, **kwargs
+    ) -> django.http.HttpResponse:
+        if not core.cache.can_cache_request(request):
+            return super().dispatch(request, *args, **kwargs)
+        cache = core.cache.get_cache()
+        key = core.cache.get_page_key(
+            request,
+            (core.cache.get_model_label(model) for model in self.cache_models),
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return django.http.HttpResponse(content, content_type=content_type)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            if hasattr(response, 'render'):
+                response.render()
+            cache.set(
+                key,
+                (response.content, response['Content-Type']),
+                django.conf.settings.PAGE_CACHE_SECONDS,
+            )
+        return response
+
+
+class KeysetPaginationMixin(django.views.generic.list.MultipleObjectMixin):
+    """
+    постраничный вывод списка по курсору вместо номера страницы
+    порядок задается keyset_ordering, курсор передается в параметре cursor,
+    испорченный курсор - 404
+    с keyset_count в контекст попадает примерное количество строк
+    """
+
+    paginator_class = core.pagination.KeysetPaginator
+    keyset_ordering: typing.Tuple[str, ...] = ('pk',)
+    keyset_count = False
+    cursor_kwarg = 'cursor'
+
+    def get_paginator(
+        self, queryset: typing.Any, per_page: int, *args, **kwargs
+    ) -> core.pagination.KeysetPaginator:
+        return self.paginator_class(
+            queryset, per_page, ordering=self.keyset_ordering
+        )
+
+    def paginate_queryset(
+        self, queryset: typing.Any, page_size: int
+    ) -> typing.Tuple[
+        core.pagination.KeysetPaginator,
+        core.pagination.KeysetPage,
+        typing.List[typing.Any],
+        bool,
+    ]:
+        paginator = self.get_paginator(queryset, page_size)
+        try:
+            page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        except core.pagination.InvalidCursorError:
+            raise django.http.Http404()
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_cursor_query(self, cursor: typing.Optional[str]) -> str:
+        """параметры запроса для ссылки на страницу с курсором"""
+        if cursor is None:
+            return ''
+        query = self.request.GET.copy()
+        query[self.cursor_kwarg] = cursor
+        return query.urlencode()
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if page is not None:
+            context['next_page_query'] = self.get_cursor_query(
+                page.next_cursor
+            )
+            context['previous_page_query'] = self.get_cursor_query(
+                page.previous_cursor
+            )
+        paginator = context.get('paginator')
+        if self.keyset_count and paginator is not None:
+            context['approximate_count'] = paginator.approximate_count
+        return context
@@ -1,10 +1,13 @@
 import secrets
 import typing
 
-import sorl.thumbnail
 import transliterate
 
 import django.db.models
+import django.utils.timezone
+
+import core.managers
+import core.richtext
 
 
 def generate_image_path(obj: django.db.models.Model, filename: str) -> str:
@@ -22,7 +25,11 @@ def generate_image_path(obj: django.db.models.Model, filename: str) -> str:
 
 
 class AbstractImageModel(django.db.models.Model):
-    """абсрактная модель с картинкой"""
+    """
+    абсрактная модель с картинкой
+    уменьшенные копии картинки делает фоновая задача,
+    страницы берут их готовые адреса и саму картинку не читают
+    """
 
     image = django.db.models.ImageField(
         verbose_name='картинка',
@@ -30,11 +37,339 @@ class AbstractImageModel(django.db.models.Model):
         upload_to='images',
     )
 
-    def get_image_50x50(self) -> typing.Any:
-        """делаем миниатюру"""
-        return sorl.thumbnail.get_thumbnail(
-            self.image, '50x50', crop='center', quality=60
-        )
+    renditions = django.db.models.JSONField(
+        verbose_name='копии картинки',
+        help_text='Адреса уменьшенных копий картинки по формату и размеру',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+
+    def get_renditions_directory(self) -> str:
+        """папка с уменьшенными копиями картинки"""
+        return f'renditions/{self._meta.label_lower}/{self.pk}'
+
+    class Meta:
+        abstract = True
+
+
+class RichTextModel(django.db.models.Model):
+    """
+    абстрактная модель с текстами редактора
+    для каждого поля из rich_text_fields при сохранении считаются
+    очищенный html (поле <имя>_html) и короткий текст (<имя>_excerpt),
+    страницы показывают их и исходный текст не читают
+    """
+
+    rich_text_fields: typing.Tuple[str, ...] = ()
+
+    def render_rich_text(self) -> None:
+        """
+        считаем очищенный html и короткий текст полей,
+        короткий текст берем из уже очищенного html
+        """
+        for name in self.rich_text_fields:
+            value = core.richtext.sanitize_html(getattr(self, name))
+            setattr(self, f'{name}_html', value)
+            setattr(
+                self,
+                f'{name}_excerpt',
+                core.richtext.truncate_text(core.richtext.html_to_text(value)),
+            )
+
+    def save(self, *args, **kwargs) -> None:
+        """при сохранении текстов сохраняем и производные поля"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.render_rich_text()
+        else:
+            names = [
+                name for name in self.rich_text_fields if name in update_fields
+            ]
+            if names:
+                self.render_rich_text()
+                kwargs['update_fields'] = {
+                    *update_fields,
+                    *(f'{name}_html' for name in names),
+                    *(f'{name}_excerpt' for name in names),
+                }
+        super().save(*args, **kwargs)
 
     class Meta:
         abstract = True
+
+
+class Job(django.db.models.Model):
+    """фоновая задача"""
+
+    objects = core.managers.JobManager()
+
+    class Statuses(django.db.models.IntegerChoices):
+        """статусы задачи"""
+
+        PENDING = 0, 'В очереди'
+        RUNNING = 1, 'Выполняется'
+        DONE = 2, 'Выполнена'
+        FAILED = 3, 'Ошибка'
+
+    task = django.db.models.CharField(
+        verbose_name='задача',
+        help_text='Путь к функции, которую нужно выполнить',
+        max_length=200,
+    )
+
+    kwargs = django.db.models.JSONField(
+        verbose_name='аргументы',
+        help_text='Именованные аргументы функции',
+        default=dict,
+        blank=True,
+    )
+
+    key = django.db.models.CharField(
+        verbose_name='ключ',
+        help_text='Ключ для поиска задачи и защиты от дублей',
+        max_length=200,
+        blank=True,
+        db_index=True,
+    )
+
+    status = django.db.models.IntegerField(
+        verbose_name='статус',
+        help_text='Статус задачи',
+        choices=Statuses.choices,
+        default=Statuses.PENDING,
+    )
+
+    created_at = django.db.models.DateTimeField(
+        verbose_name='создана',
+        help_text='Время постановки задачи в очередь',
+        auto_now_add=True,
+    )
+
+    started_at = django.db.models.DateTimeField(
+        verbose_name='начата',
+        help_text='Время начала выполнения задачи',
+        null=True,
+        blank=True,
+    )
+
+    lease_until = django.db.models.DateTimeField(
+        verbose_name='аренда до',
+        help_text='До этого времени задачу выполняет взявший ее воркер, '
+        'потом ее может взять другой',
+        null=True,
+        blank=True,
+    )
+
+    duration = django.db.models.DurationField(
+        verbose_name='длительность',
+        help_text='Время выполнения задачи',
+        null=True,
+        blank=True,
+    )
+
+    error = django.db.models.TextField(
+        verbose_name='ошибка',
+        help_text='Текст ошибки, если задача упала',
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'задача'
+        verbose_name_plural = 'задачи'
+        indexes = [
+            django.db.models.Index(
+                fields=('status', 'created_at'), name='job_status_created'
+            ),
+        ]
+        constraints = [
+            django.db.models.UniqueConstraint(
+                fields=('key',),
+                # в очереди или выполняется
+                condition=django.db.models.Q(status__in=(0, 1))
+                & ~django.db.models.Q(key=''),
+                name='job_active_key',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'Задача {self.pk}'
+
+    @property
+    def is_active(self) -> bool:
+        """задача еще в очереди или выполняется"""
+        return self.status in (self.Statuses.PENDING, self.Statuses.RUNNING)
+
+    @property
+    def is_leased(self) -> bool:
+        """аренда задачи воркером еще не истекла"""
+        return (
+            self.lease_until is not None
+            and self.lease_until >= django.utils.timezone.now()
+        )
+
+
+class Email(django.db.models.Model):
+    """письмо в очереди на отправку"""
+
+    objects = core.managers.EmailManager()
+
+    class Statuses(django.db.models.IntegerChoices):
+        """статусы письма"""
+
+        PENDING = 0, 'В очереди'
+        SENDING = 1, 'Отправляется'
+        SENT = 2, 'Отправлено'
+        FAILED = 3, 'Не отправлено'
+
+    to = django.db.models.EmailField(
+        verbose_name='получатель',
+        help_text='Почта получателя',
+        max_length=254,
+    )
+
+    from_email = django.db.models.CharField(
+        verbose_name='отправитель',
+        help_text='Почта отправителя, по умолчанию DEFAULT_FROM_EMAIL',
+        max_length=254,
+        blank=True,
+    )
+
+    subject = django.db.models.CharField(
+        verbose_name='тема',
+        help_text='Тема письма',
+        max_length=200,
+    )
+
+    body = django.db.models.TextField(
+        verbose_name='текст',
+        help_text='Текст письма',
+    )
+
+    key = django.db.models.CharField(
+        verbose_name='ключ',
+        help_text='Ключ для защиты от повторных писем',
+        max_length=200,
+        blank=True,
+        db_index=True,
+    )
+
+    status = django.db.models.IntegerField(
+        verbose_name='статус',
+        help_text='Статус письма',
+        choices=Statuses.choices,
+        default=Statuses.PENDING,
+    )
+
+    attempts = django.db.models.PositiveIntegerField(
+        verbose_name='попытки',
+        help_text='Количество неудачных попыток отправки',
+        default=0,
+    )
+
+    send_after = django.db.models.DateTimeField(
+        verbose_name='отправить после',
+        help_text='Время, раньше которого письмо не отправляется',
+        default=django.utils.timezone.now,
+    )
+
+    created_at = django.db.models.DateTimeField(
+        verbose_name='создано',
+        help_text='Время постановки письма в очередь',
+        auto_now_add=True,
+    )
+
+    claimed_at = django.db.models.DateTimeField(
+        verbose_name='взято в отправку',
+        help_text='Время, когда отправитель взял письмо из очереди',
+        null=True,
+        blank=True,
+    )
+
+    sent_at = django.db.models.DateTimeField(
+        verbose_name='отправлено',
+        help_text='Время отправки письма',
+        null=True,
+        blank=True,
+    )
+
+    error = django.db.models.TextField(
+        verbose_name='ошибка',
+        help_text='Текст последней ошибки отправки',
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'письмо'
+        verbose_name_plural = 'письма'
+        indexes = [
+            django.db.models.Index(
+                fields=('status', 'send_after'), name='email_status_send_after'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'Письмо {self.pk} для {self.to}'
+
+
+class UploadedFile(django.db.models.Model):
+    """
+    файл, загруженный через редактор текста
+    файл лежит по адресу из хеша содержимого, поэтому одинаковые
+    загрузки хранятся один раз, а references считает тексты,
+    которые на него ссылаются
+    """
+
+    name = django.db.models.CharField(
+        verbose_name='путь',
+        help_text='Путь к файлу в хранилище',
+        max_length=255,
+        unique=True,
+    )
+
+    digest = django.db.models.CharField(
+        verbose_name='хеш',
+        help_text='SHA-256 загруженного содержимого',
+        max_length=64,
+        unique=True,
+    )
+
+    size = django.db.models.PositiveIntegerField(
+        verbose_name='размер',
+        help_text='Размер файла в байтах',
+        default=0,
+    )
+
+    references = django.db.models.IntegerField(
+        verbose_name='ссылки',
+        help_text='Количество текстов, в которых есть файл',
+        default=0,
+    )
+
+    is_optimized = django.db.models.BooleanField(
+        verbose_name='обработан',
+        help_text='Метаданные удалены, картинка уменьшена и пережата',
+        default=False,
+    )
+
+    created_at = django.db.models.DateTimeField(
+        verbose_name='загружен',
+        help_text='Время первой загрузки файла',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'загруженный файл'
+        verbose_name_plural = 'загруженные файлы'
+        indexes = [
+            django.db.models.Index(
+                fields=('references', 'created_at'),
+                name='uploadedfile_references',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return self.name
@@ -0,0 +1,235 @@
+import json
+import typing
+
+import django.core.exceptions
+import django.core.serializers.json
+import django.core.signing
+import django.db
+import django.db.models
+import django.http
+
+
+class InvalidCursorError(Exception):
+    """курсор страницы испорчен или подделан"""
+
+
+class CursorSerializer:
+    """сериализатор курсора, умеет даты и decimal"""
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        return json.dumps(
+            obj,
+            separators=(',', ':'),
+            cls=django.core.serializers.json.DjangoJSONEncoder,
+        ).encode('latin-1')
+
+    def loads(self, data: bytes) -> typing.Any:
+        return json.loads(data.decode('latin-1'))
+
+
+def encode_cursor(key: typing.Sequence[typing.Any], reverse: bool) -> str:
+    """
+    непрозрачный курсор: ключ крайней строки страницы и направление
+    курсор подписан, поэтому подставить в него свои значения нельзя
+    """
+    return django.core.signing.dumps(
+        [list(key), reverse],
+        salt='core.pagination',
+        serializer=CursorSerializer,
+    )
+
+
+def decode_cursor(
+    cursor: str,
+) -> typing.Tuple[typing.List[typing.Any], bool]:
+    """ключ и направление из курсора"""
+    try:
+        key, reverse = django.core.signing.loads(
+            cursor, salt='core.pagination', serializer=CursorSerializer
+        )
+    except (django.core.signing.BadSignature, TypeError, ValueError):
+        raise InvalidCursorError()
+    return key, bool(reverse)
+
+
+def get_page_query(request: django.http.HttpRequest) -> str:
+    """
+    параметры запроса для ссылок на номера страниц:
+    вкладка, поиск и фильтры без номера страницы
+    """
+    query = request.GET.copy()
+    query.pop('page', None)
+    return f'{query.urlencode()}&' if query else ''
+
+
+def get_approximate_count(queryset: django.db.models.QuerySet) -> int:
+    """
+    примерное количество строк
+    на PostgreSQL берем оценку планировщика, это не требует прохода
+    по таблице, на остальных бд считаем честно
+    """
+    connection = django.db.connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    """
+    страница списка без номера
+    вместо номеров соседние страницы задаются курсорами
+    """
+
+    def __init__(
+        self,
+        object_list: typing.List[typing.Any],
+        paginator: 'KeysetPaginator',
+        has_next: bool,
+        has_previous: bool,
+    ) -> None:
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(self.object_list)
+
+    def __getitem__(self, index: typing.Union[int, slice]) -> typing.Any:
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self) -> typing.Optional[str]:
+        """курсор следующей страницы"""
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(
+            self.paginator.get_key(self.object_list[-1]), False
+        )
+
+    @property
+    def previous_cursor(self) -> typing.Optional[str]:
+        """курсор предыдущей страницы"""
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.paginator.get_key(self.object_list[0]), True)
+
+
+class KeysetPaginator:
+    """
+    постраничный вывод по ключу (seek) вместо OFFSET
+    страница - это per_page строк после ключа последней строки
+    предыдущей страницы в порядке ordering, поэтому глубокие страницы
+    отдаются так же быстро, как первая, и COUNT(*) не нужен
+    последним полем порядка всегда идет pk, так порядок однозначен
+    поля порядка не должны быть NULL
+    """
+
+    def __init__(
+        self,
+        object_list: typing.Any,
+        per_page: int,
+        ordering: typing.Sequence[str] = ('pk',),
+    ) -> None:
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        self.ordering = tuple(ordering)
+
+    @property
+    def count(self) -> int:
+        """точное количество строк, считается только по запросу"""
+        return self.object_list.count()
+
+    @property
+    def approximate_count(self) -> int:
+        """примерное количество строк"""
+        return get_approximate_count(self.object_list)
+
+    def get_key(self, obj: typing.Any) -> typing.Tuple[typing.Any, ...]:
+        """значения полей порядка у строки"""
+        key = list()
+        for field in self.ordering:
+            value = obj
+            for name in field.lstrip('-').split('__'):
+                value = getattr(value, name)
+            key.append(value)
+        return tuple(key)
+
+    def get_seek_filter(
+        self, key: typing.Sequence[typing.Any], reverse: bool
+    ) -> django.db.models.Q:
+        """
+        условие "строка дальше ключа":
+        (a > x) or (a = x and b > y) or ...
+        """
+        if len(key) != len(self.ordering):
+            raise InvalidCursorError()
+        condition = django.db.models.Q()
+        equal = dict()
+        for field, value in zip(self.ordering, key):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= django.db.models.Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+    def fetch(
+        self,
+        key: typing.Optional[typing.Sequence[typing.Any]],
+        limit: int,
+        reverse: bool,
+    ) -> typing.List[typing.Any]:
+        """
+        limit строк после ключа в порядке обхода,
+        при reverse - в обратном порядке до ключа
+        """
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = self.object_list.order_by(*ordering)
+        try:
+            if key is not None:
+                queryset = queryset.filter(self.get_seek_filter(key, reverse))
+            return list(queryset[:limit])
+        except django.core.exceptions.ValidationError:
+            raise InvalidCursorError()
+
+    def get_page(self, cursor: typing.Optional[str] = None) -> KeysetPage:
+        """страница по курсору, без курсора - первая"""
+        if not cursor:
+            rows = self.fetch(None, self.per_page + 1, False)
+            return KeysetPage(
+                rows[: self.per_page], self, len(rows) > self.per_page, False
+            )
+        key, reverse = decode_cursor(cursor)
+        rows = self.fetch(key, self.per_page + 1, reverse)
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            return KeysetPage(rows[::-1], self, True, has_more)
+        return KeysetPage(rows, self, has_more, True)
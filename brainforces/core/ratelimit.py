@@ -0,0 +1,170 @@
+import hashlib
+import threading
+import time
+import typing
+
+import django.conf
+import django.core.cache
+import django.utils.module_loading
+
+
+class CounterStore:
+    """
+    хранилище счетчиков ограничения частоты
+    счетчик живет заданное время, потом пропадает сам
+    """
+
+    def get_many(self, keys: typing.Sequence[str]) -> typing.Dict[str, int]:
+        """значения существующих счетчиков"""
+        raise NotImplementedError
+
+    def incr(self, key: str, timeout: int) -> None:
+        """увеличиваем счетчик, новый живет timeout секунд"""
+        raise NotImplementedError
+
+    def delete_many(self, keys: typing.Sequence[str]) -> None:
+        """сбрасываем счетчики"""
+        raise NotImplementedError
+
+
+class CacheCounterStore(CounterStore):
+    """
+    счетчики в кеше из RATELIMIT_CACHE_ALIAS
+    с общим кешем (redis) счетчики видны всем процессам и серверам
+    """
+
+    def get_cache(self) -> typing.Any:
+        """кеш счетчиков"""
+        return django.core.cache.caches[
+            django.conf.settings.RATELIMIT_CACHE_ALIAS
+        ]
+
+    def get_many(self, keys: typing.Sequence[str]) -> typing.Dict[str, int]:
+        return self.get_cache().get_many(keys)
+
+    def incr(self, key: str, timeout: int) -> None:
+        cache = self.get_cache()
+        cache.add(key, 0, timeout)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout)
+
+    def delete_many(self, keys: typing.Sequence[str]) -> None:
+        self.get_cache().delete_many(keys)
+
+
+class LocalCounterStore(CounterStore):
+    """счетчики в памяти процесса, для разработки и тестов"""
+
+    def __init__(self) -> None:
+        self._counters: typing.Dict[str, typing.Tuple[int, float]] = dict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: typing.Sequence[str]) -> typing.Dict[str, int]:
+        now = time.time()
+        with self._lock:
+            return {
+                key: self._counters[key][0]
+                for key in keys
+                if key in self._counters and self._counters[key][1] > now
+            }
+
+    def incr(self, key: str, timeout: int) -> None:
+        now = time.time()
+        with self._lock:
+            value, expires = self._counters.get(key, (0, 0.0))
+            if expires <= now:
+                value, expires = 0, now + timeout
+            self._counters[key] = (value + 1, expires)
+
+    def delete_many(self, keys: typing.Sequence[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._counters.pop(key, None)
+
+
+_store: typing.Optional[CounterStore] = None
+
+
+def get_store() -> CounterStore:
+    """хранилище счетчиков из настроек, одно на процесс"""
+    global _store
+    if _store is None:
+        _store = django.utils.module_loading.import_string(
+            django.conf.settings.RATELIMIT_STORE
+        )()
+    return _store
+
+
+class RateLimit(typing.NamedTuple):
+    """
+    ограничение: не больше limit событий за seconds секунд
+    окно скользящее: считаем события текущего отрезка длины seconds
+    и долю событий предыдущего, пропорциональную еще не прошедшей
+    части окна, поэтому на границе отрезков лимит не удваивается
+    """
+
+    name: str
+    limit: int
+    seconds: int
+
+    def get_keys(
+        self, ident: str, now: float
+    ) -> typing.Tuple[str, str, float]:
+        """ключи текущего и предыдущего отрезков и вес предыдущего"""
+        bucket, offset = divmod(now, self.seconds)
+        ident_hash = hashlib.md5(ident.encode()).hexdigest()
+        return (
+            f'ratelimit:{self.name}:{ident_hash}:{int(bucket)}',
+            f'ratelimit:{self.name}:{ident_hash}:{int(bucket) - 1}',
+            1 - offset / self.seconds,
+        )
+
+
+# ограничение и идентификатор того, кого ограничиваем (ip, аккаунт)
+Check = typing.Tuple[RateLimit, str]
+
+
+def get_counts(checks: typing.Sequence[Check]) -> typing.List[float]:
+    """количество событий в окне каждого ограничения, одним запросом"""
+    now = time.time()
+    keys = [rate.get_keys(ident, now) for rate, ident in checks]
+    values = get_store().get_many(
+        [key for current, previous, _ in keys for key in (current, previous)]
+    )
+    return [
+        values.get(current, 0) + values.get(previous, 0) * weight
+        for current, previous, weight in keys
+    ]
+
+
+def get_exceeded(
+    checks: typing.Sequence[Check],
+) -> typing.Optional[RateLimit]:
+    """первое исчерпанное ограничение или None"""
+    for (rate, _), count in zip(checks, get_counts(checks)):
+        if count >= rate.limit:
+            return rate
+    return None
+
+
+def hit(checks: typing.Sequence[Check]) -> None:
+    """учитываем событие во всех ограничениях"""
+    store = get_store()
+    now = time.time()
+    for rate, ident in checks:
+        current, _, _ = rate.get_keys(ident, now)
+        store.incr(current, rate.seconds * 2)
+
+
+def reset(checks: typing.Sequence[Check]) -> None:
+    """забываем события ограничений"""
+    now = time.time()
+    get_store().delete_many(
+        [
+            key
+            for rate, ident in checks
+            for key in rate.get_keys(ident, now)[:2]
+        ]
+    )
@@ -0,0 +1,238 @@
+import html
+import html.parser
+import re
+import typing
+
+import django.utils.html
+
+
+# длина короткого текста для списков
+EXCERPT_LENGTH = 300
+
+ALLOWED_TAGS = frozenset(
+    (
+        'a',
+        'b',
+        'blockquote',
+        'br',
+        'caption',
+        'code',
+        'div',
+        'em',
+        'figcaption',
+        'figure',
+        'h1',
+        'h2',
+        'h3',
+        'h4',
+        'h5',
+        'h6',
+        'hr',
+        'i',
+        'img',
+        'li',
+        'ol',
+        'p',
+        'pre',
+        's',
+        'span',
+        'strike',
+        'strong',
+        'sub',
+        'sup',
+        'table',
+        'tbody',
+        'td',
+        'tfoot',
+        'th',
+        'thead',
+        'tr',
+        'u',
+        'ul',
+    )
+)
+
+# теги без закрывающего тега
+VOID_TAGS = frozenset(('br', 'hr', 'img'))
+
+# теги, которые удаляются вместе с содержимым
+DROPPED_TAGS = frozenset(
+    ('script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript')
+)
+
+ALLOWED_ATTRIBUTES = {
+    'a': frozenset(('href', 'title', 'target')),
+    'img': frozenset(('src', 'alt', 'title', 'width', 'height')),
+    'td': frozenset(('colspan', 'rowspan')),
+    'th': frozenset(('colspan', 'rowspan')),
+    'table': frozenset(('border', 'cellpadding', 'cellspacing')),
+}
+
+# атрибуты, разрешенные всем тегам
+COMMON_ATTRIBUTES = frozenset(('style',))
+
+URL_ATTRIBUTES = frozenset(('href', 'src'))
+ALLOWED_URL_SCHEMES = frozenset(('http', 'https', 'mailto'))
+
+# свойства style, которые выставляет редактор
+ALLOWED_STYLES = frozenset(
+    (
+        'border',
+        'color',
+        'background-color',
+        'float',
+        'font-size',
+        'height',
+        'margin',
+        'margin-left',
+        'margin-right',
+        'text-align',
+        'width',
+    )
+)
+
+URL_SCHEME_PATTERN = re.compile(r'^([a-z][a-z0-9+.-]*):', re.IGNORECASE)
+# пробелы и управляющие символы, которые браузер выбрасывает из ссылки
+URL_IGNORED_PATTERN = re.compile(r'[\x00-\x20\x7f]+')
+URL_EDGE_CHARACTERS = ''.join(map(chr, range(0x21)))
+UNSAFE_STYLE_PATTERN = re.compile(r'url\s*\(|expression\s*\(|[<>\\]', re.I)
+
+
+def html_to_text(value: str) -> str:
+    """текст без html тегов и сущностей, пробелы схлопнуты"""
+    return ' '.join(
+        html.unescape(django.utils.html.strip_tags(value or '')).split()
+    )
+
+
+def make_excerpt(value: str, length: int = EXCERPT_LENGTH) -> str:
+    """
+    короткий текст без разметки для списков
+    текст берем из очищенного html, чтобы в него не попали скрипты
+    """
+    return truncate_text(html_to_text(sanitize_html(value)), length)
+
+
+def truncate_text(text: str, length: int = EXCERPT_LENGTH) -> str:
+    """обрезаем текст по границе слова"""
+    if len(text) <= length:
+        return text
+    cut = text[: length - 1]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return f'{cut}…'
+
+
+def clean_url(value: str) -> typing.Optional[str]:
+    """
+    ссылка, если ее схема разрешена или ссылка явно относительная
+    схему ищем без управляющих символов, их браузер выбрасывает сам
+    """
+    compact = URL_IGNORED_PATTERN.sub('', value)
+    match = URL_SCHEME_PATTERN.match(compact)
+    if match:
+        if match.group(1).lower() not in ALLOWED_URL_SCHEMES:
+            return None
+    elif not compact.startswith(('/', '#', '?')) and ':' in (
+        compact.split('/', 1)[0]
+    ):
+        return None
+    return value.strip(URL_EDGE_CHARACTERS).translate(
+        {ord('\t'): None, ord('\n'): None, ord('\r'): None}
+    )
+
+
+def clean_style(value: str) -> str:
+    """оставляем только разрешенные свойства style"""
+    declarations = list()
+    for declaration in value.split(';'):
+        name, _, style_value = declaration.partition(':')
+        name, style_value = name.strip().lower(), style_value.strip()
+        if (
+            name in ALLOWED_STYLES
+            and style_value
+            and not UNSAFE_STYLE_PATTERN.search(style_value)
+        ):
+            declarations.append(f'{name}:{style_value}')
+    return ';'.join(declarations)
+
+
+class HTMLSanitizer(html.parser.HTMLParser):
+    """
+    html редактора без опасной разметки
+    остаются только разрешенные теги и атрибуты, скрипты и стили
+    удаляются с содержимым, незакрытые теги закрываются
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: typing.List[str] = list()
+        self.open_tags: typing.List[str] = list()
+        self.dropped_depth = 0
+
+    def clean_attributes(
+        self, tag: str, attrs: typing.List[typing.Tuple[str, str]]
+    ) -> str:
+        """разрешенные атрибуты тега строкой"""
+        allowed = ALLOWED_ATTRIBUTES.get(tag, frozenset()) | COMMON_ATTRIBUTES
+        cleaned = list()
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = clean_url(value)
+            elif name == 'style':
+                value = clean_style(value)
+            if value:
+                cleaned.append(f' {name}="{html.escape(value)}"')
+        if tag == 'a' and any(name == 'target' for name, _ in attrs):
+            # открытая в новой вкладке страница не получает window.opener
+            cleaned.append(' rel="noopener noreferrer"')
+        return ''.join(cleaned)
+
+    def handle_starttag(
+        self, tag: str, attrs: typing.List[typing.Tuple[str, str]]
+    ) -> None:
+        if tag in DROPPED_TAGS:
+            self.dropped_depth += 1
+            return
+        if self.dropped_depth or tag not in ALLOWED_TAGS:
+            return
+        self.parts.append(f'<{tag}{self.clean_attributes(tag, attrs)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(
+        self, tag: str, attrs: typing.List[typing.Tuple[str, str]]
+    ) -> None:
+        if tag in VOID_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in DROPPED_TAGS:
+            self.dropped_depth = max(self.dropped_depth - 1, 0)
+            return
+        if self.dropped_depth or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if not self.dropped_depth:
+            self.parts.append(html.escape(data, quote=False))
+
+    def get_html(self) -> str:
+        """очищенный html"""
+        self.close()
+        closing = [f'</{tag}>' for tag in reversed(self.open_tags)]
+        return ''.join(self.parts + closing)
+
+
+def sanitize_html(value: str) -> str:
+    """очищаем html редактора от опасной разметки"""
+    sanitizer = HTMLSanitizer()
+    sanitizer.feed(value or '')
+    return sanitizer.get_html()
@@ -0,0 +1,156 @@
+import threading
+import time
+import traceback
+import typing
+
+import django.conf
+import django.core.mail
+import django.db
+import django.utils.module_loading
+import django.utils.timezone
+
+import core.models
+
+
+class LeaseKeeper(threading.Thread):
+    """
+    поток, который продлевает аренду задачи каждые
+    JOBS_LEASE_RENEW_SECONDS, пока задача выполняется,
+    иначе долгую задачу взял бы второй воркер
+    """
+
+    def __init__(self, job: core.models.Job) -> None:
+        super().__init__(name=f'job-lease-{job.pk}', daemon=True)
+        self.job = job
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        try:
+            while not self.stopped.wait(
+                django.conf.settings.JOBS_LEASE_RENEW_SECONDS
+            ):
+                with self.lock:
+                    if self.stopped.is_set():
+                        return
+                    if not core.models.Job.objects.renew(self.job):
+                        return
+        finally:
+            django.db.connection.close()
+
+    def stop(self) -> None:
+        """останавливаем продление, после этого аренда не меняется"""
+        with self.lock:
+            self.stopped.set()
+        self.join()
+
+
+def run_job(job: core.models.Job) -> bool:
+    """
+    выполняем задачу и сохраняем ее статус и длительность
+    статус сохраняем, только если аренда все еще наша,
+    иначе задачу уже выполняет другой воркер, возвращаем False
+    """
+    started = time.monotonic()
+    lease_keeper = LeaseKeeper(job)
+    lease_keeper.start()
+    try:
+        django.utils.module_loading.import_string(job.task)(**job.kwargs)
+    except Exception:
+        job.status = core.models.Job.Statuses.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = core.models.Job.Statuses.DONE
+    finally:
+        lease_keeper.stop()
+    job.duration = django.utils.timezone.timedelta(
+        seconds=time.monotonic() - started
+    )
+    return bool(
+        core.models.Job.objects.get_own(job).update(
+            status=job.status, error=job.error, duration=job.duration
+        )
+    )
+
+
+def run_pending_jobs() -> int:
+    """выполняем все задачи из очереди, возвращаем их количество"""
+    jobs_count = 0
+    job = core.models.Job.objects.claim()
+    while job is not None:
+        run_job(job)
+        jobs_count += 1
+        job = core.models.Job.objects.claim()
+    return jobs_count
+
+
+def get_retry_delay(attempts: int) -> django.utils.timezone.timedelta:
+    """пауза перед следующей попыткой отправки, растет вдвое"""
+    return django.utils.timezone.timedelta(
+        seconds=django.conf.settings.EMAIL_RETRY_SECONDS * 2 ** (attempts - 1)
+    )
+
+
+def send_emails(emails: typing.List[core.models.Email]) -> int:
+    """
+    отправляем пачку писем через одно соединение с почтовым сервером
+    неотправленные письма возвращаются в очередь с паузой,
+    после EMAIL_MAX_ATTEMPTS попыток помечаются ошибкой
+    возвращаем количество отправленных писем
+    """
+    statuses = core.models.Email.Statuses
+    sent_count = 0
+    connection = django.core.mail.get_connection()
+    try:
+        connection.open()
+    except Exception:
+        errors = {email.pk: traceback.format_exc() for email in emails}
+    else:
+        errors = dict()
+        for email in emails:
+            try:
+                django.core.mail.EmailMessage(
+                    email.subject,
+                    email.body,
+                    email.from_email or None,
+                    [email.to],
+                    connection=connection,
+                ).send()
+            except Exception:
+                errors[email.pk] = traceback.format_exc()
+        connection.close()
+    now = django.utils.timezone.now()
+    for email in emails:
+        if email.pk not in errors:
+            email.status = statuses.SENT
+            email.sent_at = now
+            sent_count += 1
+            continue
+        email.attempts += 1
+        email.error = errors[email.pk]
+        if email.attempts >= django.conf.settings.EMAIL_MAX_ATTEMPTS:
+            email.status = statuses.FAILED
+        else:
+            email.status = statuses.PENDING
+            email.send_after = now + get_retry_delay(email.attempts)
+    core.models.Email.objects.bulk_update(
+        emails, ('status', 'sent_at', 'attempts', 'error', 'send_after')
+    )
+    return sent_count
+
+
+def send_pending_emails() -> int:
+    """
+    отправляем письма из очереди пачками по EMAIL_BATCH_SIZE,
+    возвращаем количество отправленных
+    """
+    sent_count = 0
+    emails = core.models.Email.objects.claim_batch(
+        django.conf.settings.EMAIL_BATCH_SIZE
+    )
+    while emails:
+        sent_count += send_emails(emails)
+        emails = core.models.Email.objects.claim_batch(
+            django.conf.settings.EMAIL_BATCH_SIZE
+        )
+    return sent_count
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import typing
+
+import django.conf
+import django.core.files.storage
+
+import core.models
+
+
+class ContentAddressedStorage(django.core.files.storage.FileSystemStorage):
+    """
+    хранилище загрузок редактора текста
+    путь файла - хеш его содержимого, поэтому одинаковые загрузки
+    хранятся один раз, каждый новый файл учитывается в UploadedFile
+    и ставится в очередь на обработку
+    удаляется файл, только если на него не ссылается ни один текст
+    """
+
+    def get_digest(self, content: typing.Any) -> str:
+        """SHA-256 содержимого файла"""
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    def get_content_name(self, name: str, digest: str) -> str:
+        """путь файла по хешу, расширение берем из имени загрузки"""
+        extension = os.path.splitext(name)[1].lower()
+        return (
+            f'{django.conf.settings.CKEDITOR_UPLOAD_PATH}'
+            f'{digest[:2]}/{digest}{extension}'
+        )
+
+    def save(
+        self,
+        name: typing.Optional[str],
+        content: typing.Any,
+        max_length: typing.Optional[int] = None,
+    ) -> str:
+        """
+        сохраняем файл под путем из хеша
+        если такой файл уже есть, возвращаем его путь без записи
+        """
+        digest = self.get_digest(content)
+        content_name = self.get_content_name(name or content.name, digest)
+        if self.exists(content_name):
+            if core.models.UploadedFile.objects.filter(
+                name=content_name
+            ).exists():
+                return content_name
+        else:
+            saved_name = super()._save(content_name, content)
+            if saved_name != content_name:
+                # одинаковый файл одновременно загрузили дважды
+                super().delete(saved_name)
+        uploaded, created = core.models.UploadedFile.objects.get_or_create(
+            digest=digest,
+            defaults={'name': content_name, 'size': self.size(content_name)},
+        )
+        if created:
+            core.models.Job.objects.enqueue(
+                'core.uploads.optimize_upload',
+                key=f'optimize_upload:{uploaded.name}',
+                name=uploaded.name,
+            )
+        return uploaded.name
+
+    def replace(self, name: str, content: typing.Any) -> str:
+        """перезаписываем файл на месте, путь и адрес не меняются"""
+        super().delete(name)
+        return super()._save(name, content)
+
+    def delete(self, name: str) -> None:
+        """удаляем файл и его учет, если на него больше не ссылаются"""
+        uploaded = core.models.UploadedFile.objects.filter(name=name)
+        if uploaded.filter(references__gt=0).exists():
+            return
+        uploaded.delete()
+        super().delete(name)
@@ -0,0 +1,628 @@
+import io
+import shutil
+import tempfile
+
+import ckeditor_uploader.utils
+import freezegun
+import PIL.Image
+
+import django.core.cache
+import django.core.files.base
+import django.core.files.uploadedfile
+import django.core.mail
+import django.core.mail.backends.locmem
+import django.db
+import django.test
+import django.test.utils
+import django.urls
+import django.utils.timezone
+
+import core.models
+import core.pagination
+import core.ratelimit
+import core.richtext
+import core.services
+import core.uploads
+import organization.models
+import users.leaderboard
+import users.models
+
+
+# вызовы noop_task
+task_calls = list()
+
+
+def noop_task(**kwargs) -> None:
+    """задача, которая только запоминает свои аргументы"""
+    task_calls.append(kwargs)
+
+
+def failing_task() -> None:
+    """задача, которая всегда падает"""
+    raise ValueError('ошибка')
+
+
+class CountingEmailBackend(django.core.mail.backends.locmem.EmailBackend):
+    """почтовый бэкенд, который считает открытые соединения"""
+
+    opened = 0
+
+    def open(self) -> bool:
+        CountingEmailBackend.opened += 1
+        return super().open()
+
+
+class FailingEmailBackend(django.core.mail.backends.locmem.EmailBackend):
+    """почтовый бэкенд, который не может отправить письмо"""
+
+    def send_messages(self, messages: list) -> int:
+        raise ConnectionError('почтовый сервер недоступен')
+
+
+class JobTests(django.test.TestCase):
+    """тестируем очередь фоновых задач"""
+
+    def test_enqueue_deduplicates_by_key(self) -> None:
+        """задача с тем же ключом не ставится в очередь дважды"""
+        first = core.models.Job.objects.enqueue(
+            'core.tests.noop_task', key='key'
+        )
+        second = core.models.Job.objects.enqueue(
+            'core.tests.noop_task', key='key'
+        )
+        self.assertEqual(first.pk, second.pk)
+
+    def test_claim_takes_oldest_job_once(self) -> None:
+        """задачу из очереди забирает только один воркер"""
+        first = core.models.Job.objects.enqueue('core.tests.noop_task')
+        core.models.Job.objects.enqueue('core.tests.noop_task')
+        self.assertEqual(core.models.Job.objects.claim().pk, first.pk)
+        self.assertNotEqual(core.models.Job.objects.claim().pk, first.pk)
+        self.assertIsNone(core.models.Job.objects.claim())
+
+    @django.test.override_settings(JOBS_LEASE_SECONDS=60)
+    def test_expired_lease_reclaimed(self) -> None:
+        """задачу упавшего воркера берет другой после конца аренды"""
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            job = core.models.Job.objects.enqueue(
+                'core.tests.noop_task', key='key'
+            )
+            self.assertEqual(core.models.Job.objects.claim().pk, job.pk)
+            self.assertIsNone(core.models.Job.objects.claim())
+            self.assertEqual(
+                core.models.Job.objects.enqueue(
+                    'core.tests.noop_task', key='key'
+                ).status,
+                core.models.Job.Statuses.RUNNING,
+            )
+        with freezegun.freeze_time('2023-01-01 00:01:01'):
+            self.assertEqual(core.models.Job.objects.claim().pk, job.pk)
+        with freezegun.freeze_time('2023-01-01 00:02:02'):
+            again = core.models.Job.objects.enqueue(
+                'core.tests.noop_task', key='key'
+            )
+            self.assertEqual(again.pk, job.pk)
+            self.assertEqual(again.status, core.models.Job.Statuses.PENDING)
+
+    @django.test.override_settings(JOBS_LEASE_SECONDS=60)
+    def test_lease_renewed(self) -> None:
+        """продленную аренду не забирает другой воркер"""
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            core.models.Job.objects.enqueue('core.tests.noop_task')
+            job = core.models.Job.objects.claim()
+        with freezegun.freeze_time('2023-01-01 00:00:50'):
+            self.assertTrue(core.models.Job.objects.renew(job))
+        with freezegun.freeze_time('2023-01-01 00:01:30'):
+            self.assertIsNone(core.models.Job.objects.claim())
+
+    @django.test.override_settings(JOBS_LEASE_SECONDS=60)
+    def test_lost_lease_keeps_new_owner(self) -> None:
+        """
+        воркер, у которого задачу забрали после конца аренды,
+        не продлевает ее и не перезаписывает статус
+        """
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            core.models.Job.objects.enqueue('core.tests.noop_task')
+            job = core.models.Job.objects.claim()
+        with freezegun.freeze_time('2023-01-01 00:01:01'):
+            self.assertEqual(core.models.Job.objects.claim().pk, job.pk)
+            self.assertFalse(core.models.Job.objects.renew(job))
+            self.assertFalse(core.services.run_job(job))
+        self.assertEqual(
+            core.models.Job.objects.get().status,
+            core.models.Job.Statuses.RUNNING,
+        )
+
+    def test_one_active_job_per_key(self) -> None:
+        """вторую активную задачу с тем же ключом не дает создать бд"""
+        core.models.Job.objects.enqueue('core.tests.noop_task', key='key')
+        with self.assertRaises(django.db.IntegrityError):
+            with django.db.transaction.atomic():
+                core.models.Job.objects.create(
+                    task='core.tests.noop_task', key='key'
+                )
+        core.models.Job.objects.update(status=core.models.Job.Statuses.DONE)
+        self.assertEqual(
+            core.models.Job.objects.enqueue(
+                'core.tests.noop_task', key='key'
+            ).status,
+            core.models.Job.Statuses.PENDING,
+        )
+        self.assertEqual(core.models.Job.objects.count(), 2)
+
+    def test_run_pending_jobs(self) -> None:
+        """задачи выполняются, статус и длительность сохраняются"""
+        task_calls.clear()
+        core.models.Job.objects.enqueue('core.tests.noop_task', value=1)
+        core.models.Job.objects.enqueue('core.tests.failing_task')
+        self.assertEqual(core.services.run_pending_jobs(), 2)
+        self.assertEqual(task_calls, [{'value': 1}])
+        done, failed = core.models.Job.objects.order_by('pk')
+        self.assertEqual(done.status, core.models.Job.Statuses.DONE)
+        self.assertIsNotNone(done.duration)
+        self.assertEqual(failed.status, core.models.Job.Statuses.FAILED)
+        self.assertIn('ValueError', failed.error)
+
+
+@django.test.override_settings(PAGE_CACHE_SECONDS=60)
+class PageCacheTests(django.test.TestCase):
+    """тестируем кеш страниц для анонимных пользователей"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        django.core.cache.cache.clear()
+        self.organization = organization.models.Organization.objects.create(
+            name='organization', description='description'
+        )
+        self.url = django.urls.reverse('homepage:homepage')
+
+    def create_post(self, name: str) -> None:
+        """публикуем пост организации"""
+        organization.models.OrganizationPost.objects.create(
+            name=name, text='text', posted_by=self.organization
+        )
+
+    def test_anonymous_page_cached(self) -> None:
+        """повторный запрос анонима не ходит в бд"""
+        self.create_post('first')
+        first = django.test.Client().get(self.url)
+        with self.assertNumQueries(0):
+            second = django.test.Client().get(self.url)
+        self.assertEqual(first.content, second.content)
+
+    def test_page_invalidated_on_change(self) -> None:
+        """новый пост сразу виден на закешированной странице"""
+        self.create_post('first')
+        django.test.Client().get(self.url)
+        self.create_post('second')
+        response = django.test.Client().get(self.url)
+        self.assertContains(response, 'second')
+
+    def test_query_string_in_key(self) -> None:
+        """разные параметры запроса - разные страницы"""
+        self.create_post('first')
+        django.test.Client().get(self.url)
+        with self.assertNumQueries(2):
+            django.test.Client().get(self.url, {'page': 1})
+
+    def test_authenticated_not_cached(self) -> None:
+        """страницы вошедших пользователей не кешируются"""
+        user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        users.models.Profile.objects.create(user=user)
+        client = django.test.Client()
+        client.force_login(user)
+        client.get(self.url)
+        response = client.get(self.url)
+        self.assertIn('posts', response.context)
+
+
+class KeysetPaginationTests(django.test.TestCase):
+    """тестируем постраничный вывод по курсору"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        for user_ind in range(7):
+            user = users.models.User.objects.create(
+                username=f'user{user_ind}', email=f'user{user_ind}@gmail.com'
+            )
+            users.models.Profile.objects.create(
+                user=user, rating=user_ind // 3
+            )
+        self.paginator = core.pagination.KeysetPaginator(
+            users.models.User.objects.all(), 3, ordering=('-profile__rating',)
+        )
+
+    def test_pages_cover_list_once(self) -> None:
+        """строки с одинаковым ключом не теряются и не повторяются"""
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual(
+            [[user.username for user in page] for page in pages],
+            [
+                ['user6', 'user5', 'user4'],
+                ['user3', 'user2', 'user1'],
+                ['user0'],
+            ],
+        )
+        previous_page = self.paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous_page), list(pages[1]))
+        self.assertTrue(previous_page.has_previous())
+
+    def test_deep_page_without_count(self) -> None:
+        """страница достается одним запросом без COUNT и OFFSET"""
+        cursor = self.paginator.get_page().next_cursor
+        with django.test.utils.CaptureQueriesContext(
+            django.db.connection
+        ) as queries:
+            self.paginator.get_page(cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_bad_cursor(self) -> None:
+        """подделанный курсор - 404"""
+        response = django.test.Client().get(
+            django.urls.reverse('users:list'), {'cursor': 'bad'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_list_keeps_query(self) -> None:
+        """ссылка на следующую страницу сохраняет курсор"""
+        users.models.User.objects.bulk_create(
+            users.models.User(
+                username=f'other{user_ind}', email=f'other{user_ind}@gmail.com'
+            )
+            for user_ind in range(100)
+        )
+        users.leaderboard.rebuild_leaderboard()
+        response = django.test.Client().get(django.urls.reverse('users:list'))
+        self.assertEqual(len(response.context['users']), 100)
+        self.assertEqual(response.context['approximate_count'], 107)
+        self.assertIn('cursor=', response.context['next_page_query'])
+        response = django.test.Client().get(
+            django.urls.reverse('users:list')
+            + '?'
+            + response.context['next_page_query']
+        )
+        self.assertEqual(
+            [user.username for user in response.context['users']],
+            [f'other{user_ind}' for user_ind in range(93, 100)],
+        )
+
+
+class EmailOutboxTests(django.test.TestCase):
+    """тестируем очередь писем"""
+
+    def enqueue(self, key: str = '') -> core.models.Email:
+        """ставим тестовое письмо в очередь"""
+        return core.models.Email.objects.enqueue(
+            'user@gmail.com', 'subject', 'body', key=key
+        )
+
+    @django.test.override_settings(
+        EMAIL_BACKEND='core.tests.CountingEmailBackend', EMAIL_BATCH_SIZE=3
+    )
+    def test_batch_uses_one_connection(self) -> None:
+        """пачка писем отправляется через одно соединение"""
+        CountingEmailBackend.opened = 0
+        for _ in range(5):
+            self.enqueue()
+        self.assertEqual(core.services.send_pending_emails(), 5)
+        self.assertEqual(len(django.core.mail.outbox), 5)
+        self.assertEqual(CountingEmailBackend.opened, 2)
+        self.assertFalse(
+            core.models.Email.objects.exclude(
+                status=core.models.Email.Statuses.SENT
+            ).exists()
+        )
+
+    @django.test.override_settings(
+        EMAIL_BACKEND='core.tests.FailingEmailBackend',
+        EMAIL_RETRY_SECONDS=60,
+        EMAIL_MAX_ATTEMPTS=2,
+    )
+    def test_retry_with_backoff(self) -> None:
+        """неотправленное письмо ждет паузу, потом помечается ошибкой"""
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            email = self.enqueue()
+            self.assertEqual(core.services.send_pending_emails(), 0)
+            email.refresh_from_db()
+            self.assertEqual(email.status, core.models.Email.Statuses.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('ConnectionError', email.error)
+            self.assertEqual(core.services.send_pending_emails(), 0)
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 1)
+        with freezegun.freeze_time('2023-01-01 00:01:00'):
+            core.services.send_pending_emails()
+            email.refresh_from_db()
+            self.assertEqual(email.status, core.models.Email.Statuses.FAILED)
+            self.assertEqual(email.attempts, 2)
+
+    def test_deduplicate_by_key(self) -> None:
+        """письмо с тем же ключом недавно уже было - второе не ставим"""
+        first = self.enqueue(key='key')
+        self.assertEqual(self.enqueue(key='key').pk, first.pk)
+        core.services.send_pending_emails()
+        self.assertEqual(self.enqueue(key='key').pk, first.pk)
+        self.assertNotEqual(self.enqueue(key='other').pk, first.pk)
+        self.assertEqual(len(django.core.mail.outbox), 1)
+
+    @django.test.override_settings(EMAIL_SENDING_TIMEOUT_SECONDS=60)
+    def test_stale_sending_requeued(self) -> None:
+        """письмо упавшего отправителя снова берется в отправку"""
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            email = self.enqueue()
+            self.assertEqual(
+                [obj.pk for obj in core.models.Email.objects.claim_batch(5)],
+                [email.pk],
+            )
+            self.assertEqual(core.models.Email.objects.claim_batch(5), [])
+        with freezegun.freeze_time('2023-01-01 00:01:01'):
+            self.assertEqual(core.services.send_pending_emails(), 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, core.models.Email.Statuses.SENT)
+
+    @django.test.override_settings(EMAIL_SENDING_TIMEOUT_SECONDS=60)
+    def test_stale_sending_not_deduplicated(self) -> None:
+        """зависшее письмо не мешает отправить новое с тем же ключом"""
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            stale = self.enqueue(key='key')
+            core.models.Email.objects.claim_batch(5)
+            self.assertEqual(self.enqueue(key='key').pk, stale.pk)
+        with freezegun.freeze_time('2023-01-01 00:01:01'):
+            fresh = self.enqueue(key='key')
+            self.assertNotEqual(fresh.pk, stale.pk)
+            self.assertEqual(core.services.send_pending_emails(), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, core.models.Email.Statuses.FAILED)
+        self.assertEqual(len(django.core.mail.outbox), 1)
+
+
+class RateLimitTests(django.test.SimpleTestCase):
+    """тестируем ограничение частоты со скользящим окном"""
+
+    def setUp(self) -> None:
+        """свежее хранилище счетчиков в памяти"""
+        self.store = core.ratelimit.LocalCounterStore()
+        core.ratelimit._store = self.store
+        self.rate = core.ratelimit.RateLimit('test', 4, 60)
+
+    def tearDown(self) -> None:
+        """возвращаем хранилище из настроек"""
+        core.ratelimit._store = None
+
+    def test_limit_reached(self) -> None:
+        """после limit событий ограничение срабатывает, сброс снимает его"""
+        checks = [(self.rate, 'ip')]
+        with freezegun.freeze_time('2023-01-01 00:00:10'):
+            for _ in range(3):
+                core.ratelimit.hit(checks)
+            self.assertIsNone(core.ratelimit.get_exceeded(checks))
+            core.ratelimit.hit(checks)
+            self.assertEqual(core.ratelimit.get_exceeded(checks), self.rate)
+            self.assertIsNone(core.ratelimit.get_exceeded([(self.rate, 'x')]))
+            core.ratelimit.reset(checks)
+            self.assertIsNone(core.ratelimit.get_exceeded(checks))
+
+    def test_sliding_window(self) -> None:
+        """события прошлого отрезка учитываются с убывающим весом"""
+        checks = [(self.rate, 'ip')]
+        with freezegun.freeze_time('2023-01-01 00:00:50'):
+            for _ in range(4):
+                core.ratelimit.hit(checks)
+        with freezegun.freeze_time('2023-01-01 00:01:15'):
+            self.assertEqual(core.ratelimit.get_counts(checks), [3.0])
+            self.assertIsNone(core.ratelimit.get_exceeded(checks))
+        with freezegun.freeze_time('2023-01-01 00:02:30'):
+            self.assertEqual(core.ratelimit.get_counts(checks), [0])
+
+
+class UploadStorageTests(django.test.TestCase):
+    """тестируем хранилище загрузок редактора текста"""
+
+    def setUp(self) -> None:
+        """временная папка для файлов"""
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = django.test.override_settings(
+            MEDIA_ROOT=self.media_root
+        )
+        self.settings_override.enable()
+        self.storage = ckeditor_uploader.utils.storage
+
+    def tearDown(self) -> None:
+        """удаляем загруженные файлы"""
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def get_image(self, size: tuple = (100, 100), **options) -> bytes:
+        """картинка в JPEG"""
+        buffer = io.BytesIO()
+        PIL.Image.new('RGB', size, 'blue').save(buffer, 'JPEG', **options)
+        return buffer.getvalue()
+
+    def save(self, name: str, data: bytes) -> str:
+        """сохраняем файл в хранилище"""
+        return self.storage.save(
+            f'uploads/2023/04/09/{name}',
+            django.core.files.base.ContentFile(data, name=name),
+        )
+
+    def get_html(self, *names: str) -> str:
+        """текст редактора с картинками"""
+        return ''.join(
+            f'<p><img src="{self.storage.url(name)}" /></p>' for name in names
+        )
+
+    def test_identical_uploads_stored_once(self) -> None:
+        """одинаковое содержимое хранится одним файлом"""
+        data = self.get_image()
+        first = self.save('login_img.jpeg', data)
+        second = self.save('other_name.JPEG', data)
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('uploads/'))
+        self.assertEqual(core.models.UploadedFile.objects.count(), 1)
+        self.assertEqual(core.models.Job.objects.count(), 1)
+        self.assertNotEqual(
+            self.save('new.jpeg', self.get_image((50, 50))), first
+        )
+
+    def test_upload_view_returns_content_address(self) -> None:
+        """редактор получает адрес файла по хешу"""
+        user = users.models.User.objects.create_user(
+            username='staff',
+            email='staff@gmail.com',
+            password='password',
+            is_staff=True,
+        )
+        client = django.test.Client()
+        client.force_login(user)
+        data = self.get_image()
+        urls = set()
+        for _ in range(2):
+            response = client.post(
+                django.urls.reverse('ckeditor_upload'),
+                {
+                    'upload': (
+                        django.core.files.uploadedfile.SimpleUploadedFile(
+                            'login_img.jpeg', data, content_type='image/jpeg'
+                        )
+                    )
+                },
+            )
+            urls.add(response.json()['url'])
+        self.assertEqual(len(urls), 1)
+        self.assertIn(
+            core.models.UploadedFile.objects.get().digest, urls.pop()
+        )
+
+    def test_optimize_strips_metadata_and_caps_size(self) -> None:
+        """воркер убирает exif и уменьшает большую картинку"""
+        exif = PIL.Image.Exif()
+        exif[0x010F] = 'camera'
+        name = self.save(
+            'big.jpg', self.get_image((3000, 1000), exif=exif.tobytes())
+        )
+        core.services.run_pending_jobs()
+        uploaded = core.models.UploadedFile.objects.get()
+        self.assertTrue(uploaded.is_optimized)
+        self.assertEqual(uploaded.size, self.storage.size(name))
+        with self.storage.open(name) as image_file:
+            image = PIL.Image.open(image_file)
+            self.assertEqual(image.size, (1920, 640))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_references_counted(self) -> None:
+        """ссылки считаются по сохраненным и удаленным текстам"""
+        name = self.save('login_img.jpeg', self.get_image())
+        other_name = self.save('other.jpeg', self.get_image((50, 50)))
+        first = organization.models.Organization.objects.create(
+            name='first', description=self.get_html(name, name)
+        )
+        second = organization.models.Organization.objects.create(
+            name='second', description=self.get_html(name, other_name)
+        )
+        references = dict(
+            core.models.UploadedFile.objects.values_list('name', 'references')
+        )
+        self.assertEqual(references, {name: 2, other_name: 1})
+        first.description = self.get_html(other_name)
+        first.save()
+        second.delete()
+        references = dict(
+            core.models.UploadedFile.objects.values_list('name', 'references')
+        )
+        self.assertEqual(references, {name: 0, other_name: 1})
+
+    def test_delete_unused_uploads(self) -> None:
+        """удаляются только старые файлы без ссылок"""
+        used = self.save('used.jpeg', self.get_image())
+        unused = self.save('unused.jpeg', self.get_image((50, 50)))
+        organization.models.Organization.objects.create(
+            name='org', description=self.get_html(used)
+        )
+        self.storage.delete(used)
+        self.assertTrue(self.storage.exists(used))
+        self.assertEqual(core.uploads.delete_unused_uploads(), 0)
+        with freezegun.freeze_time(
+            django.utils.timezone.now()
+            + django.utils.timezone.timedelta(days=2)
+        ):
+            self.assertEqual(core.uploads.delete_unused_uploads(), 1)
+        self.assertTrue(self.storage.exists(used))
+        self.assertFalse(self.storage.exists(unused))
+        self.assertEqual(
+            list(
+                core.models.UploadedFile.objects.values_list('name', flat=True)
+            ),
+            [used],
+        )
+
+
+class RichTextTests(django.test.TestCase):
+    """тестируем очистку html и короткие тексты"""
+
+    def test_sanitize_html(self) -> None:
+        """опасная разметка удаляется, разрешенная остается"""
+        self.assertEqual(
+            core.richtext.sanitize_html(
+                '<p style="text-align:center;background:url(x)"'
+                ' onclick="x">a &lt; b<script>alert(1)</script>'
+                '<b>x<i>y</p><a href="javascript:alert(1)">l</a>'
+                '<a href="/quiz/" target="_blank">q</a>'
+                '<img src="/media/a.png" onerror="x"/><em>'
+            ),
+            '<p style="text-align:center">a &lt; b<b>x<i>y</i></b></p>'
+            '<a>l</a>'
+            '<a href="/quiz/" target="_blank" rel="noopener noreferrer">q</a>'
+            '<img src="/media/a.png"><em></em>',
+        )
+
+    def test_url_with_control_characters(self) -> None:
+        """управляющие символы не прячут схему ссылки"""
+        for href in (
+            '\x01javascript:alert(1)',
+            ' \x00java\tscript:alert(1)',
+            'java\nscript:alert(1)',
+            '&#1;javascript:alert(1)',
+            'data:text/html,x',
+            'vbscript&colon;x',
+        ):
+            with self.subTest(href=href):
+                self.assertEqual(
+                    core.richtext.sanitize_html(f'<a href="{href}">x</a>'),
+                    '<a>x</a>',
+                )
+        for href in ('https://a.ru/x', '/quiz/1/', '#top', '?page=2', 'a/b:c'):
+            with self.subTest(href=href):
+                self.assertEqual(
+                    core.richtext.sanitize_html(f'<a href="{href}">x</a>'),
+                    f'<a href="{href}">x</a>',
+                )
+
+    def test_make_excerpt(self) -> None:
+        """короткий текст без разметки и сущностей"""
+        self.assertEqual(
+            core.richtext.make_excerpt('<p>раз&nbsp;два</p>\n<p>три</p>'),
+            'раз два три',
+        )
+        self.assertEqual(
+            core.richtext.make_excerpt('<p>' + 'слово ' * 100 + '</p>', 20),
+            'слово слово слово…',
+        )
+
+    def test_rendered_on_save(self) -> None:
+        """производные поля считаются при сохранении"""
+        organization_obj = organization.models.Organization.objects.create(
+            name='org', description='<p>старое</p>'
+        )
+        self.assertEqual(organization_obj.description_html, '<p>старое</p>')
+        self.assertEqual(organization_obj.description_excerpt, 'старое')
+        organization_obj.description = '<p>новое<script></script></p>'
+        organization_obj.save(update_fields=('description',))
+        organization_obj.refresh_from_db()
+        self.assertEqual(organization_obj.description_html, '<p>новое</p>')
+        self.assertEqual(organization_obj.description_excerpt, 'новое')
@@ -0,0 +1,202 @@
+import collections
+import io
+import os
+import re
+import typing
+
+import ckeditor_uploader.fields
+import ckeditor_uploader.utils
+import PIL.Image
+import PIL.ImageOps
+
+import django.conf
+import django.core.files.base
+import django.db.models
+import django.utils.timezone
+
+import core.models
+
+
+# форматы картинок, которые пережимаем, и параметры сохранения
+OPTIMIZED_FORMATS = {
+    '.jpg': ('JPEG', {'optimize': True, 'progressive': True}),
+    '.jpeg': ('JPEG', {'optimize': True, 'progressive': True}),
+    '.png': ('PNG', {'optimize': True}),
+    '.webp': ('WEBP', {'method': 6}),
+}
+
+
+def get_rich_text_fields(
+    model: typing.Type[django.db.models.Model],
+) -> typing.List[str]:
+    """поля модели с текстом редактора, в которые загружают файлы"""
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if isinstance(field, ckeditor_uploader.fields.RichTextUploadingField)
+    ]
+
+
+def get_upload_names(texts: typing.Iterable[str]) -> typing.Set[str]:
+    """пути загруженных файлов, на которые ссылаются тексты"""
+    settings = django.conf.settings
+    prefix = f'{settings.MEDIA_URL}{settings.CKEDITOR_UPLOAD_PATH}'
+    pattern = re.compile(
+        rf'(?:src|href)\s*=\s*["\']{re.escape(prefix)}([^"\'?#]+)'
+    )
+    return {
+        f'{settings.CKEDITOR_UPLOAD_PATH}{match}'
+        for text in texts
+        if text
+        for match in pattern.findall(text)
+    }
+
+
+def get_instance_upload_names(
+    instance: django.db.models.Model,
+) -> typing.Set[str]:
+    """пути файлов из текстов объекта"""
+    return get_upload_names(
+        getattr(instance, name)
+        for name in get_rich_text_fields(type(instance))
+    )
+
+
+def update_references(
+    added: typing.Iterable[str], removed: typing.Iterable[str]
+) -> None:
+    """меняем количество ссылок на файлы одним запросом на направление"""
+    uploaded = core.models.UploadedFile.objects
+    if added:
+        uploaded.filter(name__in=added).update(
+            references=django.db.models.F('references') + 1
+        )
+    if removed:
+        uploaded.filter(name__in=removed).update(
+            references=django.db.models.F('references') - 1
+        )
+
+
+def add_references(instances: typing.Iterable[django.db.models.Model]) -> None:
+    """
+    объекты, созданные через bulk_create без сигналов, ссылаются на файлы
+    ссылки считаем на каждый объект, запрос - на каждое разное количество
+    """
+    counts = collections.Counter(
+        name
+        for instance in instances
+        for name in get_instance_upload_names(instance)
+    )
+    names_by_count = collections.defaultdict(list)
+    for name, count in counts.items():
+        names_by_count[count].append(name)
+    for count, names in names_by_count.items():
+        core.models.UploadedFile.objects.filter(name__in=names).update(
+            references=django.db.models.F('references') + count
+        )
+
+
+def remember_upload_names(
+    sender: type, instance: django.db.models.Model, **kwargs
+) -> None:
+    """перед сохранением запоминаем файлы из старых текстов объекта"""
+    fields = get_rich_text_fields(sender)
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(fields) & set(update_fields):
+        instance._upload_names = None
+        return
+    instance._upload_names = set()
+    if instance.pk is not None and not instance._state.adding:
+        instance._upload_names = get_upload_names(
+            sender._base_manager.filter(pk=instance.pk)
+            .values_list(*fields)
+            .first()
+            or ()
+        )
+
+
+def count_saved_references(
+    sender: type, instance: django.db.models.Model, **kwargs
+) -> None:
+    """после сохранения учитываем добавленные и убранные ссылки"""
+    old_names = getattr(instance, '_upload_names', None)
+    if old_names is None:
+        return
+    new_names = get_instance_upload_names(instance)
+    update_references(new_names - old_names, old_names - new_names)
+    instance._upload_names = None
+
+
+def count_deleted_references(
+    sender: type, instance: django.db.models.Model, **kwargs
+) -> None:
+    """удаленный объект больше не ссылается на свои файлы"""
+    update_references((), get_instance_upload_names(instance))
+
+
+def optimize_upload(name: str) -> None:
+    """
+    фоновая задача: обработка загруженной картинки
+    удаляем метаданные (exif с геопозицией и т.п.), поворачиваем
+    по exif, уменьшаем до UPLOAD_IMAGE_MAX_SIZE и пережимаем в том же
+    формате, чтобы адрес в текстах остался прежним
+    файл заменяется, если в нем были метаданные, он был уменьшен
+    или после пережатия стал меньше
+    """
+    uploaded = core.models.UploadedFile.objects.filter(
+        name=name, is_optimized=False
+    ).first()
+    if uploaded is None:
+        return
+    extension = os.path.splitext(name)[1].lower()
+    storage = ckeditor_uploader.utils.storage
+    if extension in OPTIMIZED_FORMATS and storage.exists(name):
+        settings = django.conf.settings
+        image_format, options = OPTIMIZED_FORMATS[extension]
+        with storage.open(name, 'rb') as source_file:
+            source = PIL.Image.open(source_file)
+            source.load()
+        image = PIL.ImageOps.exif_transpose(source)
+        max_size = settings.UPLOAD_IMAGE_MAX_SIZE
+        resized = max(image.size) > max_size
+        image.thumbnail((max_size, max_size), PIL.Image.Resampling.LANCZOS)
+        if image_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        if image_format == 'PNG':
+            image.save(buffer, image_format, **options)
+        else:
+            image.save(
+                buffer,
+                image_format,
+                quality=settings.UPLOAD_IMAGE_QUALITY,
+                **options,
+            )
+        if resized or 'exif' in source.info or buffer.tell() < uploaded.size:
+            storage.replace(
+                name, django.core.files.base.ContentFile(buffer.getvalue())
+            )
+            uploaded.size = buffer.tell()
+    uploaded.is_optimized = True
+    uploaded.save(update_fields=('size', 'is_optimized'))
+
+
+def delete_unused_uploads() -> int:
+    """
+    удаляем файлы, на которые не ссылается ни один текст
+    свежие файлы не трогаем: текст с ними, возможно, еще не сохранен
+    возвращаем количество удаленных файлов
+    """
+    created_before = django.utils.timezone.now() - (
+        django.utils.timezone.timedelta(
+            seconds=django.conf.settings.UPLOAD_ORPHAN_SECONDS
+        )
+    )
+    names = list(
+        core.models.UploadedFile.objects.filter(
+            references__lte=0, created_at__lt=created_before
+        ).values_list('name', flat=True)
+    )
+    for name in names:
+        ckeditor_uploader.utils.storage.delete(name)
+    return len(names)
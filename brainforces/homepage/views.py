@@ -1,12 +1,20 @@
 import django.db.models
 import django.views.generic
 
+import core.mixins
 import organization.models
 
 
-class HomeView(django.views.generic.ListView):
+class HomeView(
+    core.mixins.AnonymousPageCacheMixin, django.views.generic.ListView
+):
     """список постов на главной странице"""
 
+    cache_models = (
+        'organization.OrganizationPost',
+        'organization.Organization',
+    )
+
     template_name = 'homepage/homepage.html'
     context_object_name = 'posts'
     paginate_by = 10
@@ -18,5 +26,5 @@ class HomeView(django.views.generic.ListView):
                 is_private=False
             )
             .select_related('posted_by')
-            .only('name', 'text', 'posted_by__name')
+            .only('name', 'text_excerpt', 'posted_by__name')
         )
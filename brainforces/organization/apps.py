@@ -7,3 +7,7 @@ class OrganizationConfig(django.apps.AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'organization'
     verbose_name = 'организация'
+
+    def ready(self) -> None:
+        """подключаем обработчики сигналов"""
+        import organization.signals  # noqa: F401
@@ -3,6 +3,7 @@ import django.db.models
 import django.forms
 
 import organization.models
+import search.fuzzy
 import users.models
 
 
@@ -14,7 +15,7 @@ class InviteToOrganizationForm(django.forms.Form):
     def clean_username(self) -> str:
         """
         валидируем пользователя: имя или почта
-        должны существовать
+        должны существовать, иначе подсказываем похожие имена
         """
         username = self.cleaned_data['username']
         user = users.models.User.objects.filter(
@@ -24,7 +25,20 @@ class InviteToOrganizationForm(django.forms.Form):
             )
         ).first()
         if user is None:
-            raise django.core.exceptions.ValidationError('Ошибка')
+            suggestions = [
+                label
+                for _, label in search.fuzzy.suggest(
+                    'users', username, limit=5
+                )
+            ]
+            if suggestions:
+                raise django.core.exceptions.ValidationError(
+                    'Пользователь не найден, возможно, вы имели в виду: '
+                    + ', '.join(suggestions)
+                )
+            raise django.core.exceptions.ValidationError(
+                'Пользователь не найден'
+            )
         self.cleaned_data['user_obj'] = user
         return username
 
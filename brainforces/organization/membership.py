@@ -0,0 +1,80 @@
+import typing
+
+import django.conf
+import django.core.cache
+import django.http
+
+import core.cache
+import organization.models
+
+
+def get_cache_key(user_pk: int) -> str:
+    """ключ кеша ролей пользователя"""
+    return f'organization_roles:{user_pk}'
+
+
+def get_cache() -> typing.Any:
+    """кеш ролей, бэкенд задается в настройках"""
+    return django.core.cache.caches[
+        django.conf.settings.MEMBERSHIP_CACHE_ALIAS
+    ]
+
+
+def get_cache_seconds(cache: typing.Any) -> int:
+    """
+    сколько хранить роли: в общем кеше - долго, его сбрасывают сигналы,
+    в памяти процесса - несколько секунд, потому что сигнал сбрасывает
+    кеш только того процесса, в котором изменили членство
+    """
+    if core.cache.is_process_local(cache):
+        return django.conf.settings.MEMBERSHIP_LOCAL_CACHE_SECONDS
+    return django.conf.settings.MEMBERSHIP_CACHE_SECONDS
+
+
+def load_user_roles(user_pk: typing.Optional[int]) -> typing.Dict[int, int]:
+    """
+    роли пользователя во всех его организациях: {id организации: роль}
+    берем из общего кеша, при промахе читаем одним запросом
+    кеш сбрасывается сигналами при изменении OrganizationToUser
+    """
+    if user_pk is None:
+        return dict()
+    cache = get_cache()
+    roles = cache.get(get_cache_key(user_pk))
+    if roles is None:
+        roles = dict(
+            organization.models.OrganizationToUser.objects.filter(
+                user__pk=user_pk
+            ).values_list('organization_id', 'role')
+        )
+        cache.set(get_cache_key(user_pk), roles, get_cache_seconds(cache))
+    return roles
+
+
+def invalidate_user_roles(user_pk: int) -> None:
+    """сбрасываем кеш ролей пользователя"""
+    get_cache().delete(get_cache_key(user_pk))
+
+
+def get_user_roles(request: django.http.HttpRequest) -> typing.Dict[int, int]:
+    """роли пользователя из запроса, запомненные на время запроса"""
+    if '_organization_roles' not in request.__dict__:
+        request._organization_roles = load_user_roles(request.user.pk)
+    return request._organization_roles
+
+
+def get_role(
+    request: django.http.HttpRequest, organization_pk: int
+) -> typing.Optional[int]:
+    """роль пользователя в организации, None если он в ней не состоит"""
+    return get_user_roles(request).get(organization_pk)
+
+
+def is_member(request: django.http.HttpRequest, organization_pk: int) -> bool:
+    """пользователь - участник организации (не только приглашен)"""
+    return get_role(request, organization_pk) in (1, 2, 3)
+
+
+def is_admin(request: django.http.HttpRequest, organization_pk: int) -> bool:
+    """пользователь - админ организации"""
+    return get_role(request, organization_pk) in (2, 3)
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+import core.richtext
+
+
+def render_rich_text(apps, schema_editor):
+    """считаем очищенный html и короткий текст для существующих строк"""
+    for obj in apps.get_model('organization', 'Organization').objects.all():
+        obj.description_html = core.richtext.sanitize_html(obj.description)
+        obj.description_excerpt = core.richtext.make_excerpt(obj.description)
+        obj.save(update_fields=('description_html', 'description_excerpt'))
+    for obj in apps.get_model('organization', 'OrganizationPost').objects.all():
+        obj.text_html = core.richtext.sanitize_html(obj.text)
+        obj.text_excerpt = core.richtext.make_excerpt(obj.text)
+        obj.save(update_fields=('text_html', 'text_excerpt'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0012_organizationpost_is_private'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='description_excerpt',
+            field=models.CharField(blank=True, editable=False, help_text='Начало текста без разметки для списков', max_length=300, verbose_name='описание кратко'),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False, help_text='Очищенный html, считается при сохранении', verbose_name='описание для показа'),
+        ),
+        migrations.AddField(
+            model_name='organizationpost',
+            name='text_excerpt',
+            field=models.CharField(blank=True, editable=False, help_text='Начало текста без разметки для списков', max_length=300, verbose_name='текст кратко'),
+        ),
+        migrations.AddField(
+            model_name='organizationpost',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, help_text='Очищенный html, считается при сохранении', verbose_name='текст для показа'),
+        ),
+        migrations.RunPython(render_rich_text, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 import django.http
+import django.shortcuts
 import django.views.generic
 
+import organization.membership
 import organization.models
 
 
@@ -10,11 +12,17 @@ class OrganizationMixin(django.views.generic.View):
     def get_context_data(self, *args, **kwargs) -> dict:
         context = super().get_context_data(*args, **kwargs)
         organization_obj = django.shortcuts.get_object_or_404(
-            organization.models.Organization.objects.filter_user_access(
-                user_pk=self.request.user.pk
-            ).only('name'),
+            organization.models.Organization.objects.only(
+                'name', 'is_private'
+            ),
             pk=self.kwargs['pk'],
         )
+        if organization_obj.is_private and not (
+            organization.membership.is_member(
+                self.request, organization_obj.pk
+            )
+        ):
+            raise django.http.Http404()
         context['organization'] = organization_obj
         return context
 
@@ -24,22 +32,17 @@ class UserIsOrganizationMemberMixin(OrganizationMixin):
 
     def get_context_data(self, *args, **kwargs) -> dict:
         """
-        добавляем в контекст переменные объекта organization_to_user,
+        добавляем в контекст роль пользователя в организации,
         является ли пользователь участником группы
         и является ли он ее администратором
         """
         context = super().get_context_data(*args, **kwargs)
-        org_user_obj = organization.models.OrganizationToUser.objects.filter(
-            user__pk=self.request.user.pk,
-            organization__pk=self.kwargs['pk'],
-        ).first()
-        context['organization_to_user'] = org_user_obj
-        context['is_group_member'] = org_user_obj is not None
-        context['user_is_admin'] = (
-            org_user_obj.role in (2, 3)
-            if context['is_group_member']
-            else False
+        role = organization.membership.get_role(
+            self.request, self.kwargs['pk']
         )
+        context['organization_role'] = role
+        context['is_group_member'] = role is not None
+        context['user_is_admin'] = role in (2, 3)
         return context
 
 
@@ -3,15 +3,19 @@ import ckeditor_uploader.fields
 import django.db.models
 import django.urls
 
+import core.models
+import core.richtext
 import organization.managers
 import users.models
 
 
-class Organization(django.db.models.Model):
+class Organization(core.models.RichTextModel):
     """модель организации"""
 
     objects = organization.managers.OrganizationManager()
 
+    rich_text_fields = ('description',)
+
     name = django.db.models.CharField(
         verbose_name='название',
         help_text='Название организации',
@@ -22,6 +26,21 @@ class Organization(django.db.models.Model):
         verbose_name='описание', help_text='Описание организации'
     )
 
+    description_html = django.db.models.TextField(
+        verbose_name='описание для показа',
+        help_text='Очищенный html, считается при сохранении',
+        blank=True,
+        editable=False,
+    )
+
+    description_excerpt = django.db.models.CharField(
+        verbose_name='описание кратко',
+        help_text='Начало текста без разметки для списков',
+        max_length=core.richtext.EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+    )
+
     is_private = django.db.models.BooleanField(
         default=False,
         verbose_name='приватная',
@@ -89,11 +108,13 @@ class OrganizationToUser(django.db.models.Model):
         return f'Участник организации {self.pk}'
 
 
-class OrganizationPost(django.db.models.Model):
+class OrganizationPost(core.models.RichTextModel):
     """объявление организации"""
 
     objects = organization.managers.OrganizationPostManager()
 
+    rich_text_fields = ('text',)
+
     name = django.db.models.CharField(
         max_length=150,
         verbose_name='название',
@@ -104,6 +125,21 @@ class OrganizationPost(django.db.models.Model):
         verbose_name='текст', help_text='Текст поста'
     )
 
+    text_html = django.db.models.TextField(
+        verbose_name='текст для показа',
+        help_text='Очищенный html, считается при сохранении',
+        blank=True,
+        editable=False,
+    )
+
+    text_excerpt = django.db.models.CharField(
+        verbose_name='текст кратко',
+        help_text='Начало текста без разметки для списков',
+        max_length=core.richtext.EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+    )
+
     is_private = django.db.models.BooleanField(
         default=False,
         verbose_name='приватный',
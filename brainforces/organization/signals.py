@@ -0,0 +1,20 @@
+import django.db.models.signals
+import django.dispatch
+
+import organization.membership
+import organization.models
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save,
+    sender=organization.models.OrganizationToUser,
+)
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete,
+    sender=organization.models.OrganizationToUser,
+)
+def invalidate_membership(
+    sender: type, instance: organization.models.OrganizationToUser, **kwargs
+) -> None:
+    """роли пользователя изменились, сбрасываем их кеш"""
+    organization.membership.invalidate_user_roles(instance.user_id)
@@ -0,0 +1,244 @@
+import django.conf
+import django.core.cache
+import django.core.cache.backends.dummy
+import django.db
+import django.test
+import django.test.utils
+import django.urls
+
+import organization.membership
+import organization.models
+import quiz.models
+import search.models
+import search.services
+import users.models
+
+
+class MembershipTests(django.test.TestCase):
+    """тестируем кеш ролей пользователя в организациях"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        django.core.cache.cache.clear()
+        self.user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        users.models.Profile.objects.create(user=self.user)
+        self.organization = organization.models.Organization.objects.create(
+            name='organization', description='description', is_private=True
+        )
+        self.membership = (
+            organization.models.OrganizationToUser.objects.create(
+                organization=self.organization, user=self.user, role=2
+            )
+        )
+
+    def get_request(self) -> django.http.HttpRequest:
+        """запрос от имени тестового пользователя"""
+        request = django.test.RequestFactory().get('/')
+        request.user = self.user
+        return request
+
+    def test_roles_cached(self) -> None:
+        """роли читаются из бд один раз"""
+        organization.membership.load_user_roles(self.user.pk)
+        with self.assertNumQueries(0):
+            request = self.get_request()
+            self.assertTrue(
+                organization.membership.is_admin(request, self.organization.pk)
+            )
+            self.assertTrue(
+                organization.membership.is_member(
+                    request, self.organization.pk
+                )
+            )
+
+    def test_invalidated_on_change(self) -> None:
+        """изменение и удаление членства сбрасывают кеш"""
+        organization.membership.load_user_roles(self.user.pk)
+        self.membership.role = 0
+        self.membership.save()
+        self.assertFalse(
+            organization.membership.is_member(
+                self.get_request(), self.organization.pk
+            )
+        )
+        self.membership.delete()
+        self.assertIsNone(
+            organization.membership.get_role(
+                self.get_request(), self.organization.pk
+            )
+        )
+
+    def test_local_cache_short_lived(self) -> None:
+        """в памяти процесса роли хранятся секунды, в общем кеше - дольше"""
+        self.assertEqual(
+            organization.membership.get_cache_seconds(
+                django.core.cache.caches['default']
+            ),
+            django.conf.settings.MEMBERSHIP_LOCAL_CACHE_SECONDS,
+        )
+        self.assertLess(
+            django.conf.settings.MEMBERSHIP_LOCAL_CACHE_SECONDS, 60
+        )
+        shared = django.core.cache.backends.dummy.DummyCache('', {})
+        self.assertEqual(
+            organization.membership.get_cache_seconds(shared),
+            django.conf.settings.MEMBERSHIP_CACHE_SECONDS,
+        )
+
+    def test_private_organization_hidden(self) -> None:
+        """приватную организацию видят только участники"""
+        url = django.urls.reverse(
+            'organization:profile', kwargs={'pk': self.organization.pk}
+        )
+        self.assertEqual(django.test.Client().get(url).status_code, 404)
+        client = django.test.Client()
+        client.force_login(self.user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['user_is_admin'])
+
+
+class QuizCreateTests(django.test.TestCase):
+    """тестируем создание викторины с вопросами"""
+
+    def setUp(self) -> None:
+        """администратор организации и теги"""
+        django.core.cache.cache.clear()
+        self.user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        users.models.Profile.objects.create(user=self.user)
+        self.organization = organization.models.Organization.objects.create(
+            name='organization', description='description'
+        )
+        organization.models.OrganizationToUser.objects.create(
+            organization=self.organization, user=self.user, role=2
+        )
+        self.tags = [
+            quiz.models.Tag.objects.create(name=f'tag{tag_ind}')
+            for tag_ind in range(2)
+        ]
+        self.client.force_login(self.user)
+
+    def get_url(self, num_questions: int) -> str:
+        """адрес создания викторины"""
+        return django.urls.reverse(
+            'organization:create_quiz',
+            kwargs={
+                'pk': self.organization.pk,
+                'num_questions': num_questions,
+            },
+        )
+
+    def get_data(self, num_questions: int, name: str = 'quiz') -> dict:
+        """данные форм викторины и вопросов"""
+        data = {
+            'name': name,
+            'description': 'description',
+            'start_time': '2030-01-01 10:00',
+            'duration': 60,
+            'quiz_question-TOTAL_FORMS': num_questions,
+            'quiz_question-INITIAL_FORMS': 0,
+            'quiz_question-MIN_NUM_FORMS': num_questions,
+            'quiz_question-MAX_NUM_FORMS': num_questions,
+        }
+        for question_ind in range(num_questions):
+            prefix = f'quiz_question-{question_ind}'
+            data[f'{prefix}-name'] = f'question{question_ind}'
+            data[f'{prefix}-text'] = f'<p>text {question_ind}</p>'
+            data[f'{prefix}-difficulty'] = 2
+            data[f'{prefix}-variants'] = 'wrong\nrightright'
+            data[f'{prefix}-tags'] = [tag.pk for tag in self.tags]
+        return data
+
+    def test_create(self) -> None:
+        """викторина сохраняется с вопросами, вариантами и тегами"""
+        response = self.client.post(self.get_url(3), self.get_data(3))
+        self.assertRedirects(
+            response,
+            django.urls.reverse(
+                'organization:quizzes', kwargs={'pk': self.organization.pk}
+            ),
+            fetch_redirect_response=False,
+        )
+        quiz_obj = quiz.models.Quiz.objects.get(name='quiz')
+        self.assertEqual(quiz_obj.organized_by, self.organization)
+        questions = list(quiz_obj.quiz_question.order_by('position'))
+        self.assertEqual(
+            [question.position for question in questions], [0, 1, 2]
+        )
+        self.assertEqual(questions[1].text_html, '<p>text 1</p>')
+        self.assertEqual(
+            list(
+                questions[0]
+                .variants.order_by('pk')
+                .values_list('text', 'is_correct')
+            ),
+            [('wrong', False), ('right', True)],
+        )
+        self.assertEqual(
+            set(questions[2].tags.values_list('name', flat=True)),
+            {'tag0', 'tag1'},
+        )
+
+    def test_constant_queries(self) -> None:
+        """количество запросов не зависит от количества вопросов"""
+        # роли пользователя попадают в кеш при первом запросе
+        self.client.get(self.get_url(1))
+        query_counts = list()
+        for num_questions in (2, 40):
+            with django.test.utils.CaptureQueriesContext(
+                django.db.connection
+            ) as queries:
+                self.client.post(
+                    self.get_url(num_questions),
+                    self.get_data(num_questions, f'quiz{num_questions}'),
+                )
+            query_counts.append(len(queries))
+            self.assertEqual(
+                quiz.models.Question.objects.filter(
+                    quiz__name=f'quiz{num_questions}'
+                ).count(),
+                num_questions,
+            )
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_questions_indexed(self) -> None:
+        """после фиксации транзакции вопросы попадают в поиск"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.get_url(3), self.get_data(3))
+        question_pks = set(
+            quiz.models.Question.objects.values_list('pk', flat=True)
+        )
+        self.assertEqual(
+            set(
+                search.models.SearchDocument.objects.filter(
+                    kind=search.models.SearchDocument.Kinds.QUESTION
+                ).values_list('object_id', flat=True)
+            ),
+            question_pks,
+        )
+        self.assertEqual(
+            search.services.filter_search(
+                quiz.models.Question.objects.all(),
+                search.models.SearchDocument.Kinds.QUESTION,
+                'question1',
+            ).count(),
+            1,
+        )
+
+    def test_all_questions_required(self) -> None:
+        """незаполненный вопрос не дает создать викторину"""
+        data = self.get_data(2)
+        del data['quiz_question-1-name']
+        response = self.client.post(self.get_url(2), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(quiz.models.Quiz.objects.exists())
+
+    @django.test.utils.override_settings(QUIZ_MAX_QUESTIONS=3)
+    def test_max_questions(self) -> None:
+        """больше QUIZ_MAX_QUESTIONS вопросов создать нельзя"""
+        self.assertEqual(self.client.get(self.get_url(4)).status_code, 404)
+        self.assertEqual(self.client.get(self.get_url(3)).status_code, 200)
@@ -56,6 +56,16 @@ urlpatterns = [
         organization.views.QuizCreateView.as_view(),
         name='create_quiz',
     ),
+    django.urls.path(
+        '<int:pk>/import_quiz/',
+        organization.views.QuizImportView.as_view(),
+        name='import_quiz',
+    ),
+    django.urls.path(
+        '<int:pk>/quizzes/<int:quiz_pk>/export/',
+        organization.views.QuizExportView.as_view(),
+        name='export_quiz',
+    ),
     django.urls.path(
         '<int:pk>/create_post/',
         organization.views.CreatePostView.as_view(),
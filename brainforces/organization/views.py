@@ -1,3 +1,4 @@
+import django.conf
 import django.contrib.auth.mixins
 import django.contrib.messages
 import django.db.models
@@ -7,11 +8,18 @@ import django.shortcuts
 import django.urls
 import django.views.generic
 
+import core.mixins
+import core.pagination
 import organization.forms
+import organization.membership
 import organization.mixins
 import organization.models
+import quiz.bundles
 import quiz.forms
 import quiz.models
+import quiz.services
+import search.mixins
+import search.models
 
 
 class OrganizationMainView(django.views.generic.DetailView):
@@ -20,11 +28,20 @@ class OrganizationMainView(django.views.generic.DetailView):
     template_name = 'organization/profile.html'
     context_object_name = 'organization'
 
-    def get_queryset(self) -> django.db.models.QuerySet:
+    queryset = organization.models.Organization.objects.only(
+        'name', 'description_html', 'is_private'
+    )
+
+    def get_object(self, *args, **kwargs) -> organization.models.Organization:
         """организация либо открытая, либо пользователь - участник"""
-        return organization.models.Organization.objects.filter_user_access(
-            user_pk=self.request.user.pk
-        ).only('name', 'description')
+        organization_obj = super().get_object(*args, **kwargs)
+        if organization_obj.is_private and not (
+            organization.membership.is_member(
+                self.request, organization_obj.pk
+            )
+        ):
+            raise django.http.Http404()
+        return organization_obj
 
     def get_context_data(self, *args, **kwargs) -> dict:
         """
@@ -33,55 +50,46 @@ class OrganizationMainView(django.views.generic.DetailView):
         является ли он ее администратором
         """
         context = super().get_context_data(*args, **kwargs)
-        org_user_manager = organization.models.OrganizationToUser.objects
-        user = (
-            org_user_manager.get_organization_member(
-                pk=self.kwargs['pk'], user_pk=self.request.user.pk
-            )
-            .only('role')
-            .first()
+        context['is_group_member'] = organization.membership.is_member(
+            self.request, self.kwargs['pk']
+        )
+        context['user_is_admin'] = organization.membership.is_admin(
+            self.request, self.kwargs['pk']
         )
-        context['is_group_member'] = user is not None
-        context['user_is_admin'] = context[
-            'is_group_member'
-        ] and user.role in (2, 3)
         return context
 
 
-class OrganizationListView(django.views.generic.ListView):
+class OrganizationListView(
+    core.mixins.AnonymousPageCacheMixin,
+    search.mixins.SearchMixin,
+    django.views.generic.ListView,
+):
     """список организаций"""
 
+    cache_models = (
+        'organization.Organization',
+        'organization.OrganizationToUser',
+    )
+    search_kind = search.models.SearchDocument.Kinds.ORGANIZATION
+    search_columns = {'all': None, 'name': 'title', 'description': 'body'}
+
     template_name = 'organization/list.html'
     paginate_by = 5
     context_object_name = 'organizations'
 
     def get_queryset(self) -> django.db.models.QuerySet:
         """
-        получение объектов и поиск
+        получение объектов и полнотекстовый поиск
         поиск либо по всем критериям,
         либо по названию и описанию по отдельности
         """
         queryset = (
             organization.models.Organization.objects.filter(is_private=False)
-            .only('name', 'description')
+            .only('name', 'description_excerpt')
             .annotate(count_users=django.db.models.Count('users__id'))
             .order_by('-count_users')
         )
-        searched = self.request.GET.get('searched')
-        search_criteria = self.request.GET.get('search_critery', 'all')
-        if searched:
-            if search_criteria == 'all':
-                queryset = (
-                    queryset.filter(
-                        django.db.models.Q(name__icontains=searched)
-                        | django.db.models.Q(description__icontains=searched)
-                    )
-                ).distinct()
-            elif search_criteria == 'name':
-                queryset = queryset.filter(name__icontains=searched)
-            elif search_criteria == 'description':
-                queryset = queryset.filter(description__icontains=searched)
-        return queryset
+        return self.search_queryset(queryset)
 
 
 class OrganizationUsersView(
@@ -127,19 +135,11 @@ class OrganizationUsersView(
             request.POST or None
         )
         if form.is_valid():
-            org_user_manager = organization.models.OrganizationToUser.objects
-            user_obj = (
-                org_user_manager.get_organization_admin(pk, request.user.pk)
-                .select_related('organization')
-                .only('id', 'organization__id')
-                .first()
-            )
-
-            if user_obj:
+            if organization.membership.is_admin(request, pk):
                 organization.models.OrganizationToUser.objects.create(
                     user=form.cleaned_data['user_obj'],
                     role=0,
-                    organization=user_obj.organization,
+                    organization_id=pk,
                 )
                 django.contrib.messages.success(
                     request, 'Приглашение отправлено'
@@ -147,7 +147,9 @@ class OrganizationUsersView(
             else:
                 raise django.http.Http404()
         else:
-            django.contrib.messages.error(request, 'Ошибка')
+            django.contrib.messages.error(
+                request, ' '.join(form.errors.get('username', ['Ошибка']))
+            )
         return django.shortcuts.redirect(
             django.urls.reverse('organization:users', kwargs={'pk': pk})
         )
@@ -168,42 +170,41 @@ class OrganizationQuizzesView(
         соревнования организации
         они могут быть приватными, поэтому нужно фильтровать
         """
-        return (
-            quiz.models.Quiz.objects.get_only_useful_list_fields()
-            .filter(
-                django.db.models.Q(is_private=False)
-                | django.db.models.Q(
-                    organized_by__users__user__pk=self.request.user.pk
-                ),
-                organized_by__pk=self.kwargs['pk'],
-            )
-            .distinct()
-        )
+        queryset = quiz.models.Quiz.objects.filter_status_tab(
+            self.request.GET.get('tab', 'all')
+        ).filter(organized_by__pk=self.kwargs['pk'])
+        if not organization.membership.is_member(
+            self.request, self.kwargs['pk']
+        ):
+            queryset = queryset.filter(is_private=False)
+        return queryset
+
+    def get_context_data(self, *args, **kwargs) -> dict:
+        """
+        дополняем контекст выбранной вкладкой, ссылки на страницы
+        сохраняют вкладку и поиск
+        """
+        context = super().get_context_data(*args, **kwargs)
+        context['tab'] = self.request.GET.get('tab', 'all')
+        context['page_query'] = core.pagination.get_page_query(self.request)
+        return context
 
 
 class ActionWithUserView(django.views.generic.View):
     """
-    получаем модель organizationtouser
-    того кто спрашивает
-    и того о ком спрашивают
+    получаем роль того, кто спрашивает,
+    и модель organizationtouser того, о ком спрашивают
     """
 
     def get(
         self, request: django.http.HttpRequest, pk: int, user_pk: int
     ) -> None:
-        self.self_user = (
-            organization.models.OrganizationToUser.objects.filter(
-                organization__pk=pk,
-                user__pk=request.user.pk,
-            )
-            .only('role')
-            .first()
-        )
+        self.self_role = organization.membership.get_role(request, pk)
         self.target_user = (
             organization.models.OrganizationToUser.objects.filter(
                 user__pk=user_pk, organization__pk=pk
             )
-            .only('role')
+            .only('role', 'user')
             .first()
         )
 
@@ -222,11 +223,11 @@ class DeleteUserFromOrganizationView(ActionWithUserView):
         """
         super().get(request, pk, user_pk)
         if (
-            self.self_user
+            self.self_role is not None
             and self.target_user
             and (
-                self.self_user.role > self.target_user.role
-                and self.self_user.role != 1
+                self.self_role > self.target_user.role
+                and self.self_role != 1
                 or self.request.user.pk == user_pk
             )
         ):
@@ -256,10 +257,10 @@ class UpdateUserOrganizationRoleView(ActionWithUserView):
         или пользователь принимает приглашение (с 0 до 1)
         """
         if (
-            self.self_user
+            self.self_role is not None
             and self.target_user
             and (
-                self.self_user.role > self.target_user.role
+                self.self_role > self.target_user.role
                 or self.request.user.pk == user_pk
                 and new_role == 1
             )
@@ -291,18 +292,20 @@ class OrganizationPostsView(
                 self.request.user.pk, org_pk=self.kwargs['pk']
             )
             .select_related('posted_by')
-            .only('name', 'text', 'posted_by__id')
+            .only('name', 'text_excerpt', 'posted_by__id')
         )
 
 
 class PostCommentsView(
     django.contrib.auth.mixins.LoginRequiredMixin,
     organization.mixins.UserIsOrganizationMemberMixin,
+    core.mixins.KeysetPaginationMixin,
     django.views.generic.ListView,
 ):
     """комментарии к посту"""
 
     template_name = 'organization/post_comments.html'
+    keyset_ordering = ('pk',)
     paginate_by = 50
     context_object_name = 'comments'
 
@@ -393,88 +396,134 @@ class QuizCreateView(
     template_name = 'organization/create_quiz.html'
     form_class = quiz.forms.QuizForm
 
-    def get_context_data(self, *args, **kwargs) -> dict:
+    def get_question_formset(self) -> django.forms.BaseInlineFormSet:
         """
-        дополняем контекст формсетом из форм с добавлением вопроса
+        формсет из выбранного количества обязательных вопросов,
+        не больше QUIZ_MAX_QUESTIONS, теги загружаются один раз на все формы
         """
-        context = super().get_context_data(*args, **kwargs)
-        question_formset = django.forms.inlineformset_factory(
+        num_questions = self.kwargs['num_questions']
+        max_questions = django.conf.settings.QUIZ_MAX_QUESTIONS
+        if num_questions > max_questions:
+            raise django.http.Http404()
+        formset_class = django.forms.inlineformset_factory(
             quiz.models.Quiz,
             quiz.models.Question,
             form=quiz.forms.QuestionForm,
-            extra=self.kwargs['num_questions'],
+            extra=0,
+            min_num=num_questions,
+            max_num=num_questions,
+            absolute_max=max_questions,
+            validate_min=True,
+            validate_max=True,
+            can_delete=False,
         )
-        context['question_formset'] = question_formset()
-        return context
+        return formset_class(
+            self.request.POST or None,
+            form_kwargs={'tag_choices': quiz.forms.get_tag_choices()},
+        )
+
+    def get_context_data(self, *args, **kwargs) -> dict:
+        """
+        дополняем контекст формсетом из форм с добавлением вопроса
+        """
+        if 'question_formset' not in kwargs:
+            kwargs['question_formset'] = self.get_question_formset()
+        return super().get_context_data(*args, **kwargs)
 
     def post(
         self, request: django.http.HttpRequest, pk: int, num_questions: int
     ) -> django.http.HttpResponse:
         """
         обрабатываем создание викторины
-        создаем формсет из нужного количества вопросов,
-        валидируем его
+        формсет собирается и валидируется один раз
         проверяем на существование организации
         и админа организации с данным pk
-        проходимся по всем вопросам, проверяем валидность,
-        создаем вопросы и варианты,
-        сохраняем квиз, вопросы и варианты ответов
+        викторину, вопросы, варианты и теги вопросов сохраняем
+        массовыми вставками одной транзакцией
         """
-        context = self.get_context_data()
-        quiz_form = self.form_class(request.POST or None)
-        question_formset = django.forms.inlineformset_factory(
-            quiz.models.Quiz,
-            quiz.models.Question,
-            form=quiz.forms.QuestionForm,
-            extra=self.kwargs['num_questions'],
-        )(self.request.POST or None)
-        if quiz_form.is_valid():
+        quiz_form = self.get_form()
+        question_formset = self.get_question_formset()
+        context = self.get_context_data(
+            form=quiz_form, question_formset=question_formset
+        )
+        if quiz_form.is_valid() and question_formset.is_valid():
             quiz_obj = quiz_form.save(commit=False)
             quiz_obj.organized_by = context['organization']
             quiz_obj.creator = request.user
-
-            question_objects = list()
-            variants_objects = list()
-            formset_valid = True
-
-            for question in question_formset:
-                if question.is_valid():
-                    question_obj = question.save(commit=False)
-                    question_obj.quiz = quiz_obj
-                    question_objects.append(question_obj)
-                    variants = question.cleaned_data['variants']
-                    for variant in variants:
-                        if variant.endswith('right'):
-                            variant_obj = quiz.models.Variant(
-                                text=variant[: variant.rfind('right')],
-                                question=question_obj,
-                                is_correct=True,
-                            )
-                        else:
-                            variant_obj = quiz.models.Variant(
-                                text=variant,
-                                question=question_obj,
-                                is_correct=False,
-                            )
-                        variants_objects.append(variant_obj)
-                else:
-                    formset_valid = False
-            if formset_valid:
-                quiz_obj.save()
-                for item in question_objects:
-                    item.save()
-                quiz.models.Variant.objects.bulk_create(variants_objects)
-                django.contrib.messages.success(
-                    request, 'Викторина отправлена на модерацию'
-                )
-                return django.shortcuts.redirect(
-                    django.urls.reverse(
-                        'organization:quizzes', kwargs={'pk': pk}
+            quiz.services.create_quiz(
+                quiz_obj,
+                [
+                    quiz.services.QuestionDraft(
+                        question=question_form.save(commit=False),
+                        variants=question_form.get_variants(),
+                        tag_pks=question_form.cleaned_data['tags'],
                     )
-                )
-        context['question_formset'] = question_formset
-        context['form'] = quiz_form
-        return django.shortcuts.render(request, self.template_name, context)
+                    for question_form in question_formset
+                ],
+            )
+            django.contrib.messages.success(
+                request, 'Викторина отправлена на модерацию'
+            )
+            return django.shortcuts.redirect(
+                django.urls.reverse('organization:quizzes', kwargs={'pk': pk})
+            )
+        return self.render_to_response(context)
+
+
+class QuizImportView(
+    organization.mixins.IsAdminMixin,
+    django.views.generic.edit.FormView,
+):
+    """загрузка викторины организации из набора вопросов"""
+
+    template_name = 'organization/import_quiz.html'
+    form_class = quiz.forms.QuizImportForm
+
+    def form_valid(
+        self, form: quiz.forms.QuizImportForm
+    ) -> django.http.HttpResponse:
+        """
+        проверяем права админа организации и загружаем набор,
+        викторина, как и созданная вручную, уходит на модерацию
+        """
+        context = self.get_context_data(form=form)
+        quiz_obj = form.import_bundle(
+            self.request.user, organized_by=context['organization']
+        )
+        if quiz_obj is None:
+            return self.form_invalid(form)
+        django.contrib.messages.success(
+            self.request, 'Викторина отправлена на модерацию'
+        )
+        return django.shortcuts.redirect(
+            django.urls.reverse(
+                'organization:quizzes', kwargs={'pk': self.kwargs['pk']}
+            )
+        )
+
+
+class QuizExportView(
+    organization.mixins.IsAdminMixin,
+    django.views.generic.base.ContextMixin,
+    django.views.generic.View,
+):
+    """выгрузка викторины организации набором вопросов"""
+
+    def get(
+        self, request: django.http.HttpRequest, pk: int, quiz_pk: int
+    ) -> django.http.StreamingHttpResponse:
+        """
+        набор отдаем потоком строка за строкой,
+        формат - параметр format: jsonl или csv
+        """
+        self.get_context_data()
+        quiz_obj = django.shortcuts.get_object_or_404(
+            quiz.models.Quiz, pk=quiz_pk, organized_by__pk=pk
+        )
+        bundle_format = request.GET.get('format', 'jsonl')
+        if bundle_format not in quiz.bundles.FORMATS:
+            raise django.http.Http404()
+        return quiz.bundles.get_response(quiz_obj, bundle_format)
 
 
 class CreatePostView(
@@ -496,14 +545,10 @@ class CreatePostView(
         """
         form = self.form_class(request.POST or None)
         if form.is_valid():
-            org_user_manager = organization.models.OrganizationToUser.objects
-            user_obj = django.shortcuts.get_object_or_404(
-                org_user_manager.get_organization_admin(pk, request.user.pk)
-                .select_related('organization')
-                .only('id', 'organization__id')
-            )
+            if not organization.membership.is_admin(request, pk):
+                raise django.http.Http404()
             post_obj = form.save(commit=False)
-            post_obj.posted_by = user_obj.organization
+            post_obj.posted_by_id = pk
             post_obj.save()
             return django.shortcuts.redirect(self.get_success_url())
         return django.shortcuts.render(
@@ -0,0 +1,136 @@
+import typing
+
+import django.db.models
+import django.http
+import django.utils.timezone
+
+import organization.models
+import quiz.models
+import quiz.services
+import users.models
+
+
+QUIZ_ACCESS_FIELDS = (
+    'name',
+    'is_private',
+    'is_rated',
+    'is_ended',
+    'start_time',
+    'duration',
+    'creator',
+    'organized_by',
+)
+
+
+def get_access_annotations(user_pk: typing.Optional[int]) -> dict:
+    """
+    аннотации викторины для проверки доступа пользователя:
+    состоит ли он в проводящей организации
+    и зарегистрирован ли на викторину
+    """
+    return {
+        'is_member': django.db.models.Exists(
+            organization.models.OrganizationToUser.objects.filter(
+                organization__pk=django.db.models.OuterRef('organized_by'),
+                user__pk=user_pk,
+                role__in=(1, 2, 3),
+            )
+        ),
+        'is_registered': django.db.models.Exists(
+            quiz.models.QuizResults.objects.filter(
+                quiz__pk=django.db.models.OuterRef('pk'), user__pk=user_pk
+            )
+        ),
+    }
+
+
+class QuizAccess:
+    """
+    права пользователя в викторине
+    викторина, членство в организации и регистрация
+    загружаются одним запросом, статус считается один раз
+    """
+
+    def __init__(
+        self, quiz_obj: quiz.models.Quiz, user_obj: users.models.User
+    ) -> None:
+        self.quiz = quiz_obj
+        self.user = user_obj
+        self.status = quiz_obj.get_quiz_status()
+
+    @property
+    def can_access_quiz(self) -> bool:
+        """может ли пользователь зайти в викторину"""
+        return bool(quiz.services.user_can_access_quiz(self.quiz, self.user))
+
+    @property
+    def can_participate(self) -> bool:
+        """зарегистрирован ли пользователь на викторину"""
+        return self.quiz.is_registered
+
+    @property
+    def can_access_questions(self) -> bool:
+        """
+        может ли пользователь смотреть вопросы:
+        до начала никто, во время викторины зарегистрированные,
+        после окончания все, у кого есть доступ к викторине
+        """
+        if self.status == 1:
+            return False
+        if self.status == 2:
+            return self.can_participate
+        return self.can_access_quiz
+
+    def get_context(self) -> dict:
+        """контекст шаблонов страниц викторины"""
+        return {
+            'quiz': self.quiz,
+            'can_participate': self.can_participate,
+            'can_access_questions': self.can_access_questions,
+            'quiz_status': self.status,
+            'now_time': str(django.utils.timezone.now()),
+            'end_time': str(
+                self.quiz.start_time
+                + django.utils.timezone.timedelta(minutes=self.quiz.duration)
+            ),
+        }
+
+
+def load_quiz_access(
+    quiz_pk: int,
+    user_obj: users.models.User,
+    queryset: typing.Optional[django.db.models.QuerySet] = None,
+) -> typing.Optional[QuizAccess]:
+    """права пользователя в опубликованной викторине, None если ее нет"""
+    if queryset is None:
+        queryset = quiz.models.Quiz.objects.filter(is_published=True).only(
+            *QUIZ_ACCESS_FIELDS
+        )
+    quiz_obj = (
+        queryset.annotate(**get_access_annotations(user_obj.pk))
+        .filter(pk=quiz_pk)
+        .first()
+    )
+    if quiz_obj is None:
+        return None
+    return QuizAccess(quiz_obj, user_obj)
+
+
+def get_quiz_access(
+    request: django.http.HttpRequest,
+    quiz_pk: int,
+    queryset: typing.Optional[django.db.models.QuerySet] = None,
+) -> QuizAccess:
+    """
+    права пользователя в викторине, запомненные на время запроса
+    повторные проверки в миксинах, представлениях и сервисах
+    не делают запросов в бд
+    если викторины нет, отдаем 404
+    """
+    cache = request.__dict__.setdefault('_quiz_access', dict())
+    if quiz_pk not in cache:
+        quiz_access = load_quiz_access(quiz_pk, request.user, queryset)
+        if quiz_access is None:
+            raise django.http.Http404()
+        cache[quiz_pk] = quiz_access
+    return cache[quiz_pk]
@@ -1,5 +1,16 @@
-import django.contrib
+import typing
 
+import django.contrib
+import django.contrib.messages
+import django.core.exceptions
+import django.db.models
+import django.http
+import django.shortcuts
+import django.template.response
+import django.urls
+
+import quiz.bundles
+import quiz.forms
 import quiz.models
 
 
@@ -19,6 +30,76 @@ class QuizAdmin(django.contrib.admin.ModelAdmin):
     list_display_links = ('id',)
     list_editable = ('is_rated', 'is_ended', 'is_published')
     list_filter = ('is_published',)
+    actions = ('export_jsonl', 'export_csv')
+    change_list_template = 'admin/quiz/quiz/change_list.html'
+
+    def get_urls(self) -> list:
+        """страница загрузки набора вопросов"""
+        return [
+            django.urls.path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='quiz_quiz_import',
+            ),
+        ] + super().get_urls()
+
+    def import_view(
+        self, request: django.http.HttpRequest
+    ) -> django.http.HttpResponse:
+        """загружаем викторину из набора от имени администратора"""
+        if not self.has_add_permission(request):
+            raise django.core.exceptions.PermissionDenied()
+        form = quiz.forms.QuizImportForm(
+            request.POST or None, request.FILES or None
+        )
+        if request.method == 'POST' and form.is_valid():
+            quiz_obj = form.import_bundle(request.user)
+            if quiz_obj is not None:
+                self.message_user(request, f'Викторина {quiz_obj} загружена')
+                return django.shortcuts.redirect(
+                    'admin:quiz_quiz_change', quiz_obj.pk
+                )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Загрузка викторины',
+            'form': form,
+        }
+        return django.template.response.TemplateResponse(
+            request, 'admin/quiz/quiz/import_bundle.html', context
+        )
+
+    def export_bundle(
+        self,
+        request: django.http.HttpRequest,
+        queryset: django.db.models.QuerySet,
+        bundle_format: str,
+    ) -> typing.Optional[django.http.StreamingHttpResponse]:
+        """выгружаем одну выбранную викторину"""
+        if queryset.count() != 1:
+            self.message_user(
+                request,
+                'Выберите одну викторину',
+                level=django.contrib.messages.WARNING,
+            )
+            return None
+        return quiz.bundles.get_response(queryset.get(), bundle_format)
+
+    @django.contrib.admin.action(description='Выгрузить в JSON Lines')
+    def export_jsonl(
+        self,
+        request: django.http.HttpRequest,
+        queryset: django.db.models.QuerySet,
+    ) -> typing.Optional[django.http.StreamingHttpResponse]:
+        return self.export_bundle(request, queryset, 'jsonl')
+
+    @django.contrib.admin.action(description='Выгрузить в CSV')
+    def export_csv(
+        self,
+        request: django.http.HttpRequest,
+        queryset: django.db.models.QuerySet,
+    ) -> typing.Optional[django.http.StreamingHttpResponse]:
+        return self.export_bundle(request, queryset, 'csv')
 
 
 class VariantInline(django.contrib.admin.TabularInline):
@@ -74,3 +155,24 @@ class QuizResultsAdmin(django.contrib.admin.ModelAdmin):
 
     list_display = ('id', 'user', 'quiz', 'place')
     list_display_links = ('id',)
+
+
+@django.contrib.admin.register(quiz.models.QuestionStats)
+class QuestionStatsAdmin(django.contrib.admin.ModelAdmin):
+    """отображение статистики вопросов в админке"""
+
+    list_display = (
+        'question',
+        'attempts',
+        'accepted',
+        'solvers',
+        'first_solved_at',
+    )
+    list_display_links = ('question',)
+    readonly_fields = (
+        'question',
+        'attempts',
+        'accepted',
+        'solvers',
+        'first_solved_at',
+    )
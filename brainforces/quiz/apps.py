@@ -7,3 +7,7 @@ class QuizConfig(django.apps.AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quiz'
     verbose_name = 'викторина'
+
+    def ready(self) -> None:
+        """подключаем обработчики сигналов"""
+        import quiz.signals  # noqa: F401
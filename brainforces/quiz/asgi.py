@@ -0,0 +1,124 @@
+import asyncio
+import http.cookies
+import importlib
+import re
+import types
+import typing
+
+import asgiref.sync
+
+import django.conf
+import django.contrib.auth
+import django.contrib.auth.models
+
+import quiz.access
+import quiz.events
+
+
+EVENTS_PATH = re.compile(r'^/quiz/(?P<pk>\d+)/events/$')
+
+
+def get_user(
+    scope: dict,
+) -> typing.Union[
+    django.contrib.auth.models.AbstractBaseUser,
+    django.contrib.auth.models.AnonymousUser,
+]:
+    """пользователь по сессионной куке из заголовков запроса"""
+    cookies = http.cookies.SimpleCookie()
+    for name, value in scope.get('headers', ()):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    session_cookie = cookies.get(django.conf.settings.SESSION_COOKIE_NAME)
+    session_store = importlib.import_module(
+        django.conf.settings.SESSION_ENGINE
+    ).SessionStore
+    session = session_store(session_cookie.value if session_cookie else None)
+    return django.contrib.auth.get_user(types.SimpleNamespace(session=session))
+
+
+def get_channels(quiz_pk: int, scope: dict) -> typing.Optional[list]:
+    """
+    каналы, на которые может подписаться пользователь
+    None если викторины нет или у пользователя нет к ней доступа
+    """
+    user = get_user(scope)
+    quiz_access = quiz.access.load_quiz_access(quiz_pk, user)
+    if quiz_access is None or not quiz_access.can_access_quiz:
+        return None
+    channels = [quiz.events.standings_channel(quiz_pk)]
+    if user.is_authenticated:
+        channels.append(quiz.events.verdicts_channel(quiz_pk, user.pk))
+    return channels
+
+
+class EventStreamApplication:
+    """
+    ASGI приложение: поток server-sent events викторины
+    по адресу /quiz/<pk>/events/ отдаем изменения таблицы положения
+    и вердикты на свои ответы, остальные запросы отдаем django
+    """
+
+    def __init__(self, django_application: typing.Callable) -> None:
+        self.django_application = django_application
+
+    async def __call__(
+        self, scope: dict, receive: typing.Callable, send: typing.Callable
+    ) -> None:
+        match = (
+            EVENTS_PATH.match(scope['path'])
+            if scope['type'] == 'http'
+            else None
+        )
+        if match is None:
+            await self.django_application(scope, receive, send)
+            return
+        channels = await asgiref.sync.sync_to_async(get_channels)(
+            int(match['pk']), scope
+        )
+        if channels is None:
+            await send({'type': 'http.response.start', 'status': 404})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await self.stream(channels, receive, send)
+
+    async def stream(
+        self, channels: list, receive: typing.Callable, send: typing.Callable
+    ) -> None:
+        """отдаем события, пока клиент не отключится"""
+        quiz.events.get_broker().listen()
+        subscription = quiz.events.hub.subscribe(channels)
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            await send(
+                {
+                    'type': 'http.response.start',
+                    'status': 200,
+                    'headers': [
+                        (b'content-type', b'text/event-stream'),
+                        (b'cache-control', b'no-cache'),
+                    ],
+                }
+            )
+            while not disconnected.done():
+                message = await subscription.get(
+                    django.conf.settings.QUIZ_EVENTS_KEEPALIVE_SECONDS
+                )
+                # комментарий держит соединение открытым
+                body = message if message is not None else ': keepalive\n\n'
+                await send(
+                    {
+                        'type': 'http.response.body',
+                        'body': body.encode(),
+                        'more_body': True,
+                    }
+                )
+        finally:
+            quiz.events.hub.unsubscribe(subscription)
+            disconnected.cancel()
+
+    @staticmethod
+    async def wait_disconnect(receive: typing.Callable) -> None:
+        """ждем отключения клиента"""
+        while (await receive())['type'] != 'http.disconnect':
+            pass
@@ -0,0 +1,522 @@
+import collections
+import csv
+import datetime
+import itertools
+import json
+import typing
+
+import django.conf
+import django.core.exceptions
+import django.db
+import django.http
+import django.utils.dateparse
+import django.utils.timezone
+
+import core.cache
+import organization.models
+import quiz.models
+import quiz.services
+import users.models
+
+
+FORMATS = ('jsonl', 'csv')
+
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+CSV_COLUMNS = (
+    'type',
+    'name',
+    'text',
+    'difficulty',
+    'tags',
+    'is_correct',
+    'start_time',
+    'duration',
+    'is_rated',
+    'is_private',
+)
+
+# наибольшая сложность, которая помещается в поле вопроса
+MAX_DIFFICULTY = 32767
+
+# разделитель тегов в ячейке csv
+CSV_TAGS_SEPARATOR = '|'
+
+Record = typing.Dict[str, typing.Any]
+
+
+class QuestionRecord(typing.NamedTuple):
+    """прочитанный вопрос и названия его тегов"""
+
+    question: quiz.models.Question
+    variants: typing.List[quiz.models.Variant]
+    tag_names: typing.List[str]
+
+
+class Echo:
+    """файл, который возвращает записанную строку, для потокового csv"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def get_format(filename: str) -> str:
+    """формат набора по расширению файла"""
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+def get_error(
+    line_number: int, text: str
+) -> django.core.exceptions.ValidationError:
+    """ошибка набора с номером строки"""
+    return django.core.exceptions.ValidationError(
+        f'Строка {line_number}: {text}'
+    )
+
+
+def parse_bool(value: typing.Any) -> bool:
+    """логическое значение из json или ячейки csv"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def read_jsonl(
+    lines: typing.Iterable[str],
+) -> typing.Iterator[typing.Tuple[int, Record]]:
+    """записи набора json lines: объект на строку, варианты внутри вопроса"""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise get_error(line_number, 'неверный json')
+        if not isinstance(record, dict):
+            raise get_error(line_number, 'ожидается объект')
+        yield line_number, record
+
+
+def read_csv_rows(
+    reader: csv.DictReader,
+) -> typing.Iterator[typing.Dict[str, str]]:
+    """
+    строки csv, строку, которую не разобрать,
+    например со слишком длинной ячейкой, отклоняем с ее номером
+    """
+    try:
+        yield from reader
+    except csv.Error:
+        # строка с ошибкой еще не учтена в line_num
+        raise get_error(reader.line_num + 1, 'неверная строка csv')
+
+
+def read_csv(
+    lines: typing.Iterable[str],
+) -> typing.Iterator[typing.Tuple[int, Record]]:
+    """
+    записи набора csv: строка викторины, затем строки вопросов,
+    за каждым вопросом - строки его вариантов
+    вопрос отдается, когда прочитаны все его варианты
+    """
+    reader = csv.DictReader(lines)
+    current = None
+    for row in read_csv_rows(reader):
+        kind = row.get('type')
+        if kind == 'variant':
+            if current is None:
+                raise get_error(reader.line_num, 'вариант без вопроса')
+            current[1]['variants'].append(
+                {
+                    'text': row.get('text') or '',
+                    'is_correct': row.get('is_correct'),
+                }
+            )
+            continue
+        if current is not None:
+            yield current
+            current = None
+        if kind == 'question':
+            current = (
+                reader.line_num,
+                {
+                    'type': kind,
+                    'name': row.get('name'),
+                    'text': row.get('text'),
+                    'difficulty': row.get('difficulty') or 1,
+                    'tags': (row.get('tags') or '').split(CSV_TAGS_SEPARATOR),
+                    'variants': list(),
+                },
+            )
+        else:
+            yield reader.line_num, dict(row, description=row.get('text'))
+    if current is not None:
+        yield current
+
+
+def has_null_character(value: typing.Any) -> bool:
+    """
+    в значении записи есть символ NUL,
+    PostgreSQL не хранит его в текстовых полях
+    """
+    if isinstance(value, str):
+        return '\x00' in value
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return any(has_null_character(item) for item in value)
+    return False
+
+
+def read_records(
+    lines: typing.Iterable[str], bundle_format: str
+) -> typing.Iterator[typing.Tuple[int, Record]]:
+    """записи набора в нужном формате"""
+    if bundle_format == 'csv':
+        records = read_csv(lines)
+    else:
+        records = read_jsonl(lines)
+    for line_number, record in records:
+        if has_null_character(record):
+            raise get_error(line_number, 'недопустимый символ NUL')
+        yield line_number, record
+
+
+def parse_start_time(
+    line_number: int, value: typing.Any
+) -> typing.Optional[datetime.datetime]:
+    """время начала викторины, пустое - викторина без времени"""
+    if not value:
+        return None
+    try:
+        start_time = django.utils.dateparse.parse_datetime(str(value))
+    except ValueError:
+        start_time = None
+    if start_time is None:
+        raise get_error(line_number, 'неверное время начала')
+    if django.utils.timezone.is_naive(start_time):
+        start_time = django.utils.timezone.make_aware(start_time)
+    return start_time
+
+
+def make_quiz(line_number: int, record: Record) -> quiz.models.Quiz:
+    """викторина из первой записи набора"""
+    if record.get('type') != 'quiz':
+        raise get_error(line_number, 'первой должна идти викторина')
+    start_time = parse_start_time(line_number, record.get('start_time'))
+    try:
+        duration = int(record.get('duration') or 0) or None
+    except (TypeError, ValueError):
+        raise get_error(line_number, 'неверная продолжительность')
+    quiz_obj = quiz.models.Quiz(
+        name=record.get('name') or '',
+        description=record.get('description') or '',
+        start_time=start_time,
+        duration=duration,
+        is_rated=parse_bool(record.get('is_rated', True)),
+        is_private=parse_bool(record.get('is_private', False)),
+    )
+    try:
+        quiz_obj.full_clean(exclude=('creator', 'organized_by'))
+    except django.core.exceptions.ValidationError as exc:
+        raise get_error(line_number, '; '.join(exc.messages))
+    return quiz_obj
+
+
+def get_max_length(model: type, name: str) -> int:
+    """наибольшая длина текстового поля модели"""
+    return model._meta.get_field(name).max_length
+
+
+def make_variants(
+    line_number: int, raw_variants: typing.Any
+) -> typing.List[quiz.models.Variant]:
+    """варианты ответа: не меньше двух и хотя бы один правильный"""
+    raw_variants = raw_variants or ()
+    if not isinstance(raw_variants, (list, tuple)):
+        raise get_error(line_number, 'варианты должны быть списком')
+    variants = [
+        quiz.models.Variant(
+            text=str(variant.get('text') or ''),
+            is_correct=parse_bool(variant.get('is_correct')),
+        )
+        for variant in raw_variants
+        if isinstance(variant, dict)
+    ]
+    if len(variants) < 2 or len(variants) != len(raw_variants):
+        raise get_error(line_number, 'слишком мало вариантов ответа')
+    if not any(variant.is_correct for variant in variants):
+        raise get_error(line_number, 'нет правильного варианта')
+    max_length = get_max_length(quiz.models.Variant, 'text')
+    if not all(0 < len(variant.text) <= max_length for variant in variants):
+        raise get_error(line_number, 'неверный текст варианта')
+    return variants
+
+
+def get_tag_names(line_number: int, raw_tags: typing.Any) -> typing.List[str]:
+    """непустые названия тегов вопроса"""
+    raw_tags = raw_tags or ()
+    if not isinstance(raw_tags, (list, tuple)):
+        raise get_error(line_number, 'теги должны быть списком')
+    tag_names = [str(tag).strip() for tag in raw_tags if str(tag).strip()]
+    max_length = get_max_length(quiz.models.Tag, 'name')
+    if any(len(tag) > max_length for tag in tag_names):
+        raise get_error(line_number, 'слишком длинное название тега')
+    return tag_names
+
+
+def make_question(line_number: int, record: Record) -> QuestionRecord:
+    """
+    вопрос с вариантами из записи набора
+    поля проверяем без запросов к бд и без clean_fields моделей,
+    которые на сотнях тысяч строк заметно дороже
+    """
+    if record.get('type') != 'question':
+        raise get_error(line_number, 'ожидается вопрос')
+    name = str(record.get('name') or '')
+    text = str(record.get('text') or '')
+    if not name or len(name) > get_max_length(quiz.models.Question, 'name'):
+        raise get_error(line_number, 'неверное название вопроса')
+    if not text:
+        raise get_error(line_number, 'пустой текст вопроса')
+    try:
+        difficulty = int(record.get('difficulty') or 1)
+    except (TypeError, ValueError):
+        difficulty = -1
+    if not 0 <= difficulty <= MAX_DIFFICULTY:
+        raise get_error(line_number, 'неверная сложность')
+    return QuestionRecord(
+        quiz.models.Question(name=name, text=text, difficulty=difficulty),
+        make_variants(line_number, record.get('variants')),
+        get_tag_names(line_number, record.get('tags')),
+    )
+
+
+def load_tags(names: typing.Set[str], tag_pks: typing.Dict[str, int]) -> None:
+    """
+    дополняем tag_pks id тегов по названиям,
+    ненайденные теги создаются неопубликованными до проверки модератором
+    """
+    missing = names - tag_pks.keys()
+    if not missing:
+        return
+    tag_pks.update(
+        quiz.models.Tag.objects.filter(name__in=missing).values_list(
+            'name', 'pk'
+        )
+    )
+    missing = missing - tag_pks.keys()
+    if missing:
+        quiz.models.Tag.objects.bulk_create(
+            quiz.models.Tag(name=name, is_published=False) for name in missing
+        )
+        tag_pks.update(
+            quiz.models.Tag.objects.filter(name__in=missing).values_list(
+                'name', 'pk'
+            )
+        )
+
+
+def import_bundle(
+    lines: typing.Iterable[str],
+    bundle_format: str,
+    creator: typing.Optional[users.models.User] = None,
+    organized_by: typing.Optional[organization.models.Organization] = None,
+) -> quiz.models.Quiz:
+    """
+    загружаем викторину из набора одной транзакцией
+    строки читаются потоком, в памяти только пачка из
+    QUIZ_IMPORT_BATCH_SIZE вопросов, пачки сохраняются массовыми вставками
+    id тегов помним не больше QUIZ_IMPORT_MAX_CACHED_TAGS, дальше
+    забываем и читаем заново, до фиксации транзакции в памяти еще
+    остаются id вопросов, которые после нее попадут в поиск
+    ошибки в данных - ValidationError с номером строки
+    """
+    settings = django.conf.settings
+    records = read_records(lines, bundle_format)
+    tag_pks: typing.Dict[str, int] = dict()
+    position = 0
+    with django.db.transaction.atomic():
+        first = next(records, None)
+        if first is None:
+            raise django.core.exceptions.ValidationError('Набор пуст')
+        quiz_obj = make_quiz(*first)
+        quiz_obj.creator = creator
+        quiz_obj.organized_by = organized_by
+        quiz_obj.save()
+        while True:
+            batch = list(
+                itertools.islice(records, settings.QUIZ_IMPORT_BATCH_SIZE)
+            )
+            if not batch:
+                break
+            if position + len(batch) > settings.QUIZ_IMPORT_MAX_QUESTIONS:
+                raise get_error(
+                    batch[-1][0],
+                    'больше '
+                    f'{settings.QUIZ_IMPORT_MAX_QUESTIONS} вопросов в наборе',
+                )
+            questions = [make_question(*record) for record in batch]
+            names = {name for record in questions for name in record.tag_names}
+            if (
+                len(tag_pks) + len(names)
+                > settings.QUIZ_IMPORT_MAX_CACHED_TAGS
+            ):
+                tag_pks.clear()
+            load_tags(names, tag_pks)
+            quiz.services.bulk_create_questions(
+                quiz_obj,
+                [
+                    quiz.services.QuestionDraft(
+                        question=record.question,
+                        variants=record.variants,
+                        tag_pks=[tag_pks[name] for name in record.tag_names],
+                    )
+                    for record in questions
+                ],
+                first_position=position,
+            )
+            position += len(batch)
+        if not position:
+            raise django.core.exceptions.ValidationError(
+                'В наборе нет вопросов'
+            )
+    # массовые вставки сигналов не отправляют
+    core.cache.touch(quiz.models.Question)
+    core.cache.touch(quiz.models.Tag)
+    return quiz_obj
+
+
+def iter_questions(
+    quiz_pk: int,
+) -> typing.Iterator[QuestionRecord]:
+    """
+    вопросы викторины с вариантами и тегами пачками по номеру вопроса,
+    на пачку - три запроса, в памяти только одна пачка
+    """
+    batch_size = django.conf.settings.QUIZ_IMPORT_BATCH_SIZE
+    last_position = -1
+    while True:
+        questions = list(
+            quiz.models.Question.objects.filter(
+                quiz__pk=quiz_pk, position__gt=last_position
+            )
+            .only('name', 'text', 'difficulty', 'position')
+            .order_by('position')[:batch_size]
+        )
+        if not questions:
+            return
+        question_pks = [question.pk for question in questions]
+        variants = collections.defaultdict(list)
+        for variant in (
+            quiz.models.Variant.objects.filter(question__pk__in=question_pks)
+            .only('question', 'text', 'is_correct')
+            .order_by('pk')
+        ):
+            variants[variant.question_id].append(variant)
+        tag_names = collections.defaultdict(list)
+        for question_pk, name in (
+            quiz.models.Question.tags.through.objects.filter(
+                question__pk__in=question_pks
+            )
+            .values_list('question', 'tag__name')
+            .order_by('pk')
+        ):
+            tag_names[question_pk].append(name)
+        for question in questions:
+            yield QuestionRecord(
+                question, variants[question.pk], tag_names[question.pk]
+            )
+        last_position = questions[-1].position
+
+
+def get_quiz_record(quiz_obj: quiz.models.Quiz) -> Record:
+    """запись викторины"""
+    return {
+        'type': 'quiz',
+        'name': quiz_obj.name,
+        'description': quiz_obj.description,
+        'start_time': quiz_obj.start_time.isoformat()
+        if quiz_obj.start_time
+        else None,
+        'duration': quiz_obj.duration,
+        'is_rated': quiz_obj.is_rated,
+        'is_private': quiz_obj.is_private,
+    }
+
+
+def export_jsonl(quiz_obj: quiz.models.Quiz) -> typing.Iterator[str]:
+    """набор json lines строка за строкой"""
+    yield json.dumps(get_quiz_record(quiz_obj), ensure_ascii=False) + '\n'
+    for question, variants, tag_names in iter_questions(quiz_obj.pk):
+        record = {
+            'type': 'question',
+            'name': question.name,
+            'text': question.text,
+            'difficulty': question.difficulty,
+            'tags': tag_names,
+            'variants': [
+                {'text': variant.text, 'is_correct': variant.is_correct}
+                for variant in variants
+            ],
+        }
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def export_csv(quiz_obj: quiz.models.Quiz) -> typing.Iterator[str]:
+    """набор csv строка за строкой"""
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    record = get_quiz_record(quiz_obj)
+    yield writer.writerow(
+        {
+            'type': 'quiz',
+            'name': record['name'],
+            'text': record['description'],
+            'start_time': record['start_time'] or '',
+            'duration': record['duration'] or '',
+            'is_rated': int(record['is_rated']),
+            'is_private': int(record['is_private']),
+        }
+    )
+    for question, variants, tag_names in iter_questions(quiz_obj.pk):
+        yield writer.writerow(
+            {
+                'type': 'question',
+                'name': question.name,
+                'text': question.text,
+                'difficulty': question.difficulty,
+                'tags': CSV_TAGS_SEPARATOR.join(tag_names),
+            }
+        )
+        for variant in variants:
+            yield writer.writerow(
+                {
+                    'type': 'variant',
+                    'text': variant.text,
+                    'is_correct': int(variant.is_correct),
+                }
+            )
+
+
+def export_bundle(
+    quiz_obj: quiz.models.Quiz, bundle_format: str
+) -> typing.Iterator[str]:
+    """набор викторины в нужном формате"""
+    if bundle_format == 'csv':
+        return export_csv(quiz_obj)
+    return export_jsonl(quiz_obj)
+
+
+def get_response(
+    quiz_obj: quiz.models.Quiz, bundle_format: str
+) -> django.http.StreamingHttpResponse:
+    """набор викторины файлом, который отдается потоком"""
+    response = django.http.StreamingHttpResponse(
+        export_bundle(quiz_obj, bundle_format),
+        content_type=CONTENT_TYPES[bundle_format],
+    )
+    response[
+        'Content-Disposition'
+    ] = f'attachment; filename="quiz-{quiz_obj.pk}.{bundle_format}"'
+    return response
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import threading
+import time
+import typing
+
+import django.conf
+import django.db
+import django.utils.module_loading
+import django.utils.timezone
+
+import quiz.models
+
+
+class Subscription:
+    """
+    подписка одного клиента на каналы событий
+    события складываются в очередь в цикле событий подписчика
+    """
+
+    def __init__(self, channels: typing.Iterable[str]) -> None:
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(
+            maxsize=django.conf.settings.QUIZ_EVENTS_QUEUE_SIZE
+        )
+
+    def push(self, message: str) -> None:
+        """
+        кладем событие в очередь
+        если клиент не успевает читать, выкидываем самое старое событие
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> typing.Optional[str]:
+        """ждем следующее событие, None если за timeout ничего не пришло"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """раздает события подписчикам этого процесса"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: typing.Dict[str, typing.Set[Subscription]] = {}
+
+    def subscribe(self, channels: typing.Iterable[str]) -> Subscription:
+        """подписываемся на каналы, вызывается внутри цикла событий"""
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(
+                    subscription
+                )
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """отписываемся от всех каналов подписки"""
+        with self._lock:
+            for channel in subscription.channels:
+                subscriptions = self._subscriptions.get(channel, set())
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    self._subscriptions.pop(channel, None)
+
+    def has_subscriptions(self) -> bool:
+        """есть ли в процессе подписчики"""
+        with self._lock:
+            return bool(self._subscriptions)
+
+    def dispatch(self, channel: str, message: str) -> None:
+        """
+        отправляем событие всем подписчикам канала
+        можно вызывать из любого потока
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.push, message)
+
+
+hub = EventHub()
+
+
+class LocalBroker:
+    """
+    брокер в пределах одного процесса, для разработки
+    события из других процессов, например из run_jobs
+    или планировщика, до подписчиков не доходят
+    """
+
+    def publish(self, channel: str, message: str) -> None:
+        """публикуем событие"""
+        hub.dispatch(channel, message)
+
+    def listen(self) -> None:
+        """события и так приходят в hub этого процесса"""
+
+
+class DatabaseListener(threading.Thread):
+    """
+    поток, который раздает подписчикам процесса события из бд
+    id событий выдаются до коммита, и событие с меньшим id может
+    появиться позже, поэтому каждый опрос перечитывает события
+    за последние QUIZ_EVENTS_LAG_SECONDS и пропускает уже разосланные
+    """
+
+    def __init__(self, event_hub: EventHub) -> None:
+        super().__init__(name='quiz-events', daemon=True)
+        self.event_hub = event_hub
+        self.since = django.utils.timezone.now()
+        self.seen: typing.Dict[int, django.utils.timezone.datetime] = dict()
+
+    def poll(self) -> None:
+        """раздаем новые события, пока подписчиков нет - не читаем бд"""
+        now = django.utils.timezone.now()
+        if not self.event_hub.has_subscriptions():
+            self.since = now
+            self.seen = dict()
+            return
+        self.since = max(
+            self.since,
+            now
+            - django.utils.timezone.timedelta(
+                seconds=django.conf.settings.QUIZ_EVENTS_LAG_SECONDS
+            ),
+        )
+        self.seen = {
+            pk: created_at
+            for pk, created_at in self.seen.items()
+            if created_at >= self.since
+        }
+        events = (
+            quiz.models.QuizEvent.objects.filter(created_at__gte=self.since)
+            .order_by('pk')
+            .values_list('pk', 'channel', 'message', 'created_at')
+        )
+        for pk, channel, message, created_at in events:
+            if pk not in self.seen:
+                self.seen[pk] = created_at
+                self.event_hub.dispatch(channel, message)
+
+    def run(self) -> None:
+        """опрашиваем бд, пока жив процесс"""
+        while True:
+            try:
+                self.poll()
+            except django.db.Error:
+                # соединение могло оборваться, следующий опрос откроет новое
+                django.db.connection.close()
+            time.sleep(django.conf.settings.QUIZ_EVENTS_POLL_SECONDS)
+
+
+class DatabaseBroker:
+    """
+    брокер через таблицу событий, работает при нескольких воркерах
+    publish из любого процесса записывает событие в бд,
+    слушатель в каждом процессе с подписчиками опрашивает таблицу
+    и вызывает hub.dispatch
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._listener: typing.Optional[DatabaseListener] = None
+        self._cleaned_at: typing.Optional[float] = None
+
+    def publish(self, channel: str, message: str) -> None:
+        """записываем событие, изредка удаляем старые"""
+        quiz.models.QuizEvent.objects.create(channel=channel, message=message)
+        keep_seconds = django.conf.settings.QUIZ_EVENTS_KEEP_SECONDS
+        with self._lock:
+            if (
+                self._cleaned_at is not None
+                and time.monotonic() - self._cleaned_at < keep_seconds
+            ):
+                return
+            self._cleaned_at = time.monotonic()
+        quiz.models.QuizEvent.objects.filter(
+            created_at__lt=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(seconds=keep_seconds)
+        ).delete()
+
+    def listen(self) -> None:
+        """запускаем слушателя бд в этом процессе, если его еще нет"""
+        with self._lock:
+            if self._listener is None:
+                self._listener = DatabaseListener(hub)
+                self._listener.start()
+
+
+_broker = None
+
+
+def get_broker() -> typing.Any:
+    """брокер событий из настроек"""
+    global _broker
+    if _broker is None:
+        _broker = django.utils.module_loading.import_string(
+            django.conf.settings.QUIZ_EVENTS_BROKER
+        )()
+    return _broker
+
+
+def standings_channel(quiz_pk: int) -> str:
+    """канал изменений таблицы положения викторины"""
+    return f'quiz:{quiz_pk}:standings'
+
+
+def verdicts_channel(quiz_pk: int, user_pk: int) -> str:
+    """канал вердиктов участника викторины"""
+    return f'quiz:{quiz_pk}:verdicts:{user_pk}'
+
+
+def format_event(event: str, data: dict) -> str:
+    """событие в формате server-sent events"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def publish(channel: str, event: str, data: dict) -> None:
+    """публикуем событие в канал"""
+    get_broker().publish(channel, format_event(event, data))
+
+
+def on_commit_publish(channel: str, event: str, data: dict) -> None:
+    """публикуем событие после коммита транзакции"""
+    django.db.transaction.on_commit(lambda: publish(channel, event, data))
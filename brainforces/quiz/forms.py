@@ -1,7 +1,14 @@
+import codecs
+import typing
+
+import django.conf
 import django.core.exceptions
 import django.forms
 
+import organization.models
+import quiz.bundles
 import quiz.models
+import users.models
 
 
 class AnswerForm(django.forms.Form):
@@ -20,6 +27,7 @@ class QuizQuestionsNumberForm(django.forms.Form):
 
     num_questions = django.forms.IntegerField(
         min_value=1,
+        max_value=django.conf.settings.QUIZ_MAX_QUESTIONS,
         label='Количество вопросов',
         help_text='Введите количество вопросов в викторине',
     )
@@ -40,8 +48,21 @@ class QuizForm(django.forms.ModelForm):
         )
 
 
+def get_tag_choices() -> typing.List[typing.Tuple[int, str]]:
+    """опубликованные теги для выбора в формах вопросов"""
+    return list(
+        quiz.models.Tag.objects.filter(is_published=True).values_list(
+            'pk', 'name'
+        )
+    )
+
+
 class QuestionForm(django.forms.ModelForm):
-    """форма создания вопроса"""
+    """
+    форма создания вопроса
+    теги выбираются из готового списка, который формсет загружает
+    один раз для всех форм
+    """
 
     variants = django.forms.CharField(
         label='Варианты ответа',
@@ -50,10 +71,30 @@ class QuestionForm(django.forms.ModelForm):
         widget=django.forms.widgets.Textarea(attrs={'rows': 5}),
     )
 
+    tags = django.forms.TypedMultipleChoiceField(
+        label='Теги',
+        help_text='Выберите теги вопроса',
+        coerce=int,
+        required=False,
+    )
+
     class Meta:
         model = quiz.models.Question
         fields = ('name', 'text', 'difficulty')
 
+    def __init__(
+        self,
+        *args,
+        tag_choices: typing.Optional[
+            typing.List[typing.Tuple[int, str]]
+        ] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        if tag_choices is None:
+            tag_choices = get_tag_choices()
+        self.fields['tags'].choices = tag_choices
+
     def clean_variants(self) -> list:
         """
         валидируем варианты ответа
@@ -72,3 +113,64 @@ class QuestionForm(django.forms.ModelForm):
                 'Нет правильного варианта'
             )
         return variants
+
+    def get_variants(self) -> typing.List[quiz.models.Variant]:
+        """
+        варианты ответа формы без вопроса и без сохранения,
+        правильные отмечены суффиксом right
+        """
+        variants = list()
+        for variant in self.cleaned_data['variants']:
+            is_correct = variant.endswith('right')
+            if is_correct:
+                variant = variant[: variant.rfind('right')]
+            variants.append(
+                quiz.models.Variant(text=variant, is_correct=is_correct)
+            )
+        return variants
+
+
+class QuizImportForm(django.forms.Form):
+    """форма загрузки викторины из набора вопросов"""
+
+    bundle = django.forms.FileField(
+        label='Набор вопросов',
+        help_text='Файл JSON Lines (.jsonl) или CSV (.csv)',
+    )
+
+    bundle_format = django.forms.ChoiceField(
+        label='Формат',
+        help_text='По умолчанию определяется по расширению файла',
+        choices=[('', 'Автоматически')]
+        + [
+            (bundle_format, bundle_format)
+            for bundle_format in quiz.bundles.FORMATS
+        ],
+        required=False,
+    )
+
+    def import_bundle(
+        self,
+        creator: users.models.User,
+        organized_by: typing.Optional[organization.models.Organization] = None,
+    ) -> typing.Optional[quiz.models.Quiz]:
+        """
+        загружаем викторину из файла построчно,
+        ошибки набора добавляются к полю файла, тогда возвращаем None
+        """
+        bundle = self.cleaned_data['bundle']
+        bundle_format = self.cleaned_data[
+            'bundle_format'
+        ] or quiz.bundles.get_format(bundle.name)
+        try:
+            return quiz.bundles.import_bundle(
+                codecs.iterdecode(bundle, 'utf-8-sig'),
+                bundle_format,
+                creator=creator,
+                organized_by=organized_by,
+            )
+        except django.core.exceptions.ValidationError as exc:
+            self.add_error('bundle', exc)
+        except UnicodeDecodeError:
+            self.add_error('bundle', 'Файл должен быть в кодировке UTF-8')
+        return None
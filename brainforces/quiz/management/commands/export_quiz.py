@@ -0,0 +1,43 @@
+import sys
+
+import django.core.management.base
+
+import quiz.bundles
+import quiz.models
+
+
+class Command(django.core.management.base.BaseCommand):
+    """выгрузка викторины набором вопросов"""
+
+    help = 'Выгружает викторину в файл JSON Lines или CSV'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('quiz', type=int, help='id викторины')
+        parser.add_argument('path', help='Файл набора, - для stdout')
+        parser.add_argument(
+            '--format',
+            choices=quiz.bundles.FORMATS,
+            help='Формат набора, по умолчанию по расширению файла',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """пишем набор построчно"""
+        quiz_obj = quiz.models.Quiz.objects.filter(pk=options['quiz']).first()
+        if quiz_obj is None:
+            raise django.core.management.base.CommandError(
+                'Викторина не найдена'
+            )
+        path = options['path']
+        bundle_format = options['format'] or quiz.bundles.get_format(path)
+        bundle_file = (
+            sys.stdout
+            if path == '-'
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+        try:
+            bundle_file.writelines(
+                quiz.bundles.export_bundle(quiz_obj, bundle_format)
+            )
+        finally:
+            if bundle_file is not sys.stdout:
+                bundle_file.close()
@@ -0,0 +1,71 @@
+import sys
+
+import django.core.exceptions
+import django.core.management.base
+
+import organization.models
+import quiz.bundles
+import users.models
+
+
+class Command(django.core.management.base.BaseCommand):
+    """загрузка викторины из набора вопросов"""
+
+    help = 'Загружает викторину из файла JSON Lines или CSV'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('path', help='Файл набора, - для stdin')
+        parser.add_argument(
+            '--format',
+            choices=quiz.bundles.FORMATS,
+            help='Формат набора, по умолчанию по расширению файла',
+        )
+        parser.add_argument('--creator', help='Имя создателя викторины')
+        parser.add_argument(
+            '--organization', type=int, help='id проводящей организации'
+        )
+
+    def handle(self, *args, **options) -> None:
+        """читаем файл построчно и загружаем викторину"""
+        creator = organized_by = None
+        if options['creator']:
+            creator = users.models.User.objects.filter(
+                username=options['creator']
+            ).first()
+            if creator is None:
+                raise django.core.management.base.CommandError(
+                    'Пользователь не найден'
+                )
+        if options['organization']:
+            organized_by = organization.models.Organization.objects.filter(
+                pk=options['organization']
+            ).first()
+            if organized_by is None:
+                raise django.core.management.base.CommandError(
+                    'Организация не найдена'
+                )
+        path = options['path']
+        bundle_format = options['format'] or quiz.bundles.get_format(path)
+        bundle_file = (
+            sys.stdin
+            if path == '-'
+            else open(path, encoding='utf-8-sig', newline='')
+        )
+        try:
+            quiz_obj = quiz.bundles.import_bundle(
+                bundle_file,
+                bundle_format,
+                creator=creator,
+                organized_by=organized_by,
+            )
+        except django.core.exceptions.ValidationError as exc:
+            raise django.core.management.base.CommandError(
+                '; '.join(exc.messages)
+            )
+        finally:
+            if bundle_file is not sys.stdin:
+                bundle_file.close()
+        self.stdout.write(
+            f'Загружена викторина {quiz_obj.pk}: '
+            f'{quiz_obj.quiz_question.count()} вопросов'
+        )
@@ -0,0 +1,13 @@
+import django.core.management.base
+
+import quiz.stats
+
+
+class Command(django.core.management.base.BaseCommand):
+    """пересчет статистики вопросов"""
+
+    help = 'Заново считает статистику ответов на вопросы'
+
+    def handle(self, *args, **options) -> None:
+        changed = quiz.stats.rebuild_stats()
+        self.stdout.write(f'Обновлено строк статистики: {changed}')
@@ -0,0 +1,39 @@
+import time
+
+import django.conf
+import django.core.management.base
+import django.utils.timezone
+
+import quiz.scheduler
+
+
+class Command(django.core.management.base.BaseCommand):
+    """планировщик жизненного цикла викторин"""
+
+    help = 'Переводит викторины по статусам и запускает подведение итогов'
+
+    def handle(self, *args, **options) -> None:
+        """
+        обрабатываем наступившие события и спим до следующего,
+        периодически перечитываем викторины из бд,
+        чтобы подхватить новые и измененные
+        """
+        scheduler = quiz.scheduler.QuizScheduler()
+        reload_seconds = django.conf.settings.QUIZ_SCHEDULER_RELOAD_SECONDS
+        while True:
+            scheduler.load()
+            reload_at = time.monotonic() + reload_seconds
+            while time.monotonic() < reload_at:
+                events_count = scheduler.run_due()
+                if events_count:
+                    self.stdout.write(f'Обработано событий: {events_count}')
+                next_event_time = scheduler.next_event_time()
+                sleep_seconds = reload_at - time.monotonic()
+                if next_event_time is not None:
+                    sleep_seconds = min(
+                        sleep_seconds,
+                        (
+                            next_event_time - django.utils.timezone.now()
+                        ).total_seconds(),
+                    )
+                time.sleep(max(sleep_seconds, 0))
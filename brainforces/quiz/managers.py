@@ -1,18 +1,34 @@
 import django.db.models
+import django.utils.timezone
 
 
 class QuizManager(django.db.models.Manager):
     """менеджер модели Quiz"""
 
     def get_only_useful_list_fields(self) -> django.db.models.QuerySet:
-        """только нужные поля для списка викторин на главной"""
+        """только нужные поля для списка викторин, описание кратко"""
+        return self.get_published_with_status('description_excerpt')
+
+    def get_only_useful_detail_fields(self) -> django.db.models.QuerySet:
+        """только нужные поля для страницы викторины, описание полностью"""
+        return self.get_published_with_status('description_html')
+
+    def get_published_with_status(
+        self, description_field: str
+    ) -> django.db.models.QuerySet:
+        """
+        опубликованные викторины с полями для карточки
+        текстовый статус считаем в бд по start_time и end_time
+        """
+        now_datetime = django.utils.timezone.now()
+        statuses = self.model.Statuses
         return (
             self.get_queryset()
             .filter(is_published=True)
             .select_related('creator', 'organized_by')
             .only(
                 'name',
-                'description',
+                description_field,
                 'creator__username',
                 'duration',
                 'start_time',
@@ -20,9 +36,61 @@ class QuizManager(django.db.models.Manager):
                 'is_private',
                 'is_ended',
             )
+            .annotate(
+                status_display=django.db.models.Case(
+                    django.db.models.When(
+                        start_time__gt=now_datetime,
+                        then=django.db.models.Value(
+                            statuses.NOT_STARTED.label
+                        ),
+                    ),
+                    django.db.models.When(
+                        end_time__gt=now_datetime,
+                        then=django.db.models.Value(statuses.RUNNING.label),
+                    ),
+                    default=django.db.models.Value(statuses.ENDED.label),
+                    output_field=django.db.models.CharField(),
+                )
+            )
             .order_by('-start_time')
         )
 
+    def filter_running(self) -> django.db.models.QuerySet:
+        """
+        викторины, которые идут сейчас
+        закончившиеся по статусу отсекаем индексом, а время проверяем,
+        потому что планировщик меняет статус с небольшой задержкой
+        """
+        statuses = self.model.Statuses
+        now_datetime = django.utils.timezone.now()
+        return self.get_only_useful_list_fields().filter(
+            status__in=(statuses.NOT_STARTED, statuses.RUNNING),
+            start_time__lte=now_datetime,
+            end_time__gt=now_datetime,
+        )
+
+    def filter_upcoming(self) -> django.db.models.QuerySet:
+        """
+        викторины, которые еще не начались
+        у них всегда статус NOT_STARTED: его ставит сохранение викторины
+        """
+        return (
+            self.get_only_useful_list_fields()
+            .filter(
+                status=self.model.Statuses.NOT_STARTED,
+                start_time__gt=django.utils.timezone.now(),
+            )
+            .order_by('start_time')
+        )
+
+    def filter_status_tab(self, tab: str) -> django.db.models.QuerySet:
+        """викторины для вкладки списка: идут, скоро или все"""
+        if tab == 'running':
+            return self.filter_running()
+        if tab == 'upcoming':
+            return self.filter_upcoming()
+        return self.get_only_useful_list_fields()
+
 
 class UserAnswerManager(django.db.models.Manager):
     """менеджер модели UserAnswer"""
@@ -70,21 +138,30 @@ class QuizResultsManager(django.db.models.Manager):
 class QuestionManager(django.db.models.Manager):
     """менеджер модели Question"""
 
+    def filter_archived(self) -> django.db.models.QuerySet:
+        """вопросы архива: из закончившихся открытых викторин"""
+        return self.get_queryset().filter(
+            quiz__is_ended=True,
+            quiz__is_private=False,
+            quiz__is_published=True,
+        )
+
     def get_only_useful_list_fields(self) -> django.db.models.QuerySet:
-        """только нужные поля для списка архивных вопросов"""
+        """
+        только нужные поля для списка архивных вопросов
+        вместе с готовой статистикой ответов
+        """
         return (
-            self.get_queryset()
-            .select_related('quiz')
-            .filter(
-                quiz__is_ended=True,
-                quiz__is_private=False,
-                quiz__is_published=True,
-            )
+            self.filter_archived()
+            .select_related('quiz', 'stats')
             .only(
                 'id',
                 'name',
                 'difficulty',
                 'quiz__id',
+                'stats__attempts',
+                'stats__accepted',
+                'stats__solvers',
             )
             .order_by('difficulty')
         )
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.16 on 2026-10-18 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0023_quiz_is_published'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranswer',
+            name='during_quiz',
+            field=models.BooleanField(default=False, help_text='Ответ дан во время проведения викторины', verbose_name='во время викторины'),
+        ),
+        migrations.AddConstraint(
+            model_name='useranswer',
+            constraint=models.UniqueConstraint(condition=models.Q(('during_quiz', True)), fields=('user', 'question'), name='unique_user_answer_during_quiz'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_status(apps, schema_editor):
+    """заполняем статус существующих викторин по времени"""
+    quiz_model = apps.get_model('quiz', 'Quiz')
+    now_datetime = django.utils.timezone.now()
+    quizzes = list(
+        quiz_model.objects.exclude(start_time=None).exclude(duration=None)
+    )
+    for quiz_obj in quizzes:
+        end_time = quiz_obj.start_time + django.utils.timezone.timedelta(
+            minutes=quiz_obj.duration
+        )
+        if now_datetime < quiz_obj.start_time:
+            quiz_obj.status = 1
+        elif now_datetime < end_time:
+            quiz_obj.status = 2
+        else:
+            quiz_obj.status = 3
+    quiz_model.objects.bulk_update(quizzes, ('status',), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0024_useranswer_during_quiz'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Не начата'), (2, 'Идет'), (3, 'Закончена')], default=1, help_text='Статус викторины, его обновляет планировщик', verbose_name='статус'),
+        ),
+        migrations.RunPython(fill_status, migrations.RunPython.noop),
+    ]
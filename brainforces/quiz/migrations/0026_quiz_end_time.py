@@ -0,0 +1,41 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_end_time(apps, schema_editor):
+    """считаем время окончания существующих викторин"""
+    quiz_model = apps.get_model('quiz', 'Quiz')
+    quizzes = list(
+        quiz_model.objects.exclude(start_time=None).exclude(duration=None)
+    )
+    for quiz_obj in quizzes:
+        quiz_obj.end_time = quiz_obj.start_time + django.utils.timezone.timedelta(
+            minutes=quiz_obj.duration
+        )
+    quiz_model.objects.bulk_update(quizzes, ('end_time',), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0025_quiz_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='end_time',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Время окончания викторины, считается автоматически', null=True, verbose_name='время окончания'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['is_published', 'is_private', 'start_time'], name='quiz_published_private_start'),
+        ),
+        migrations.RunPython(fill_end_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['end_time'], name='quiz_end_time'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0026_quiz_end_time'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['user', 'time_answered'], name='useranswer_user_time'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    """считаем статистику по существующим ответам"""
+    answer_model = apps.get_model('quiz', 'UserAnswer')
+    stats_model = apps.get_model('quiz', 'QuestionStats')
+    correct = models.Q(is_correct=True)
+    stats_model.objects.bulk_create(
+        stats_model(question_id=values.pop('question'), **values)
+        for values in answer_model.objects.values('question')
+        .annotate(
+            attempts=models.Count('pk'),
+            accepted=models.Count('pk', filter=correct),
+            solvers=models.Count('user', filter=correct, distinct=True),
+            first_solved_at=models.Min('time_answered', filter=correct),
+        )
+        .order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0028_rendered_rich_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(help_text='Вопрос, к которому относится статистика', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.question', verbose_name='вопрос')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Количество всех ответов на вопрос', verbose_name='попытки')),
+                ('accepted', models.PositiveIntegerField(default=0, help_text='Количество верных ответов на вопрос', verbose_name='верные')),
+                ('solvers', models.PositiveIntegerField(default=0, help_text='Количество пользователей, верно ответивших на вопрос', verbose_name='решили')),
+                ('first_solved_at', models.DateTimeField(blank=True, help_text='Время первого верного ответа', null=True, verbose_name='первое решение')),
+            ],
+            options={
+                'verbose_name': 'статистика вопроса',
+                'verbose_name_plural': 'статистика вопросов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['question', 'user'], name='useranswer_question_user'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_positions(apps, schema_editor):
+    """нумеруем вопросы каждой викторины в порядке создания"""
+    question_model = apps.get_model('quiz', 'Question')
+    questions = list(question_model.objects.order_by('quiz', 'pk').only('quiz'))
+    positions = dict()
+    for question in questions:
+        question.position = positions.get(question.quiz_id, 0)
+        positions[question.quiz_id] = question.position + 1
+    question_model.objects.bulk_update(questions, ('position',), batch_size=500)
+
+
+def fill_progress(apps, schema_editor):
+    """собираем маски прогресса из существующих ответов"""
+    answer_model = apps.get_model('quiz', 'UserAnswer')
+    progress_model = apps.get_model('quiz', 'QuizProgress')
+    masks = dict()
+    for user_id, quiz_id, position, is_correct in (
+        answer_model.objects.values_list(
+            'user', 'question__quiz', 'question__position', 'is_correct'
+        ).iterator()
+    ):
+        attempted, solved = masks.setdefault(
+            (user_id, quiz_id), (bytearray(), bytearray())
+        )
+        index, bit = divmod(position, 8)
+        for mask in (attempted, solved) if is_correct else (attempted,):
+            if index >= len(mask):
+                mask.extend(bytes(index - len(mask) + 1))
+            mask[index] |= 1 << bit
+    progress_model.objects.bulk_create(
+        (
+            progress_model(
+                user_id=user_id,
+                quiz_id=quiz_id,
+                attempted=bytes(attempted),
+                solved=bytes(solved),
+            )
+            for (user_id, quiz_id), (attempted, solved) in masks.items()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0029_question_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='position',
+            field=models.PositiveIntegerField(editable=False, help_text='Номер вопроса в викторине, бит в прогрессе участников', null=True, verbose_name='номер'),
+        ),
+        migrations.CreateModel(
+            name='QuizProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempted', models.BinaryField(default=bytes, help_text='Биты вопросов, на которые пользователь отвечал', verbose_name='отвечал')),
+                ('solved', models.BinaryField(default=bytes, help_text='Биты вопросов, на которые пользователь ответил верно', verbose_name='решил')),
+                ('quiz', models.ForeignKey(help_text='Викторина, к которой относятся вопросы', on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='quiz.quiz', verbose_name='викторина')),
+                ('user', models.ForeignKey(help_text='Пользователь, отвечавший на вопросы', on_delete=django.db.models.deletion.CASCADE, related_name='quiz_progress', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'прогресс в викторине',
+                'verbose_name_plural': 'прогресс в викторинах',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='quizprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'quiz'), name='unique_quiz_progress'),
+        ),
+        migrations.RunPython(fill_positions, migrations.RunPython.noop),
+        migrations.RunPython(fill_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0030_quiz_progress'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['quiz', 'position'], name='question_quiz_position'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0031_question_quiz_position'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['is_published', 'status', 'start_time'], name='quiz_published_status_start'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+def fill_positions(apps, schema_editor):
+    """
+    вопросы без номера и вопросы с чужим номером получают номера
+    после последнего в викторине, прогресс в таких викторинах
+    собираем заново из ответов
+    """
+    question_model = apps.get_model('quiz', 'Question')
+    answer_model = apps.get_model('quiz', 'UserAnswer')
+    progress_model = apps.get_model('quiz', 'QuizProgress')
+    last_positions = dict()
+    taken = set()
+    renumbered = list()
+    for question in question_model.objects.order_by('quiz', 'pk').only(
+        'quiz', 'position'
+    ):
+        if question.position is not None:
+            last_positions[question.quiz_id] = max(
+                last_positions.get(question.quiz_id, -1), question.position
+            )
+            if (question.quiz_id, question.position) not in taken:
+                taken.add((question.quiz_id, question.position))
+                continue
+        renumbered.append(question)
+    for question in renumbered:
+        question.position = last_positions.get(question.quiz_id, -1) + 1
+        last_positions[question.quiz_id] = question.position
+    question_model.objects.bulk_update(
+        renumbered, ('position',), batch_size=500
+    )
+    quiz_pks = {question.quiz_id for question in renumbered}
+    if not quiz_pks:
+        return
+    progress_model.objects.filter(quiz__in=quiz_pks).delete()
+    masks = dict()
+    for user_id, quiz_id, position, is_correct in (
+        answer_model.objects.filter(question__quiz__in=quiz_pks)
+        .values_list(
+            'user', 'question__quiz', 'question__position', 'is_correct'
+        )
+        .iterator()
+    ):
+        attempted, solved = masks.setdefault(
+            (user_id, quiz_id), (bytearray(), bytearray())
+        )
+        index, bit = divmod(position, 8)
+        for mask in (attempted, solved) if is_correct else (attempted,):
+            if index >= len(mask):
+                mask.extend(bytes(index - len(mask) + 1))
+            mask[index] |= 1 << bit
+    progress_model.objects.bulk_create(
+        (
+            progress_model(
+                user_id=user_id,
+                quiz_id=quiz_id,
+                attempted=bytes(attempted),
+                solved=bytes(solved),
+            )
+            for (user_id, quiz_id), (attempted, solved) in masks.items()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0032_quiz_status_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_positions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='question',
+            constraint=models.UniqueConstraint(condition=models.Q(('position__isnull', False)), fields=('quiz', 'position'), name='unique_question_position'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-18 02:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0033_question_position_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(help_text='Канал, в который опубликовано событие', max_length=100, verbose_name='канал')),
+                ('message', models.TextField(help_text='Событие в формате server-sent events', verbose_name='событие')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='Когда событие опубликовано', verbose_name='время публикации')),
+            ],
+            options={
+                'verbose_name': 'событие викторины',
+                'verbose_name_plural': 'события викторин',
+            },
+        ),
+    ]
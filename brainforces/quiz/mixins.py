@@ -1,6 +1,7 @@
+import django.http
 import django.views.generic
 
-import quiz.models
+import quiz.access
 
 
 class QuizMixin(django.views.generic.View):
@@ -9,35 +10,16 @@ class QuizMixin(django.views.generic.View):
     может ли он участвовать в викторине и решать вопросы
     статус квиза(не начат, идет, закончен)
     стартовое и конечное время квиза
+    все это загружается одним запросом и запоминается на время запроса
     """
 
+    def get_quiz_access(self) -> quiz.access.QuizAccess:
+        """права пользователя в викторине"""
+        return quiz.access.get_quiz_access(self.request, self.kwargs['pk'])
+
     def get_context_data(self, *args, **kwargs) -> dict:
         context = super().get_context_data(*args, **kwargs)
-        quiz_obj = django.shortcuts.get_object_or_404(
-            quiz.models.Quiz.objects.filter(is_published=True).only(
-                'id', 'is_private', 'start_time', 'duration'
-            ),
-            pk=self.kwargs['pk'],
-        )
-        context['quiz'] = quiz_obj
-        context['can_participate'] = quiz.models.QuizResults.objects.filter(
-            quiz__pk=self.kwargs['pk'], user__pk=self.request.user.pk
-        ).exists()
-        quiz_status = quiz_obj.get_quiz_status()
-        if quiz_status == 1:
-            context['can_access_questions'] = False
-        elif quiz_status == 2:
-            context['can_access_questions'] = context['can_participate']
-        else:
-            context[
-                'can_access_questions'
-            ] = quiz.services.user_can_access_quiz(quiz_obj, self.request.user)
-        context['quiz_status'] = quiz_status
-        context['now_time'] = str(django.utils.timezone.now())
-        context['end_time'] = str(
-            quiz_obj.start_time
-            + django.utils.timezone.timedelta(minutes=quiz_obj.duration)
-        )
+        context.update(self.get_quiz_access().get_context())
         return context
 
 
@@ -45,7 +27,6 @@ class AccessToQuizMixin(QuizMixin):
     """проверяем доступ участника к викторине"""
 
     def get_context_data(self, *args, **kwargs) -> dict:
-        context = super().get_context_data(*args, **kwargs)
-        if not context['can_access_questions']:
+        if not self.get_quiz_access().can_access_questions:
             raise django.http.Http404()
-        return context
+        return super().get_context_data(*args, **kwargs)
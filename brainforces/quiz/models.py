@@ -1,17 +1,26 @@
+import typing
+
 import ckeditor_uploader.fields
 
 import django.core.validators
+import django.db
 import django.db.models
 import django.shortcuts
 import django.urls
 import django.utils.encoding
 import django.utils.timezone
 
+import core.models
+import core.richtext
 import organization.models
 import quiz.managers
 import users.models
 
 
+# сколько раз пробуем занять номер вопроса при одновременных сохранениях
+QUESTION_POSITION_ATTEMPTS = 3
+
+
 class Tag(django.db.models.Model):
     """модель тега для викторины"""
 
@@ -33,11 +42,20 @@ class Tag(django.db.models.Model):
         return self.name[:20]
 
 
-class Quiz(django.db.models.Model):
+class Quiz(core.models.RichTextModel):
     """модель викторины"""
 
     objects = quiz.managers.QuizManager()
 
+    rich_text_fields = ('description',)
+
+    class Statuses(django.db.models.IntegerChoices):
+        """статусы викторины"""
+
+        NOT_STARTED = 1, 'Не начата'
+        RUNNING = 2, 'Идет'
+        ENDED = 3, 'Закончена'
+
     creator = django.db.models.ForeignKey(
         users.models.User,
         verbose_name='создатель',
@@ -58,6 +76,21 @@ class Quiz(django.db.models.Model):
         verbose_name='описание',
     )
 
+    description_html = django.db.models.TextField(
+        verbose_name='описание для показа',
+        help_text='Очищенный html, считается при сохранении',
+        blank=True,
+        editable=False,
+    )
+
+    description_excerpt = django.db.models.CharField(
+        verbose_name='описание кратко',
+        help_text='Начало текста без разметки для списков',
+        max_length=core.richtext.EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+    )
+
     start_time = django.db.models.DateTimeField(
         help_text='Время начала викторины в формате день.месяц.год'
         ' часы:минуты:секунды',
@@ -74,6 +107,14 @@ class Quiz(django.db.models.Model):
         validators=[django.core.validators.MinValueValidator(10)],
     )
 
+    end_time = django.db.models.DateTimeField(
+        help_text='Время окончания викторины, считается автоматически',
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='время окончания',
+    )
+
     is_rated = django.db.models.BooleanField(
         verbose_name='рейтинговая',
         help_text='Изменяется ли рейтинг пользователя после данной викторины',
@@ -108,9 +149,27 @@ class Quiz(django.db.models.Model):
         default=False,
     )
 
+    status = django.db.models.PositiveSmallIntegerField(
+        verbose_name='статус',
+        help_text='Статус викторины, его обновляет планировщик',
+        choices=Statuses.choices,
+        default=Statuses.NOT_STARTED,
+    )
+
     class Meta:
         verbose_name = 'викторина'
         verbose_name_plural = 'викторины'
+        indexes = [
+            django.db.models.Index(
+                fields=('is_published', 'is_private', 'start_time'),
+                name='quiz_published_private_start',
+            ),
+            django.db.models.Index(fields=('end_time',), name='quiz_end_time'),
+            django.db.models.Index(
+                fields=('is_published', 'status', 'start_time'),
+                name='quiz_published_status_start',
+            ),
+        ]
 
     def __str__(self) -> str:
         """строковое представление"""
@@ -122,6 +181,20 @@ class Quiz(django.db.models.Model):
             'quiz:quiz_detail', kwargs={'pk': self.pk}
         )
 
+    def save(self, *args, **kwargs) -> None:
+        """
+        при сохранении считаем время окончания
+        и приводим статус в соответствие со временем
+        """
+        if self.start_time is not None and self.duration is not None:
+            self.end_time = self.start_time + django.utils.timezone.timedelta(
+                minutes=self.duration
+            )
+            self.status = self.get_quiz_status()
+        else:
+            self.end_time = None
+        super().save(*args, **kwargs)
+
     def get_quiz_status(self) -> int:
         """статус викторины"""
         now_datetime = django.utils.timezone.now()
@@ -129,7 +202,7 @@ class Quiz(django.db.models.Model):
             return 1
         elif (
             self.start_time
-            < now_datetime
+            <= now_datetime
             < self.start_time
             + django.utils.timezone.timedelta(minutes=self.duration)
         ):
@@ -195,11 +268,13 @@ class QuizResults(django.db.models.Model):
         return f'Результат {self.pk}'
 
 
-class Question(django.db.models.Model):
+class Question(core.models.RichTextModel):
     """модель вопроса"""
 
     objects = quiz.managers.QuestionManager()
 
+    rich_text_fields = ('text',)
+
     name = django.db.models.CharField(
         max_length=100,
         help_text='Напишите название вопроса',
@@ -210,6 +285,21 @@ class Question(django.db.models.Model):
         help_text='Напишите вопрос', verbose_name='текст'
     )
 
+    text_html = django.db.models.TextField(
+        verbose_name='текст для показа',
+        help_text='Очищенный html, считается при сохранении',
+        blank=True,
+        editable=False,
+    )
+
+    text_excerpt = django.db.models.CharField(
+        verbose_name='текст кратко',
+        help_text='Начало текста без разметки для списков',
+        max_length=core.richtext.EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+    )
+
     quiz = django.db.models.ForeignKey(
         Quiz,
         verbose_name='викторина',
@@ -224,6 +314,13 @@ class Question(django.db.models.Model):
         default=1,
     )
 
+    position = django.db.models.PositiveIntegerField(
+        verbose_name='номер',
+        help_text='Номер вопроса в викторине, бит в прогрессе участников',
+        null=True,
+        editable=False,
+    )
+
     tags = django.db.models.ManyToManyField(
         Tag,
         related_name='questions',
@@ -235,11 +332,52 @@ class Question(django.db.models.Model):
     class Meta:
         verbose_name = 'вопрос'
         verbose_name_plural = 'вопросы'
+        indexes = [
+            django.db.models.Index(
+                fields=('quiz', 'position'), name='question_quiz_position'
+            ),
+        ]
+        constraints = [
+            # номер - бит в масках прогресса, у двух вопросов он общим
+            # быть не может
+            django.db.models.UniqueConstraint(
+                fields=('quiz', 'position'),
+                condition=django.db.models.Q(position__isnull=False),
+                name='unique_question_position',
+            ),
+        ]
 
     def __str__(self) -> str:
         """строковое представление"""
         return self.name[:20]
 
+    def get_next_position(self) -> int:
+        """следующий свободный номер в викторине"""
+        last = Question.objects.filter(quiz__pk=self.quiz_id).aggregate(
+            last=django.db.models.Max('position')
+        )['last']
+        return 0 if last is None else last + 1
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        вопрос без номера получает следующий номер в викторине
+        если этот номер одновременно занял другой вопрос, ограничение
+        уникальности не даст сохранить, и мы берем номер заново
+        """
+        if self.position is not None:
+            super().save(*args, **kwargs)
+            return
+        for attempt in range(QUESTION_POSITION_ATTEMPTS):
+            self.position = self.get_next_position()
+            try:
+                with django.db.transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except django.db.IntegrityError:
+                self.position = None
+                if attempt == QUESTION_POSITION_ATTEMPTS - 1:
+                    raise
+
     def get_absolute_url(self) -> str:
         """путь к question detail"""
         return django.urls.reverse_lazy(
@@ -314,10 +452,202 @@ class UserAnswer(django.db.models.Model):
         null=True,
     )
 
+    during_quiz = django.db.models.BooleanField(
+        verbose_name='во время викторины',
+        help_text='Ответ дан во время проведения викторины',
+        default=False,
+    )
+
     class Meta:
         verbose_name = 'ответ пользователя'
         verbose_name_plural = 'ответы пользователей'
+        constraints = [
+            django.db.models.UniqueConstraint(
+                fields=('user', 'question'),
+                condition=django.db.models.Q(during_quiz=True),
+                name='unique_user_answer_during_quiz',
+            ),
+        ]
+        indexes = [
+            django.db.models.Index(
+                fields=('user', 'time_answered'), name='useranswer_user_time'
+            ),
+            django.db.models.Index(
+                fields=('question', 'user'), name='useranswer_question_user'
+            ),
+        ]
 
     def __str__(self) -> str:
         """строковое представление"""
         return f'Ответ {self.pk}'
+
+
+class QuestionStats(django.db.models.Model):
+    """
+    статистика ответов на вопрос
+    обновляется при отправке ответа, чтобы страницы вопросов, архива
+    и викторины не считали ответы на каждый запрос
+    """
+
+    question = django.db.models.OneToOneField(
+        Question,
+        verbose_name='вопрос',
+        help_text='Вопрос, к которому относится статистика',
+        on_delete=django.db.models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+
+    attempts = django.db.models.PositiveIntegerField(
+        verbose_name='попытки',
+        help_text='Количество всех ответов на вопрос',
+        default=0,
+    )
+
+    accepted = django.db.models.PositiveIntegerField(
+        verbose_name='верные',
+        help_text='Количество верных ответов на вопрос',
+        default=0,
+    )
+
+    solvers = django.db.models.PositiveIntegerField(
+        verbose_name='решили',
+        help_text='Количество пользователей, верно ответивших на вопрос',
+        default=0,
+    )
+
+    first_solved_at = django.db.models.DateTimeField(
+        verbose_name='первое решение',
+        help_text='Время первого верного ответа',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'статистика вопроса'
+        verbose_name_plural = 'статистика вопросов'
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'Статистика вопроса {self.question_id}'
+
+    @property
+    def acceptance(self) -> int:
+        """процент верных ответов"""
+        if not self.attempts:
+            return 0
+        return round(100 * self.accepted / self.attempts)
+
+
+class QuizProgress(django.db.models.Model):
+    """
+    вопросы викторины, на которые пользователь отвечал и которые решил,
+    битовыми масками по номеру вопроса
+    проверки вида "уже решал" - битовые операции без запросов к ответам
+    """
+
+    user = django.db.models.ForeignKey(
+        users.models.User,
+        verbose_name='пользователь',
+        help_text='Пользователь, отвечавший на вопросы',
+        on_delete=django.db.models.CASCADE,
+        related_name='quiz_progress',
+    )
+
+    quiz = django.db.models.ForeignKey(
+        Quiz,
+        verbose_name='викторина',
+        help_text='Викторина, к которой относятся вопросы',
+        on_delete=django.db.models.CASCADE,
+        related_name='progress',
+    )
+
+    attempted = django.db.models.BinaryField(
+        verbose_name='отвечал',
+        help_text='Биты вопросов, на которые пользователь отвечал',
+        default=bytes,
+    )
+
+    solved = django.db.models.BinaryField(
+        verbose_name='решил',
+        help_text='Биты вопросов, на которые пользователь ответил верно',
+        default=bytes,
+    )
+
+    class Meta:
+        verbose_name = 'прогресс в викторине'
+        verbose_name_plural = 'прогресс в викторинах'
+        constraints = [
+            django.db.models.UniqueConstraint(
+                fields=('user', 'quiz'), name='unique_quiz_progress'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'Прогресс {self.user_id} в викторине {self.quiz_id}'
+
+    @staticmethod
+    def has_bit(mask: bytes, position: typing.Optional[int]) -> bool:
+        """выставлен ли бит вопроса в маске, у вопроса без номера - нет"""
+        if position is None:
+            return False
+        index, bit = divmod(position, 8)
+        return index < len(mask) and bool(mask[index] >> bit & 1)
+
+    @staticmethod
+    def with_bit(mask: bytes, position: int) -> bytes:
+        """маска с выставленным битом вопроса"""
+        index, bit = divmod(position, 8)
+        result = bytearray(mask)
+        if index >= len(result):
+            result.extend(bytes(index - len(result) + 1))
+        result[index] |= 1 << bit
+        return bytes(result)
+
+    def has_attempted(self, position: typing.Optional[int]) -> bool:
+        """отвечал ли пользователь на вопрос"""
+        return self.has_bit(self.attempted, position)
+
+    def has_solved(self, position: typing.Optional[int]) -> bool:
+        """решил ли пользователь вопрос"""
+        return self.has_bit(self.solved, position)
+
+    def mark(self, position: int, is_correct: bool) -> None:
+        """учитываем ответ на вопрос"""
+        self.attempted = self.with_bit(self.attempted, position)
+        if is_correct:
+            self.solved = self.with_bit(self.solved, position)
+
+
+class QuizEvent(django.db.models.Model):
+    """
+    событие викторины в бд для подписчиков в других процессах
+    строки старше QUIZ_EVENTS_KEEP_SECONDS удаляются
+    """
+
+    channel = django.db.models.CharField(
+        verbose_name='канал',
+        help_text='Канал, в который опубликовано событие',
+        max_length=100,
+    )
+
+    message = django.db.models.TextField(
+        verbose_name='событие',
+        help_text='Событие в формате server-sent events',
+    )
+
+    created_at = django.db.models.DateTimeField(
+        verbose_name='время публикации',
+        help_text='Когда событие опубликовано',
+        default=django.utils.timezone.now,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'событие викторины'
+        verbose_name_plural = 'события викторин'
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'Событие {self.pk} в канале {self.channel}'
@@ -0,0 +1,47 @@
+import typing
+
+import django.db
+
+import quiz.models
+
+
+def load_progress(
+    user_pk: typing.Optional[int], quiz_pk: int
+) -> quiz.models.QuizProgress:
+    """
+    прогресс пользователя в викторине одним запросом,
+    если пользователь еще не отвечал - пустой
+    """
+    progress = None
+    if user_pk is not None:
+        progress = (
+            quiz.models.QuizProgress.objects.filter(
+                user__pk=user_pk, quiz__pk=quiz_pk
+            )
+            .only('attempted', 'solved')
+            .first()
+        )
+    if progress is None:
+        progress = quiz.models.QuizProgress(user_id=user_pk, quiz_id=quiz_pk)
+    return progress
+
+
+def lock_progress(user_pk: int, quiz_pk: int) -> quiz.models.QuizProgress:
+    """
+    прогресс пользователя в викторине с блокировкой строки,
+    ответы одного пользователя в викторине проверяются по очереди
+    вызывается внутри транзакции
+    """
+    progress_objects = quiz.models.QuizProgress.objects.select_for_update()
+    progress = progress_objects.filter(
+        user__pk=user_pk, quiz__pk=quiz_pk
+    ).first()
+    if progress is not None:
+        return progress
+    try:
+        with django.db.transaction.atomic():
+            return quiz.models.QuizProgress.objects.create(
+                user_id=user_pk, quiz_id=quiz_pk
+            )
+    except django.db.IntegrityError:
+        return progress_objects.get(user__pk=user_pk, quiz__pk=quiz_pk)
@@ -0,0 +1,111 @@
+import collections
+import typing
+
+import django.conf
+import django.utils.module_loading
+
+
+class RatingSystem:
+    """
+    базовый класс системы подсчета рейтинга
+    на вход получает списки решенных задач, рейтингов до викторины
+    и рейтингов, накопленных во время викторины, по участникам,
+    возвращает новые рейтинги в том же порядке
+    """
+
+    def calculate(
+        self,
+        solved: typing.Sequence[int],
+        ratings_before: typing.Sequence[int],
+        ratings_after: typing.Sequence[int],
+    ) -> typing.List[int]:
+        raise NotImplementedError
+
+
+class DifficultyRating(RatingSystem):
+    """
+    рейтинг растет на сложность каждого решенного вопроса
+    он уже накоплен в rating_after при отправке ответов
+    """
+
+    def calculate(
+        self,
+        solved: typing.Sequence[int],
+        ratings_before: typing.Sequence[int],
+        ratings_after: typing.Sequence[int],
+    ) -> typing.List[int]:
+        return list(ratings_after)
+
+
+class EloRating(RatingSystem):
+    """
+    рейтинг в стиле Эло/Codeforces
+    ожидаемое место участника - 1 плюс сумма вероятностей того,
+    что его обойдет каждый другой участник,
+    изменение рейтинга пропорционально разнице ожидаемого и реального мест
+    участников с одинаковым рейтингом считаем вместе, поэтому
+    сложность O(n log n + k^2), где k - число различных рейтингов
+    """
+
+    k_factor = 64
+
+    @staticmethod
+    def win_probability(rating: int, other_rating: int) -> float:
+        """вероятность того, что участник с other_rating обойдет rating"""
+        return 1 / (1 + 10 ** ((rating - other_rating) / 400))
+
+    @staticmethod
+    def get_places(solved: typing.Sequence[int]) -> typing.List[float]:
+        """места участников, при равенстве берем среднее место группы"""
+        solved_counts = collections.Counter(solved)
+        places, better = dict(), 0
+        for solved_value in sorted(solved_counts, reverse=True):
+            count = solved_counts[solved_value]
+            places[solved_value] = better + (count + 1) / 2
+            better += count
+        return [places[solved_value] for solved_value in solved]
+
+    def get_seeds(
+        self, ratings_before: typing.Sequence[int]
+    ) -> typing.Dict[int, float]:
+        """ожидаемое место для каждого различного рейтинга"""
+        rating_counts = collections.Counter(ratings_before)
+        # в сумму попадает и сам участник с вероятностью 0.5
+        return {
+            rating: 0.5
+            + sum(
+                count * self.win_probability(rating, other_rating)
+                for other_rating, count in rating_counts.items()
+            )
+            for rating in rating_counts
+        }
+
+    def calculate(
+        self,
+        solved: typing.Sequence[int],
+        ratings_before: typing.Sequence[int],
+        ratings_after: typing.Sequence[int],
+    ) -> typing.List[int]:
+        participants_count = len(solved)
+        if participants_count < 2:
+            return list(ratings_before)
+        seeds = self.get_seeds(ratings_before)
+        return [
+            max(
+                0,
+                rating
+                + round(
+                    self.k_factor
+                    * (seeds[rating] - place)
+                    / (participants_count - 1)
+                ),
+            )
+            for rating, place in zip(ratings_before, self.get_places(solved))
+        ]
+
+
+def get_rating_system() -> RatingSystem:
+    """система подсчета рейтинга из настроек"""
+    return django.utils.module_loading.import_string(
+        django.conf.settings.QUIZ_RATING_SYSTEM
+    )()
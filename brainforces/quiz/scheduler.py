@@ -0,0 +1,115 @@
+import heapq
+import itertools
+import typing
+
+import django.conf
+import django.utils.timezone
+
+import core.cache
+import quiz.models
+import quiz.services
+import quiz.signals
+
+
+WARM = 'warm'
+SYNC = 'sync'
+
+
+class QuizScheduler:
+    """
+    планировщик жизненного цикла викторин
+    события (прогрев перед стартом, старт, конец) лежат в куче
+    по времени наступления, поэтому ближайшее событие берется за O(log n)
+    при наступлении старта или конца статус викторины
+    пересчитывается по свежим данным из бд, так что устаревшие
+    события после изменения времени викторины ничего не ломают
+    """
+
+    def __init__(self) -> None:
+        self._heap: typing.List[tuple] = list()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(
+        self, event_time: django.utils.timezone.datetime, event: str, pk: int
+    ) -> None:
+        """добавляем событие в кучу"""
+        heapq.heappush(
+            self._heap, (event_time, next(self._counter), event, pk)
+        )
+
+    def load(self) -> None:
+        """строим кучу событий заново по незакончившимся викторинам"""
+        self._heap = list()
+        warmup = django.utils.timezone.timedelta(
+            seconds=django.conf.settings.QUIZ_WARMUP_SECONDS
+        )
+        quizzes = (
+            quiz.models.Quiz.objects.filter(
+                is_published=True,
+                status__in=(
+                    quiz.models.Quiz.Statuses.NOT_STARTED,
+                    quiz.models.Quiz.Statuses.RUNNING,
+                ),
+            )
+            .exclude(start_time=None)
+            .exclude(end_time=None)
+            .only('start_time', 'end_time', 'status')
+        )
+        for quiz_obj in quizzes:
+            if quiz_obj.status == quiz.models.Quiz.Statuses.NOT_STARTED:
+                self.push(quiz_obj.start_time - warmup, WARM, quiz_obj.pk)
+                self.push(quiz_obj.start_time, SYNC, quiz_obj.pk)
+            self.push(quiz_obj.end_time, SYNC, quiz_obj.pk)
+
+    def next_event_time(
+        self,
+    ) -> typing.Optional[django.utils.timezone.datetime]:
+        """время ближайшего события"""
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self) -> int:
+        """обрабатываем наступившие события, возвращаем их количество"""
+        events_count = 0
+        now_datetime = django.utils.timezone.now()
+        while self._heap and self._heap[0][0] <= now_datetime:
+            _, _, event, pk = heapq.heappop(self._heap)
+            if event == WARM:
+                quiz.signals.quiz_starting.send(
+                    sender=quiz.models.Quiz, quiz_pk=pk
+                )
+            else:
+                sync_quiz_status(pk)
+            events_count += 1
+        return events_count
+
+
+def sync_quiz_status(quiz_pk: int) -> None:
+    """
+    приводим сохраненный статус викторины в соответствие со временем
+    при окончании викторины ставим в очередь подведение итогов
+    """
+    quiz_obj = (
+        quiz.models.Quiz.objects.filter(pk=quiz_pk)
+        .only('start_time', 'duration', 'status', 'is_ended')
+        .first()
+    )
+    if (
+        quiz_obj is None
+        or quiz_obj.start_time is None
+        or quiz_obj.duration is None
+    ):
+        return
+    new_status = quiz_obj.get_quiz_status()
+    if new_status <= quiz_obj.status:
+        return
+    # статус меняем, только если его никто не поменял раньше нас
+    if not quiz.models.Quiz.objects.filter(
+        pk=quiz_pk, status=quiz_obj.status
+    ).update(status=new_status):
+        return
+    core.cache.touch(quiz.models.Quiz)
+    if new_status == quiz.models.Quiz.Statuses.ENDED and not quiz_obj.is_ended:
+        quiz.services.enqueue_quiz_results(quiz_pk)
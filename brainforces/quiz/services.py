@@ -1,8 +1,33 @@
-import organization.models
+import typing
+
+import django.conf
+import django.db
+import django.db.models
+
+import archive.facets
+import core.cache
+import core.models
+import core.uploads
+import organization.membership
+import quiz.events
 import quiz.models
+import quiz.progress
+import quiz.rating
+import quiz.standings
+import quiz.stats
+import search.services
+import users.leaderboard
 import users.models
 
 
+class QuestionDraft(typing.NamedTuple):
+    """несохраненный вопрос с вариантами ответа и тегами"""
+
+    question: quiz.models.Question
+    variants: typing.List[quiz.models.Variant]
+    tag_pks: typing.List[int]
+
+
 def user_can_access_quiz(
     quiz_obj: quiz.models.Quiz, user_obj: users.models.User
 ) -> bool:
@@ -10,51 +35,245 @@ def user_can_access_quiz(
     может ли пользователь зайти в викторину
     она не приватная или пользователь участник
     проводящей организации
+    если викторина загружена через quiz.access,
+    членство уже посчитано в аннотации is_member
     """
-    org_to_user_manager = organization.models.OrganizationToUser.objects
-    return not quiz_obj.is_private or (
-        quiz_obj.is_private
-        and (
-            org_to_user_manager.get_organization_member(
-                pk=quiz_obj.organized_by.pk, user_pk=user_obj.pk
+    if not quiz_obj.is_private:
+        return True
+    is_member = getattr(quiz_obj, 'is_member', None)
+    if is_member is not None:
+        return is_member
+    roles = organization.membership.load_user_roles(user_obj.pk)
+    return roles.get(quiz_obj.organized_by_id) in (1, 2, 3)
+
+
+def submit_answer(
+    user_obj: users.models.User,
+    question_obj: quiz.models.Question,
+    variant_pk: typing.Any,
+) -> typing.Optional[bool]:
+    """
+    сохраняем ответ пользователя на вопрос
+    отвеченные и решенные вопросы берем из битовых масок прогресса
+    пользователя в викторине, строка прогресса блокируется
+    на время сохранения ответа
+    во время викторины на вопрос можно ответить только один раз,
+    повторный ответ отклоняется по маске без записи в бд,
+    ограничение уникальности в бд остается страховкой
+    счетчик решенных задач и статистику вопроса
+    увеличиваем атомарно через F()
+    возвращаем правильность ответа или None,
+    если ответ во время викторины уже был
+    """
+    quiz_obj = question_obj.quiz
+    during_quiz = quiz_obj.get_quiz_status() == 2
+    is_correct = quiz.models.Variant.objects.filter(
+        pk=variant_pk, question__pk=question_obj.pk, is_correct=True
+    ).exists()
+    if question_obj.position is None:
+        # вопрос загружен в обход save, например loaddata, и без номера
+        question_obj.save(update_fields=('position',))
+    position = question_obj.position
+    try:
+        with django.db.transaction.atomic():
+            progress = quiz.progress.lock_progress(user_obj.pk, quiz_obj.pk)
+            if during_quiz and progress.has_attempted(position):
+                return None
+            is_new_solve = is_correct and not progress.has_solved(position)
+            answer_obj = quiz.models.UserAnswer.objects.create(
+                user=user_obj,
+                question=question_obj,
+                is_correct=is_correct,
+                during_quiz=during_quiz,
             )
-        )
-    )
+            progress.mark(position, is_correct)
+            progress.save(update_fields=('attempted', 'solved'))
+            quiz.stats.record_answer(
+                question_obj.pk,
+                is_correct,
+                is_new_solve,
+                answer_obj.time_answered,
+            )
+            quiz.events.on_commit_publish(
+                quiz.events.verdicts_channel(quiz_obj.pk, user_obj.pk),
+                'verdict',
+                {
+                    'question_id': question_obj.pk,
+                    'question_name': question_obj.name,
+                    'is_correct': is_correct,
+                    'time_answered': answer_obj.time_answered.isoformat(),
+                },
+            )
+            if during_quiz and is_new_solve:
+                add_rating = quiz_obj.is_rated and not quiz_obj.is_private
+                results = quiz.models.QuizResults.objects.filter(
+                    quiz__pk=quiz_obj.pk, user__pk=user_obj.pk
+                )
+                if results.update(
+                    solved=django.db.models.F('solved') + 1,
+                    rating_after=django.db.models.F('rating_after')
+                    + (question_obj.difficulty if add_rating else 0),
+                ):
+                    # строка заблокирована нашим UPDATE до коммита
+                    quiz.standings.on_commit_solved(
+                        quiz_obj.pk,
+                        user_obj.pk,
+                        results.values_list('solved', flat=True).get(),
+                    )
+    except django.db.IntegrityError:
+        return None
+    if quiz_obj.is_ended:
+        # статистику вопросов архива показывают закешированные страницы
+        core.cache.touch(quiz.models.QuestionStats)
+    return is_correct
 
 
 def make_quiz_results(quiz_obj: quiz.models.Quiz) -> None:
     """
     подводим итоги викторины
-    изменяем рейтинг пользователя,
-    его место в топе участников викторины
+    места берем из таблицы положения, построенной из бд,
+    новый рейтинг считает система рейтинга из настроек
+    результаты сохраняем одним bulk_update,
+    рейтинг в профилях обновляем одним UPDATE из результатов,
+    затем пересчитываем места участников в общем рейтинге
     """
     quiz_results = list(
-        quiz.models.QuizResults.objects.filter(quiz__pk=quiz_obj.pk)
-        .select_related('user')
-        .order_by('-solved')
+        quiz.models.QuizResults.objects.filter(quiz__pk=quiz_obj.pk).only(
+            'id', 'user', 'solved', 'rating_before', 'rating_after'
+        )
     )
+    standings = quiz.standings.load_standings(quiz_obj.pk)
     add_rating = quiz_obj.is_rated and not quiz_obj.is_private
-    cur_place = 1
-    to_update_profiles, quiz_results_objects = list(), list()
-    profile_objects = users.models.Profile.objects.filter(
-        user__pk__in=(quiz_result.user.pk for quiz_result in quiz_results)
-    )
-    for result_ind in range(len(quiz_results)):
+    if add_rating:
+        new_ratings = quiz.rating.get_rating_system().calculate(
+            [result.solved for result in quiz_results],
+            [result.rating_before for result in quiz_results],
+            [result.rating_after for result in quiz_results],
+        )
+    else:
+        new_ratings = [result.rating_before for result in quiz_results]
+    for result, new_rating in zip(quiz_results, new_ratings):
+        result.place = standings.rank(result.user_id)
+        result.rating_after = new_rating
+    with django.db.transaction.atomic():
+        quiz.models.QuizResults.objects.bulk_update(
+            quiz_results,
+            ('place', 'rating_after'),
+            batch_size=django.conf.settings.QUIZ_RESULTS_BATCH_SIZE,
+        )
         if add_rating:
-            profile_obj = profile_objects[result_ind]
-            profile_obj.rating = quiz_results[result_ind].rating_after
-            to_update_profiles.append(profile_obj)
-        if (
-            result_ind != 0
-            and quiz_results[result_ind].solved
-            != quiz_results[result_ind - 1].solved
-        ):
-            cur_place += 1
-        quiz_results[result_ind].place = cur_place
-        quiz_results_objects.append(quiz_results[result_ind])
+            users.models.Profile.objects.filter(
+                user__results__quiz__pk=quiz_obj.pk
+            ).update(
+                rating=django.db.models.Subquery(
+                    quiz.models.QuizResults.objects.filter(
+                        quiz__pk=quiz_obj.pk,
+                        user__pk=django.db.models.OuterRef('user__pk'),
+                    ).values('rating_after')[:1]
+                )
+            )
+            users.leaderboard.update_leaderboard(
+                result.user_id for result in quiz_results
+            )
+        quiz.models.Quiz.objects.filter(pk=quiz_obj.pk).update(is_ended=True)
     quiz_obj.is_ended = True
-    quiz_obj.save()
-    users.models.Profile.objects.bulk_update(to_update_profiles, ('rating',))
-    quiz.models.QuizResults.objects.bulk_update(
-        quiz_results_objects, ('place',)
+    quiz.standings.forget_standings(quiz_obj.pk)
+    archive.facets.refresh_quiz_facets(quiz_obj.pk)
+    # массовые обновления сигналов не отправляют
+    core.cache.touch(quiz.models.Quiz)
+    if add_rating:
+        core.cache.touch(users.models.Profile)
+
+
+def get_results_job_key(quiz_pk: int) -> str:
+    """ключ фоновой задачи подведения итогов викторины"""
+    return f'make_quiz_results:{quiz_pk}'
+
+
+def make_quiz_results_by_pk(quiz_pk: int) -> None:
+    """фоновая задача подведения итогов викторины"""
+    quiz_obj = (
+        quiz.models.Quiz.objects.filter(pk=quiz_pk, is_ended=False)
+        .only('is_rated', 'is_private')
+        .first()
+    )
+    if quiz_obj is not None:
+        make_quiz_results(quiz_obj)
+
+
+def enqueue_quiz_results(quiz_pk: int) -> core.models.Job:
+    """ставим подведение итогов викторины в очередь задач"""
+    return core.models.Job.objects.enqueue(
+        'quiz.services.make_quiz_results_by_pk',
+        key=get_results_job_key(quiz_pk),
+        quiz_pk=quiz_pk,
+    )
+
+
+def bulk_create_questions(
+    quiz_obj: quiz.models.Quiz,
+    drafts: typing.Sequence[QuestionDraft],
+    first_position: int = 0,
+) -> typing.List[quiz.models.Question]:
+    """
+    сохраняем вопросы викторины пачками через bulk_create,
+    затем так же варианты ответа и связи с тегами
+    номера вопросов идут подряд с first_position
+    бд без RETURNING (sqlite) id не возвращает,
+    тогда берем их одним запросом по номерам вопросов
+    вызывается внутри транзакции, сигналы сохранения не отправляются,
+    поэтому html текстов и ссылки на загрузки считаем здесь,
+    а поисковые документы строим после фиксации транзакции
+    """
+    batch_size = django.conf.settings.QUIZ_QUESTIONS_BATCH_SIZE
+    questions = [draft.question for draft in drafts]
+    for position, question_obj in enumerate(questions, first_position):
+        question_obj.quiz = quiz_obj
+        question_obj.position = position
+        question_obj.render_rich_text()
+    quiz.models.Question.objects.bulk_create(questions, batch_size=batch_size)
+    if questions and questions[0].pk is None:
+        pks = dict(
+            quiz.models.Question.objects.filter(
+                quiz__pk=quiz_obj.pk,
+                position__gte=first_position,
+                position__lt=first_position + len(questions),
+            ).values_list('position', 'pk')
+        )
+        for question_obj in questions:
+            question_obj.pk = pks[question_obj.position]
+            question_obj._state.adding = False
+    variants = list()
+    tag_links = list()
+    through = quiz.models.Question.tags.through
+    for draft in drafts:
+        for variant in draft.variants:
+            variant.question_id = draft.question.pk
+            variants.append(variant)
+        tag_links.extend(
+            through(question_id=draft.question.pk, tag_id=tag_pk)
+            for tag_pk in set(draft.tag_pks)
+        )
+    quiz.models.Variant.objects.bulk_create(variants, batch_size=batch_size)
+    through.objects.bulk_create(tag_links, batch_size=batch_size)
+    core.uploads.add_references(questions)
+    search.services.index_on_commit(
+        search.services.Kinds.QUESTION,
+        [question_obj.pk for question_obj in questions],
     )
+    return questions
+
+
+def create_quiz(
+    quiz_obj: quiz.models.Quiz, drafts: typing.Sequence[QuestionDraft]
+) -> quiz.models.Quiz:
+    """
+    сохраняем новую викторину вместе с вопросами одной транзакцией,
+    количество запросов не зависит от количества вопросов
+    """
+    with django.db.transaction.atomic():
+        quiz_obj.save()
+        bulk_create_questions(quiz_obj, drafts)
+    # массовые вставки сигналов не отправляют
+    core.cache.touch(quiz.models.Question)
+    return quiz_obj
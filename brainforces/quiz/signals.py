@@ -0,0 +1,64 @@
+import django.conf
+import django.db
+import django.db.models.signals
+import django.dispatch
+
+import quiz.models
+
+
+# викторина скоро начнется, можно прогреть кеши
+# аргументы: quiz_pk
+quiz_starting = django.dispatch.Signal()
+
+
+@django.dispatch.receiver(quiz_starting)
+def prepare_quiz_start(sender: type, quiz_pk: int, **kwargs) -> None:
+    """
+    заранее создаем строки статистики вопросов и прогресса
+    зарегистрированных участников, чтобы первые ответы после старта
+    только обновляли их и не спорили за вставку
+    """
+    question_pks = quiz.models.Question.objects.filter(
+        quiz__pk=quiz_pk, stats=None
+    ).values_list('pk', flat=True)
+    user_pks = (
+        quiz.models.QuizResults.objects.filter(quiz__pk=quiz_pk)
+        .exclude(
+            user__pk__in=quiz.models.QuizProgress.objects.filter(
+                quiz__pk=quiz_pk
+            ).values('user__pk')
+        )
+        .values_list('user__pk', flat=True)
+    )
+    batch_size = django.conf.settings.QUIZ_RESULTS_BATCH_SIZE
+    with django.db.transaction.atomic():
+        quiz.models.QuestionStats.objects.bulk_create(
+            (
+                quiz.models.QuestionStats(question_id=question_pk)
+                for question_pk in question_pks
+            ),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        quiz.models.QuizProgress.objects.bulk_create(
+            (
+                quiz.models.QuizProgress(user_id=user_pk, quiz_id=quiz_pk)
+                for user_pk in user_pks
+            ),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=quiz.models.Question
+)
+def number_loaded_question(
+    sender: type, instance: quiz.models.Question, raw: bool, **kwargs
+) -> None:
+    """
+    loaddata сохраняет вопросы в обход save, и вопрос из фикстуры
+    без номера получает его здесь
+    """
+    if raw and instance.position is None:
+        instance.save(update_fields=('position',))
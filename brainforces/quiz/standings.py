@@ -0,0 +1,319 @@
+import bisect
+import collections
+import threading
+import time
+import typing
+
+import django.conf
+import django.db
+
+import core.pagination
+import quiz.events
+import quiz.models
+
+
+# ключ строки в массиве таблицы: (-solved, user_id)
+Key = typing.Tuple[int, int]
+
+
+class ChangedRange(typing.NamedTuple):
+    """
+    строки, которые изменились: с ключа first по ключ last включительно,
+    None - от начала или до конца таблицы
+    """
+
+    first: typing.Optional[Key]
+    last: typing.Optional[Key]
+
+
+class StandingsRow(typing.NamedTuple):
+    """строка таблицы положения"""
+
+    rank: int
+    user_id: int
+    solved: int
+
+
+class QuizStandings:
+    """
+    таблица положения участников одной викторины в памяти
+    участники хранятся в отсортированном массиве по ключу (-solved, user_id),
+    отдельно храним отсортированный массив различных значений solved,
+    поэтому плотное место участника ищется бинпоиском,
+    а страница таблицы - срезом массива
+    """
+
+    def __init__(
+        self, results: typing.Iterable[typing.Tuple[int, int]]
+    ) -> None:
+        self._lock = threading.Lock()
+        self._solved = dict(results)
+        self._keys = sorted(
+            (-solved, user_id) for user_id, solved in self._solved.items()
+        )
+        self._counts: typing.Dict[int, int] = dict()
+        for solved in self._solved.values():
+            self._counts[solved] = self._counts.get(solved, 0) + 1
+        self._levels = sorted(-solved for solved in self._counts)
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(
+        self, index: typing.Union[int, slice]
+    ) -> typing.Union[StandingsRow, typing.List[StandingsRow]]:
+        """строка или страница таблицы с плотными местами"""
+        with self._lock:
+            if isinstance(index, slice):
+                return [self._make_row(key) for key in self._keys[index]]
+            return self._make_row(self._keys[index])
+
+    def _make_row(self, key: Key) -> StandingsRow:
+        """строка таблицы по ключу массива"""
+        negative_solved, user_id = key
+        return StandingsRow(
+            rank=bisect.bisect_left(self._levels, negative_solved) + 1,
+            user_id=user_id,
+            solved=-negative_solved,
+        )
+
+    def _add_level(self, solved: int) -> bool:
+        """
+        учитываем участника с данным количеством решенных задач,
+        True - появилось новое место
+        """
+        is_new = solved not in self._counts
+        if is_new:
+            bisect.insort(self._levels, -solved)
+        self._counts[solved] = self._counts.get(solved, 0) + 1
+        return is_new
+
+    def _remove_level(self, solved: int) -> bool:
+        """
+        убираем участника с данным количеством решенных задач,
+        True - место исчезло
+        """
+        self._counts[solved] -= 1
+        if self._counts[solved]:
+            return False
+        del self._counts[solved]
+        del self._levels[bisect.bisect_left(self._levels, -solved)]
+        return True
+
+    def seek(
+        self,
+        key: typing.Optional[Key],
+        limit: int,
+        reverse: bool,
+    ) -> typing.List[StandingsRow]:
+        """
+        limit строк после ключа (-solved, user_id) бинпоиском,
+        при reverse - до ключа в обратном порядке
+        """
+        with self._lock:
+            if not reverse:
+                start = 0
+                if key is not None:
+                    start = bisect.bisect_right(self._keys, key)
+                keys = self._keys[start : start + limit]
+            else:
+                end = len(self._keys)
+                if key is not None:
+                    end = bisect.bisect_left(self._keys, key)
+                keys = self._keys[max(end - limit, 0) : end][::-1]
+            return [self._make_row(row_key) for row_key in keys]
+
+    def rank(self, user_id: int) -> typing.Optional[int]:
+        """плотное место участника или None, если его нет в таблице"""
+        with self._lock:
+            if user_id not in self._solved:
+                return None
+            return bisect.bisect_left(self._levels, -self._solved[user_id]) + 1
+
+    def row(self, user_id: int) -> typing.Optional[StandingsRow]:
+        """строка участника или None, если его нет в таблице"""
+        with self._lock:
+            if user_id not in self._solved:
+                return None
+            return self._make_row((-self._solved[user_id], user_id))
+
+    def _set_solved(self, user_id: int, solved: int) -> ChangedRange:
+        """
+        перемещаем участника на новое место в массиве
+        возвращаем строки, которые изменились: между старым и новым
+        ключом участника сдвинулся порядок, а если место появилось
+        или исчезло, то у всех строк ниже сдвинулись и места
+        """
+        new_key = (-solved, user_id)
+        keys = [new_key]
+        levels_changed = False
+        if user_id in self._solved:
+            old_solved = self._solved[user_id]
+            old_key = (-old_solved, user_id)
+            del self._keys[bisect.bisect_left(self._keys, old_key)]
+            levels_changed = self._remove_level(old_solved)
+            keys.append(old_key)
+        self._solved[user_id] = solved
+        bisect.insort(self._keys, new_key)
+        levels_changed = self._add_level(solved) or levels_changed
+        return ChangedRange(min(keys), None if levels_changed else max(keys))
+
+    def set_solved(self, user_id: int, solved: int) -> ChangedRange:
+        """добавляем участника или обновляем количество решенных задач"""
+        with self._lock:
+            return self._set_solved(user_id, solved)
+
+    def add_participant(self, user_id: int) -> typing.Optional[ChangedRange]:
+        """
+        добавляем участника без решенных задач, если его еще нет,
+        None - таблица не изменилась
+        """
+        with self._lock:
+            if user_id in self._solved:
+                return None
+            return self._set_solved(user_id, 0)
+
+    def add_solved(self, user_id: int) -> ChangedRange:
+        """участник решил еще одну задачу"""
+        with self._lock:
+            return self._set_solved(user_id, self._solved.get(user_id, 0) + 1)
+
+
+class StandingsPaginator(core.pagination.KeysetPaginator):
+    """
+    постраничный вывод таблицы положения по курсору
+    ключ строки - (-solved, user_id), как в массиве таблицы
+    """
+
+    @property
+    def count(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def approximate_count(self) -> int:
+        return len(self.object_list)
+
+    def get_key(self, obj: StandingsRow) -> Key:
+        return (-obj.solved, obj.user_id)
+
+    def fetch(
+        self,
+        key: typing.Optional[typing.Sequence[typing.Any]],
+        limit: int,
+        reverse: bool,
+    ) -> typing.List[StandingsRow]:
+        if key is not None:
+            try:
+                key = (int(key[0]), int(key[1]))
+            except (IndexError, TypeError, ValueError):
+                raise core.pagination.InvalidCursorError()
+        return self.object_list.seek(key, limit, reverse)
+
+
+# таблицы последних просмотренных викторин,
+# самые давние вытесняются сверх STANDINGS_MAX_QUIZZES
+_standings: typing.OrderedDict[int, QuizStandings] = collections.OrderedDict()
+_standings_lock = threading.Lock()
+
+
+def load_standings(quiz_pk: int) -> QuizStandings:
+    """строим таблицу положения викторины из бд"""
+    return QuizStandings(
+        quiz.models.QuizResults.objects.filter(quiz__pk=quiz_pk).values_list(
+            'user__pk', 'solved'
+        )
+    )
+
+
+def get_cached_standings(quiz_pk: int) -> typing.Optional[QuizStandings]:
+    """таблица из памяти процесса, если она там есть"""
+    with _standings_lock:
+        standings = _standings.get(quiz_pk)
+        if standings is not None:
+            _standings.move_to_end(quiz_pk)
+    return standings
+
+
+def rebuild_standings(quiz_pk: int) -> QuizStandings:
+    """строим таблицу положения викторины заново и запоминаем ее"""
+    standings = load_standings(quiz_pk)
+    with _standings_lock:
+        _standings[quiz_pk] = standings
+        _standings.move_to_end(quiz_pk)
+        while len(_standings) > django.conf.settings.STANDINGS_MAX_QUIZZES:
+            _standings.popitem(last=False)
+    return standings
+
+
+def forget_standings(quiz_pk: int) -> None:
+    """
+    итоги викторины подведены, таблица больше не меняется,
+    освобождаем память, при просмотре она построится заново
+    """
+    with _standings_lock:
+        _standings.pop(quiz_pk, None)
+
+
+def get_standings(quiz_pk: int) -> QuizStandings:
+    """
+    таблица положения викторины
+    таблица строится из бд при первом обращении
+    и периодически перестраивается, чтобы подхватить изменения,
+    сделанные в других процессах
+    """
+    standings = get_cached_standings(quiz_pk)
+    if (
+        standings is None
+        or time.monotonic() - standings.built_at
+        > django.conf.settings.STANDINGS_REFRESH_SECONDS
+    ):
+        standings = rebuild_standings(quiz_pk)
+    return standings
+
+
+def publish_changes(quiz_pk: int, changed: ChangedRange) -> None:
+    """
+    публикуем подписчикам таблицы положения диапазон изменившихся строк,
+    страница, которая его задевает, перезагружает свои строки
+    """
+    quiz.events.publish(
+        quiz.events.standings_channel(quiz_pk),
+        'standings',
+        changed._asdict(),
+    )
+
+
+def on_commit_solved(quiz_pk: int, user_pk: int, solved: int) -> None:
+    """
+    после коммита записываем участнику количество решенных задач из бд
+    таблица могла перестроиться уже с этим решением,
+    поэтому значение ставим, а не прибавляем
+    """
+
+    def update() -> None:
+        standings = get_cached_standings(quiz_pk)
+        if standings is None:
+            rebuild_standings(quiz_pk)
+            changed = ChangedRange(None, None)
+        else:
+            changed = standings.set_solved(user_pk, solved)
+        publish_changes(quiz_pk, changed)
+
+    django.db.transaction.on_commit(update)
+
+
+def on_commit_registered(quiz_pk: int, user_pk: int) -> None:
+    """после коммита добавляем зарегистрированного участника"""
+
+    def update() -> None:
+        standings = get_cached_standings(quiz_pk)
+        if standings is None:
+            rebuild_standings(quiz_pk)
+            changed = ChangedRange(None, None)
+        else:
+            changed = standings.add_participant(user_pk)
+        if changed is not None:
+            publish_changes(quiz_pk, changed)
+
+    django.db.transaction.on_commit(update)
@@ -0,0 +1,111 @@
+import typing
+
+import django.db
+import django.db.models
+import django.db.models.functions
+
+import core.cache
+import quiz.models
+
+
+def record_answer(
+    question_pk: int,
+    is_correct: bool,
+    is_new_solver: bool,
+    time_answered: typing.Any,
+) -> None:
+    """
+    учитываем новый ответ в статистике вопроса одним UPDATE через F()
+    строки статистики еще нет - создаем ее, при гонке с другим
+    ответом повторяем UPDATE
+    вызывается внутри транзакции сохранения ответа
+    """
+    stats = quiz.models.QuestionStats.objects.filter(question__pk=question_pk)
+    values = {
+        'attempts': django.db.models.F('attempts') + 1,
+        'accepted': django.db.models.F('accepted') + int(is_correct),
+        'solvers': django.db.models.F('solvers') + int(is_new_solver),
+    }
+    if is_correct:
+        values['first_solved_at'] = django.db.models.functions.Coalesce(
+            'first_solved_at', django.db.models.Value(time_answered)
+        )
+    if stats.update(**values):
+        return
+    try:
+        with django.db.transaction.atomic():
+            quiz.models.QuestionStats.objects.create(
+                question_id=question_pk,
+                attempts=1,
+                accepted=int(is_correct),
+                solvers=int(is_new_solver),
+                first_solved_at=time_answered if is_correct else None,
+            )
+    except django.db.IntegrityError:
+        stats.update(**values)
+
+
+def count_stats(
+    question_pks: typing.Optional[typing.Iterable[int]],
+) -> typing.Dict[int, typing.Dict[str, typing.Any]]:
+    """
+    статистика вопросов по сырым ответам одним запросом с группировкой
+    question_pks None - по всем вопросам
+    """
+    answers = quiz.models.UserAnswer.objects.all()
+    if question_pks is not None:
+        answers = answers.filter(question__pk__in=question_pks)
+    correct = django.db.models.Q(is_correct=True)
+    return {
+        values.pop('question'): values
+        for values in answers.values('question')
+        .annotate(
+            attempts=django.db.models.Count('pk'),
+            accepted=django.db.models.Count('pk', filter=correct),
+            solvers=django.db.models.Count(
+                'user', filter=correct, distinct=True
+            ),
+            first_solved_at=django.db.models.Min(
+                'time_answered', filter=correct
+            ),
+        )
+        .order_by()
+    }
+
+
+def rebuild_stats(
+    question_pks: typing.Optional[typing.Iterable[int]] = None,
+) -> int:
+    """
+    пересчитываем статистику вопросов заново, None - всех вопросов
+    пишем только изменившиеся строки, возвращаем их количество
+    """
+    if question_pks is not None:
+        question_pks = set(question_pks)
+    counts = count_stats(question_pks)
+    fields = ('attempts', 'accepted', 'solvers', 'first_solved_at')
+    stats = quiz.models.QuestionStats.objects.all()
+    if question_pks is not None:
+        stats = stats.filter(question__pk__in=question_pks)
+    with django.db.transaction.atomic():
+        deleted, _ = stats.exclude(question__pk__in=counts.keys()).delete()
+        existing = quiz.models.QuestionStats.objects.in_bulk(counts.keys())
+        changed = list()
+        for stats_obj in existing.values():
+            values = counts[stats_obj.pk]
+            if any(
+                getattr(stats_obj, name) != values[name] for name in fields
+            ):
+                for name in fields:
+                    setattr(stats_obj, name, values[name])
+                changed.append(stats_obj)
+        quiz.models.QuestionStats.objects.bulk_update(changed, fields)
+        created = quiz.models.QuestionStats.objects.bulk_create(
+            [
+                quiz.models.QuestionStats(question_id=pk, **values)
+                for pk, values in counts.items()
+                if pk not in existing
+            ]
+        )
+    core.cache.touch(quiz.models.QuestionStats)
+    return deleted + len(changed) + len(created)
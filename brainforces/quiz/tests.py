@@ -0,0 +1,1235 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+
+import freezegun
+
+import django.core.cache
+import django.core.exceptions
+import django.core.files.uploadedfile
+import django.core.management
+import django.db
+import django.db.models
+import django.test
+import django.test.utils
+import django.urls
+import django.utils.timezone
+
+import core.models
+import core.services
+import organization.models
+import quiz.access
+import quiz.bundles
+import quiz.events
+import quiz.models
+import quiz.progress
+import quiz.rating
+import quiz.scheduler
+import quiz.services
+import quiz.signals
+import quiz.standings
+import quiz.stats
+import search.models
+import users.models
+
+
+class QuestionAnswerTests(django.test.TestCase):
+    """тестируем отправку ответов на вопросы викторины"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        self.user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        users.models.Profile.objects.create(user=self.user)
+        self.quiz = quiz.models.Quiz.objects.create(
+            creator=self.user,
+            name='testquiz',
+            description='description',
+            start_time=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(minutes=5),
+            duration=60,
+            is_published=True,
+        )
+        self.question = quiz.models.Question.objects.create(
+            name='question', text='text', quiz=self.quiz, difficulty=3
+        )
+        self.right_variant = quiz.models.Variant.objects.create(
+            text='right', question=self.question, is_correct=True
+        )
+        self.wrong_variant = quiz.models.Variant.objects.create(
+            text='wrong', question=self.question, is_correct=False
+        )
+        quiz.models.QuizResults.objects.create(quiz=self.quiz, user=self.user)
+        self.client = django.test.Client()
+        self.client.force_login(self.user)
+        super().setUp()
+
+    def answer(self, variant: quiz.models.Variant) -> None:
+        """отправляем ответ на вопрос"""
+        self.client.post(
+            django.urls.reverse(
+                'quiz:question_detail',
+                kwargs={'pk': self.quiz.pk, 'question_pk': self.question.pk},
+            ),
+            {'answer': variant.pk},
+        )
+
+    def test_correct_answer_updates_results(self) -> None:
+        """верный ответ увеличивает счетчик решенных и рейтинг"""
+        self.answer(self.right_variant)
+        result = quiz.models.QuizResults.objects.get(user=self.user)
+        self.assertEqual(result.solved, 1)
+        self.assertEqual(result.rating_after, 3)
+
+    def test_standings_rebuilt_before_commit(self) -> None:
+        """
+        таблица, перестроенная до коммита, уже учла решение,
+        и после коммита оно не прибавляется второй раз
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.answer(self.right_variant)
+        quiz.standings.rebuild_standings(self.quiz.pk)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            quiz.standings.get_standings(self.quiz.pk)[0].solved, 1
+        )
+
+    def test_second_answer_during_quiz_rejected(self) -> None:
+        """во время викторины можно ответить на вопрос только один раз"""
+        self.answer(self.wrong_variant)
+        self.answer(self.right_variant)
+        self.assertEqual(quiz.models.UserAnswer.objects.count(), 1)
+        result = quiz.models.QuizResults.objects.get(user=self.user)
+        self.assertEqual(result.solved, 0)
+
+    def test_answers_after_quiz_not_counted(self) -> None:
+        """после викторины ответы сохраняются, но не влияют на результат"""
+        self.quiz.start_time -= django.utils.timezone.timedelta(days=1)
+        self.quiz.save()
+        self.answer(self.right_variant)
+        self.answer(self.right_variant)
+        self.assertEqual(quiz.models.UserAnswer.objects.count(), 2)
+        result = quiz.models.QuizResults.objects.get(user=self.user)
+        self.assertEqual(result.solved, 0)
+
+    def test_variant_from_other_question_is_wrong(self) -> None:
+        """вариант ответа от другого вопроса не засчитывается"""
+        other_question = quiz.models.Question.objects.create(
+            name='other', text='text', quiz=self.quiz
+        )
+        other_variant = quiz.models.Variant.objects.create(
+            text='right', question=other_question, is_correct=True
+        )
+        self.answer(other_variant)
+        self.assertFalse(quiz.models.UserAnswer.objects.get().is_correct)
+
+    def tearDown(self) -> None:
+        """удаление тестовых данных"""
+        users.models.User.objects.all().delete()
+        super().tearDown()
+
+
+class QuestionStatsTests(django.test.TestCase):
+    """тестируем статистику ответов на вопросы"""
+
+    def setUp(self) -> None:
+        """викторина с вопросом и двумя пользователями"""
+        self.first = users.models.User.objects.create(
+            username='first', email='first@gmail.com'
+        )
+        self.second = users.models.User.objects.create(
+            username='second', email='second@gmail.com'
+        )
+        self.quiz = quiz.models.Quiz.objects.create(
+            name='testquiz',
+            description='description',
+            start_time=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(days=1),
+            duration=60,
+            is_published=True,
+        )
+        self.question = quiz.models.Question.objects.create(
+            name='question', text='text', quiz=self.quiz, difficulty=3
+        )
+        self.right_variant = quiz.models.Variant.objects.create(
+            text='right', question=self.question, is_correct=True
+        )
+        self.wrong_variant = quiz.models.Variant.objects.create(
+            text='wrong', question=self.question, is_correct=False
+        )
+        self.question.quiz = self.quiz
+
+    def answer(
+        self, user: users.models.User, variant: quiz.models.Variant
+    ) -> None:
+        """ответ пользователя на вопрос"""
+        quiz.services.submit_answer(user, self.question, variant.pk)
+
+    def get_stats(self) -> tuple:
+        """попытки, верные ответы и решившие"""
+        stats = quiz.models.QuestionStats.objects.get(
+            question__pk=self.question.pk
+        )
+        return stats.attempts, stats.accepted, stats.solvers
+
+    def test_incremental(self) -> None:
+        """статистика обновляется при отправке ответов"""
+        self.answer(self.first, self.wrong_variant)
+        self.assertEqual(self.get_stats(), (1, 0, 0))
+        self.assertIsNone(self.question.stats.first_solved_at)
+        self.answer(self.first, self.right_variant)
+        self.answer(self.first, self.right_variant)
+        self.answer(self.second, self.right_variant)
+        self.assertEqual(self.get_stats(), (4, 3, 2))
+        first_solve = quiz.models.UserAnswer.objects.filter(
+            is_correct=True
+        ).earliest('time_answered')
+        self.question.stats.refresh_from_db()
+        self.assertEqual(
+            self.question.stats.first_solved_at, first_solve.time_answered
+        )
+        self.assertEqual(self.question.stats.acceptance, 75)
+
+    def test_rebuild(self) -> None:
+        """пересчет совпадает с обновлениями и исправляет расхождения"""
+        self.answer(self.first, self.wrong_variant)
+        self.answer(self.first, self.right_variant)
+        self.answer(self.second, self.right_variant)
+        self.assertEqual(quiz.stats.rebuild_stats(), 0)
+        quiz.models.UserAnswer.objects.filter(user=self.second).delete()
+        self.assertEqual(quiz.stats.rebuild_stats(), 1)
+        self.assertEqual(self.get_stats(), (2, 1, 1))
+        quiz.models.UserAnswer.objects.all().delete()
+        self.assertEqual(quiz.stats.rebuild_stats([self.question.pk]), 1)
+        self.assertFalse(quiz.models.QuestionStats.objects.exists())
+
+    def test_questions_page(self) -> None:
+        """страница вопросов показывает статистику без подсчета ответов"""
+        self.answer(self.first, self.right_variant)
+        self.answer(self.second, self.wrong_variant)
+        self.client.force_login(self.first)
+        response = self.client.get(
+            django.urls.reverse('quiz:questions', kwargs={'pk': self.quiz.pk})
+        )
+        self.assertEqual(response.context['questions'][0].stats.acceptance, 50)
+        self.assertContains(response, '50%')
+
+
+class QuizProgressTests(django.test.TestCase):
+    """тестируем битовые маски отвеченных и решенных вопросов"""
+
+    def setUp(self) -> None:
+        """идущая викторина с двумя вопросами и участником"""
+        self.user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        self.quiz = quiz.models.Quiz.objects.create(
+            name='testquiz',
+            description='description',
+            start_time=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(minutes=5),
+            duration=60,
+            is_published=True,
+        )
+        self.first = quiz.models.Question.objects.create(
+            name='first', text='text', quiz=self.quiz
+        )
+        self.second = quiz.models.Question.objects.create(
+            name='second', text='text', quiz=self.quiz
+        )
+        for question in (self.first, self.second):
+            question.quiz = self.quiz
+            question.right = quiz.models.Variant.objects.create(
+                text='right', question=question, is_correct=True
+            )
+            question.wrong = quiz.models.Variant.objects.create(
+                text='wrong', question=question, is_correct=False
+            )
+        quiz.models.QuizResults.objects.create(quiz=self.quiz, user=self.user)
+
+    def test_bits(self) -> None:
+        """биты выставляются и за пределами 64 вопросов"""
+        progress = quiz.models.QuizProgress()
+        for position in (0, 9, 100):
+            self.assertFalse(progress.has_attempted(position))
+            progress.mark(position, is_correct=position != 9)
+            self.assertTrue(progress.has_attempted(position))
+        self.assertTrue(progress.has_solved(100))
+        self.assertFalse(progress.has_solved(9))
+        self.assertFalse(progress.has_attempted(8))
+        self.assertEqual(len(progress.attempted), 13)
+        self.assertFalse(progress.has_attempted(None))
+
+    def test_position_unique(self) -> None:
+        """два вопроса викторины не делят один номер"""
+        with self.assertRaises(django.db.IntegrityError):
+            with django.db.transaction.atomic():
+                quiz.models.Question.objects.create(
+                    name='third', text='text', quiz=self.quiz, position=0
+                )
+
+    def test_position_taken_concurrently(self) -> None:
+        """номер, занятый другим сохранением, берется заново"""
+        question = quiz.models.Question(
+            name='third', text='text', quiz=self.quiz
+        )
+        question.get_next_position = iter((1, 2)).__next__
+        question.save()
+        self.assertEqual(question.position, 2)
+
+    def test_question_without_position(self) -> None:
+        """вопрос из фикстуры без номера получает его при ответе"""
+        quiz.models.Question.objects.filter(pk=self.second.pk).update(
+            position=None
+        )
+        self.second.position = None
+        quiz.services.submit_answer(
+            self.user, self.second, self.second.right.pk
+        )
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.position, 1)
+        progress = quiz.progress.load_progress(self.user.pk, self.quiz.pk)
+        self.assertTrue(progress.has_solved(1))
+        self.assertFalse(progress.has_attempted(self.first.position))
+
+    def test_loaded_question_numbered(self) -> None:
+        """вопрос, сохраненный loaddata без номера, получает номер"""
+        question = quiz.models.Question(
+            name='third', text='text', quiz=self.quiz
+        )
+        django.db.models.Model.save_base(question, raw=True)
+        question.refresh_from_db()
+        self.assertEqual(question.position, 2)
+
+    def test_positions(self) -> None:
+        """вопросы нумеруются в порядке создания внутри викторины"""
+        self.assertEqual((self.first.position, self.second.position), (0, 1))
+
+    def test_duplicate_rejected_by_mask(self) -> None:
+        """повторный ответ во время викторины отклоняется без записи"""
+        quiz.services.submit_answer(
+            self.user, self.second, self.second.right.pk
+        )
+        # вариант, прогресс с блокировкой, создание и снятие точки сохранения
+        with self.assertNumQueries(4):
+            self.assertIsNone(
+                quiz.services.submit_answer(
+                    self.user, self.second, self.second.wrong.pk
+                )
+            )
+        progress = quiz.progress.load_progress(self.user.pk, self.quiz.pk)
+        self.assertFalse(progress.has_attempted(0))
+        self.assertTrue(progress.has_solved(1))
+        self.assertEqual(
+            quiz.models.QuizResults.objects.get(user=self.user).solved, 1
+        )
+
+    def test_questions_page_badges(self) -> None:
+        """отметки решенных и нерешенных вопросов берутся из масок"""
+        quiz.services.submit_answer(self.user, self.first, self.first.wrong.pk)
+        quiz.services.submit_answer(
+            self.user, self.second, self.second.right.pk
+        )
+        self.client.force_login(self.user)
+        response = self.client.get(
+            django.urls.reverse('quiz:questions', kwargs={'pk': self.quiz.pk})
+        )
+        self.assertEqual(
+            [
+                (question.is_attempted, question.is_solved)
+                for question in response.context['questions']
+            ],
+            [(True, False), (True, True)],
+        )
+        self.assertContains(response, 'table-success')
+        self.assertContains(response, 'table-danger')
+
+
+class StandingsTests(django.test.TestCase):
+    """тестируем таблицу положения"""
+
+    def test_dense_ranks(self) -> None:
+        """места плотные, участники отсортированы по решенным задачам"""
+        standings = quiz.standings.QuizStandings([(1, 2), (2, 5), (3, 2)])
+        self.assertEqual(
+            [(row.rank, row.user_id) for row in standings[:]],
+            [(1, 2), (2, 1), (2, 3)],
+        )
+
+    def test_incremental_update(self) -> None:
+        """места пересчитываются после решения задачи"""
+        standings = quiz.standings.QuizStandings([(1, 1), (2, 1)])
+        standings.add_participant(3)
+        standings.add_solved(2)
+        self.assertEqual(standings.rank(2), 1)
+        self.assertEqual(standings.rank(1), 2)
+        self.assertEqual(standings.rank(3), 3)
+        self.assertEqual(len(standings), 3)
+
+    @django.test.utils.override_settings(STANDINGS_MAX_QUIZZES=2)
+    def test_least_recent_evicted(self) -> None:
+        """сверх лимита из памяти уходит давно не просмотренная таблица"""
+        for quiz_pk in (1, 2):
+            quiz.standings.rebuild_standings(quiz_pk)
+        quiz.standings.get_standings(1)
+        quiz.standings.rebuild_standings(3)
+        self.assertIsNotNone(quiz.standings.get_cached_standings(1))
+        self.assertIsNone(quiz.standings.get_cached_standings(2))
+        self.assertIsNotNone(quiz.standings.get_cached_standings(3))
+
+    def test_changed_range(self) -> None:
+        """изменение задевает строки между ключами, сдвиг мест - до конца"""
+        standings = quiz.standings.QuizStandings([(1, 2), (2, 1), (3, 1)])
+        self.assertEqual(
+            standings.add_solved(3),
+            quiz.standings.ChangedRange((-2, 3), (-1, 3)),
+        )
+        self.assertEqual(
+            standings.add_solved(2), quiz.standings.ChangedRange((-2, 2), None)
+        )
+        standings.add_participant(4)
+        self.assertEqual(
+            standings.add_solved(1), quiz.standings.ChangedRange((-3, 1), None)
+        )
+        standings.set_solved(5, 3)
+        self.assertEqual(
+            standings.set_solved(3, 3),
+            quiz.standings.ChangedRange((-3, 3), (-2, 3)),
+        )
+        self.assertEqual(
+            standings.add_participant(6),
+            quiz.standings.ChangedRange((0, 6), (0, 6)),
+        )
+        self.assertIsNone(standings.add_participant(6))
+
+    @django.test.override_settings(STANDINGS_REFRESH_SECONDS=-1)
+    def test_ranks_on_second_page(self) -> None:
+        """места на второй странице продолжают первую"""
+        creator = users.models.User.objects.create(
+            username='creator', email='creator@gmail.com'
+        )
+        quiz_obj = quiz.models.Quiz.objects.create(
+            creator=creator,
+            name='testquiz',
+            description='description',
+            start_time=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(days=1),
+            duration=60,
+            is_published=True,
+        )
+        for user_ind in range(45):
+            user = users.models.User.objects.create(
+                username=f'user{user_ind}', email=f'user{user_ind}@gmail.com'
+            )
+            quiz.models.QuizResults.objects.create(
+                quiz=quiz_obj, user=user, solved=user_ind
+            )
+        client = django.test.Client()
+        client.force_login(creator)
+        url = django.urls.reverse(
+            'quiz:standings_list', kwargs={'pk': quiz_obj.pk}
+        )
+        response = client.get(url)
+        response = client.get(
+            url, {'cursor': response.context['page_obj'].next_cursor}
+        )
+        self.assertEqual(
+            [result['rank'] for result in response.context['results']],
+            [41, 42, 43, 44, 45],
+        )
+        self.assertFalse(response.context['page_obj'].has_next())
+        self.assertEqual(response.context['page_keys']['first'][0], -4)
+        self.assertIsNone(response.context['page_keys']['last'])
+        response = client.get(
+            url, {'cursor': response.context['page_obj'].previous_cursor}
+        )
+        self.assertEqual(
+            [result['rank'] for result in response.context['results']],
+            list(range(1, 41)),
+        )
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_seek(self) -> None:
+        """страница таблицы после ключа и до него"""
+        standings = quiz.standings.QuizStandings(
+            [(1, 3), (2, 3), (3, 1), (4, 0)]
+        )
+        self.assertEqual(
+            [row.user_id for row in standings.seek((-3, 1), 2, False)],
+            [2, 3],
+        )
+        self.assertEqual(
+            [row.user_id for row in standings.seek((-1, 3), 5, True)],
+            [2, 1],
+        )
+
+
+class EventHubTests(django.test.SimpleTestCase):
+    """тестируем раздачу событий подписчикам"""
+
+    def test_fan_out(self) -> None:
+        """событие получают все подписчики канала"""
+
+        async def run() -> list:
+            hub = quiz.events.EventHub()
+            subscriptions = [hub.subscribe(['channel']) for _ in range(100)]
+            other = hub.subscribe(['other'])
+            hub.dispatch('channel', 'message')
+            received = [await sub.get(1) for sub in subscriptions]
+            return received + [await other.get(0.01)]
+
+        self.assertEqual(asyncio.run(run()), ['message'] * 100 + [None])
+
+    def test_unsubscribe(self) -> None:
+        """после отписки события не приходят"""
+
+        async def run() -> None:
+            hub = quiz.events.EventHub()
+            subscription = hub.subscribe(['channel'])
+            hub.unsubscribe(subscription)
+            hub.dispatch('channel', 'message')
+            return await subscription.get(0.01)
+
+        self.assertIsNone(asyncio.run(run()))
+
+    @django.test.override_settings(QUIZ_EVENTS_QUEUE_SIZE=2)
+    def test_slow_subscriber_keeps_latest(self) -> None:
+        """медленный подписчик получает последние события"""
+
+        async def run() -> list:
+            hub = quiz.events.EventHub()
+            subscription = hub.subscribe(['channel'])
+            for message in ('first', 'second', 'third'):
+                hub.dispatch('channel', message)
+            return [await subscription.get(1) for _ in range(2)]
+
+        self.assertEqual(asyncio.run(run()), ['second', 'third'])
+
+
+class RecordingHub(quiz.events.EventHub):
+    """hub, который запоминает разосланные события"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.dispatched: list = list()
+
+    def has_subscriptions(self) -> bool:
+        return True
+
+    def dispatch(self, channel: str, message: str) -> None:
+        self.dispatched.append((channel, message))
+
+
+class DatabaseBrokerTests(django.test.TestCase):
+    """тестируем доставку событий между процессами через бд"""
+
+    def test_listener_dispatches_once(self) -> None:
+        """событие из другого процесса разослано один раз"""
+        event_hub = RecordingHub()
+        listener = quiz.events.DatabaseListener(event_hub)
+        quiz.events.DatabaseBroker().publish('channel', 'first')
+        listener.poll()
+        listener.poll()
+        self.assertEqual(event_hub.dispatched, [('channel', 'first')])
+
+    def test_late_commit_dispatched(self) -> None:
+        """событие с меньшим id, закоммиченное позже, не теряется"""
+        event_hub = RecordingHub()
+        listener = quiz.events.DatabaseListener(event_hub)
+        quiz.models.QuizEvent.objects.create(
+            pk=2, channel='channel', message='new'
+        )
+        listener.poll()
+        quiz.models.QuizEvent.objects.create(
+            pk=1, channel='channel', message='late'
+        )
+        listener.poll()
+        self.assertEqual(
+            [message for _, message in event_hub.dispatched],
+            ['new', 'late'],
+        )
+
+    @django.test.override_settings(QUIZ_EVENTS_KEEP_SECONDS=60)
+    def test_old_events_deleted(self) -> None:
+        """публикация удаляет события старше QUIZ_EVENTS_KEEP_SECONDS"""
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            quiz.models.QuizEvent.objects.create(channel='channel')
+        with freezegun.freeze_time('2023-01-01 00:02:00'):
+            quiz.events.DatabaseBroker().publish('channel', 'message')
+        self.assertEqual(
+            list(
+                quiz.models.QuizEvent.objects.values_list('message', flat=True)
+            ),
+            ['message'],
+        )
+
+
+class QuizResultsTests(django.test.TestCase):
+    """тестируем подведение итогов викторины"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        self.quiz = quiz.models.Quiz.objects.create(
+            name='testquiz',
+            description='description',
+            start_time=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(days=1),
+            duration=60,
+            is_published=True,
+        )
+        for user_ind, solved in enumerate((2, 5, 2, 0)):
+            user = users.models.User.objects.create(
+                username=f'user{user_ind}', email=f'user{user_ind}@gmail.com'
+            )
+            users.models.Profile.objects.create(user=user, rating=10)
+            quiz.models.QuizResults.objects.create(
+                quiz=self.quiz,
+                user=user,
+                solved=solved,
+                rating_before=10,
+                rating_after=10 + solved,
+            )
+        super().setUp()
+
+    def test_places_and_ratings(self) -> None:
+        """места плотные, рейтинг в профилях обновлен"""
+        quiz.services.make_quiz_results(self.quiz)
+        self.assertEqual(
+            list(
+                quiz.models.QuizResults.objects.order_by(
+                    'user__pk'
+                ).values_list('place', flat=True)
+            ),
+            [2, 1, 2, 3],
+        )
+        self.assertEqual(
+            list(
+                users.models.Profile.objects.order_by('user__pk').values_list(
+                    'rating', flat=True
+                )
+            ),
+            [12, 15, 12, 10],
+        )
+        self.assertEqual(
+            list(
+                users.models.LeaderboardEntry.objects.order_by(
+                    'rank', 'user__pk'
+                ).values_list('username', 'rank')
+            ),
+            [('user1', 1), ('user0', 2), ('user2', 2), ('user3', 4)],
+        )
+        self.assertTrue(quiz.models.Quiz.objects.get().is_ended)
+
+    def test_standings_forgotten(self) -> None:
+        """после подведения итогов таблица не занимает память"""
+        quiz.standings.get_standings(self.quiz.pk)
+        quiz.services.make_quiz_results(self.quiz)
+        self.assertIsNone(quiz.standings.get_cached_standings(self.quiz.pk))
+
+    def test_results_made_in_background(self) -> None:
+        """создатель ставит подведение итогов в очередь задач"""
+        creator = users.models.User.objects.get(username='user0')
+        self.quiz.creator = creator
+        self.quiz.save()
+        client = django.test.Client()
+        client.force_login(creator)
+        client.get(
+            django.urls.reverse(
+                'quiz:make_results', kwargs={'pk': self.quiz.pk}
+            )
+        )
+        self.assertFalse(quiz.models.Quiz.objects.get().is_ended)
+        core.services.run_pending_jobs()
+        self.assertTrue(quiz.models.Quiz.objects.get().is_ended)
+
+    @django.test.override_settings(QUIZ_RATING_SYSTEM='quiz.rating.EloRating')
+    def test_elo_rating(self) -> None:
+        """по Эло при равных рейтингах лучший растет, худший падает"""
+        quiz.services.make_quiz_results(self.quiz)
+        ratings = list(
+            users.models.Profile.objects.order_by('user__pk').values_list(
+                'rating', flat=True
+            )
+        )
+        self.assertGreater(ratings[1], 10)
+        self.assertEqual(ratings[0], ratings[2])
+        self.assertLess(ratings[3], 10)
+
+    def tearDown(self) -> None:
+        """удаление тестовых данных"""
+        users.models.User.objects.all().delete()
+        super().tearDown()
+
+
+class EloRatingTests(django.test.SimpleTestCase):
+    """тестируем рейтинг в стиле Эло"""
+
+    def test_expected_result_keeps_rating(self) -> None:
+        """если места совпали с ожидаемыми, рейтинг почти не меняется"""
+        new_ratings = quiz.rating.EloRating().calculate(
+            [3, 2, 1], [2000, 1500, 1000], [0, 0, 0]
+        )
+        for new_rating, rating in zip(new_ratings, (2000, 1500, 1000)):
+            self.assertLess(abs(new_rating - rating), 10)
+
+    def test_upset_changes_rating(self) -> None:
+        """слабый участник, обошедший сильного, получает рейтинг"""
+        new_ratings = quiz.rating.EloRating().calculate(
+            [1, 3], [2000, 1000], [0, 0]
+        )
+        self.assertLess(new_ratings[0], 2000)
+        self.assertGreater(new_ratings[1], 1000)
+
+
+class QuizSchedulerTests(django.test.TestCase):
+    """тестируем планировщик викторин"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            self.quiz = quiz.models.Quiz.objects.create(
+                name='testquiz',
+                description='description',
+                start_time=django.utils.timezone.now()
+                + django.utils.timezone.timedelta(hours=1),
+                duration=60,
+                is_published=True,
+            )
+        super().setUp()
+
+    def test_quiz_lifecycle(self) -> None:
+        """викторина стартует, заканчивается и ставится на подведение итогов"""
+        scheduler = quiz.scheduler.QuizScheduler()
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            scheduler.load()
+            self.assertEqual(len(scheduler), 3)
+            self.assertEqual(scheduler.run_due(), 0)
+        with freezegun.freeze_time('2023-01-01 01:00:00'):
+            self.assertEqual(scheduler.run_due(), 2)
+            self.assertEqual(
+                quiz.models.Quiz.objects.get().status,
+                quiz.models.Quiz.Statuses.RUNNING,
+            )
+        with freezegun.freeze_time('2023-01-01 02:00:00'):
+            self.assertEqual(scheduler.run_due(), 1)
+            self.assertEqual(
+                quiz.models.Quiz.objects.get().status,
+                quiz.models.Quiz.Statuses.ENDED,
+            )
+        self.assertTrue(
+            core.models.Job.objects.filter(
+                key=quiz.services.get_results_job_key(self.quiz.pk)
+            ).exists()
+        )
+
+    def test_warmup_before_start(self) -> None:
+        """перед стартом создаются строки статистики и прогресса"""
+        user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        quiz.models.QuizResults.objects.create(quiz=self.quiz, user=user)
+        question = quiz.models.Question.objects.create(
+            name='question', text='text', quiz=self.quiz
+        )
+        scheduler = quiz.scheduler.QuizScheduler()
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            scheduler.load()
+        with freezegun.freeze_time('2023-01-01 00:59:30'):
+            self.assertEqual(scheduler.run_due(), 1)
+        self.assertTrue(
+            quiz.models.QuestionStats.objects.filter(
+                question=question, attempts=0
+            ).exists()
+        )
+        self.assertTrue(
+            quiz.models.QuizProgress.objects.filter(
+                quiz=self.quiz, user=user
+            ).exists()
+        )
+        quiz.signals.quiz_starting.send(
+            sender=quiz.models.Quiz, quiz_pk=self.quiz.pk
+        )
+        self.assertEqual(quiz.models.QuizProgress.objects.count(), 1)
+
+    def test_moved_quiz_not_started_early(self) -> None:
+        """устаревшее событие не запускает перенесенную викторину"""
+        scheduler = quiz.scheduler.QuizScheduler()
+        with freezegun.freeze_time('2023-01-01 00:00:00'):
+            scheduler.load()
+        with freezegun.freeze_time('2023-01-01 00:30:00'):
+            self.quiz.start_time += django.utils.timezone.timedelta(days=1)
+            self.quiz.save()
+        with freezegun.freeze_time('2023-01-01 01:00:00'):
+            scheduler.run_due()
+        self.assertEqual(
+            quiz.models.Quiz.objects.get().status,
+            quiz.models.Quiz.Statuses.NOT_STARTED,
+        )
+
+
+class QuizListTabsTests(django.test.TestCase):
+    """тестируем вкладки списка викторин"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        self.user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        now_datetime = django.utils.timezone.now()
+        self.quizzes = dict()
+        for name, minutes in (('ended', -120), ('running', -5), ('soon', 30)):
+            self.quizzes[name] = quiz.models.Quiz.objects.create(
+                creator=self.user,
+                name=name,
+                description='description',
+                start_time=now_datetime
+                + django.utils.timezone.timedelta(minutes=minutes),
+                duration=60,
+                is_published=True,
+            )
+
+    def test_end_time_saved(self) -> None:
+        """время окончания сохраняется вместе с викториной"""
+        running = self.quizzes['running']
+        self.assertEqual(
+            running.end_time,
+            running.start_time + django.utils.timezone.timedelta(minutes=60),
+        )
+
+    def test_status_display_annotated(self) -> None:
+        """статус викторины считается в запросе"""
+        statuses = {
+            quiz_obj.name: quiz_obj.status_display
+            for quiz_obj in (
+                quiz.models.Quiz.objects.get_only_useful_list_fields()
+            )
+        }
+        self.assertEqual(
+            statuses,
+            {
+                'ended': quiz.models.Quiz.Statuses.ENDED.label,
+                'running': quiz.models.Quiz.Statuses.RUNNING.label,
+                'soon': quiz.models.Quiz.Statuses.NOT_STARTED.label,
+            },
+        )
+
+    def test_tabs(self) -> None:
+        """вкладки фильтруют викторины по статусу"""
+        for tab, names in (
+            ('running', ['running']),
+            ('upcoming', ['soon']),
+            ('all', ['soon', 'running', 'ended']),
+        ):
+            with self.subTest(tab=tab):
+                response = django.test.Client().get(
+                    django.urls.reverse('quiz:list'), {'tab': tab}
+                )
+                self.assertEqual(
+                    [
+                        quiz_obj.name
+                        for quiz_obj in response.context['quizzes']
+                    ],
+                    names,
+                )
+
+    def test_page_link_keeps_tab(self) -> None:
+        """ссылка на следующую страницу вкладки остается на вкладке"""
+        for quiz_ind in range(5):
+            quiz.models.Quiz.objects.create(
+                creator=self.user,
+                name=f'soon{quiz_ind}',
+                description='description',
+                start_time=django.utils.timezone.now()
+                + django.utils.timezone.timedelta(hours=quiz_ind + 1),
+                duration=60,
+                is_published=True,
+            )
+        client = django.test.Client()
+        response = client.get(
+            django.urls.reverse('quiz:list'), {'tab': 'upcoming'}
+        )
+        self.assertEqual(response.context['page_query'], 'tab=upcoming&')
+        self.assertContains(response, 'href="?tab=upcoming&amp;page=2"')
+        response = client.get(
+            django.urls.reverse('quiz:list') + '?tab=upcoming&page=2'
+        )
+        self.assertEqual(
+            [quiz_obj.name for quiz_obj in response.context['quizzes']],
+            ['soon4'],
+        )
+
+    def test_tabs_with_lagging_status(self) -> None:
+        """
+        отстающий от времени статус не прячет идущую викторину,
+        а закончившуюся по статусу не показывает
+        """
+        quiz.models.Quiz.objects.filter(pk=self.quizzes['running'].pk).update(
+            status=quiz.models.Quiz.Statuses.NOT_STARTED
+        )
+        quiz.models.Quiz.objects.filter(pk=self.quizzes['ended'].pk).update(
+            start_time=django.utils.timezone.now(),
+            end_time=django.utils.timezone.now()
+            + django.utils.timezone.timedelta(hours=1),
+        )
+        self.assertEqual(
+            [
+                quiz_obj.name
+                for quiz_obj in quiz.models.Quiz.objects.filter_running()
+            ],
+            ['running'],
+        )
+
+    def test_list_reads_excerpt(self) -> None:
+        """список викторин читает короткое описание, а не весь html"""
+        django.core.cache.cache.clear()
+        self.quizzes[
+            'ended'
+        ].description = (
+            '<p>Длинное <b>описание</b></p><script>alert(1)</script>'
+        )
+        self.quizzes['ended'].save()
+        with django.test.utils.CaptureQueriesContext(
+            django.db.connection
+        ) as queries:
+            response = django.test.Client().get(
+                django.urls.reverse('quiz:list')
+            )
+        self.assertContains(response, 'Длинное описание')
+        self.assertNotContains(response, 'alert(1)')
+        self.assertFalse(
+            any(
+                '"quiz_quiz"."description",' in query['sql']
+                or '"quiz_quiz"."description_html"' in query['sql']
+                for query in queries
+            )
+        )
+
+
+class QuizAccessTests(django.test.TestCase):
+    """тестируем права пользователя в приватной викторине"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        django.core.cache.cache.clear()
+        self.user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        users.models.Profile.objects.create(user=self.user)
+        self.organization = organization.models.Organization.objects.create(
+            name='organization', description='description', is_private=True
+        )
+        organization.models.OrganizationToUser.objects.create(
+            organization=self.organization, user=self.user, role=1
+        )
+        self.quiz = quiz.models.Quiz.objects.create(
+            creator=self.user,
+            name='testquiz',
+            description='description',
+            start_time=django.utils.timezone.now()
+            - django.utils.timezone.timedelta(minutes=5),
+            duration=60,
+            is_published=True,
+            is_private=True,
+            organized_by=self.organization,
+        )
+        self.question = quiz.models.Question.objects.create(
+            name='question', text='text', quiz=self.quiz, difficulty=3
+        )
+        quiz.models.QuizResults.objects.create(quiz=self.quiz, user=self.user)
+        self.client.force_login(self.user)
+
+    def test_access_context(self) -> None:
+        """права считаются одним запросом и запоминаются"""
+        request = django.test.RequestFactory().get('/')
+        request.user = self.user
+        with self.assertNumQueries(1):
+            quiz_access = quiz.access.get_quiz_access(request, self.quiz.pk)
+            self.assertTrue(quiz_access.can_access_quiz)
+            self.assertTrue(quiz_access.can_participate)
+            self.assertTrue(quiz_access.can_access_questions)
+            self.assertIs(
+                quiz.access.get_quiz_access(request, self.quiz.pk),
+                quiz_access,
+            )
+
+    def test_not_member_denied(self) -> None:
+        """не участник организации не видит приватную викторину"""
+        outsider = users.models.User.objects.create(
+            username='outsider', email='outsider@gmail.com'
+        )
+        request = django.test.RequestFactory().get('/')
+        request.user = outsider
+        self.assertFalse(
+            quiz.access.get_quiz_access(request, self.quiz.pk).can_access_quiz
+        )
+
+    def test_question_page_queries(self) -> None:
+        """количество запросов страницы вопроса"""
+        # сессия, пользователь с профилем, вопрос, викторина с правами
+        # и варианты
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                django.urls.reverse(
+                    'quiz:question_detail',
+                    kwargs={
+                        'pk': self.quiz.pk,
+                        'question_pk': self.question.pk,
+                    },
+                )
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_standings_page_queries(self) -> None:
+        """количество запросов страницы положения"""
+        quiz.standings.get_standings(self.quiz.pk)
+        # сессия, пользователь с профилем, викторина с правами
+        # и пользователи страницы
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                django.urls.reverse(
+                    'quiz:standings_list', kwargs={'pk': self.quiz.pk}
+                )
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class QuizBundleTests(django.test.TestCase):
+    """тестируем загрузку и выгрузку наборов вопросов"""
+
+    def setUp(self) -> None:
+        """существующий тег и набор в json lines"""
+        self.tag = quiz.models.Tag.objects.create(name='known')
+        self.records = [
+            {
+                'type': 'quiz',
+                'name': 'imported',
+                'description': '<p>description</p>',
+                'start_time': '2030-01-01T10:00:00+00:00',
+                'duration': 60,
+                'is_rated': False,
+                'is_private': False,
+            },
+        ] + [
+            {
+                'type': 'question',
+                'name': f'question{question_ind}',
+                'text': f'<p>text {question_ind}</p>',
+                'difficulty': question_ind + 1,
+                'tags': ['known', 'new'] if question_ind % 2 else [],
+                'variants': [
+                    {'text': 'wrong', 'is_correct': False},
+                    {'text': 'right', 'is_correct': True},
+                ],
+            }
+            for question_ind in range(5)
+        ]
+
+    def get_lines(self) -> list:
+        """строки набора json lines"""
+        return [
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in self.records
+        ]
+
+    @django.test.utils.override_settings(QUIZ_IMPORT_BATCH_SIZE=2)
+    def test_jsonl_round_trip(self) -> None:
+        """загруженный пачками набор выгружается без изменений"""
+        quiz_obj = quiz.bundles.import_bundle(self.get_lines(), 'jsonl')
+        questions = list(quiz_obj.quiz_question.order_by('position'))
+        self.assertEqual(
+            [question.position for question in questions], list(range(5))
+        )
+        self.assertEqual(questions[0].text_html, '<p>text 0</p>')
+        self.assertEqual(
+            set(questions[1].tags.values_list('name', 'is_published')),
+            {('known', True), ('new', False)},
+        )
+        self.assertEqual(quiz.models.Tag.objects.count(), 2)
+        exported = [
+            json.loads(line)
+            for line in quiz.bundles.export_bundle(quiz_obj, 'jsonl')
+        ]
+        self.assertEqual(exported, self.records)
+
+    @django.test.utils.override_settings(
+        QUIZ_IMPORT_BATCH_SIZE=2, QUIZ_IMPORT_MAX_CACHED_TAGS=1
+    )
+    def test_tags_cache_bounded(self) -> None:
+        """забытые id тегов читаются заново, новые теги не дублируются"""
+        quiz_obj = quiz.bundles.import_bundle(self.get_lines(), 'jsonl')
+        self.assertEqual(quiz.models.Tag.objects.count(), 2)
+        self.assertEqual(
+            quiz.models.Question.tags.through.objects.filter(
+                question__quiz=quiz_obj
+            ).count(),
+            4,
+        )
+
+    @django.test.utils.override_settings(QUIZ_IMPORT_BATCH_SIZE=2)
+    def test_questions_indexed(self) -> None:
+        """после фиксации транзакции загруженные вопросы есть в поиске"""
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz_obj = quiz.bundles.import_bundle(self.get_lines(), 'jsonl')
+        self.assertEqual(
+            set(
+                search.models.SearchDocument.objects.filter(
+                    kind=search.models.SearchDocument.Kinds.QUESTION
+                ).values_list('object_id', flat=True)
+            ),
+            set(quiz_obj.quiz_question.values_list('pk', flat=True)),
+        )
+
+    def test_csv_round_trip(self) -> None:
+        """набор, выгруженный в csv, загружается обратно"""
+        quiz_obj = quiz.bundles.import_bundle(self.get_lines(), 'jsonl')
+        csv_lines = ''.join(
+            quiz.bundles.export_bundle(quiz_obj, 'csv')
+        ).splitlines(keepends=True)
+        copy = quiz.bundles.import_bundle(csv_lines, 'csv')
+        self.assertEqual(
+            [
+                json.loads(line)
+                for line in quiz.bundles.export_bundle(copy, 'jsonl')
+            ],
+            self.records,
+        )
+
+    def test_error_rolls_back(self) -> None:
+        """ошибка в наборе указывает строку, викторина не сохраняется"""
+        self.records[3]['variants'][1]['is_correct'] = False
+        with self.assertRaisesMessage(
+            django.core.exceptions.ValidationError, 'Строка 4'
+        ):
+            quiz.bundles.import_bundle(self.get_lines(), 'jsonl')
+        self.assertFalse(quiz.models.Quiz.objects.exists())
+        self.assertFalse(quiz.models.Question.objects.exists())
+
+    def test_malformed_jsonl(self) -> None:
+        """неверные поля записи - ошибка набора с номером строки"""
+        cases = (
+            (0, 'start_time', '2023-13-45T00:00:00', 'Строка 1'),
+            (2, 'variants', 5, 'Строка 3'),
+            (2, 'variants', {'text': 'right'}, 'Строка 3'),
+            (3, 'tags', ['a\x00b'], 'Строка 4'),
+        )
+        for record_ind, field, value, message in cases:
+            with self.subTest(field=field, value=value):
+                records = json.loads(json.dumps(self.records))
+                records[record_ind][field] = value
+                lines = [json.dumps(record) + '\n' for record in records]
+                with self.assertRaisesMessage(
+                    django.core.exceptions.ValidationError, message
+                ):
+                    quiz.bundles.import_bundle(lines, 'jsonl')
+        self.assertFalse(quiz.models.Quiz.objects.exists())
+
+    def test_malformed_csv(self) -> None:
+        """ячейку csv, которую не разобрать, отклоняем с номером строки"""
+        quiz_obj = quiz.bundles.import_bundle(self.get_lines(), 'jsonl')
+        csv_lines = ''.join(
+            quiz.bundles.export_bundle(quiz_obj, 'csv')
+        ).splitlines(keepends=True)
+        for cell in ('x' * 200000, 'a\0b'):
+            with self.subTest(length=len(cell)):
+                lines = list(csv_lines)
+                lines[2] = f'question,name,"{cell}",1,,,,,,\n'
+                with self.assertRaisesMessage(
+                    django.core.exceptions.ValidationError, 'Строка 3'
+                ):
+                    quiz.bundles.import_bundle(lines, 'csv')
+        self.assertEqual(quiz.models.Quiz.objects.count(), 1)
+
+    def test_command(self) -> None:
+        """загрузка и выгрузка командами"""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'quiz.jsonl')
+            with open(source, 'w', encoding='utf-8') as source_file:
+                source_file.writelines(self.get_lines())
+            django.core.management.call_command(
+                'import_quiz', source, stdout=io.StringIO()
+            )
+            quiz_obj = quiz.models.Quiz.objects.get()
+            target = os.path.join(directory, 'quiz.csv')
+            django.core.management.call_command(
+                'export_quiz', quiz_obj.pk, target
+            )
+            with open(target, encoding='utf-8') as target_file:
+                self.assertEqual(len(target_file.readlines()), 1 + 1 + 5 * 3)
+
+    def test_organization_upload(self) -> None:
+        """админ организации загружает и выгружает набор"""
+        user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        users.models.Profile.objects.create(user=user)
+        organization_obj = organization.models.Organization.objects.create(
+            name='organization', description='description'
+        )
+        organization.models.OrganizationToUser.objects.create(
+            organization=organization_obj, user=user, role=2
+        )
+        self.client.force_login(user)
+        response = self.client.post(
+            django.urls.reverse(
+                'organization:import_quiz', kwargs={'pk': organization_obj.pk}
+            ),
+            {
+                'bundle': django.core.files.uploadedfile.SimpleUploadedFile(
+                    'quiz.jsonl', ''.join(self.get_lines()).encode()
+                ),
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        quiz_obj = quiz.models.Quiz.objects.get(organized_by=organization_obj)
+        self.assertEqual(quiz_obj.creator, user)
+        response = self.client.get(
+            django.urls.reverse(
+                'organization:export_quiz',
+                kwargs={'pk': organization_obj.pk, 'quiz_pk': quiz_obj.pk},
+            ),
+            {'format': 'jsonl'},
+        )
+        self.assertEqual(
+            [
+                json.loads(line)
+                for line in b''.join(response.streaming_content).splitlines()
+            ],
+            self.records,
+        )
+
+    def test_admin_import(self) -> None:
+        """администратор загружает набор csv в админке"""
+        admin = users.models.User.objects.create(
+            username='admin',
+            email='admin@gmail.com',
+            is_staff=True,
+            is_superuser=True,
+        )
+        users.models.Profile.objects.create(user=admin)
+        self.client.force_login(admin)
+        url = django.urls.reverse('admin:quiz_quiz_import')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        source = quiz.bundles.import_bundle(self.get_lines(), 'jsonl')
+        response = self.client.post(
+            url,
+            {
+                'bundle': django.core.files.uploadedfile.SimpleUploadedFile(
+                    'quiz.csv',
+                    ''.join(
+                        quiz.bundles.export_bundle(source, 'csv')
+                    ).encode(),
+                ),
+            },
+        )
+        quiz_obj = quiz.models.Quiz.objects.exclude(pk=source.pk).get()
+        self.assertRedirects(
+            response,
+            django.urls.reverse('admin:quiz_quiz_change', args=(quiz_obj.pk,)),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(quiz_obj.creator, admin)
+        self.assertEqual(quiz_obj.quiz_question.count(), 5)
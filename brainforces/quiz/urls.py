@@ -37,6 +37,11 @@ urlpatterns = [
         quiz.views.QuizRegistrationView.as_view(),
         name='register',
     ),
+    django.urls.path(
+        '<int:pk>/events/',
+        quiz.views.QuizEventsView.as_view(),
+        name='events',
+    ),
     django.urls.path(
         '<int:pk>/make_results/',
         quiz.views.MakeQuizResultsView.as_view(),
@@ -9,95 +9,111 @@ import django.urls
 import django.utils.timezone
 import django.views.generic
 
+import core.mixins
+import core.models
+import core.pagination
+import quiz.access
 import quiz.forms
 import quiz.mixins
 import quiz.models
+import quiz.progress
 import quiz.services
+import quiz.standings
+import search.mixins
+import search.models
+import users.models
 
 
-class QuizListView(django.views.generic.ListView):
+class QuizListView(
+    core.mixins.AnonymousPageCacheMixin,
+    search.mixins.SearchMixin,
+    django.views.generic.ListView,
+):
     """список викторин на главной странице"""
 
+    cache_models = ('quiz.Quiz', 'organization.Organization', 'users.User')
+    search_kind = search.models.SearchDocument.Kinds.QUIZ
+    search_columns = {
+        'all': None,
+        'name': 'title',
+        'description': 'body',
+        'organized_by': 'extra',
+    }
+
     template_name = 'quiz/list.html'
     context_object_name = 'quizzes'
     paginate_by = 5
 
     def get_queryset(self) -> django.db.models.QuerySet:
         """
-        получение объектов и поиск
+        получение объектов и полнотекстовый поиск
         либо по всем критериям,
         либо по имени, описанию и организации квиза
         """
-        queryset = (
-            quiz.models.Quiz.objects.get_only_useful_list_fields().filter(
-                is_private=False
-            )
-        )
-        searched = self.request.GET.get('searched')
-        search_criteria = self.request.GET.get('search_critery', 'all')
-        if searched:
-            if search_criteria == 'all':
-                queryset = (
-                    queryset.filter(
-                        django.db.models.Q(name__icontains=searched)
-                        | django.db.models.Q(description__icontains=searched)
-                        | django.db.models.Q(
-                            organized_by__name__icontains=searched
-                        )
-                    )
-                ).distinct()
-            elif search_criteria == 'name':
-                queryset = queryset.filter(name__icontains=searched)
-            elif search_criteria == 'description':
-                queryset = queryset.filter(description__icontains=searched)
-            elif search_criteria == 'organized_by':
-                queryset = queryset.filter(
-                    organized_by__name__icontains=searched
-                )
-        return queryset
+        queryset = quiz.models.Quiz.objects.filter_status_tab(
+            self.request.GET.get('tab', 'all')
+        ).filter(is_private=False)
+        return self.search_queryset(queryset)
+
+    def get_context_data(self, *args, **kwargs) -> dict:
+        """
+        дополняем контекст выбранной вкладкой, ссылки на страницы
+        сохраняют вкладку и поиск
+        """
+        context = super().get_context_data(*args, **kwargs)
+        context['tab'] = self.request.GET.get('tab', 'all')
+        context['page_query'] = core.pagination.get_page_query(self.request)
+        return context
 
 
 class QuizDetailView(django.views.generic.DetailView):
     """детальная информация о викторине"""
 
-    queryset = quiz.models.Quiz.objects.get_only_useful_list_fields()
     template_name = 'quiz/quiz_detail.html'
     context_object_name = 'quiz'
 
+    def get_object(self, *args, **kwargs) -> quiz.models.Quiz:
+        """
+        викторина вместе с правами пользователя одним запросом
+        статус в запросе зависит от текущего времени
+        """
+        return quiz.access.get_quiz_access(
+            self.request,
+            self.kwargs['pk'],
+            queryset=quiz.models.Quiz.objects.get_only_useful_detail_fields(),
+        ).quiz
+
     def get_context_data(self, *args, **kwargs) -> dict:
         """
         право доступа к викторине для пользователя
         может ли пользователь войти в эту викторину,
         может ли он решать задания на данный момент
+        после начала - сводка ответов из статистики вопросов
         """
         context = super().get_context_data(*args, **kwargs)
-        quiz_obj = context['object']
-        can_access_quiz = quiz.services.user_can_access_quiz(
-            quiz_obj, self.request.user
+        quiz_access = quiz.access.get_quiz_access(
+            self.request, self.kwargs['pk']
         )
-        if not can_access_quiz:
+        if not quiz_access.can_access_quiz:
             raise django.http.Http404()
-        context['can_participate'] = quiz.models.QuizResults.objects.filter(
-            quiz__pk=self.kwargs['pk'], user__pk=self.request.user.pk
-        ).exists()
-        quiz_status = quiz_obj.get_quiz_status()
-        context['quiz_status'] = quiz_status
-        if quiz_status == 1:
-            context['can_access_questions'] = False
-        elif quiz_status == 2:
-            context['can_access_questions'] = context['can_participate']
-        else:
-            context[
-                'can_access_questions'
-            ] = quiz.services.user_can_access_quiz(quiz_obj, self.request.user)
+        context.update(quiz_access.get_context())
+        quiz_obj = quiz_access.quiz
         context['can_end'] = (
-            quiz_status == 3 and quiz_obj.creator.pk == self.request.user.pk
-        )
-        context['now_time'] = str(django.utils.timezone.now())
-        context['end_time'] = str(
-            quiz_obj.start_time
-            + django.utils.timezone.timedelta(minutes=quiz_obj.duration)
+            quiz_access.status == 3
+            and quiz_obj.creator.pk == self.request.user.pk
         )
+        if quiz_access.status != 1:
+            context['quiz_stats'] = quiz.models.QuestionStats.objects.filter(
+                question__quiz__pk=quiz_obj.pk
+            ).aggregate(
+                attempts=django.db.models.Sum('attempts'),
+                accepted=django.db.models.Sum('accepted'),
+                first_solved_at=django.db.models.Min('first_solved_at'),
+            )
+        if quiz_access.status == 3 and not quiz_obj.is_ended:
+            context['results_job'] = core.models.Job.objects.get_last(
+                quiz.services.get_results_job_key(quiz_obj.pk)
+            )
         return context
 
 
@@ -108,6 +124,7 @@ class MakeQuizResultsView(django.views.generic.View):
         self, request: django.http.HttpRequest, pk: int
     ) -> django.http.HttpResponse:
         """
+        ставим в очередь задачу подведения итогов:
         обновляется рейтинг пользователя,
         определяется место в топе участников викторины
         проверки: существует ли квиз,
@@ -118,8 +135,10 @@ class MakeQuizResultsView(django.views.generic.View):
         )
         if quiz_obj.creator.pk != request.user.pk:
             raise django.http.Http404()
-        quiz.services.make_quiz_results(quiz_obj)
-        django.contrib.messages.success(request, 'Успешно!')
+        quiz.services.enqueue_quiz_results(pk)
+        django.contrib.messages.success(
+            request, 'Итоги подводятся, это займет немного времени'
+        )
         return django.shortcuts.redirect(
             django.urls.reverse('quiz:quiz_detail', kwargs={'pk': pk}),
         )
@@ -136,27 +155,34 @@ class QuestionsView(
     def get_queryset(self) -> django.db.models.QuerySet:
         """
         получаем все вопросы в викторине
-        и количество ответов всего и только правильных
+        и готовую статистику ответов всех пользователей
         """
         return (
             quiz.models.Question.objects.filter(quiz__pk=self.kwargs['pk'])
-            .annotate(
-                total_answers=django.db.models.Count(
-                    'answers__id',
-                    filter=django.db.models.Q(
-                        answers__user__pk=self.request.user.pk
-                    ),
-                ),
-                success_answers=django.db.models.Count(
-                    'answers__id',
-                    filter=django.db.models.Q(
-                        answers__is_correct=True,
-                        answers__user__pk=self.request.user.pk,
-                    ),
-                ),
+            .select_related('stats')
+            .only(
+                'name',
+                'position',
+                'stats__attempts',
+                'stats__accepted',
+                'stats__solvers',
             )
-            .only('name')
+            .order_by('position')
+        )
+
+    def get_context_data(self, *args, **kwargs) -> dict:
+        """
+        отвечал ли пользователь на вопросы и решил ли их -
+        биты из прогресса пользователя в викторине, одним запросом
+        """
+        context = super().get_context_data(*args, **kwargs)
+        progress = quiz.progress.load_progress(
+            self.request.user.pk, self.kwargs['pk']
         )
+        for question in context['questions']:
+            question.is_attempted = progress.has_attempted(question.position)
+            question.is_solved = progress.has_solved(question.position)
+        return context
 
 
 class QuestionDetailView(
@@ -168,7 +194,9 @@ class QuestionDetailView(
 
     template_name = 'quiz/question_detail.html'
     context_object_name = 'question'
-    queryset = quiz.models.Question.objects.only('name', 'text', 'difficulty')
+    queryset = quiz.models.Question.objects.only(
+        'name', 'text_html', 'difficulty'
+    )
     pk_url_kwarg = 'question_pk'
 
     def get_context_data(self, *args, **kwargs) -> typing.Dict:
@@ -201,108 +229,115 @@ class QuestionDetailView(
         если викторина идет, пользователь не может
         дать ответ на тот же вопрос дважды
         """
+        quiz_access = quiz.access.get_quiz_access(request, pk)
         question_obj = django.shortcuts.get_object_or_404(
-            quiz.models.Question.objects.select_related('quiz').only(
-                'quiz__is_rated',
-                'quiz__is_private',
-                'id',
-                'quiz__start_time',
-                'quiz__duration',
+            quiz.models.Question.objects.only(
+                'id', 'name', 'difficulty', 'position'
             ),
             pk=question_pk,
             quiz__pk=pk,
         )
-        quiz_obj = question_obj.quiz
-        if quiz.services.user_can_access_quiz(quiz_obj, request.user):
-            is_correct = quiz.models.Variant.objects.filter(
-                pk=request.POST['answer'], is_correct=True
-            ).exists()
-
-            quiz_status = quiz_obj.get_quiz_status()
-            if quiz_status == 2:
-                if quiz.models.UserAnswer.objects.filter(
-                    user__pk=request.user.pk, question__pk=question_pk
-                ).exists():
-                    django.contrib.messages.error(
-                        request,
-                        'Вы уже отправляли ответ на этот вопрос'
-                        ' в течение викторины',
-                    )
-                    return django.shortcuts.redirect(
-                        django.urls.reverse(
-                            'quiz:question_detail',
-                            kwargs={'pk': pk, 'question_pk': question_pk},
-                        )
-                    )
-
-            quiz.models.UserAnswer.objects.create(
-                user=request.user,
-                question=question_obj,
-                is_correct=is_correct,
+        question_obj.quiz = quiz_access.quiz
+        if quiz_access.can_access_quiz:
+            is_correct = quiz.services.submit_answer(
+                request.user, question_obj, request.POST['answer']
             )
-            quiz_result = quiz.models.QuizResults.objects.filter(
-                quiz__pk=pk, user__pk=request.user.pk
-            ).first()
-            if (
-                quiz_status == 2
-                and quiz_result
-                and is_correct
-                and quiz.models.UserAnswer.objects.filter(
-                    user__pk=request.user.pk,
-                    question__pk=question_pk,
-                    is_correct=is_correct,
-                ).count()
-                == 1
-            ):
-                quiz_result.solved += 1
-                if quiz_obj.is_rated and not quiz_obj.is_private:
-                    quiz_result.rating_after += question_obj.difficulty
-                quiz_result.save()
+            if is_correct is None:
+                django.contrib.messages.error(
+                    request,
+                    'Вы уже отправляли ответ на этот вопрос'
+                    ' в течение викторины',
+                )
+                return django.shortcuts.redirect(
+                    django.urls.reverse(
+                        'quiz:question_detail',
+                        kwargs={'pk': pk, 'question_pk': question_pk},
+                    )
+                )
         return django.shortcuts.redirect('quiz:user_answers_list', pk=pk)
 
 
 class UserAnswersList(
-    quiz.mixins.AccessToQuizMixin, django.views.generic.ListView
+    quiz.mixins.AccessToQuizMixin,
+    core.mixins.KeysetPaginationMixin,
+    django.views.generic.ListView,
 ):
     """мои посылки"""
 
     template_name = 'quiz/user_answers_list.html'
     context_object_name = 'answers'
+    keyset_ordering = ('-time_answered',)
     paginate_by = 40
 
     def get_queryset(self) -> django.db.models.QuerySet:
         """получаем свои послыки в данной викторине"""
-        useful_answer_fields = (
-            quiz.models.UserAnswer.objects.get_only_useful_list_fields()
-            .filter(
-                question__quiz__id=self.kwargs['pk'],
-                user__id=self.request.user.id,
-            )
-            .order_by('-time_answered')
+        answers = quiz.models.UserAnswer.objects.get_only_useful_list_fields()
+        return answers.filter(
+            question__quiz__id=self.kwargs['pk'],
+            user__id=self.request.user.id,
         )
-        return useful_answer_fields
 
 
 class StandingsList(
-    quiz.mixins.AccessToQuizMixin, django.views.generic.ListView
+    quiz.mixins.AccessToQuizMixin,
+    core.mixins.KeysetPaginationMixin,
+    django.views.generic.ListView,
 ):
     """положение"""
 
     template_name = 'quiz/standing.html'
     context_object_name = 'results'
+    paginator_class = quiz.standings.StandingsPaginator
     paginate_by = 40
 
-    def get_queryset(self, *args, **kwargs) -> django.db.models.QuerySet:
+    def get_queryset(self, *args, **kwargs) -> quiz.standings.QuizStandings:
         """
-        получаем информацию о других пользователях,
-        участвующих в викторине
+        получаем таблицу положения участников викторины,
+        она уже отсортирована и хранит места участников
         """
-        return (
-            quiz.models.QuizResults.objects.select_related('user')
-            .filter(quiz__pk=self.kwargs['pk'])
-            .only('solved', 'user__username')
-            .order_by('-solved')
+        return quiz.standings.get_standings(self.kwargs['pk'])
+
+    def get_context_data(self, *args, **kwargs) -> dict:
+        """
+        дополняем строки текущей страницы пользователями
+        и ключами ее первой и последней строки, по ним страница узнает,
+        задели ли ее изменения таблицы
+        """
+        context = super().get_context_data(*args, **kwargs)
+        rows, page = context['results'], context['page_obj']
+        get_key = context['paginator'].get_key
+        context['page_keys'] = {
+            'first': get_key(rows[0])
+            if rows and page.has_previous()
+            else None,
+            'last': get_key(rows[-1]) if rows and page.has_next() else None,
+        }
+        page_users = users.models.User.objects.only('username').in_bulk(
+            [row.user_id for row in rows]
         )
+        context['results'] = [
+            {
+                'rank': row.rank,
+                'solved': row.solved,
+                'user': page_users.get(row.user_id),
+            }
+            for row in context['results']
+        ]
+        return context
+
+
+class QuizEventsView(django.views.generic.View):
+    """
+    поток событий викторины
+    при запуске через ASGI запрос перехватывает quiz.asgi,
+    без ASGI потока нет, и статус 204 говорит браузеру
+    не переподключаться
+    """
+
+    def get(
+        self, request: django.http.HttpRequest, pk: int
+    ) -> django.http.HttpResponse:
+        return django.http.HttpResponse(status=204)
 
 
 class QuizRegistrationView(
@@ -318,21 +353,15 @@ class QuizRegistrationView(
         проверка: квиз существует
         пользователь может в нем участвовать
         """
-        quiz_obj = django.shortcuts.get_object_or_404(
-            quiz.models.Quiz, pk=pk, is_published=True
-        )
-        if (
-            quiz.services.user_can_access_quiz(quiz_obj, request.user)
-            and not quiz.models.QuizResults.objects.filter(
-                quiz__pk=pk, user__pk=request.user.pk
-            ).exists()
-        ):
+        quiz_access = quiz.access.get_quiz_access(request, pk)
+        if quiz_access.can_access_quiz and not quiz_access.can_participate:
             quiz.models.QuizResults.objects.create(
-                quiz=quiz_obj,
+                quiz=quiz_access.quiz,
                 user=request.user,
                 rating_before=request.user.profile.rating,
                 rating_after=request.user.profile.rating,
             )
+            quiz.standings.on_commit_registered(pk, request.user.pk)
             django.contrib.messages.success(request, 'Регистрация успешна!')
             return django.shortcuts.redirect(
                 django.urls.reverse('quiz:quiz_detail', kwargs={'pk': pk})
@@ -0,0 +1,14 @@
+import django.contrib.admin
+
+import search.models
+
+
+@django.contrib.admin.register(search.models.SearchDocument)
+class SearchDocumentAdmin(django.contrib.admin.ModelAdmin):
+    """отображение модели SearchDocument в админке"""
+
+    list_display = ('id', 'kind', 'object_id', 'title')
+    list_display_links = ('id',)
+    list_filter = ('kind',)
+    search_fields = ('title',)
+    readonly_fields = ('kind', 'object_id', 'title', 'body', 'extra')
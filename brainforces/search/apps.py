@@ -0,0 +1,13 @@
+import django.apps
+
+
+class SearchConfig(django.apps.AppConfig):
+    """базовый класс для приложения search"""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+    verbose_name = 'поиск'
+
+    def ready(self) -> None:
+        """подключаем обработчики сигналов"""
+        import search.signals  # noqa: F401
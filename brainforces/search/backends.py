@@ -0,0 +1,219 @@
+import re
+import typing
+
+import django.conf
+import django.contrib.postgres.search
+import django.db
+import django.db.models
+import django.utils.module_loading
+
+import search.models
+
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# колонки документа в порядке важности
+COLUMNS = ('title', 'body', 'extra')
+
+
+def get_tokens(query: str) -> typing.List[str]:
+    """слова поискового запроса без знаков и спецсимволов"""
+    return TOKEN_PATTERN.findall(query.lower())
+
+
+class SearchBackend:
+    """
+    базовый класс поискового бэкенда
+    документы хранятся в SearchDocument, бэкенд поддерживает
+    свой индекс по ним и ищет id объектов по релевантности
+    """
+
+    def index(
+        self, documents: typing.Sequence[search.models.SearchDocument]
+    ) -> None:
+        """документы сохранены, обновляем индекс"""
+        raise NotImplementedError
+
+    def remove(self, document_pks: typing.Sequence[int]) -> None:
+        """документы удаляются, убираем их из индекса"""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """очищаем индекс целиком"""
+        raise NotImplementedError
+
+    def search(
+        self,
+        kind: str,
+        tokens: typing.Sequence[str],
+        column: typing.Optional[str] = None,
+        limit: int = 1000,
+        queryset: typing.Optional[django.db.models.QuerySet] = None,
+    ) -> typing.List[int]:
+        """
+        id объектов, в документах которых есть все слова запроса,
+        от самых релевантных, поиск по одной колонке, если она задана
+        queryset ограничивает поиск видимыми объектами до limit,
+        иначе первые limit документов могли бы оказаться скрытыми
+        """
+        raise NotImplementedError
+
+
+class SQLiteBackend(SearchBackend):
+    """
+    поиск на SQLite FTS5 для разработки и тестов
+    виртуальная таблица создается миграцией, rowid в ней - id документа,
+    слова ищутся по префиксу, сортировка по bm25
+    """
+
+    table = 'search_searchdocument_fts'
+    # вес колонок в bm25: название важнее текста
+    weights = (10.0, 1.0, 3.0)
+
+    def index(
+        self, documents: typing.Sequence[search.models.SearchDocument]
+    ) -> None:
+        self.remove([document.pk for document in documents])
+        with django.db.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, body, extra) '
+                'VALUES (%s, %s, %s, %s)',
+                [
+                    (
+                        document.pk,
+                        document.title,
+                        document.body,
+                        document.extra,
+                    )
+                    for document in documents
+                ],
+            )
+
+    def remove(self, document_pks: typing.Sequence[int]) -> None:
+        with django.db.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(document_pk,) for document_pk in document_pks],
+            )
+
+    def clear(self) -> None:
+        with django.db.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(
+        self,
+        kind: str,
+        tokens: typing.Sequence[str],
+        column: typing.Optional[str] = None,
+        limit: int = 1000,
+        queryset: typing.Optional[django.db.models.QuerySet] = None,
+    ) -> typing.List[int]:
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        if column is not None:
+            match = f'{{{column}}} : ({match})'
+        documents_table = search.models.SearchDocument._meta.db_table
+        weights = ', '.join(str(weight) for weight in self.weights)
+        objects_sql, objects_params = '', ()
+        if queryset is not None:
+            sql, objects_params = (
+                queryset.order_by().values('pk').query.sql_with_params()
+            )
+            objects_sql = f'AND document.object_id IN ({sql}) '
+        with django.db.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT document.object_id FROM {self.table} '
+                f'JOIN {documents_table} document '
+                f'ON document.id = {self.table}.rowid '
+                f'WHERE {self.table} MATCH %s AND document.kind = %s '
+                f'{objects_sql}'
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                (match, kind, *objects_params, limit),
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend(SearchBackend):
+    """
+    поиск на PostgreSQL: tsvector с GIN индексом
+    вектор строится сразу по русской и английской конфигурациям,
+    колонки документа получают веса A, B и C,
+    по ним же ограничивается поиск по одной колонке,
+    сортировка по ts_rank
+    """
+
+    configs = ('russian', 'english')
+    column_weights = dict(zip(COLUMNS, ('A', 'B', 'C')))
+
+    def get_vector(self) -> django.contrib.postgres.search.SearchVector:
+        """выражение поискового вектора документа"""
+        vectors = [
+            django.contrib.postgres.search.SearchVector(
+                column, config=config, weight=weight
+            )
+            for column, weight in self.column_weights.items()
+            for config in self.configs
+        ]
+        vector = vectors[0]
+        for other_vector in vectors[1:]:
+            vector = vector + other_vector
+        return vector
+
+    def get_query(
+        self, tokens: typing.Sequence[str], column: typing.Optional[str]
+    ) -> django.contrib.postgres.search.SearchQuery:
+        """запрос: все слова по префиксу, в нужной колонке, если задана"""
+        weight = self.column_weights.get(column, '')
+        raw_query = ' & '.join(f'{token}:*{weight}' for token in tokens)
+        query = None
+        for config in self.configs:
+            config_query = django.contrib.postgres.search.SearchQuery(
+                raw_query, search_type='raw', config=config
+            )
+            query = config_query if query is None else query | config_query
+        return query
+
+    def index(
+        self, documents: typing.Sequence[search.models.SearchDocument]
+    ) -> None:
+        search.models.SearchDocument.objects.filter(
+            pk__in=[document.pk for document in documents]
+        ).update(vector=self.get_vector())
+
+    def remove(self, document_pks: typing.Sequence[int]) -> None:
+        """вектор хранится в самом документе и удаляется вместе с ним"""
+
+    def clear(self) -> None:
+        """вектор хранится в самом документе и удаляется вместе с ним"""
+
+    def search(
+        self,
+        kind: str,
+        tokens: typing.Sequence[str],
+        column: typing.Optional[str] = None,
+        limit: int = 1000,
+        queryset: typing.Optional[django.db.models.QuerySet] = None,
+    ) -> typing.List[int]:
+        query = self.get_query(tokens, column)
+        documents = search.models.SearchDocument.objects.filter(
+            kind=kind, vector=query
+        )
+        if queryset is not None:
+            documents = documents.filter(
+                object_id__in=queryset.order_by().values('pk')
+            )
+        return list(
+            documents.annotate(
+                rank=django.contrib.postgres.search.SearchRank(
+                    django.db.models.F('vector'), query
+                )
+            )
+            .order_by('-rank')
+            .values_list('object_id', flat=True)[:limit]
+        )
+
+
+def get_backend() -> SearchBackend:
+    """поисковый бэкенд из настроек"""
+    return django.utils.module_loading.import_string(
+        django.conf.settings.SEARCH_BACKEND
+    )()
@@ -0,0 +1,309 @@
+import collections
+import threading
+import time
+import typing
+
+import django.conf
+import django.contrib.postgres.search
+import django.core.cache
+import django.db
+import django.db.models
+import django.utils.module_loading
+
+import organization.models
+import quiz.models
+import users.models
+
+
+class FuzzySource(typing.NamedTuple):
+    """
+    источник нечеткого поиска: модель, поле с названием
+    и фильтр видимых всем объектов
+    """
+
+    model: typing.Type[django.db.models.Model]
+    field: str
+    filters: typing.Dict[str, typing.Any]
+
+    def get_queryset(self) -> django.db.models.QuerySet:
+        """объекты, которые можно показывать в подсказках"""
+        return self.model.objects.filter(**self.filters)
+
+
+SOURCES = {
+    'users': FuzzySource(users.models.User, 'username', {'is_active': True}),
+    'quizzes': FuzzySource(
+        quiz.models.Quiz, 'name', {'is_published': True, 'is_private': False}
+    ),
+    'organizations': FuzzySource(
+        organization.models.Organization, 'name', {'is_private': False}
+    ),
+}
+
+
+def get_trigrams(value: str) -> typing.Set[str]:
+    """триграммы строки как в pg_trgm: по словам, с пробелами по краям"""
+    trigrams = set()
+    for word in value.lower().split():
+        padded = f'  {word} '
+        trigrams.update(
+            padded[index : index + 3] for index in range(len(padded) - 2)
+        )
+    return trigrams
+
+
+class FuzzyBackend:
+    """
+    базовый класс нечеткого поиска по названиям
+    находит названия, похожие на запрос, даже с опечатками
+    """
+
+    def suggest(
+        self, kind: str, query: str, limit: int
+    ) -> typing.List[typing.Tuple[int, str]]:
+        """пары (id, название) от самых похожих"""
+        raise NotImplementedError
+
+    def update(self, kind: str, pk: int, label: typing.Optional[str]) -> None:
+        """объект изменился, label None - объект больше не показывается"""
+
+    def reset(self) -> None:
+        """забываем закешированные данные, если они есть"""
+
+
+class TrigramBackend(FuzzyBackend):
+    """
+    нечеткий поиск на PostgreSQL через pg_trgm
+    оператор % использует GIN индексы gin_trgm_ops из миграции,
+    результаты сортируются по similarity
+    """
+
+    def suggest(
+        self, kind: str, query: str, limit: int
+    ) -> typing.List[typing.Tuple[int, str]]:
+        source = SOURCES[kind]
+        return list(
+            source.get_queryset()
+            .filter(**{f'{source.field}__trigram_similar': query})
+            .annotate(
+                similarity=django.contrib.postgres.search.TrigramSimilarity(
+                    source.field, query
+                )
+            )
+            .order_by('-similarity', source.field)
+            .values_list('pk', source.field)[:limit]
+        )
+
+
+class NgramIndex:
+    """
+    инвертированный индекс триграмм в памяти процесса
+    для каждой триграммы храним id объектов, в названии которых она есть,
+    похожесть считаем коэффициентом Дайса по общим триграммам
+    """
+
+    def __init__(self, labels: typing.Iterable[typing.Tuple[int, str]]):
+        self._labels: typing.Dict[int, str] = dict()
+        self._trigrams: typing.Dict[int, typing.Set[str]] = dict()
+        self._postings: typing.Dict[
+            str, typing.Set[int]
+        ] = collections.defaultdict(set)
+        for pk, label in labels:
+            self.add(pk, label)
+
+    def add(self, pk: int, label: str) -> None:
+        """добавляем или обновляем название объекта"""
+        self.remove(pk)
+        trigrams = get_trigrams(label)
+        self._labels[pk] = label
+        self._trigrams[pk] = trigrams
+        for trigram in trigrams:
+            self._postings[trigram].add(pk)
+
+    def remove(self, pk: int) -> None:
+        """убираем объект из индекса"""
+        for trigram in self._trigrams.pop(pk, ()):
+            self._postings[trigram].discard(pk)
+        self._labels.pop(pk, None)
+
+    def suggest(
+        self, query: str, limit: int, threshold: float
+    ) -> typing.List[typing.Tuple[int, str]]:
+        """пары (id, название) с похожестью не меньше threshold"""
+        query_trigrams = get_trigrams(query)
+        if not query_trigrams:
+            return list()
+        shared = collections.Counter()
+        for trigram in query_trigrams:
+            shared.update(self._postings.get(trigram, ()))
+        scored = list()
+        for pk, shared_count in shared.items():
+            score = (
+                2
+                * shared_count
+                / (len(query_trigrams) + len(self._trigrams[pk]))
+            )
+            if score >= threshold:
+                scored.append((-score, self._labels[pk], pk))
+        scored.sort()
+        return [(pk, label) for _, label, pk in scored[:limit]]
+
+
+def get_version_key(kind: str) -> str:
+    """ключ версии названий в общем кеше"""
+    return f'fuzzy:version:{kind}'
+
+
+def get_version(kind: str) -> int:
+    """текущая версия названий, общая для всех процессов"""
+    cache = django.core.cache.cache
+    version = cache.get(get_version_key(kind))
+    if version is None:
+        cache.add(get_version_key(kind), 1, None)
+        version = cache.get(get_version_key(kind), 1)
+    return version
+
+
+def touch(kind: str) -> int:
+    """
+    названия изменились, повышаем их версию
+    индексы с прошлой версией во всех процессах строятся заново
+    """
+    cache = django.core.cache.cache
+    try:
+        return cache.incr(get_version_key(kind))
+    except ValueError:
+        cache.set(get_version_key(kind), 2, None)
+        return 2
+
+
+class IndexEntry(typing.NamedTuple):
+    """индекс, версия названий, по которой он построен, и время постройки"""
+
+    index: NgramIndex
+    version: int
+    built_at: float
+
+
+class NgramBackend(FuzzyBackend):
+    """
+    нечеткий поиск в памяти для SQLite
+    индекс строится одним запросом к бд, сигналы этого процесса
+    правят его сразу, а после фиксации транзакции повышают версию
+    названий в общем кеше - по ней индексы других процессов узнают,
+    что устарели
+    QuerySet.update и bulk_create сигналов не отправляют, поэтому
+    индекс старше FUZZY_INDEX_MAX_AGE_SECONDS строится заново
+    в продакшене на PostgreSQL работает TrigramBackend
+    """
+
+    def __init__(self) -> None:
+        self._indexes: typing.Dict[str, IndexEntry] = dict()
+        self._lock = threading.Lock()
+
+    def is_fresh(self, entry: IndexEntry, version: int) -> bool:
+        """индекс построен по текущей версии и еще не состарился"""
+        return (
+            entry.version == version
+            and time.monotonic() - entry.built_at
+            < django.conf.settings.FUZZY_INDEX_MAX_AGE_SECONDS
+        )
+
+    def get_index(self, kind: str) -> NgramIndex:
+        """
+        индекс названий, строится при первом обращении
+        и когда устарел
+        """
+        version = get_version(kind)
+        with self._lock:
+            entry = self._indexes.get(kind)
+            if entry is None or not self.is_fresh(entry, version):
+                source = SOURCES[kind]
+                entry = IndexEntry(
+                    NgramIndex(
+                        source.get_queryset()
+                        .values_list('pk', source.field)
+                        .iterator()
+                    ),
+                    version,
+                    time.monotonic(),
+                )
+                self._indexes[kind] = entry
+            return entry.index
+
+    def suggest(
+        self, kind: str, query: str, limit: int
+    ) -> typing.List[typing.Tuple[int, str]]:
+        index = self.get_index(kind)
+        with self._lock:
+            return index.suggest(
+                query, limit, django.conf.settings.FUZZY_SEARCH_THRESHOLD
+            )
+
+    def update(self, kind: str, pk: int, label: typing.Optional[str]) -> None:
+        with self._lock:
+            entry = self._indexes.get(kind)
+            if entry is not None:
+                if label is None:
+                    entry.index.remove(pk)
+                else:
+                    entry.index.add(pk, label)
+        django.db.transaction.on_commit(lambda: self.on_committed(kind))
+
+    def on_committed(self, kind: str) -> None:
+        """
+        изменение зафиксировано, сообщаем о нем другим процессам
+        свой индекс уже исправлен, и если кроме нас названия никто
+        не менял, он остается актуальным
+        """
+        version = touch(kind)
+        with self._lock:
+            entry = self._indexes.get(kind)
+            if entry is not None and entry.version == version - 1:
+                self._indexes[kind] = entry._replace(version=version)
+
+    def reset(self) -> None:
+        """забываем индексы, они построятся заново"""
+        with self._lock:
+            self._indexes = dict()
+
+
+_backend: typing.Optional[FuzzyBackend] = None
+
+
+def get_backend() -> FuzzyBackend:
+    """бэкенд нечеткого поиска из настроек, один на процесс"""
+    global _backend
+    if _backend is None:
+        _backend = django.utils.module_loading.import_string(
+            django.conf.settings.FUZZY_SEARCH_BACKEND
+        )()
+    return _backend
+
+
+def suggest(
+    kind: str, query: str, limit: typing.Optional[int] = None
+) -> typing.List[typing.Tuple[int, str]]:
+    """похожие на запрос названия объектов"""
+    query = query.strip()
+    if not query:
+        return list()
+    return get_backend().suggest(
+        kind, query, limit or django.conf.settings.FUZZY_SEARCH_LIMIT
+    )
+
+
+def on_object_changed(instance: django.db.models.Model, deleted: bool) -> None:
+    """обновляем индекс бэкенда по сохраненному или удаленному объекту"""
+    for kind, source in SOURCES.items():
+        if not isinstance(instance, source.model):
+            continue
+        visible = not deleted and all(
+            getattr(instance, name) == value
+            for name, value in source.filters.items()
+        )
+        get_backend().update(
+            kind,
+            instance.pk,
+            getattr(instance, source.field) if visible else None,
+        )
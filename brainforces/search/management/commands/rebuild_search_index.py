@@ -0,0 +1,13 @@
+import django.core.management.base
+
+import search.services
+
+
+class Command(django.core.management.base.BaseCommand):
+    """переиндексация поиска"""
+
+    help = 'Заново строит поисковые документы и индекс'
+
+    def handle(self, *args, **options) -> None:
+        documents_count = search.services.rebuild_index()
+        self.stdout.write(f'Проиндексировано документов: {documents_count}')
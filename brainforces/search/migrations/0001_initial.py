@@ -0,0 +1,63 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:16
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """
+    индекс поискового бэкенда:
+    на SQLite - виртуальная таблица FTS5, на PostgreSQL - GIN индекс
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE search_searchdocument_fts '
+            'USING fts5(title, body, extra, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX search_document_vector '
+            'ON search_searchdocument USING GIN (vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE search_searchdocument_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX search_document_vector')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('quiz', 'Викторина'), ('organization', 'Организация'), ('question', 'Вопрос')], help_text='Тип проиндексированного объекта', max_length=20, verbose_name='тип')),
+                ('object_id', models.PositiveBigIntegerField(help_text='id проиндексированного объекта', verbose_name='id объекта')),
+                ('title', models.TextField(blank=True, help_text='Название объекта', verbose_name='заголовок')),
+                ('body', models.TextField(blank=True, help_text='Описание или текст объекта без html', verbose_name='текст')),
+                ('extra', models.TextField(blank=True, help_text='Организация или теги объекта', verbose_name='дополнительно')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Заполняется только на PostgreSQL', null=True, verbose_name='поисковый вектор')),
+            ],
+            options={
+                'verbose_name': 'поисковый документ',
+                'verbose_name_plural': 'поисковые документы',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+TRIGRAM_INDEXES = (
+    ('users', 'User', 'username', 'fuzzy_user_username'),
+    ('quiz', 'Quiz', 'name', 'fuzzy_quiz_name'),
+    ('organization', 'Organization', 'name', 'fuzzy_organization_name'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """GIN индексы pg_trgm для нечеткого поиска, только на PostgreSQL"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for app_label, model_name, field, index_name in TRIGRAM_INDEXES:
+        table = apps.get_model(app_label, model_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} '
+            f'ON {table} USING GIN ({field} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, _, _, index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('users', '0004_alter_profile_user'),
+        ('quiz', '0026_quiz_end_time'),
+        ('organization', '0012_organizationpost_is_private'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
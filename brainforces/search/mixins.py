@@ -0,0 +1,32 @@
+import typing
+
+import django.db.models
+import django.views.generic
+
+import search.services
+
+
+class SearchMixin(django.views.generic.View):
+    """
+    поиск по спискам через поисковый бэкенд
+    search_columns сопоставляет критерий поиска из запроса
+    с колонкой поискового документа, None - поиск по всем колонкам
+    """
+
+    search_kind: str = ''
+    search_columns: typing.Dict[str, typing.Optional[str]] = {'all': None}
+
+    def search_queryset(
+        self, queryset: django.db.models.QuerySet
+    ) -> django.db.models.QuerySet:
+        """найденные объекты по релевантности или queryset без поиска"""
+        searched = self.request.GET.get('searched')
+        if not searched:
+            return queryset
+        search_criteria = self.request.GET.get('search_critery', 'all')
+        return search.services.filter_search(
+            queryset,
+            self.search_kind,
+            searched,
+            self.search_columns.get(search_criteria),
+        )
@@ -0,0 +1,61 @@
+import django.contrib.postgres.search
+import django.db.models
+
+
+class SearchDocument(django.db.models.Model):
+    """
+    поисковый документ: текст объекта без html
+    по нему ищет поисковый бэкенд из настроек
+    """
+
+    class Kinds(django.db.models.TextChoices):
+        """типы индексируемых объектов"""
+
+        QUIZ = 'quiz', 'Викторина'
+        ORGANIZATION = 'organization', 'Организация'
+        QUESTION = 'question', 'Вопрос'
+
+    kind = django.db.models.CharField(
+        verbose_name='тип',
+        help_text='Тип проиндексированного объекта',
+        max_length=20,
+        choices=Kinds.choices,
+    )
+    object_id = django.db.models.PositiveBigIntegerField(
+        verbose_name='id объекта',
+        help_text='id проиндексированного объекта',
+    )
+    title = django.db.models.TextField(
+        verbose_name='заголовок',
+        help_text='Название объекта',
+        blank=True,
+    )
+    body = django.db.models.TextField(
+        verbose_name='текст',
+        help_text='Описание или текст объекта без html',
+        blank=True,
+    )
+    extra = django.db.models.TextField(
+        verbose_name='дополнительно',
+        help_text='Организация или теги объекта',
+        blank=True,
+    )
+    vector = django.contrib.postgres.search.SearchVectorField(
+        verbose_name='поисковый вектор',
+        help_text='Заполняется только на PostgreSQL',
+        null=True,
+        editable=False,
+    )
+
+    class Meta:
+        verbose_name = 'поисковый документ'
+        verbose_name_plural = 'поисковые документы'
+        constraints = (
+            django.db.models.UniqueConstraint(
+                fields=('kind', 'object_id'), name='unique_search_document'
+            ),
+        )
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'{self.kind} {self.object_id}'
@@ -0,0 +1,196 @@
+import typing
+
+import django.conf
+import django.db
+import django.db.models
+
+import core.richtext
+import organization.models
+import quiz.models
+import search.backends
+import search.models
+
+
+Kinds = search.models.SearchDocument.Kinds
+
+
+def get_quiz_documents(
+    pks: typing.Optional[typing.Iterable[int]] = None,
+) -> typing.Iterator[typing.Tuple[int, str, str, str]]:
+    """документы викторин: название, описание, организация"""
+    queryset = quiz.models.Quiz.objects.select_related('organized_by').only(
+        'name', 'description', 'organized_by__name'
+    )
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    for quiz_obj in queryset.iterator():
+        yield (
+            quiz_obj.pk,
+            quiz_obj.name,
+            core.richtext.html_to_text(quiz_obj.description),
+            quiz_obj.organized_by.name if quiz_obj.organized_by else '',
+        )
+
+
+def get_organization_documents(
+    pks: typing.Optional[typing.Iterable[int]] = None,
+) -> typing.Iterator[typing.Tuple[int, str, str, str]]:
+    """документы организаций: название и описание"""
+    queryset = organization.models.Organization.objects.only(
+        'name', 'description'
+    )
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    for organization_obj in queryset.iterator():
+        yield (
+            organization_obj.pk,
+            organization_obj.name,
+            core.richtext.html_to_text(organization_obj.description),
+            '',
+        )
+
+
+def get_question_documents(
+    pks: typing.Optional[typing.Iterable[int]] = None,
+) -> typing.Iterator[typing.Tuple[int, str, str, str]]:
+    """документы вопросов: название, текст, теги"""
+    queryset = quiz.models.Question.objects.only(
+        'name', 'text'
+    ).prefetch_related(
+        django.db.models.Prefetch(
+            'tags', queryset=quiz.models.Tag.objects.only('name')
+        )
+    )
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    for question_obj in queryset:
+        yield (
+            question_obj.pk,
+            question_obj.name,
+            core.richtext.html_to_text(question_obj.text),
+            ' '.join(tag.name for tag in question_obj.tags.all()),
+        )
+
+
+DOCUMENT_SOURCES = {
+    Kinds.QUIZ: get_quiz_documents,
+    Kinds.ORGANIZATION: get_organization_documents,
+    Kinds.QUESTION: get_question_documents,
+}
+
+
+def index_objects(
+    kind: str, pks: typing.Optional[typing.Iterable[int]] = None
+) -> int:
+    """
+    обновляем поисковые документы объектов и индекс бэкенда
+    без pks переиндексируем все объекты этого типа
+    возвращаем количество документов
+    """
+    rows = list(DOCUMENT_SOURCES[kind](pks))
+    documents = search.models.SearchDocument.objects.filter(kind=kind)
+    if pks is not None:
+        documents = documents.filter(object_id__in=[row[0] for row in rows])
+    with django.db.transaction.atomic():
+        existing = {
+            document.object_id: document
+            for document in documents.only('object_id')
+        }
+        new_documents = list()
+        for object_id, title, body, extra in rows:
+            document = existing.get(object_id)
+            if document is None:
+                document = search.models.SearchDocument(
+                    kind=kind, object_id=object_id
+                )
+                new_documents.append(document)
+            document.title, document.body, document.extra = title, body, extra
+        search.models.SearchDocument.objects.bulk_update(
+            existing.values(),
+            ('title', 'body', 'extra'),
+            batch_size=django.conf.settings.SEARCH_BATCH_SIZE,
+        )
+        search.models.SearchDocument.objects.bulk_create(
+            new_documents, batch_size=django.conf.settings.SEARCH_BATCH_SIZE
+        )
+        if rows:
+            search.backends.get_backend().index(
+                list(documents.only('title', 'body', 'extra'))
+            )
+    return len(rows)
+
+
+def index_on_commit(kind: str, pks: typing.Iterable[int]) -> None:
+    """
+    индексируем объекты после фиксации транзакции пачками
+    для массовых вставок, которые сигналов не отправляют
+    """
+    pks = list(pks)
+    batch_size = django.conf.settings.SEARCH_BATCH_SIZE
+
+    def index() -> None:
+        for start in range(0, len(pks), batch_size):
+            index_objects(kind, pks[start : start + batch_size])
+
+    if pks:
+        django.db.transaction.on_commit(index)
+
+
+def remove_objects(kind: str, pks: typing.Iterable[int]) -> None:
+    """удаляем поисковые документы объектов"""
+    documents = search.models.SearchDocument.objects.filter(
+        kind=kind, object_id__in=pks
+    )
+    with django.db.transaction.atomic():
+        search.backends.get_backend().remove(
+            list(documents.values_list('pk', flat=True))
+        )
+        documents.delete()
+
+
+def rebuild_index() -> int:
+    """
+    переиндексируем все объекты заново,
+    документы удаленных объектов пропадают
+    возвращаем количество документов
+    """
+    with django.db.transaction.atomic():
+        search.backends.get_backend().clear()
+        search.models.SearchDocument.objects.all().delete()
+        return sum(index_objects(kind) for kind in DOCUMENT_SOURCES)
+
+
+def filter_search(
+    queryset: django.db.models.QuerySet,
+    kind: str,
+    query: str,
+    column: typing.Optional[str] = None,
+) -> django.db.models.QuerySet:
+    """
+    оставляем в queryset найденные объекты и сортируем их по релевантности
+    column ограничивает поиск названием (title), текстом (body)
+    или организацией и тегами (extra)
+    фильтры queryset применяются в поиске до SEARCH_RESULTS_LIMIT,
+    поэтому скрытые объекты не вытесняют видимые
+    """
+    tokens = search.backends.get_tokens(query)
+    if not tokens:
+        return queryset.none()
+    object_ids = search.backends.get_backend().search(
+        kind,
+        tokens,
+        column,
+        limit=django.conf.settings.SEARCH_RESULTS_LIMIT,
+        queryset=queryset,
+    )
+    if not object_ids:
+        return queryset.none()
+    return queryset.filter(pk__in=object_ids).order_by(
+        django.db.models.Case(
+            *(
+                django.db.models.When(pk=object_id, then=position)
+                for position, object_id in enumerate(object_ids)
+            ),
+            output_field=django.db.models.IntegerField(),
+        )
+    )
@@ -0,0 +1,148 @@
+import django.db.models.signals
+import django.dispatch
+
+import organization.models
+import quiz.models
+import search.fuzzy
+import search.services
+import users.models
+
+
+Kinds = search.services.Kinds
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=quiz.models.Quiz
+)
+def index_quiz(sender: type, instance: quiz.models.Quiz, **kwargs) -> None:
+    """викторина сохранена, обновляем ее документ"""
+    if not kwargs.get('raw'):
+        search.services.index_objects(Kinds.QUIZ, [instance.pk])
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save,
+    sender=organization.models.Organization,
+)
+def index_organization(
+    sender: type, instance: organization.models.Organization, **kwargs
+) -> None:
+    """
+    организация сохранена, обновляем ее документ
+    и документы ее викторин, в них есть название организации
+    """
+    if kwargs.get('raw'):
+        return
+    search.services.index_objects(Kinds.ORGANIZATION, [instance.pk])
+    quiz_pks = list(instance.quizzes.values_list('pk', flat=True))
+    if quiz_pks:
+        search.services.index_objects(Kinds.QUIZ, quiz_pks)
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=quiz.models.Question
+)
+def index_question(
+    sender: type, instance: quiz.models.Question, **kwargs
+) -> None:
+    """вопрос сохранен, обновляем его документ"""
+    if not kwargs.get('raw'):
+        search.services.index_objects(Kinds.QUESTION, [instance.pk])
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=quiz.models.Tag
+)
+def index_tag_questions(
+    sender: type, instance: quiz.models.Tag, **kwargs
+) -> None:
+    """тег сохранен, обновляем документы его вопросов"""
+    if kwargs.get('raw') or kwargs.get('created'):
+        return
+    question_pks = list(instance.questions.values_list('pk', flat=True))
+    if question_pks:
+        search.services.index_objects(Kinds.QUESTION, question_pks)
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.m2m_changed,
+    sender=quiz.models.Question.tags.through,
+)
+def index_question_tags(
+    sender: type,
+    instance: django.db.models.Model,
+    action: str,
+    reverse: bool,
+    pk_set: set,
+    **kwargs,
+) -> None:
+    """теги вопроса изменились, обновляем документы вопросов"""
+    if not action.startswith('post_'):
+        return
+    question_pks = list(pk_set or ()) if reverse else [instance.pk]
+    if question_pks:
+        search.services.index_objects(Kinds.QUESTION, question_pks)
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete, sender=quiz.models.Quiz
+)
+def remove_quiz(sender: type, instance: quiz.models.Quiz, **kwargs) -> None:
+    """викторина удалена, удаляем ее документ"""
+    search.services.remove_objects(Kinds.QUIZ, [instance.pk])
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete,
+    sender=organization.models.Organization,
+)
+def remove_organization(
+    sender: type, instance: organization.models.Organization, **kwargs
+) -> None:
+    """организация удалена, удаляем ее документ"""
+    search.services.remove_objects(Kinds.ORGANIZATION, [instance.pk])
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete, sender=quiz.models.Question
+)
+def remove_question(
+    sender: type, instance: quiz.models.Question, **kwargs
+) -> None:
+    """вопрос удален, удаляем его документ"""
+    search.services.remove_objects(Kinds.QUESTION, [instance.pk])
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=users.models.User
+)
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=quiz.models.Quiz
+)
+@django.dispatch.receiver(
+    django.db.models.signals.post_save,
+    sender=organization.models.Organization,
+)
+def update_fuzzy_index(
+    sender: type, instance: django.db.models.Model, **kwargs
+) -> None:
+    """название объекта могло измениться, обновляем нечеткий поиск"""
+    if not kwargs.get('raw'):
+        search.fuzzy.on_object_changed(instance, deleted=False)
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete, sender=users.models.User
+)
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete, sender=quiz.models.Quiz
+)
+@django.dispatch.receiver(
+    django.db.models.signals.post_delete,
+    sender=organization.models.Organization,
+)
+def remove_from_fuzzy_index(
+    sender: type, instance: django.db.models.Model, **kwargs
+) -> None:
+    """объект удален, убираем его из нечеткого поиска"""
+    search.fuzzy.on_object_changed(instance, deleted=True)
@@ -0,0 +1,222 @@
+import django.test
+import django.test.utils
+import django.urls
+import django.utils.timezone
+
+import organization.forms
+import organization.models
+import quiz.models
+import search.fuzzy
+import search.models
+import search.services
+import users.models
+
+
+class SearchTests(django.test.TestCase):
+    """тестируем полнотекстовый поиск"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        self.user = users.models.User.objects.create(
+            username='testuser', email='testuser@gmail.com'
+        )
+        self.organization = organization.models.Organization.objects.create(
+            name='Клуб знатоков', description='<p>Интеллектуальные игры</p>'
+        )
+        self.history = self.create_quiz(
+            'История России', '<p>Вопросы про <b>Петра</b> Первого</p>'
+        )
+        self.geography = self.create_quiz(
+            'География', '<p>Реки и история открытий</p>'
+        )
+
+    def create_quiz(self, name: str, description: str) -> quiz.models.Quiz:
+        """создаем опубликованную викторину организации"""
+        return quiz.models.Quiz.objects.create(
+            creator=self.user,
+            name=name,
+            description=description,
+            start_time=django.utils.timezone.now(),
+            duration=60,
+            is_published=True,
+            organized_by=self.organization,
+        )
+
+    def search_quizzes(self, searched: str, criteria: str = 'all') -> list:
+        """названия найденных викторин на странице списка"""
+        response = django.test.Client().get(
+            django.urls.reverse('quiz:list'),
+            {'searched': searched, 'search_critery': criteria},
+        )
+        return [quiz_obj.name for quiz_obj in response.context['quizzes']]
+
+    def test_document_without_html(self) -> None:
+        """в документ попадает текст без html"""
+        document = search.models.SearchDocument.objects.get(
+            kind=search.models.SearchDocument.Kinds.QUIZ,
+            object_id=self.history.pk,
+        )
+        self.assertEqual(document.body, 'Вопросы про Петра Первого')
+        self.assertEqual(document.extra, 'Клуб знатоков')
+
+    def test_relevance_order(self) -> None:
+        """совпадение в названии важнее совпадения в описании"""
+        self.assertEqual(
+            self.search_quizzes('истор'), ['История России', 'География']
+        )
+
+    def test_search_by_column(self) -> None:
+        """поиск только по выбранному критерию"""
+        self.assertEqual(
+            self.search_quizzes('история', 'description'), ['География']
+        )
+        self.assertEqual(
+            len(self.search_quizzes('знатоков', 'organized_by')), 2
+        )
+        self.assertEqual(self.search_quizzes('знатоков', 'name'), [])
+
+    @django.test.utils.override_settings(SEARCH_RESULTS_LIMIT=2)
+    def test_hidden_matches_not_counted(self) -> None:
+        """скрытые совпадения не вытесняют видимые из лимита"""
+        for quiz_ind in range(3):
+            hidden = self.create_quiz(f'История {quiz_ind}', '<p>текст</p>')
+            hidden.is_private = True
+            hidden.save()
+        self.assertEqual(
+            self.search_quizzes('история', 'name'), ['История России']
+        )
+
+    def test_html_not_searched(self) -> None:
+        """теги разметки не находятся"""
+        self.assertEqual(self.search_quizzes('b'), [])
+
+    def test_index_synced_on_save_and_delete(self) -> None:
+        """документы обновляются при сохранении и удалении"""
+        self.geography.name = 'Океаны'
+        self.geography.save()
+        self.assertEqual(self.search_quizzes('океаны'), ['Океаны'])
+        self.organization.name = 'Лига'
+        self.organization.save()
+        self.assertEqual(len(self.search_quizzes('лига', 'organized_by')), 2)
+        self.history.delete()
+        self.assertEqual(self.search_quizzes('петра'), [])
+
+    def test_question_tags(self) -> None:
+        """вопросы находятся по тегам"""
+        question = quiz.models.Question.objects.create(
+            name='Столица', text='<p>Назовите столицу</p>', quiz=self.history
+        )
+        question.tags.add(quiz.models.Tag.objects.create(name='города'))
+        self.assertEqual(
+            list(
+                search.services.filter_search(
+                    quiz.models.Question.objects.all(),
+                    search.models.SearchDocument.Kinds.QUESTION,
+                    'города',
+                    'extra',
+                )
+            ),
+            [question],
+        )
+
+    def test_rebuild_index(self) -> None:
+        """переиндексация восстанавливает документы"""
+        search.models.SearchDocument.objects.all().delete()
+        self.assertEqual(search.services.rebuild_index(), 3)
+        self.assertEqual(self.search_quizzes('петра'), ['История России'])
+
+
+class FuzzySearchTests(django.test.TestCase):
+    """тестируем нечеткий поиск и подсказки"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        search.fuzzy.get_backend().reset()
+        for username in ('alexander', 'alexandra', 'boris', 'hidden'):
+            users.models.User.objects.create(
+                username=username,
+                email=f'{username}@gmail.com',
+                is_active=username != 'hidden',
+            )
+
+    def get_labels(self, kind: str, query: str) -> list:
+        """названия из ответа автодополнения"""
+        response = django.test.Client().get(
+            django.urls.reverse('search:autocomplete', kwargs={'kind': kind}),
+            {'q': query},
+        )
+        return [result['label'] for result in response.json()['results']]
+
+    def test_typo_tolerant(self) -> None:
+        """имя находится с опечаткой, самое похожее первым"""
+        self.assertEqual(
+            self.get_labels('users', 'alexnder'), ['alexander', 'alexandra']
+        )
+
+    def test_hidden_objects_not_suggested(self) -> None:
+        """неактивные пользователи и приватные объекты не подсказываются"""
+        self.assertEqual(self.get_labels('users', 'hidden'), [])
+        organization.models.Organization.objects.create(
+            name='secret club', description='description', is_private=True
+        )
+        self.assertEqual(self.get_labels('organizations', 'secret'), [])
+
+    def test_index_updated_on_change(self) -> None:
+        """переименование и удаление сразу видны в подсказках"""
+        self.get_labels('users', 'boris')
+        user = users.models.User.objects.get(username='boris')
+        user.username = 'borislav'
+        user.save()
+        self.assertEqual(self.get_labels('users', 'borislav'), ['borislav'])
+        user.delete()
+        self.assertEqual(self.get_labels('users', 'borislav'), [])
+
+    def test_changed_in_other_process(self) -> None:
+        """
+        переименование без сигналов видно после повышения версии,
+        как после изменения в другом процессе
+        """
+        self.get_labels('users', 'boris')
+        users.models.User.objects.filter(username='boris').update(
+            username='borislav'
+        )
+        self.assertEqual(self.get_labels('users', 'borislav'), ['boris'])
+        search.fuzzy.touch('users')
+        self.assertEqual(self.get_labels('users', 'borislav'), ['borislav'])
+
+    def test_own_change_keeps_index(self) -> None:
+        """после своего изменения индекс не строится заново"""
+        self.get_labels('users', 'boris')
+        user = users.models.User.objects.get(username='boris')
+        user.username = 'borislav'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                search.fuzzy.suggest('users', 'borislav'),
+                [(user.pk, 'borislav')],
+            )
+
+    @django.test.utils.override_settings(FUZZY_INDEX_MAX_AGE_SECONDS=0)
+    def test_old_index_rebuilt(self) -> None:
+        """устаревший индекс видит изменения, прошедшие мимо сигналов"""
+        self.get_labels('users', 'boris')
+        users.models.User.objects.filter(username='boris').update(
+            username='borislav'
+        )
+        self.assertEqual(self.get_labels('users', 'borislav'), ['borislav'])
+
+    def test_unknown_kind(self) -> None:
+        """неизвестный тип поиска - 404"""
+        response = django.test.Client().get(
+            django.urls.reverse('search:autocomplete', kwargs={'kind': 'x'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_invite_form_suggests_users(self) -> None:
+        """форма приглашения подсказывает похожие имена"""
+        form = organization.forms.InviteToOrganizationForm(
+            {'username': 'boriss'}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('boris', form.errors['username'][0])
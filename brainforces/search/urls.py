@@ -0,0 +1,14 @@
+import django.urls
+
+import search.views
+
+
+app_name = 'search'
+
+urlpatterns = [
+    django.urls.path(
+        'autocomplete/<str:kind>/',
+        search.views.AutocompleteView.as_view(),
+        name='autocomplete',
+    ),
+]
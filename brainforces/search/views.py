@@ -0,0 +1,39 @@
+import django.http
+import django.urls
+import django.views.generic
+
+import search.fuzzy
+
+
+class AutocompleteView(django.views.generic.View):
+    """
+    подсказки для поиска пользователей, викторин и организаций
+    нечеткий поиск находит названия даже с опечатками
+    """
+
+    url_names = {
+        'users': 'users:profile',
+        'quizzes': 'quiz:quiz_detail',
+        'organizations': 'organization:profile',
+    }
+
+    def get(
+        self, request: django.http.HttpRequest, kind: str
+    ) -> django.http.JsonResponse:
+        if kind not in search.fuzzy.SOURCES:
+            raise django.http.Http404()
+        suggestions = search.fuzzy.suggest(kind, request.GET.get('q', ''))
+        return django.http.JsonResponse(
+            {
+                'results': [
+                    {
+                        'id': pk,
+                        'label': label,
+                        'url': django.urls.reverse(
+                            self.url_names[kind], kwargs={'pk': pk}
+                        ),
+                    }
+                    for pk, label in suggestions
+                ]
+            }
+        )
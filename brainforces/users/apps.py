@@ -7,3 +7,7 @@ class UsersConfig(django.apps.AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
     verbose_name = 'пользователи'
+
+    def ready(self) -> None:
+        """подключаем обработчики сигналов"""
+        import users.signals  # noqa: F401
@@ -1,52 +1,250 @@
+import hashlib
+import typing
+
 import django.conf
 import django.contrib
 import django.contrib.auth.backends
-import django.db.models
+import django.core.cache
+import django.http
 
+import core.ratelimit
 import users.models
 import users.services
 
 
+# поля, нужные для входа и сессии
+AUTH_USER_FIELDS = (
+    'username',
+    'email',
+    'password',
+    'is_active',
+    'login_attempts',
+    'last_login',
+)
+
+
+def get_cache() -> typing.Any:
+    """кеш ненайденных логинов"""
+    return django.core.cache.caches[django.conf.settings.AUTH_CACHE_ALIAS]
+
+
+def get_missing_key(field: str, value: str) -> str:
+    """ключ кеша: по значению поля пользователь не найден"""
+    value_hash = hashlib.md5(value.encode()).hexdigest()
+    return f'auth_missing:{field}:{value_hash}'
+
+
+def forget_missing(user: users.models.User) -> None:
+    """пользователь появился или изменился, его логины снова ищем в бд"""
+    get_cache().delete_many(
+        [
+            get_missing_key('email', user.email),
+            get_missing_key('username', user.username),
+        ]
+    )
+
+
+def get_account_ident(
+    user: typing.Optional[users.models.User], username: str
+) -> str:
+    """
+    чей счетчик неудачных входов: найденного пользователя, по какому бы
+    логину он ни входил, или нормализованного логина, если никого нет
+    """
+    if user is not None:
+        return f'user:{user.pk}'
+    return users.models.User.objects.normalize_email(username) or username
+
+
+def get_account_checks(ident: str) -> typing.List[core.ratelimit.Check]:
+    """ограничение неудачных входов в аккаунт"""
+    rate = core.ratelimit.RateLimit(
+        'login_account',
+        django.conf.settings.LOGIN_ATTEMPTS,
+        django.conf.settings.LOGIN_ATTEMPTS_SECONDS,
+    )
+    return [(rate, ident)]
+
+
+def get_global_check() -> core.ratelimit.Check:
+    """
+    неудачные входы на всем сайте
+    это признак массового перебора, а не ограничение: отклонять по нему
+    все входы нельзя, иначе перебор с чужих адресов закроет вход всем
+    """
+    settings = django.conf.settings
+    return (
+        core.ratelimit.RateLimit(
+            'login_global',
+            settings.LOGIN_GLOBAL_LIMIT,
+            settings.LOGIN_GLOBAL_SECONDS,
+        ),
+        'all',
+    )
+
+
+def get_client_checks(
+    request: typing.Optional[django.http.HttpRequest],
+) -> typing.List[core.ratelimit.Check]:
+    """ограничение неудачных входов с одного ip"""
+    settings = django.conf.settings
+    ip = request.META.get(settings.RATELIMIT_IP_HEADER) if request else None
+    if not ip:
+        return list()
+    return [
+        (
+            core.ratelimit.RateLimit(
+                'login_ip', settings.LOGIN_IP_LIMIT, settings.LOGIN_IP_SECONDS
+            ),
+            ip.split(',')[0].strip(),
+        )
+    ]
+
+
+def reset_login_attempts(user: users.models.User) -> None:
+    """забываем неудачные входы в аккаунт"""
+    core.ratelimit.reset(get_account_checks(get_account_ident(user, '')))
+
+
+def is_limited(
+    checks: typing.List[core.ratelimit.Check],
+    counts: typing.Sequence[float],
+    is_flood: bool,
+) -> bool:
+    """
+    исчерпан ли лимит, при массовом переборе по всему сайту
+    лимит - LOGIN_FLOOD_ATTEMPTS
+    """
+    for (rate, _), count in zip(checks, counts):
+        limit = rate.limit
+        if is_flood:
+            limit = min(limit, django.conf.settings.LOGIN_FLOOD_ATTEMPTS)
+        if count >= limit:
+            return True
+    return False
+
+
 class EmailBackend(django.contrib.auth.backends.ModelBackend):
     """бекенд для аутентификации по почте"""
 
+    def get_user(self, user_id: int) -> typing.Optional[users.models.User]:
+        """
+        пользователь сессии вместе с профилем одним запросом,
+        шапка страницы показывает аватарку из профиля
+        """
+        user = (
+            users.models.User.objects.select_related('profile')
+            .filter(pk=user_id)
+            .first()
+        )
+        return user if self.user_can_authenticate(user) else None
+
+    def get_login_user(
+        self, username: typing.Optional[str]
+    ) -> typing.Optional[users.models.User]:
+        """
+        ищем пользователя отдельными запросами по почте и по имени,
+        каждый идет по своему уникальному индексу
+        логины, по которым никого нет, недолго помним в кеше
+        """
+        if not username:
+            return None
+        probes = list()
+        email = users.models.User.objects.normalize_email(username)
+        if email:
+            probes.append(('email', email))
+        probes.append(('username', username))
+        cache = get_cache()
+        missing = cache.get_many(
+            [get_missing_key(field, value) for field, value in probes]
+        )
+        queryset = users.models.User.objects.only(*AUTH_USER_FIELDS)
+        for field, value in probes:
+            key = get_missing_key(field, value)
+            if key in missing:
+                continue
+            user = queryset.filter(**{field: value}).first()
+            if user is not None:
+                return user
+            cache.set(
+                key, True, django.conf.settings.AUTH_MISSING_CACHE_SECONDS
+            )
+        return None
+
     def authenticate(
         self, request, username=None, password=None, **kwargs
-    ) -> None:
+    ) -> typing.Optional[users.models.User]:
         """
-        ищем пользователя с такой почтой,
-        если пароль неправильный то количество неудачных
-        попыток входа увеличивается
-        отправляем письмо с реактивацией аккаунта если попыток много
+        ищем пользователя с такой почтой или именем
+        неудачные входы считаем счетчиками в кеше по аккаунту, ip
+        и всему сайту, при исчерпании лимита ip попытка отклоняется
+        до обращения к бд, лимита аккаунта - до проверки пароля
+        аккаунт - найденный пользователь, поэтому вход то по почте,
+        то по имени попыток не добавляет
+        при массовом переборе по всему сайту лимиты аккаунта и ip
+        сжимаются до LOGIN_FLOOD_ATTEMPTS: кто еще не ошибался, входит,
+        а перебор отклоняется, не тратя время воркера на хеширование
+        после LOGIN_ATTEMPTS неудачных попыток за LOGIN_ATTEMPTS_SECONDS
+        аккаунт деактивируется и отправляется письмо с реактивацией
+        в бд пишем только изменившиеся поля
         """
-        email = users.models.User.objects.normalize_email(username)
-        try:
-            user = users.models.User.objects.get(
-                django.db.models.Q(email=email)
-                | django.db.models.Q(username=username)
+        if not username:
+            return None
+        client_checks = get_client_checks(request)
+        global_check = get_global_check()
+        *client_counts, global_count = core.ratelimit.get_counts(
+            client_checks + [global_check]
+        )
+        is_flood = global_count >= global_check[0].limit
+        if is_limited(client_checks, client_counts, is_flood):
+            self.error(
+                request, 'Слишком много попыток входа, попробуйте позже'
             )
-        except users.models.User.DoesNotExist:
             return None
-        if user.check_password(password):
-            user.login_attempts = 0
-            user.save()
+        user = self.get_login_user(username)
+        account_checks = get_account_checks(get_account_ident(user, username))
+        if is_limited(
+            account_checks,
+            core.ratelimit.get_counts(account_checks),
+            is_flood,
+        ):
+            self.error(
+                request, 'Слишком много попыток входа, попробуйте позже'
+            )
+            return None
+        if user is not None and user.check_password(password):
+            if user.login_attempts:
+                user.login_attempts = 0
+                user.save(update_fields=('login_attempts',))
+            reset_login_attempts(user)
             return user
-        else:
-            user.login_attempts += 1
-            if user.login_attempts == django.conf.settings.LOGIN_ATTEMPTS:
-                user.is_active = False
-                django.contrib.messages.error(
-                    request,
-                    'Вы слишком много раз пытались '
-                    'войти в аккаунт'
-                    ', поэтому нам пришлось его деактивировать. '
-                    'Ссылка для восстановления '
-                    'отправлена на ваш email.',
-                )
-                users.services.activation_email(
-                    request, 'users:reset_login_attempts', user
-                )
-            elif user.login_attempts > django.conf.settings.LOGIN_ATTEMPTS:
-                django.contrib.messages.error(request, 'Проверьте свою почту')
-            user.save()
+        core.ratelimit.hit(account_checks + client_checks + [global_check])
+        if user is None:
+            return None
+        if not user.is_active:
+            self.error(request, 'Проверьте свою почту')
+            return None
+        (attempts,) = core.ratelimit.get_counts(account_checks)
+        if attempts >= django.conf.settings.LOGIN_ATTEMPTS:
+            user.login_attempts = django.conf.settings.LOGIN_ATTEMPTS
+            user.is_active = False
+            user.save(update_fields=('login_attempts', 'is_active'))
+            self.error(
+                request,
+                'Вы слишком много раз пытались '
+                'войти в аккаунт'
+                ', поэтому нам пришлось его деактивировать. '
+                'Ссылка для восстановления '
+                'отправлена на ваш email.',
+            )
+            users.services.activation_email(
+                request, 'users:reset_login_attempts', user
+            )
         return None
+
+    def error(
+        self, request: typing.Optional[django.http.HttpRequest], text: str
+    ) -> None:
+        """сообщение об ошибке входа, если вход идет из запроса"""
+        if request is not None:
+            django.contrib.messages.error(request, text)
@@ -0,0 +1,206 @@
+import functools
+import operator
+import typing
+
+import django.conf
+import django.db
+import django.db.models
+import django.db.models.functions
+
+import core.cache
+import users.models
+
+
+def get_user_rows(
+    user_pks: typing.Optional[typing.Iterable[int]] = None,
+) -> typing.Dict[int, typing.Tuple[str, int]]:
+    """
+    имя и рейтинг активных пользователей
+    пользователя без профиля считаем с нулевым рейтингом
+    """
+    queryset = users.models.User.objects.filter(is_active=True)
+    if user_pks is not None:
+        queryset = queryset.filter(pk__in=user_pks)
+    return {
+        pk: (username, rating)
+        for pk, username, rating in queryset.annotate(
+            rating_value=django.db.models.functions.Coalesce(
+                'profile__rating', 0
+            )
+        )
+        .values_list('pk', 'username', 'rating_value')
+        .iterator()
+    }
+
+
+def lock_leaderboard() -> None:
+    """
+    блокировка рейтинга до конца транзакции
+    места пересчитываются по всей таблице, поэтому одновременные
+    обновления (итоги разных викторин) выполняются по очереди
+    postgresql - advisory lock, sqlite - пустой UPDATE,
+    который сразу берет блокировку записи бд
+    """
+    connection = django.db.connections[
+        django.db.router.db_for_write(users.models.LeaderboardEntry)
+    ]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s)',
+                (django.conf.settings.LEADERBOARD_LOCK_KEY,),
+            )
+    else:
+        users.models.LeaderboardEntry.objects.filter(rank__lt=0).update(rank=0)
+
+
+def rebuild_leaderboard() -> int:
+    """
+    строим рейтинг заново по всем активным пользователям
+    возвращаем количество строк
+    """
+    with django.db.transaction.atomic():
+        lock_leaderboard()
+        rows = sorted(
+            get_user_rows().items(), key=lambda item: (-item[1][1], item[0])
+        )
+        entries = list()
+        rank = 0
+        previous_rating = None
+        for position, (user_pk, (username, rating)) in enumerate(rows, 1):
+            if rating != previous_rating:
+                rank, previous_rating = position, rating
+            entries.append(
+                users.models.LeaderboardEntry(
+                    user_id=user_pk,
+                    username=username,
+                    rating=rating,
+                    rank=rank,
+                )
+            )
+        users.models.LeaderboardEntry.objects.all().delete()
+        users.models.LeaderboardEntry.objects.bulk_create(
+            entries, batch_size=django.conf.settings.LEADERBOARD_BATCH_SIZE
+        )
+    core.cache.touch(users.models.LeaderboardEntry)
+    return len(entries)
+
+
+def update_ranks(low: int, high: int, shift: int) -> None:
+    """
+    пересчитываем места после изменения рейтингов в отрезке [low, high]
+    у строк ниже отрезка место сдвигается на shift - столько строк
+    добавилось в отрезок или ушло из него, выше отрезка ничего не меняется
+    внутри отрезка у строк с одним рейтингом одно место, поэтому
+    места считаем по группам рейтинга и пишем только изменившиеся строки
+    """
+    entries = users.models.LeaderboardEntry.objects
+    if shift:
+        entries.filter(rating__lt=low).update(
+            rank=django.db.models.F('rank') + shift
+        )
+    rank = entries.filter(rating__gt=high).count() + 1
+    ranks = dict()
+    for rating, total in (
+        entries.filter(rating__gte=low, rating__lte=high)
+        .values('rating')
+        .annotate(total=django.db.models.Count('pk'))
+        .order_by('-rating')
+        .values_list('rating', 'total')
+    ):
+        ranks[rating] = rank
+        rank += total
+    batch_size = django.conf.settings.LEADERBOARD_BATCH_SIZE
+    items = list(ranks.items())
+    for start in range(0, len(items), batch_size):
+        batch = items[start : start + batch_size]
+        entries.filter(
+            functools.reduce(
+                operator.or_,
+                (
+                    django.db.models.Q(rating=rating)
+                    & ~django.db.models.Q(rank=rank)
+                    for rating, rank in batch
+                ),
+            )
+        ).update(
+            rank=django.db.models.Case(
+                *(
+                    django.db.models.When(rating=rating, then=rank)
+                    for rating, rank in batch
+                ),
+                output_field=django.db.models.PositiveIntegerField(),
+            )
+        )
+
+
+def update_leaderboard(
+    user_pks: typing.Iterable[int], deleted: bool = False
+) -> None:
+    """
+    обновляем строки пользователей в рейтинге и места затронутых строк
+    неактивные и удаляемые (deleted) пользователи из рейтинга убираются
+    """
+    user_pks = set(user_pks)
+    if not user_pks:
+        return
+    with django.db.transaction.atomic():
+        lock_leaderboard()
+        rows = dict() if deleted else get_user_rows(user_pks)
+        entries = users.models.LeaderboardEntry.objects.in_bulk(user_pks)
+        ratings = [entry.rating for entry in entries.values()]
+        ratings.extend(rating for _, rating in rows.values())
+        if not ratings:
+            return
+        removed = [pk for pk in entries if pk not in rows]
+        added = [
+            users.models.LeaderboardEntry(
+                user_id=pk, username=username, rating=rating
+            )
+            for pk, (username, rating) in rows.items()
+            if pk not in entries
+        ]
+        changed = list()
+        for pk, entry in entries.items():
+            if pk in rows and (entry.username, entry.rating) != rows[pk]:
+                entry.username, entry.rating = rows[pk]
+                changed.append(entry)
+        if not (removed or added or changed):
+            return
+        users.models.LeaderboardEntry.objects.filter(pk__in=removed).delete()
+        users.models.LeaderboardEntry.objects.bulk_create(
+            added, batch_size=django.conf.settings.LEADERBOARD_BATCH_SIZE
+        )
+        users.models.LeaderboardEntry.objects.bulk_update(
+            changed,
+            ('username', 'rating'),
+            batch_size=django.conf.settings.LEADERBOARD_BATCH_SIZE,
+        )
+        update_ranks(min(ratings), max(ratings), len(added) - len(removed))
+    core.cache.touch(users.models.LeaderboardEntry)
+
+
+def get_rank(user_pk: int) -> typing.Optional[int]:
+    """место пользователя в общем рейтинге, None если его там нет"""
+    return (
+        users.models.LeaderboardEntry.objects.filter(user__pk=user_pk)
+        .values_list('rank', flat=True)
+        .first()
+    )
+
+
+def get_rating_histogram(
+    step: typing.Optional[int] = None,
+) -> typing.List[typing.Dict[str, int]]:
+    """количество пользователей по отрезкам рейтинга длины step"""
+    step = step or django.conf.settings.LEADERBOARD_HISTOGRAM_STEP
+    return [
+        {'start': start, 'end': start + step - 1, 'total': total}
+        for start, total in users.models.LeaderboardEntry.objects.annotate(
+            start=django.db.models.F('rating') / step * step
+        )
+        .values('start')
+        .annotate(total=django.db.models.Count('pk'))
+        .order_by('start')
+        .values_list('start', 'total')
+    ]
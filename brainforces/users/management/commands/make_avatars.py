@@ -0,0 +1,23 @@
+import django.core.management.base
+
+import core.images
+import users.models
+
+
+class Command(django.core.management.base.BaseCommand):
+    """копии аватарок, загруженных до появления копий"""
+
+    help = 'Ставит в очередь уменьшенные копии аватарок без копий'
+
+    def handle(self, *args, **options) -> None:
+        profiles = (
+            users.models.Profile.objects.exclude(image='')
+            .exclude(image__isnull=True)
+            .filter(renditions={})
+            .only('image')
+        )
+        jobs_count = 0
+        for profile in profiles.iterator():
+            core.images.enqueue_renditions(profile)
+            jobs_count += 1
+        self.stdout.write(f'Поставлено задач: {jobs_count}')
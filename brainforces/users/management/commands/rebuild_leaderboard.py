@@ -0,0 +1,13 @@
+import django.core.management.base
+
+import users.leaderboard
+
+
+class Command(django.core.management.base.BaseCommand):
+    """перестроение общего рейтинга"""
+
+    help = 'Заново строит общий рейтинг пользователей с местами'
+
+    def handle(self, *args, **options) -> None:
+        entries_count = users.leaderboard.rebuild_leaderboard()
+        self.stdout.write(f'Пользователей в рейтинге: {entries_count}')
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_leaderboard(apps, schema_editor):
+    """строим рейтинг по существующим пользователям"""
+    user_model = apps.get_model('users', 'User')
+    profile_model = apps.get_model('users', 'Profile')
+    entry_model = apps.get_model('users', 'LeaderboardEntry')
+    ratings = dict(profile_model.objects.values_list('user_id', 'rating'))
+    rows = sorted(
+        (
+            (-ratings.get(pk, 0), pk, username)
+            for pk, username in user_model.objects.filter(
+                is_active=True
+            ).values_list('pk', 'username')
+        )
+    )
+    entries = list()
+    rank = 0
+    previous_rating = None
+    for position, (negative_rating, pk, username) in enumerate(rows, 1):
+        if negative_rating != previous_rating:
+            rank, previous_rating = position, negative_rating
+        entries.append(
+            entry_model(
+                user_id=pk, username=username, rating=-negative_rating, rank=rank
+            )
+        )
+    entry_model.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_profile_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('user', models.OneToOneField(help_text='Пользователь в рейтинге', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to='users.user', verbose_name='пользователь')),
+                ('username', models.CharField(help_text='Имя пользователя на момент обновления рейтинга', max_length=150, verbose_name='имя пользователя')),
+                ('rating', models.PositiveIntegerField(default=0, help_text='Рейтинг пользователя', verbose_name='рейтинг')),
+                ('rank', models.PositiveIntegerField(default=0, help_text='Место в общем рейтинге', verbose_name='место')),
+            ],
+            options={
+                'verbose_name': 'место в рейтинге',
+                'verbose_name_plural': 'общий рейтинг',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['rank', 'user'], name='leaderboard_rank'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['rating', 'rank'], name='leaderboard_rating'),
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
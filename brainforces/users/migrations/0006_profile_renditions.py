@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Адреса уменьшенных копий картинки по формату и размеру', verbose_name='копии картинки'),
+        ),
+    ]
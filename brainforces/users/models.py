@@ -72,3 +72,54 @@ class Profile(core.models.AbstractImageModel):
     def __str__(self) -> str:
         """строковое представление"""
         return f'Профиль пользователя {self.user.pk}'
+
+
+class LeaderboardEntry(django.db.models.Model):
+    """
+    строка общего рейтинга пользователей
+    копия имени и рейтинга активного пользователя с готовым местом,
+    чтобы список рейтинга и место пользователя читались из одной таблицы
+    место - 1 + количество пользователей с большим рейтингом
+    """
+
+    user = django.db.models.OneToOneField(
+        User,
+        verbose_name='пользователь',
+        help_text='Пользователь в рейтинге',
+        related_name='leaderboard_entry',
+        on_delete=django.db.models.CASCADE,
+        primary_key=True,
+    )
+    username = django.db.models.CharField(
+        verbose_name='имя пользователя',
+        help_text='Имя пользователя на момент обновления рейтинга',
+        max_length=150,
+    )
+    rating = django.db.models.PositiveIntegerField(
+        verbose_name='рейтинг', help_text='Рейтинг пользователя', default=0
+    )
+    rank = django.db.models.PositiveIntegerField(
+        verbose_name='место', help_text='Место в общем рейтинге', default=0
+    )
+
+    class Meta:
+        verbose_name = 'место в рейтинге'
+        verbose_name_plural = 'общий рейтинг'
+        indexes = [
+            django.db.models.Index(
+                fields=('rank', 'user'), name='leaderboard_rank'
+            ),
+            django.db.models.Index(
+                fields=('rating', 'rank'), name='leaderboard_rating'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """строковое представление"""
+        return f'{self.rank}. {self.username}'
+
+    def get_absolute_url(self) -> str:
+        """путь к профилю пользователя"""
+        return django.urls.reverse_lazy(
+            'users:profile', kwargs={'pk': self.user_id}
+        )
@@ -1,23 +1,39 @@
+import hashlib
+
 import django.conf
 import django.contrib.auth.models
 import django.contrib.auth.tokens
 import django.contrib.sites.shortcuts
-import django.core.mail
 import django.http
 import django.template.loader
 import django.utils.encoding
 import django.utils.http
-import django.conf
 
+import core.models
 import users.tokens
 
 
+def get_token_state(user: django.contrib.auth.models.AbstractBaseUser) -> str:
+    """
+    хеш полей, от которых зависит токен ссылки: после входа
+    или смены пароля старая ссылка уже не работает
+    """
+    return hashlib.md5(
+        f'{user.password}:{user.last_login}'.encode()
+    ).hexdigest()
+
+
 def activation_email(
     request: django.http.HttpRequest,
     where_to: str,
     user: django.contrib.auth.models.AbstractBaseUser,
-) -> None:
-    """создаем токен для активации аккаунта"""
+) -> core.models.Email:
+    """
+    ставим в очередь письмо со ссылкой активации аккаунта
+    письмо отправит воркер, поэтому регистрация и вход не ждут
+    почтовый сервер, повторное письмо о блокировке не дублируется,
+    пока ссылка из прошлого письма еще работает
+    """
     if where_to == 'users:reset_login_attempts':
         token = users.tokens.token_7_days.make_token(user)
     elif where_to == 'users:activate_user':
@@ -39,6 +55,10 @@ def activation_email(
             'where_to': where_to,
         },
     )
-    print("STARTED")
-    django.core.mail.send_mail('Activate your account', message , django.conf.settings.EMAIL_HOST_USER, [user.email])
-    print("FINISHED")
+    return core.models.Email.objects.enqueue(
+        user.email,
+        'Activate your account',
+        message,
+        from_email=django.conf.settings.EMAIL_HOST_USER or '',
+        key=f'{where_to}:{user.pk}:{get_token_state(user)}',
+    )
@@ -0,0 +1,64 @@
+import django.db.models.signals
+import django.dispatch
+
+import users.backends
+import users.leaderboard
+import users.models
+
+
+# поля пользователя, которые есть в общем рейтинге
+LEADERBOARD_USER_FIELDS = frozenset(('username', 'is_active'))
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=users.models.User
+)
+def update_user_in_leaderboard(
+    sender: type,
+    instance: users.models.User,
+    update_fields: frozenset = None,
+    **kwargs,
+) -> None:
+    """пользователь изменился, обновляем его строку в рейтинге"""
+    if update_fields is not None and not (
+        LEADERBOARD_USER_FIELDS & set(update_fields)
+    ):
+        return
+    users.leaderboard.update_leaderboard([instance.pk])
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=users.models.User
+)
+def forget_missing_login(
+    sender: type,
+    instance: users.models.User,
+    update_fields: frozenset = None,
+    **kwargs,
+) -> None:
+    """новое имя или почта могли быть в кеше ненайденных логинов"""
+    if update_fields is not None and not (
+        {'username', 'email'} & set(update_fields)
+    ):
+        return
+    users.backends.forget_missing(instance)
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.pre_delete, sender=users.models.User
+)
+def remove_user_from_leaderboard(
+    sender: type, instance: users.models.User, **kwargs
+) -> None:
+    """пользователь удаляется, места ниже него сдвигаются"""
+    users.leaderboard.update_leaderboard([instance.pk], deleted=True)
+
+
+@django.dispatch.receiver(
+    django.db.models.signals.post_save, sender=users.models.Profile
+)
+def update_rating_in_leaderboard(
+    sender: type, instance: users.models.Profile, **kwargs
+) -> None:
+    """рейтинг в профиле изменился, обновляем места"""
+    users.leaderboard.update_leaderboard([instance.user_id])
@@ -1,13 +1,23 @@
+import typing
+
 import freezegun
 import parameterized
 import pytz
 
 import django.conf
+import django.contrib.messages.storage.cookie
 import django.core
+import django.core.cache
+import django.db
+import django.http
 import django.test
+import django.test.utils
 import django.urls
 import django.utils
 
+import core.models
+import core.services
+import users.backends
 import users.models
 
 
@@ -32,6 +42,10 @@ class UserTests(django.test.TestCase):
         'password2': 'ajdfgbjuygfrb',
     }
 
+    def setUp(self) -> None:
+        """сбрасываем счетчики неудачных входов"""
+        django.core.cache.cache.clear()
+
     def test_user_register_status_code(self) -> None:
         """тестируем статус код страницы регистрации"""
         response = django.test.Client().get(
@@ -96,6 +110,7 @@ class UserTests(django.test.TestCase):
             self.register_data,
             follow=True,
         )
+        core.services.send_pending_emails()
         text = django.core.mail.outbox[0].body
         text = text[text.find('http') :].strip('\n')
         client.get(text)
@@ -112,6 +127,7 @@ class UserTests(django.test.TestCase):
                 follow=True,
             )
         with freezegun.freeze_time('2023-01-01 13:00:00'):
+            core.services.send_pending_emails()
             text = django.core.mail.outbox[0].body
             text = text[text.find('http') :].strip('\n')
             client.get(text)
@@ -202,6 +218,7 @@ class UserTests(django.test.TestCase):
                 {'username': user.username, 'password': 'testbeb'},
                 follow=True,
             )
+        core.services.send_pending_emails()
         text = django.core.mail.outbox[0].body
         text = text[text.find('http') :].strip('\n')
         client.get(text)
@@ -225,12 +242,206 @@ class UserTests(django.test.TestCase):
                     follow=True,
                 )
         with freezegun.freeze_time('2023-01-10'):
+            core.services.send_pending_emails()
             text = django.core.mail.outbox[0].body
             text = text[text.find('http') :].strip('\n')
             client.get(text)
             self.assertFalse(users.models.User.objects.get(pk=1).is_active)
 
+    @django.test.override_settings(USER_IS_ACTIVE=False)
+    def test_signup_only_enqueues_email(self) -> None:
+        """регистрация ставит письмо в очередь, а не отправляет его"""
+        django.test.Client().post(
+            django.urls.reverse('users:signup'), self.register_data
+        )
+        self.assertEqual(len(django.core.mail.outbox), 0)
+        self.assertEqual(
+            core.models.Email.objects.get().to, self.register_data['email']
+        )
+
+    @django.test.override_settings(USER_IS_ACTIVE=True)
+    def test_repeated_lockout_sends_one_email(self) -> None:
+        """повторная блокировка не отправляет второе письмо"""
+        client = django.test.Client()
+        client.post(django.urls.reverse('users:signup'), self.register_data)
+        client.get(django.urls.reverse('users:logout'))
+        for _ in range(2):
+            django.core.cache.cache.clear()
+            users.models.User.objects.filter(pk=1).update(is_active=True)
+            for _ in range(django.conf.settings.LOGIN_ATTEMPTS):
+                client.post(
+                    django.urls.reverse('users:login'),
+                    {
+                        'username': self.register_data['username'],
+                        'password': 'testbeb',
+                    },
+                )
+            self.assertFalse(users.models.User.objects.get(pk=1).is_active)
+        self.assertEqual(core.models.Email.objects.count(), 1)
+
+    @django.test.override_settings(USER_IS_ACTIVE=True)
+    def test_lockout_after_reset_sends_new_email(self) -> None:
+        """
+        после реактивации и входа старая ссылка не работает,
+        поэтому новая блокировка отправляет новое письмо
+        """
+        client = django.test.Client()
+        client.post(django.urls.reverse('users:signup'), self.register_data)
+        client.get(django.urls.reverse('users:logout'))
+        for lockout_ind in range(2):
+            for _ in range(django.conf.settings.LOGIN_ATTEMPTS):
+                client.post(
+                    django.urls.reverse('users:login'),
+                    {
+                        'username': self.register_data['username'],
+                        'password': 'testbeb',
+                    },
+                )
+            self.assertFalse(users.models.User.objects.get(pk=1).is_active)
+            core.services.send_pending_emails()
+            self.assertEqual(len(django.core.mail.outbox), lockout_ind + 1)
+            text = django.core.mail.outbox[-1].body
+            client.get(text[text.find('http') :].strip('\n'))
+            self.assertTrue(users.models.User.objects.get(pk=1).is_active)
+            client.post(
+                django.urls.reverse('users:login'),
+                {
+                    'username': self.register_data['username'],
+                    'password': self.register_data['password1'],
+                },
+            )
+            client.get(django.urls.reverse('users:logout'))
+
     def tearDown(self) -> None:
         """чистим бд после тестов"""
         users.models.User.objects.all().delete()
         super().tearDown()
+
+
+@django.test.override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+)
+class EmailBackendTests(django.test.TestCase):
+    """тестируем запросы бекенда аутентификации"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        django.core.cache.cache.clear()
+        self.backend = users.backends.EmailBackend()
+        self.user = users.models.User.objects.create_user(
+            username='aboba', email='aboba@yandex.ru', password='password'
+        )
+
+    def get_request(self, **extra: str) -> django.http.HttpRequest:
+        """запрос формы входа, в который можно писать сообщения"""
+        request = django.test.RequestFactory().post('/', **extra)
+        request._messages = (
+            django.contrib.messages.storage.cookie.CookieStorage(request)
+        )
+        return request
+
+    def authenticate(
+        self,
+        username: str,
+        password: str,
+        request: typing.Optional[django.http.HttpRequest] = None,
+    ) -> tuple:
+        """пользователь и запросы в бд при входе"""
+        with django.test.utils.CaptureQueriesContext(
+            django.db.connection
+        ) as queries:
+            user = self.backend.authenticate(
+                request, username=username, password=password
+            )
+        return user, [query['sql'] for query in queries]
+
+    def test_success_without_writes(self) -> None:
+        """успешный вход - один запрос по индексу и никаких записей"""
+        user, queries = self.authenticate('aboba@ya.ru', 'password')
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(' OR ', queries[0])
+
+    def test_failure_without_writes(self) -> None:
+        """неудачная попытка считается в кеше, а не в бд"""
+        user, queries = self.authenticate('aboba', 'wrong')
+        self.assertIsNone(user)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('SELECT'))
+        user, queries = self.authenticate('aboba', 'password')
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(queries), 1)
+
+    @django.test.override_settings(LOGIN_ATTEMPTS=2)
+    def test_account_lockout(self) -> None:
+        """после LOGIN_ATTEMPTS ошибок аккаунт блокируется одной записью"""
+        request = self.get_request()
+        self.authenticate('aboba', 'wrong', request)
+        self.authenticate('aboba', 'wrong', request)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.login_attempts, 2)
+        user, queries = self.authenticate('aboba', 'password')
+        self.assertIsNone(user)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('SELECT'))
+
+    @django.test.override_settings(LOGIN_ATTEMPTS=2)
+    def test_email_and_username_share_limit(self) -> None:
+        """вход то по почте, то по имени не добавляет попыток"""
+        request = self.get_request()
+        self.authenticate('aboba', 'wrong', request)
+        self.authenticate('aboba@yandex.ru', 'wrong', request)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    @django.test.override_settings(LOGIN_IP_LIMIT=3)
+    def test_ip_throttled_across_accounts(self) -> None:
+        """перебор разных аккаунтов с одного ip отклоняется без бд"""
+        request = self.get_request()
+        for user_ind in range(3):
+            self.backend.authenticate(
+                request, username=f'user{user_ind}', password='password'
+            )
+        with django.test.utils.CaptureQueriesContext(
+            django.db.connection
+        ) as queries:
+            user = self.backend.authenticate(
+                request, username='aboba', password='password'
+            )
+        self.assertIsNone(user)
+        self.assertEqual(len(queries), 0)
+        other_request = self.get_request(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(
+            self.backend.authenticate(
+                other_request, username='aboba', password='password'
+            ),
+            self.user,
+        )
+
+    @django.test.override_settings(LOGIN_GLOBAL_LIMIT=2)
+    def test_global_limit(self) -> None:
+        """
+        при массовом переборе входит тот, кто еще не ошибался,
+        а ошибавшийся ip отклоняется без бд и проверки пароля
+        """
+        request = self.get_request()
+        for user_ind in range(2):
+            self.authenticate(f'user{user_ind}', 'password', request)
+        other_request = self.get_request(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(
+            self.authenticate('aboba', 'password', other_request)[0],
+            self.user,
+        )
+        user, queries = self.authenticate('aboba', 'password', request)
+        self.assertIsNone(user)
+        self.assertEqual(queries, [])
+
+    def test_missing_login_cached(self) -> None:
+        """ненайденный логин второй раз в бд не ищется"""
+        self.assertEqual(len(self.authenticate('nobody', 'password')[1]), 1)
+        self.assertEqual(self.authenticate('nobody', 'password')[1], [])
+        users.models.User.objects.create_user(
+            username='nobody', email='nobody@gmail.com', password='password'
+        )
+        self.assertIsNotNone(self.authenticate('nobody', 'password')[0])
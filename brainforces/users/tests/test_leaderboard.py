@@ -0,0 +1,137 @@
+import django.db
+import django.test
+import django.test.utils
+import django.urls
+
+import users.leaderboard
+import users.models
+
+
+class LeaderboardTests(django.test.TestCase):
+    """тестируем общий рейтинг пользователей"""
+
+    def setUp(self) -> None:
+        """подготовка к тестированию, создание тестовых данных"""
+        self.users = list()
+        for user_ind, rating in enumerate((150, 300, 150, 0)):
+            user = users.models.User.objects.create(
+                username=f'user{user_ind}', email=f'user{user_ind}@gmail.com'
+            )
+            users.models.Profile.objects.create(user=user, rating=rating)
+            self.users.append(user)
+
+    def get_leaderboard(self) -> list:
+        """строки рейтинга по порядку"""
+        return list(
+            users.models.LeaderboardEntry.objects.order_by(
+                'rank', 'user__pk'
+            ).values_list('username', 'rating', 'rank')
+        )
+
+    def assert_matches_rebuild(self) -> None:
+        """инкрементальный рейтинг совпадает с построенным заново"""
+        leaderboard = self.get_leaderboard()
+        users.leaderboard.rebuild_leaderboard()
+        self.assertEqual(leaderboard, self.get_leaderboard())
+
+    def test_ranks_with_ties(self) -> None:
+        """у одинакового рейтинга одно место, следующее место пропускается"""
+        self.assertEqual(
+            self.get_leaderboard(),
+            [
+                ('user1', 300, 1),
+                ('user0', 150, 2),
+                ('user2', 150, 2),
+                ('user3', 0, 4),
+            ],
+        )
+        self.assert_matches_rebuild()
+
+    def test_rating_change(self) -> None:
+        """изменение рейтинга сдвигает места затронутых строк"""
+        profile = self.users[3].profile
+        profile.rating = 200
+        profile.save()
+        self.assertEqual(users.leaderboard.get_rank(self.users[3].pk), 2)
+        self.assertEqual(users.leaderboard.get_rank(self.users[0].pk), 3)
+        self.assert_matches_rebuild()
+
+    def test_rename_deactivate_and_delete(self) -> None:
+        """имя обновляется, неактивные и удаленные уходят из рейтинга"""
+        self.users[0].username = 'renamed'
+        self.users[0].save()
+        self.users[1].is_active = False
+        self.users[1].save()
+        self.users[2].delete()
+        self.assertEqual(
+            self.get_leaderboard(),
+            [('renamed', 150, 1), ('user3', 0, 2)],
+        )
+        self.assert_matches_rebuild()
+
+    def test_locked_before_read(self) -> None:
+        """
+        блокировка берется до чтения рейтингов, чтобы одновременное
+        подведение итогов ждало и видело уже записанные места
+        """
+        profile = self.users[3].profile
+        profile.rating = 200
+        for update in (
+            profile.save,
+            users.leaderboard.rebuild_leaderboard,
+        ):
+            with self.subTest(update=update.__qualname__):
+                with django.test.utils.CaptureQueriesContext(
+                    django.db.connection
+                ) as context:
+                    update()
+                queries = [query['sql'] for query in context.captured_queries]
+                lock_ind = next(
+                    query_ind
+                    for query_ind, sql in enumerate(queries)
+                    if 'pg_advisory_xact_lock' in sql
+                    or sql.startswith('UPDATE "users_leaderboardentry"')
+                )
+                read_ind = next(
+                    query_ind
+                    for query_ind, sql in enumerate(queries)
+                    if sql.startswith('SELECT') and 'users_profile' in sql
+                )
+                self.assertLess(lock_ind, read_ind)
+        self.assert_matches_rebuild()
+
+    def test_histogram(self) -> None:
+        """пользователи считаются по отрезкам рейтинга"""
+        self.assertEqual(
+            users.leaderboard.get_rating_histogram(100),
+            [
+                {'start': 0, 'end': 99, 'total': 1},
+                {'start': 100, 'end': 199, 'total': 2},
+                {'start': 300, 'end': 399, 'total': 1},
+            ],
+        )
+
+    def test_pages_read_only_leaderboard(self) -> None:
+        """список рейтинга не читает пользователей и профили"""
+        with django.test.utils.CaptureQueriesContext(
+            django.db.connection
+        ) as queries:
+            response = django.test.Client().get(
+                django.urls.reverse('users:list')
+            )
+        self.assertEqual(
+            [user.username for user in response.context['users']],
+            ['user1', 'user0', 'user2', 'user3'],
+        )
+        for query in queries:
+            self.assertNotIn('auth_user', query['sql'])
+            self.assertNotIn('users_profile', query['sql'])
+
+    def test_profile_shows_rank(self) -> None:
+        """в профиле видно место в рейтинге"""
+        response = django.test.Client().get(
+            django.urls.reverse(
+                'users:profile', kwargs={'pk': self.users[2].pk}
+            )
+        )
+        self.assertEqual(response.context['rank'], 2)
@@ -1,11 +1,23 @@
+import io
+import shutil
+import tempfile
+import typing
+
 import parameterized
+import PIL.Image
 
 import django.conf
 import django.core
+import django.core.cache
+import django.core.files.storage
+import django.core.files.uploadedfile
+import django.core.management
 import django.test
 import django.urls
 import django.utils
 
+import core.models
+import core.services
 import quiz.models
 import users.models
 
@@ -137,3 +149,146 @@ class UserProfileTests(django.test.TestCase):
         """удаление тестовых данных"""
         users.models.User.objects.all().delete()
         super().tearDown()
+
+
+class ProfileAvatarTests(django.test.TestCase):
+    """тестируем уменьшенные копии аватарок"""
+
+    def setUp(self) -> None:
+        """пользователь с профилем и временная папка для файлов"""
+        django.core.cache.cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = django.test.override_settings(
+            MEDIA_ROOT=self.media_root
+        )
+        self.settings_override.enable()
+        self.user = users.models.User.objects.create_user(
+            username='testuser', email='testuser@gmail.com', password='pass'
+        )
+        self.profile = users.models.Profile.objects.create(user=self.user)
+        self.client = django.test.Client()
+        self.client.post(
+            django.urls.reverse('users:login'),
+            {'username': 'testuser', 'password': 'pass'},
+        )
+        super().setUp()
+
+    def tearDown(self) -> None:
+        """удаляем загруженные файлы"""
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+    def upload(self, image: typing.Any) -> None:
+        """отправляем форму изменения профиля"""
+        self.client.post(
+            django.urls.reverse(
+                'users:profile_change', kwargs={'pk': self.user.pk}
+            ),
+            {
+                'username': self.user.username,
+                'email': self.user.email,
+                'image': image,
+            },
+        )
+
+    def get_image(self, name: str = 'avatar.png') -> typing.Any:
+        """загружаемая картинка"""
+        buffer = io.BytesIO()
+        PIL.Image.new('RGB', (300, 200), 'red').save(buffer, 'PNG')
+        return django.core.files.uploadedfile.SimpleUploadedFile(
+            name, buffer.getvalue(), content_type='image/png'
+        )
+
+    def test_upload_enqueues_renditions(self) -> None:
+        """загрузка ставит задачу, копии делает воркер"""
+        self.upload(self.get_image())
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.image)
+        self.assertEqual(self.profile.renditions, dict())
+        self.assertEqual(core.models.Job.objects.count(), 1)
+        core.services.run_pending_jobs()
+        self.profile.refresh_from_db()
+        sizes = django.conf.settings.IMAGE_RENDITION_SIZES
+        self.assertEqual(
+            set(self.profile.renditions),
+            {
+                f'{kind}_{size}'
+                for kind in django.conf.settings.IMAGE_RENDITION_FORMATS
+                for size in sizes
+            },
+        )
+        directory = self.profile.get_renditions_directory()
+        for size in sizes:
+            with PIL.Image.open(
+                f'{self.media_root}/{directory}/{size}.webp'
+            ) as rendition:
+                self.assertEqual(rendition.size, (size, size))
+                self.assertEqual(rendition.format, 'WEBP')
+
+    def test_header_reads_renditions(self) -> None:
+        """шапка показывает готовую копию одним запросом с пользователем"""
+        self.upload(self.get_image())
+        core.services.run_pending_jobs()
+        self.profile.refresh_from_db()
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                django.urls.reverse('users:password_change')
+            )
+        self.assertContains(response, self.profile.renditions['webp_50'])
+        self.assertContains(response, self.profile.renditions['jpeg_100'])
+
+    def test_stale_job_skipped(self) -> None:
+        """задача для уже замененной картинки ничего не делает"""
+        self.upload(self.get_image('first.png'))
+        self.upload(self.get_image('second.png'))
+        self.assertEqual(core.models.Job.objects.count(), 2)
+        core.services.run_pending_jobs()
+        self.profile.refresh_from_db()
+        self.assertEqual(
+            len(
+                django.core.files.storage.default_storage.listdir(
+                    self.profile.get_renditions_directory()
+                )[1]
+            ),
+            len(self.profile.renditions),
+        )
+
+    def test_clear_image_removes_renditions(self) -> None:
+        """удаление аватарки удаляет и копии"""
+        self.upload(self.get_image())
+        core.services.run_pending_jobs()
+        self.client.post(
+            django.urls.reverse(
+                'users:profile_change', kwargs={'pk': self.user.pk}
+            ),
+            {
+                'username': self.user.username,
+                'email': self.user.email,
+                'image-clear': 'on',
+            },
+        )
+        core.services.run_pending_jobs()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.renditions, dict())
+        self.assertEqual(
+            django.core.files.storage.default_storage.listdir(
+                self.profile.get_renditions_directory()
+            )[1],
+            [],
+        )
+
+    def test_make_avatars_command(self) -> None:
+        """команда ставит задачи только для аватарок без копий"""
+        self.upload(self.get_image())
+        core.models.Job.objects.all().delete()
+        django.core.management.call_command(
+            'make_avatars', stdout=io.StringIO()
+        )
+        self.assertEqual(core.models.Job.objects.count(), 1)
+        core.services.run_pending_jobs()
+        core.models.Job.objects.all().delete()
+        django.core.management.call_command(
+            'make_avatars', stdout=io.StringIO()
+        )
+        self.assertEqual(core.models.Job.objects.count(), 0)
@@ -13,9 +13,13 @@ import django.views
 import django.views.generic
 import django.views.generic.edit
 
+import core.images
+import core.mixins
 import organization.models
 import quiz.models
+import users.backends
 import users.forms
+import users.leaderboard
 import users.mixins
 import users.models
 import users.services
@@ -119,6 +123,7 @@ class ResetLoginAttemptsView(django.views.generic.View):
             )
             user.login_attempts = django.conf.settings.LOGIN_ATTEMPTS - 1
             user.save()
+            users.backends.reset_login_attempts(user)
         else:
             django.contrib.messages.error(request, 'Ссылка активации неверна.')
         return django.shortcuts.redirect('homepage:homepage')
@@ -130,19 +135,39 @@ class UserProfileView(django.views.generic.DetailView):
     template_name = 'users/profile.html'
     queryset = users.models.User.objects.get_only_useful_detail_fields()
 
+    def get_context_data(self, **kwargs) -> dict:
+        """место пользователя в общем рейтинге"""
+        context = super().get_context_data(**kwargs)
+        context['rank'] = users.leaderboard.get_rank(self.object.pk)
+        return context
+
 
-class UserListView(django.views.generic.ListView):
-    """список пользователей по рейтингу"""
+class UserListView(
+    core.mixins.AnonymousPageCacheMixin,
+    core.mixins.KeysetPaginationMixin,
+    django.views.generic.ListView,
+):
+    """
+    список пользователей по рейтингу
+    читается из общего рейтинга с готовыми местами,
+    без пользователей и профилей
+    """
+
+    cache_models = ('users.LeaderboardEntry',)
 
     template_name = 'users/list.html'
     context_object_name = 'users'
-    queryset = (
-        users.models.User.objects.get_only_useful_list_fields().order_by(
-            '-profile__rating'
-        )
-    )
+    queryset = users.models.LeaderboardEntry.objects.all()
+    keyset_ordering = ('rank',)
+    keyset_count = True
     paginate_by = 100
 
+    def get_context_data(self, **kwargs) -> dict:
+        """распределение пользователей по рейтингу"""
+        context = super().get_context_data(**kwargs)
+        context['rating_histogram'] = users.leaderboard.get_rating_histogram()
+        return context
+
 
 class UserProfileChangeView(
     users.mixins.UsernameMixinView,
@@ -183,7 +208,12 @@ class UserProfileChangeView(
             )
             if user_form.is_valid() and profile_form.is_valid():
                 user_form.save()
-                profile_form.save()
+                image_changed = 'image' in profile_form.changed_data
+                if image_changed:
+                    profile_form.instance.renditions = dict()
+                profile = profile_form.save()
+                if image_changed:
+                    core.images.enqueue_renditions(profile)
                 django.contrib.messages.success(
                     request, 'Профиль успешно изменен!'
                 )
@@ -198,12 +228,15 @@ class UserProfileChangeView(
 
 
 class UserAnswersView(
-    users.mixins.UsernameMixinView, django.views.generic.ListView
+    users.mixins.UsernameMixinView,
+    core.mixins.KeysetPaginationMixin,
+    django.views.generic.ListView,
 ):
     """ответы пользователя на вопросы"""
 
     template_name = 'users/question_answers.html'
     context_object_name = 'answers'
+    keyset_ordering = ('-time_answered',)
     paginate_by = 40
 
     def get_queryset(self) -> django.db.models.QuerySet:
@@ -226,7 +259,6 @@ class UserAnswersView(
                 user__pk=self.kwargs['pk'],
             )
             .distinct()
-            .order_by('-time_answered')
         )
 
 